@@ -20,6 +20,20 @@ class ThompsonSamplingManager:
         self.exploration_bonus = 0.1
         self.confidence_threshold = 0.95
         
+        # Stopping rules (expected loss / value remaining / HDI-ROPE)
+        self.posterior_samples = 4000
+        self.loss_threshold = 0.002             # Expected loss / rate of the best arm
+        self.value_remaining_threshold = 0.01   # Possible uplift left above the best arm
+        self.rope = 0.01                        # +/-1% relative lift = equivalent
+        self.hdi_mass = 0.95
+        
+        # Cached posterior draws per arm (float32): only redrawn when
+        # alpha/beta change. Bounded by bytes, not by arm count
+        self._rng = np.random.default_rng()
+        self._draws: Dict[str, Tuple[float, float, np.ndarray]] = {}
+        self._draws_bytes = 0
+        self.max_cached_bytes = 16 * 1024 * 1024
+        
     def select_arm(self, arms: List[Dict[str, Any]]) -> str:
         """
         Select arm using Thompson Sampling
@@ -129,32 +143,38 @@ class ThompsonSamplingManager:
             }
         
         try:
-            # Calculate probabilities each arm is best
-            prob_best = self._calculate_prob_best(arms_data)
+            # Prob best, expected loss and stopping decision from one set of draws
+            stopping = self.get_stopping_decision(arms_data)
+            prob_best = stopping["prob_best"]
             
             # Calculate expected conversion rates and credible intervals
             arm_statistics = self._calculate_arm_statistics(arms_data)
             
             # Determine winner and confidence
-            best_arm_id = max(prob_best, key=prob_best.get)
+            best_arm_id = stopping["best_arm"]
             best_prob = prob_best[best_arm_id]
+            winner = stopping["decision"] == "winner"
             
             # Statistical power analysis
             power_analysis = self._calculate_statistical_power(arms_data)
             
             # Generate recommendations
             recommendations = self._generate_recommendations(
-                arms_data, prob_best, best_prob, power_analysis
+                arms_data, stopping, power_analysis
             )
             
             return {
                 "prob_best": prob_best,
+                "expected_loss": stopping["expected_loss"],
                 "arm_statistics": arm_statistics,
                 "best_arm": best_arm_id,
                 "best_arm_probability": best_prob,
-                "confidence_threshold_met": best_prob >= self.confidence_threshold,
-                "recommended_winner": best_arm_id if best_prob >= self.confidence_threshold else None,
-                "continue_experiment": best_prob < self.confidence_threshold,
+                "confidence_threshold_met": winner,
+                "recommended_winner": best_arm_id if winner else None,
+                "continue_experiment": stopping["decision"] == "continue",
+                "stopping_decision": stopping["decision"],
+                "stopping_reason": stopping["reason"],
+                "value_remaining": stopping["value_remaining"],
                 "statistical_power": power_analysis["power"],
                 "recommendations": recommendations,
                 "sample_sizes": {arm['id']: arm.get('assignments', 0) for arm in arms_data}
@@ -167,44 +187,132 @@ class ThompsonSamplingManager:
                 "message": "Unable to perform statistical analysis"
             }
     
-    def _calculate_prob_best(
-        self, 
-        arms_data: List[Dict[str, Any]], 
-        samples: int = 10000
-    ) -> Dict[str, float]:
-        """Calculate probability each arm is the best using Monte Carlo"""
+    def get_stopping_decision(self, arms_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Decide whether the experiment can stop
         
-        arm_samples = {}
+        - Expected loss: conversion rate lost by picking the best arm if it
+          is not actually the best, relative to its rate
+        - Value remaining: hdi_mass percentile of the uplift that could
+          still exist above the best arm
+        - HDI-ROPE: HDI of the best arm's relative lift over each other
+          arm against +/-rope (all inside -> equivalent)
         
-        # Generate samples for each arm
+        Returns:
+            decision ('winner' | 'equivalent' | 'continue'), reason and metrics
+        """
+        arm_ids = [arm['id'] for arm in arms_data]
+        draws = self._posterior_matrix(arms_data)
+        
+        top = draws.max(axis=0)
+        prob_best = (draws == top).mean(axis=1)
+        expected_loss = (top - draws).mean(axis=1)
+        
+        best = int(np.argmax(prob_best))
+        best_draws = draws[best]
+        relative_loss = float(expected_loss[best] / max(best_draws.mean(), 1e-12))
+        value_remaining = float(np.quantile(
+            (top - best_draws) / np.maximum(best_draws, 1e-12),
+            self.hdi_mass
+        ))
+        
+        hdi_rope = {}
+        for j, arm_id in enumerate(arm_ids):
+            if j == best:
+                continue
+            lift = (best_draws - draws[j]) / np.maximum(draws[j], 1e-12)
+            lower, upper = self._hdi(lift)
+            hdi_rope[arm_id] = {
+                "lower": lower,
+                "upper": upper,
+                "decision": self._rope_decision(lower, upper)
+            }
+        
+        samples_ok = min(
+            arm.get('assignments', 0) for arm in arms_data
+        ) >= self.min_samples_for_reliable_stats
+        rope_decisions = {entry["decision"] for entry in hdi_rope.values()}
+        
+        if not samples_ok:
+            decision, reason = "continue", "min_samples"
+        elif rope_decisions == {"equivalent"}:
+            decision, reason = "equivalent", "hdi_rope"
+        elif relative_loss <= self.loss_threshold:
+            decision, reason = "winner", "expected_loss"
+        elif value_remaining <= self.value_remaining_threshold:
+            decision, reason = "winner", "value_remaining"
+        elif rope_decisions == {"better"}:
+            decision, reason = "winner", "hdi_rope"
+        else:
+            decision, reason = "continue", "undecided"
+        
+        return {
+            "decision": decision,
+            "reason": reason,
+            "best_arm": arm_ids[best],
+            "prob_best": {arm_id: float(prob_best[i]) for i, arm_id in enumerate(arm_ids)},
+            "expected_loss": {arm_id: float(expected_loss[i]) for i, arm_id in enumerate(arm_ids)},
+            "relative_loss": relative_loss,
+            "value_remaining": value_remaining,
+            "hdi_rope": hdi_rope
+        }
+    
+    def _posterior_matrix(self, arms_data: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Posterior draws (arms x samples), reusing cached rows
+        
+        A new conversion changes one arm's alpha/beta, so only that row
+        is redrawn instead of the whole matrix.
+        """
+        rows = []
         for arm in arms_data:
             alpha = max(arm.get('alpha', 1.0), 1.0)
             beta = max(arm.get('beta', 1.0), 1.0)
-            arm_samples[arm['id']] = np.random.beta(alpha, beta, samples)
-        
-        # Count how often each arm is best
-        prob_best = {}
-        arm_ids = list(arm_samples.keys())
-        
-        for arm_id in arm_ids:
-            is_best_count = 0
             
-            for i in range(samples):
-                is_best = True
-                current_sample = arm_samples[arm_id][i]
-                
-                # Check if this arm's sample is best
-                for other_arm_id in arm_ids:
-                    if other_arm_id != arm_id and arm_samples[other_arm_id][i] > current_sample:
-                        is_best = False
-                        break
-                
-                if is_best:
-                    is_best_count += 1
-            
-            prob_best[arm_id] = is_best_count / samples
-        
-        return prob_best
+            cached = self._draws.get(arm['id'])
+            if cached is None or cached[0] != alpha or cached[1] != beta:
+                draws = self._rng.beta(alpha, beta, self.posterior_samples).astype(np.float32)
+                self._drop_draws(arm['id'])
+                cached = (alpha, beta, draws)
+                self._draws[arm['id']] = cached
+                self._draws_bytes += draws.nbytes
+            rows.append(cached[2])
+        
+        # Oldest draws out first (dict keeps insertion order), never the
+        # arms being evaluated
+        current = {arm['id'] for arm in arms_data}
+        for arm_id in list(self._draws):
+            if self._draws_bytes <= self.max_cached_bytes:
+                break
+            if arm_id not in current:
+                self._drop_draws(arm_id)
+        
+        return np.stack(rows).astype(np.float64)
+    
+    def _drop_draws(self, arm_id: str) -> None:
+        cached = self._draws.pop(arm_id, None)
+        if cached is not None:
+            self._draws_bytes -= cached[2].nbytes
+    
+    def _hdi(self, values: np.ndarray) -> Tuple[float, float]:
+        """Shortest interval holding hdi_mass of the draws"""
+        ordered = np.sort(values)
+        width = max(1, int(np.ceil(self.hdi_mass * len(ordered))))
+        if width >= len(ordered):
+            return float(ordered[0]), float(ordered[-1])
+        
+        spans = ordered[width:] - ordered[:len(ordered) - width]
+        start = int(np.argmin(spans))
+        return float(ordered[start]), float(ordered[start + width])
+    
+    def _rope_decision(self, lower: float, upper: float) -> str:
+        if lower > self.rope:
+            return "better"
+        if upper < -self.rope:
+            return "worse"
+        if lower >= -self.rope and upper <= self.rope:
+            return "equivalent"
+        return "undecided"
     
     def _calculate_arm_statistics(self, arms_data: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
         """Calculate statistics for each arm"""
@@ -281,26 +389,43 @@ class ThompsonSamplingManager:
     def _generate_recommendations(
         self, 
         arms_data: List[Dict[str, Any]], 
-        prob_best: Dict[str, float], 
-        best_prob: float,
+        stopping: Dict[str, Any],
         power_analysis: Dict[str, float]
     ) -> List[str]:
         """Generate actionable recommendations"""
         
         recommendations = []
         total_assignments = sum(arm.get('assignments', 0) for arm in arms_data)
+        prob_best = stopping["prob_best"]
+        best_prob = prob_best[stopping["best_arm"]]
+        best_arm_name = next(
+            arm['name'] for arm in arms_data 
+            if arm['id'] == stopping["best_arm"]
+        )
         
-        if best_prob >= self.confidence_threshold:
-            best_arm_name = next(
-                arm['name'] for arm in arms_data 
-                if arm['id'] == max(prob_best, key=prob_best.get)
-            )
+        if stopping["decision"] == "winner":
             recommendations.append(
                 f"✓ Clear winner identified: {best_arm_name} "
                 f"({best_prob:.1%} probability of being best)"
             )
+            if stopping["reason"] == "expected_loss":
+                recommendations.append(
+                    f"Expected loss of choosing {best_arm_name} is "
+                    f"{stopping['relative_loss']:.2%} of its conversion rate"
+                )
+            elif stopping["reason"] == "value_remaining":
+                recommendations.append(
+                    f"At most {stopping['value_remaining']:.1%} uplift could remain "
+                    f"above {best_arm_name}"
+                )
             recommendations.append("Consider stopping the experiment and implementing the winner")
             
+        elif stopping["decision"] == "equivalent":
+            recommendations.append(
+                "🤝 Arms are practically equivalent. Stop the experiment and keep "
+                "whichever is cheaper to maintain"
+            )
+            
         elif total_assignments < self.min_samples_for_reliable_stats:
             needed = self.min_samples_for_reliable_stats - total_assignments
             recommendations.append(
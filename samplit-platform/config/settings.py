@@ -40,6 +40,11 @@ class Settings(BaseSettings):
     DB_POOL_MIN_SIZE: int = 5
     DB_POOL_MAX_SIZE: int = 20
     
+    # Sub-pool para tráfico público (tracker/assign/convert/proxy)
+    DB_PUBLIC_POOL_MIN_SIZE: int = 2
+    DB_PUBLIC_POOL_MAX_SIZE: int = 10
+    DB_PUBLIC_COMMAND_TIMEOUT: float = 5.0
+    
     @validator('DATABASE_URL')
     def validate_database_url(cls, v):
         # Supabase needs postgresql:// not postgres://
@@ -73,12 +78,158 @@ class Settings(BaseSettings):
     OPT_EXPLORATION_RATE: float = 0.1
     OPT_EXPLORATION_DECAY: float = 0.995
     
+    # Client-side decision mode (high-traffic installations)
+    CLIENT_DECISION_REFRESH_SECONDS: int = 300  # Recalcular pesos publicados
+    CLIENT_DECISION_MIN_WEIGHT: float = 0.01    # Mínimo por variante (exploración)
+    CLIENT_DECISION_MAX_EXPERIMENTS: int = 10000  # Pesos en memoria (LRU por proceso)
+    TRACKER_CONFIG_MAX_AGE: int = 300           # Cache-Control del config (CDN)
+    
     # ============================================
     # API CONFIGURATION
     # ============================================
     API_PREFIX: str = "/api/v1"
     API_RATE_LIMIT: int = 1000  # requests per hour
     
+    # Admission control (endpoints públicos)
+    ADMISSION_TRACKER_CONCURRENCY: int = 200
+    ADMISSION_ASSIGN_CONCURRENCY: int = 100
+    ADMISSION_CONVERT_CONCURRENCY: int = 50
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 50       # Espera máxima antes de rechazar
+    ADMISSION_RATE_PER_SECOND: float = 50.0    # Por instalación/experimento
+    ADMISSION_BURST: int = 100
+    
+    # Circuit breaker (base de datos en endpoints públicos)
+    CIRCUIT_SLOW_CALL_MS: int = 500          # Más lento cuenta como llamada mala
+    CIRCUIT_FAILURE_RATE: float = 0.5        # % de llamadas malas para abrir
+    CIRCUIT_WINDOW_SIZE: int = 20
+    CIRCUIT_MIN_CALLS: int = 10
+    CIRCUIT_OPEN_SECONDS: float = 15.0       # Tiempo abierto antes de probar
+    CIRCUIT_HALF_OPEN_PROBES: int = 3
+    CIRCUIT_CALL_DEADLINE_MS: int = 1500     # Deadline por llamada
+    
+    # Compute pool (analytics CPU fuera del event loop)
+    ANALYTICS_POOL_KIND: str = "process"      # process | thread
+    ANALYTICS_POOL_WORKERS: int = 2
+    ANALYTICS_POOL_MAX_QUEUE: int = 16        # Más jobs esperando → 503
+    ANALYTICS_JOB_TIMEOUT_SECONDS: float = 10.0
+    
+    # Cache de analytics (por fingerprint de allocations/conversions)
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 5000
+    ANALYTICS_CACHE_FRESH_SECONDS: float = 2.0    # Sin consultar la DB
+    ANALYTICS_CACHE_STALE_SECONDS: float = 60.0   # Stale-while-revalidate
+    
+    # Métricas en vivo (SSE, un lector por experimento)
+    LIVE_METRICS_POLL_SECONDS: float = 5.0        # Cambios de otros workers
+    LIVE_METRICS_MIN_INTERVAL_SECONDS: float = 1.0
+    LIVE_METRICS_HEARTBEAT_SECONDS: float = 15.0
+    LIVE_METRICS_HISTORY_SIZE: int = 100          # Eventos para Last-Event-ID
+    LIVE_METRICS_RETRY_MS: int = 3000
+    
+    # Exports (cursor del servidor, chunks de tamaño fijo)
+    EXPORT_CHUNK_SIZE: int = 5000
+    EXPORT_GZIP_LEVEL: int = 6
+    EXPORT_MAX_CONCURRENCY: int = 4               # Cada export retiene una conexión
+    EXPORT_QUEUE_TIMEOUT_MS: int = 200
+    
+    # Winner detection (batch sobre todos los experimentos activos)
+    WINNER_DETECTION_ENABLED: bool = True
+    WINNER_DETECTION_INTERVAL_SECONDS: int = 3600
+    WINNER_DETECTION_SAMPLES: int = 2000          # Monte Carlo (arms con pocos datos)
+    WINNER_DETECTION_THRESHOLD: float = 0.95      # P(best) para declarar ganador
+    WINNER_DETECTION_TIMEOUT_SECONDS: float = 300.0
+    WINNER_MIN_SAMPLES: int = 100                 # Allocations mínimas por variante
+    WINNER_AUTO_PAUSE_LOSERS: bool = False
+    WINNER_LOSER_THRESHOLD: float = 0.01          # P(best) por debajo → pausar variante
+    WINNER_AUTO_CONCLUDE: bool = False            # Con la decisión de las reglas de parada (STOPPING_*)
+    
+    # Reglas de parada (draws incrementales por experimento)
+    STOPPING_SAMPLES: int = 4000
+    STOPPING_CACHE_MAX_BYTES: int = 32 * 1024 * 1024   # Draws cacheados (float32) por proceso
+    STOPPING_LOSS_THRESHOLD: float = 0.002        # Expected loss / CR de la mejor (dashboard y auto-conclude)
+    STOPPING_VALUE_REMAINING: float = 0.01        # Uplift posible (percentil HDI) restante
+    STOPPING_ROPE: float = 0.01                   # ±1% de lift = equivalentes
+    STOPPING_HDI_MASS: float = 0.95
+    
+    # Snapshots columnar (Parquet por experimento/fecha) + consultas DuckDB
+    SNAPSHOT_EXPORT_ENABLED: bool = False         # Requiere pyarrow
+    SNAPSHOT_ROOT: str = "./data/snapshots"       # Disco local o bucket montado
+    SNAPSHOT_INTERVAL_SECONDS: int = 86400
+    SNAPSHOT_LOOKBACK_DAYS: int = 7               # Particiones que aún reciben conversiones
+    SNAPSHOT_QUERY_THREADS: int = 2
+    SNAPSHOT_QUERY_TIMEOUT_SECONDS: float = 30.0
+    
+    # Resumen del dashboard (experiment_summaries, materializado por usuario)
+    DASHBOARD_SUMMARY_MAX_AGE_SECONDS: float = 30.0
+    
+    # Rebuild de estado desde allocations / funnel_sessions (admin, scripts/rebuild_state.py)
+    STATE_REBUILD_WORKERS: int = 4                # Experimentos/funnels en paralelo (< pool de la DB)
+    STATE_REBUILD_CHUNK_SIZE: int = 10000
+    STATE_REBUILD_ABANDON_HOURS: int = 24         # Sesión de funnel sin actividad → intento sin conversión
+    
+    # Sesiones de funnel en curso (memory: un solo worker; postgres: compartidas)
+    FUNNEL_SESSION_BACKEND: str = "postgres"
+    FUNNEL_SESSION_TTL_SECONDS: int = 1800        # Sin actividad → expirada
+    FUNNEL_SESSION_MAX_SESSIONS: int = 100000     # memory: máximo por proceso (LRU)
+    FUNNEL_SESSION_CACHE_SECONDS: float = 5.0     # postgres: cache local read-through
+    FUNNEL_SESSION_CACHE_SIZE: int = 10000
+    
+    # Funnels precompilados (pasos + performance de variantes, por proceso)
+    FUNNEL_PLAN_FRESH_SECONDS: float = 10.0       # Después: se sirve y se refresca en background
+    FUNNEL_PLAN_MAX_FUNNELS: int = 1000
+    
+    # ============================================
+    # OUTBOUND HTTP (integration layer)
+    # ============================================
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_PROXY_LIMIT: int = 200
+    HTTP_PROXY_LIMIT_PER_HOST: int = 20
+    HTTP_PROXY_TIMEOUT: float = 30.0
+    HTTP_VERIFICATION_TIMEOUT: float = 10.0
+    HTTP_ADS_LIMIT: int = 20
+    HTTP_ADS_TIMEOUT: float = 30.0
+    
+    # ============================================
+    # STATIC ASSETS
+    # ============================================
+    STATIC_DIR: str = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'static'
+    )
+    STATIC_MINIFY: bool = True
+    STATIC_GZIP_LEVEL: int = 9         # Se comprime una vez al arrancar
+    STATIC_BROTLI_QUALITY: int = 11
+    STATIC_ALIAS_MAX_AGE: int = 300    # /static/tracker.js (URL sin hash)
+    
+    # ============================================
+    # PROXY
+    # ============================================
+    PROXY_STREAMING_ENABLED: bool = True
+    PROXY_INJECTION_MAX_SCAN_BYTES: int = 262144  # Sin <head>/<body> antes → inyectar al inicio
+    PROXY_GZIP_LEVEL: int = 6          # HTML recomprimido tras inyectar
+    PROXY_BROTLI_QUALITY: int = 5
+    PROXY_COALESCING_ENABLED: bool = True       # Un fetch por página compartible en picos
+    PROXY_MICROCACHE_SECONDS: float = 2.0
+    PROXY_SERVER_SIDE_VARIANTS: bool = False     # Aplicar variantes en el proxy (sin flicker)
+    PROXY_VISITOR_COOKIE: str = "samplit_uid"
+    PROXY_VISITOR_COOKIE_MAX_AGE: int = 365 * 86400
+    PROXY_CACHE_ENABLED: bool = True
+    PROXY_CACHE_MAX_MEMORY_BYTES: int = 64 * 1024 * 1024
+    PROXY_CACHE_MAX_ENTRY_BYTES: int = 5 * 1024 * 1024
+    PROXY_CACHE_DISK_PATH: Optional[str] = None   # Tier en disco (opcional)
+    PROXY_CACHE_MAX_DISK_BYTES: int = 1024 * 1024 * 1024
+    PROXY_CACHE_HEURISTIC_MAX_AGE: int = 86400    # Tope de frescura heurística (Last-Modified)
+    PROXY_CACHE_PASS_SECONDS: int = 60            # URLs no cacheables: sin coalescing durante este tiempo
+    
+    # ============================================
+    # INSTALLATIONS
+    # ============================================
+    HEALTH_SWEEP_ENABLED: bool = True
+    HEALTH_SWEEP_INTERVAL_SECONDS: int = 900
+    HEALTH_SWEEP_CONCURRENCY: int = 20
+    HEALTH_SWEEP_PER_HOST_INTERVAL: float = 1.0   # Segundos entre requests al mismo host
+    
     # ============================================
     # LOGGING
     # ============================================
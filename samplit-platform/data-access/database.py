@@ -2,10 +2,13 @@
 # data-access/database.py
 
 import os
+import json
 import asyncpg
-from typing import Optional
+from typing import Optional, Dict, Any, List
 from contextlib import asynccontextmanager
 
+from config.settings import settings
+
 class DatabaseManager:
     """
     Supabase/PostgreSQL connection manager
@@ -19,6 +22,11 @@ class DatabaseManager:
     def __init__(self):
         self.pool: Optional[asyncpg.Pool] = None
         
+        # Sub-pool para tráfico público (tracker, assign, convert, proxy)
+        # Así un pico en el sitio de un cliente no agota las conexiones
+        # del dashboard, y viceversa.
+        self.public_pool: Optional[asyncpg.Pool] = None
+        
         # Supabase connection strings
         self.database_url = os.environ.get("SUPABASE_DB_URL")
         self.service_role_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
@@ -53,10 +61,26 @@ class DatabaseManager:
             }
         )
         
+        # Pool público: más pequeño y con timeout corto (falla rápido)
+        self.public_pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=settings.DB_PUBLIC_POOL_MIN_SIZE,
+            max_size=settings.DB_PUBLIC_POOL_MAX_SIZE,
+            max_queries=50000,
+            max_inactive_connection_lifetime=300,
+            command_timeout=settings.DB_PUBLIC_COMMAND_TIMEOUT,
+            ssl='require' if 'supabase.co' in self.database_url else None,
+            server_settings={
+                'request.jwt.claims': '{"role":"service_role"}',
+            }
+        )
+        
         print("✅ Database pool initialized")
     
     async def close(self):
-        """Close connection pool"""
+        """Close connection pools"""
+        if self.public_pool:
+            await self.public_pool.close()
         if self.pool:
             await self.pool.close()
             print("✅ Database pool closed")
@@ -67,6 +91,42 @@ class DatabaseManager:
         async with self.pool.acquire() as connection:
             yield connection
     
+    @asynccontextmanager
+    async def acquire_public(self):
+        """Acquire connection from the public-traffic pool"""
+        async with self.public_pool.acquire() as connection:
+            yield connection
+    
+    @asynccontextmanager
+    async def advisory_lock(self, key: str):
+        """
+        Advisory lock de sesión en una conexión propia, fuera de los pools
+
+        Para jobs de background (un ciclo a la vez entre workers): el
+        lock dura todo el ciclo sin tener ocupada una conexión del pool
+        principal. Yields True si se obtuvo, False si otro lo tiene.
+        Cerrar la conexión libera el lock aunque el unlock falle.
+        """
+        conn = await asyncpg.connect(
+            self.database_url,
+            ssl='require' if 'supabase.co' in self.database_url else None
+        )
+        try:
+            locked = await conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtext($1))",
+                key
+            )
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await conn.execute(
+                        "SELECT pg_advisory_unlock(hashtext($1))",
+                        key
+                    )
+        finally:
+            await conn.close()
+    
     async def health_check(self) -> bool:
         """Check database connectivity"""
         try:
@@ -85,7 +145,9 @@ class DatabaseManager:
                 pool_stats = {
                     'pool_size': self.pool.get_size(),
                     'pool_free': self.pool.get_idle_size(),
-                    'pool_used': self.pool.get_size() - self.pool.get_idle_size()
+                    'pool_used': self.pool.get_size() - self.pool.get_idle_size(),
+                    'public_pool_size': self.public_pool.get_size(),
+                    'public_pool_free': self.public_pool.get_idle_size()
                 }
             
                 # Table counts
@@ -125,37 +187,98 @@ class DatabaseManager:
             """, variant_id)
         return dict(row) if row else {'sample_size': 0, 'conversion_rate': 0.0}
 
+    async def get_funnel_plan_state(self, funnel_id: str, variant_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Funnel version (updated_at) + performance of all its step variants
+
+        One round trip (WHERE id = ANY) instead of one query per variant.
+        """
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT 
+                    f.updated_at,
+                    v.id as variant_id,
+                    v.total_allocations as sample_size,
+                    v.observed_conversion_rate as conversion_rate
+                FROM funnels f
+                LEFT JOIN variants v ON v.id = ANY($2::uuid[])
+                WHERE f.id = $1
+            """, funnel_id, variant_ids)
+        
+        if not rows:
+            return None
+        
+        return {
+            'updated_at': rows[0]['updated_at'],
+            'performance': {
+                str(row['variant_id']): {
+                    'sample_size': row['sample_size'] or 0,
+                    'conversion_rate': float(row['conversion_rate'] or 0.0)
+                }
+                for row in rows if row['variant_id'] is not None
+            }
+        }
+
     async def create_funnel_session(self, session: 'FunnelSession'):
         """Create funnel session"""
         async with self.pool.acquire() as conn:
             await conn.execute("""
                 INSERT INTO funnel_sessions 
-                (session_id, user_id, funnel_id, current_step, started_at)
-                VALUES ($1, $2, $3, $4, $5)
+                (session_id, user_identifier, funnel_id, current_step_index,
+                 selected_variants, user_context, started_at)
+                VALUES ($1, $2, $3, $4, $5::jsonb, $6::jsonb, $7)
             """, 
             session.session_id, 
             session.user_id, 
             session.funnel_id, 
             session.current_step,
+            json.dumps(session.selections),
+            json.dumps(session.context, default=str),
             session.started_at)
 
-    async def update_funnel_session(self, session: 'FunnelSession', metadata: Dict = None):
-        """Update funnel session"""
+    async def get_funnel_session(self, session_id: str, ttl_seconds: float) -> Optional[Dict[str, Any]]:
+        """Get open funnel session (not completed, active within ttl_seconds)"""
         async with self.pool.acquire() as conn:
-            await conn.execute("""
+            row = await conn.fetchrow("""
+                SELECT 
+                    session_id, user_identifier, funnel_id, current_step_index,
+                    selected_variants, user_context, started_at, version
+                FROM funnel_sessions
+                WHERE session_id = $1
+                  AND NOT completed
+                  AND last_activity_at > NOW() - make_interval(secs => $2)
+            """, session_id, float(ttl_seconds))
+        return dict(row) if row else None
+
+    async def update_funnel_session(self, session: 'FunnelSession', metadata: Dict = None) -> Optional[int]:
+        """
+        Update funnel session progress
+
+        Compare-and-set on version: returns the new version, or None if
+        the session changed since it was read (or no longer exists).
+        """
+        async with self.pool.acquire() as conn:
+            return await conn.fetchval("""
                 UPDATE funnel_sessions
-                SET current_step = $1, last_activity_at = NOW()
-                WHERE session_id = $2
-            """, session.current_step, session.session_id)
+                SET current_step_index = $1,
+                    selected_variants = $2::jsonb,
+                    last_activity_at = NOW(),
+                    version = version + 1
+                WHERE session_id = $3 AND version = $4
+                RETURNING version
+            """, session.current_step, json.dumps(session.selections),
+            session.session_id, session.version)
 
     async def record_funnel_conversion(self, session: 'FunnelSession', value: float, metadata: Dict = None):
         """Record funnel conversion"""
         async with self.pool.acquire() as conn:
             await conn.execute("""
                 UPDATE funnel_sessions
-                SET completed = true, converted = true, completed_at = NOW()
+                SET completed = true, converted = true, completed_at = NOW(),
+                    selected_variants = $2::jsonb, last_activity_at = NOW(),
+                    version = version + 1
                 WHERE session_id = $1
-            """, session.session_id)
+            """, session.session_id, json.dumps(session.selections))
 
     async def get_funnel_step_analytics(self, funnel_id: str) -> Dict[str, Any]:
         """Get funnel step analytics"""
@@ -169,7 +292,7 @@ class DatabaseManager:
                         THEN COUNT(*) FILTER (WHERE completed)::FLOAT / COUNT(*)::FLOAT
                         ELSE 0
                     END as conversion_rate,
-                    AVG(current_step) as avg_steps
+                    AVG(current_step_index) as avg_steps
                 FROM funnel_sessions
                 WHERE funnel_id = $1
             """, funnel_id)
@@ -1,7 +1,8 @@
 # data-access/repositories/allocation_repository.py
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
 from .base_repository import BaseRepository
+from .pagination import clamp_page_size, decode_cursor, keyset_page
 import json
 from datetime import datetime, timezone
 
@@ -68,7 +69,83 @@ class AllocationRepository(BaseRepository):
             )
         
         return str(allocation_id)
-    
+
+    async def create_allocations_batch(
+        self,
+        allocations: List[Dict[str, Any]]
+    ) -> List[Dict[str, str]]:
+        """
+        Create several allocations in a single statement
+
+        Rows that conflict with an existing (experiment_id, user_identifier)
+        allocation are skipped, so concurrent requests for the same
+        visitor never produce duplicates.
+
+        Returns:
+            Inserted rows as dicts (experiment_id, variant_id, user_identifier)
+        """
+        if not allocations:
+            return []
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                INSERT INTO allocations
+                (experiment_id, variant_id, user_identifier, session_id, context)
+                SELECT * FROM unnest(
+                    $1::uuid[], $2::uuid[], $3::varchar[], $4::varchar[], $5::jsonb[]
+                )
+                ON CONFLICT (experiment_id, user_identifier) DO NOTHING
+                RETURNING experiment_id, variant_id, user_identifier
+                """,
+                [a['experiment_id'] for a in allocations],
+                [a['variant_id'] for a in allocations],
+                [a['user_identifier'] for a in allocations],
+                [a.get('session_id') for a in allocations],
+                [json.dumps(a.get('context') or {}) for a in allocations]
+            )
+
+        return [
+            {
+                'experiment_id': str(row['experiment_id']),
+                'variant_id': str(row['variant_id']),
+                'user_identifier': row['user_identifier']
+            }
+            for row in rows
+        ]
+
+    async def get_allocated_variants(
+        self,
+        experiment_ids: List[str],
+        user_identifier: str
+    ) -> Dict[str, str]:
+        """
+        Existing allocations of one visitor in several experiments
+
+        Returns:
+            {experiment_id: variant_id} for the experiments that have one
+        """
+        if not experiment_ids:
+            return {}
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT experiment_id, variant_id
+                FROM allocations
+                WHERE (experiment_id, user_identifier) IN (
+                    SELECT unnest($1::uuid[]), $2::varchar
+                )
+                """,
+                experiment_ids,
+                user_identifier
+            )
+
+        return {
+            str(row['experiment_id']): str(row['variant_id'])
+            for row in rows
+        }
+
     async def record_conversion(
         self,
         allocation_id: str,
@@ -97,26 +174,89 @@ class AllocationRepository(BaseRepository):
         self,
         experiment_id: str,
         limit: int = 100,
-        offset: int = 0
-    ) -> List[Dict[str, Any]]:
-        """Get recent allocations for experiment"""
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get allocations for experiment, newest first (keyset pagination)
+        
+        Returns:
+            {'allocations': [...], 'next_cursor': str | None}
+        
+        Raises:
+            InvalidCursor: cursor was not produced by a previous page
+        """
+        limit = clamp_page_size(limit)
+        query = """
+            SELECT 
+                a.id, a.variant_id, a.user_identifier,
+                a.allocated_at, a.converted_at, a.conversion_value,
+                v.name as variant_name
+            FROM allocations a
+            JOIN variants v ON a.variant_id = v.id
+            WHERE a.experiment_id = $1
+        """
+        args: List[Any] = [experiment_id, limit + 1]
+        
+        if cursor:
+            query += " AND (a.allocated_at, a.id) < ($3::timestamptz, $4::uuid)"
+            args.extend(decode_cursor(cursor))
+        
+        query += " ORDER BY a.allocated_at DESC, a.id DESC LIMIT $2"
+        
         async with self.db.acquire() as conn:
-            rows = await conn.fetch(
-                """
-                SELECT 
-                    a.id, a.variant_id, a.user_identifier,
-                    a.allocated_at, a.converted_at, a.conversion_value,
-                    v.name as variant_name
-                FROM allocations a
-                JOIN variants v ON a.variant_id = v.id
-                WHERE a.experiment_id = $1
-                ORDER BY a.allocated_at DESC
-                LIMIT $2 OFFSET $3
-                """,
-                experiment_id, limit, offset
-            )
+            rows = await conn.fetch(query, *args)
         
-        return [dict(row) for row in rows]
+        allocations, next_cursor = keyset_page(rows, limit, 'allocated_at')
+        return {'allocations': allocations, 'next_cursor': next_cursor}
+    
+    async def stream_experiment_allocations(
+        self,
+        experiment_id: str,
+        after: Optional[Tuple[datetime, str]] = None,
+        chunk_size: int = 5000,
+        since: Optional[datetime] = None,
+        with_context: bool = False
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Stream every allocation of an experiment in (allocated_at, id) order
+        
+        Server-side cursor in a read-only transaction: only chunk_size
+        rows are in memory at a time, whatever the total. `after` is the
+        (allocated_at, id) of the last row already received (keyset
+        resume, no OFFSET). `since` limits to allocated_at >= since
+        (snapshot partitions still open to late conversions).
+        """
+        query = f"""
+            SELECT 
+                a.id, a.variant_id, v.name as variant_name,
+                a.user_identifier, a.session_id,
+                a.allocated_at, a.converted_at, a.conversion_value
+                {', a.context' if with_context else ''}
+            FROM allocations a
+            JOIN variants v ON a.variant_id = v.id
+            WHERE a.experiment_id = $1
+        """
+        args: List[Any] = [experiment_id]
+        
+        if after:
+            query += " AND (a.allocated_at, a.id) > ($2::timestamptz, $3::uuid)"
+            args.extend(after)
+        
+        if since:
+            args.append(since)
+            query += f" AND a.allocated_at >= ${len(args)}::timestamptz"
+        
+        query += " ORDER BY a.allocated_at, a.id"
+        
+        async with self.db.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                
+                while True:
+                    rows = await cursor.fetch(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
     
     async def get_conversion_timeline(
         self,
@@ -132,6 +132,7 @@ class ExperimentRepository(BaseRepository):
             """
             
             result = await conn.execute(query, *values)
+            await self._invalidate_summaries(conn, [id])
             
         return result == 'UPDATE 1'
     
@@ -165,6 +166,8 @@ class ExperimentRepository(BaseRepository):
                     """,
                     status, id, user_id
                 )
+            
+            await self._invalidate_summaries(conn, [id])
         
         return result == 'UPDATE 1'
     
@@ -179,6 +182,8 @@ class ExperimentRepository(BaseRepository):
                 """,
                 id, user_id
             )
+            
+            await self._invalidate_summaries(conn, [id])
         
         return result == 'UPDATE 1'
     
@@ -195,3 +200,129 @@ class ExperimentRepository(BaseRepository):
             )
         
         return count or 0
+    
+    # ============================================
+    # DASHBOARD SUMMARY (experiment_summaries)
+    # ============================================
+    
+    async def get_summary(
+        self,
+        user_id: str,
+        max_age_seconds: float = 30.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Resumen de todos los experimentos del usuario
+        
+        Se lee de experiment_summaries (un index scan). Si no hay filas
+        (nunca materializado o invalidado) o tienen más de
+        max_age_seconds, se reconstruye con una sola query.
+        """
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT *
+                FROM experiment_summaries
+                WHERE user_id = $1
+                ORDER BY created_at DESC
+                """,
+                user_id
+            )
+            
+            if rows:
+                oldest = min(row['refreshed_at'] for row in rows)
+                age = (datetime.now(timezone.utc) - oldest).total_seconds()
+                if age < max_age_seconds:
+                    return [dict(row) for row in rows]
+            
+            rows = await self._refresh_summaries(conn, user_id)
+        
+        summaries = [dict(row) for row in rows]
+        summaries.sort(key=lambda s: s['created_at'], reverse=True)
+        return summaries
+    
+    async def invalidate_summaries(self, experiment_ids: List[str]) -> None:
+        """Forzar refresh del resumen de los dueños de estos experimentos"""
+        async with self.db.acquire() as conn:
+            await self._invalidate_summaries(conn, experiment_ids)
+    
+    @staticmethod
+    async def _invalidate_summaries(conn, experiment_ids: List[str]) -> None:
+        await conn.execute(
+            """
+            DELETE FROM experiment_summaries
+            WHERE user_id IN (
+                SELECT user_id FROM experiments WHERE id = ANY($1::uuid[])
+            )
+            """,
+            experiment_ids
+        )
+    
+    @staticmethod
+    async def _refresh_summaries(conn, user_id: str) -> List[Any]:
+        """
+        Materializar el resumen del usuario (un INSERT ... SELECT)
+        
+        Contadores agregados de variantes activas; líder = variante con
+        mayor P(best) en el último snapshot de winner detection.
+        """
+        return await conn.fetch(
+            """
+            INSERT INTO experiment_summaries (
+                experiment_id, user_id, name, description, status,
+                optimization_strategy, created_at, started_at,
+                variant_count, total_users, total_conversions, conversion_rate,
+                leader_variant_id, leader_variant_name,
+                leader_prob_best, leader_expected_loss, refreshed_at
+            )
+            SELECT
+                e.id, e.user_id, e.name, e.description, e.status,
+                e.optimization_strategy, e.created_at, e.started_at,
+                c.variant_count, c.total_users, c.total_conversions,
+                CASE
+                    WHEN c.total_users > 0
+                    THEN c.total_conversions::FLOAT / c.total_users::FLOAT
+                    ELSE 0
+                END,
+                l.variant_id, lv.name,
+                l.confidence_score::FLOAT, l.expected_loss,
+                NOW()
+            FROM experiments e
+            JOIN (
+                SELECT
+                    e.id,
+                    COUNT(v.id) AS variant_count,
+                    COALESCE(SUM(v.total_allocations), 0) AS total_users,
+                    COALESCE(SUM(v.total_conversions), 0) AS total_conversions
+                FROM experiments e
+                LEFT JOIN variants v ON e.id = v.experiment_id AND v.is_active = true
+                WHERE e.user_id = $1
+                GROUP BY e.id
+            ) c ON c.id = e.id
+            LEFT JOIN LATERAL (
+                SELECT s.variant_id, s.confidence_score, s.expected_loss
+                FROM performance_snapshots s
+                WHERE s.experiment_id = e.id
+                ORDER BY s.snapshot_date DESC, s.snapshot_hour DESC, s.confidence_score DESC
+                LIMIT 1
+            ) l ON true
+            LEFT JOIN variants lv ON lv.id = l.variant_id
+            WHERE e.user_id = $1
+            ON CONFLICT (experiment_id) DO UPDATE SET
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                status = EXCLUDED.status,
+                optimization_strategy = EXCLUDED.optimization_strategy,
+                started_at = EXCLUDED.started_at,
+                variant_count = EXCLUDED.variant_count,
+                total_users = EXCLUDED.total_users,
+                total_conversions = EXCLUDED.total_conversions,
+                conversion_rate = EXCLUDED.conversion_rate,
+                leader_variant_id = EXCLUDED.leader_variant_id,
+                leader_variant_name = EXCLUDED.leader_variant_name,
+                leader_prob_best = EXCLUDED.leader_prob_best,
+                leader_expected_loss = EXCLUDED.leader_expected_loss,
+                refreshed_at = EXCLUDED.refreshed_at
+            RETURNING *
+            """,
+            user_id
+        )
@@ -101,7 +101,8 @@ class FunnelPathRepository(BaseRepository):
                 'optimization_state': initial_state
             }
     
-    def _initialize_path_state(self) -> Dict[str, Any]:
+    @staticmethod
+    def _initialize_path_state() -> Dict[str, Any]:
         """
         Initialize algorithm state for new path
         
@@ -0,0 +1,63 @@
+# data-access/repositories/pagination.py
+
+"""
+Keyset pagination
+
+Cursores opacos que codifican (timestamp, id) de la última fila de
+una página. La siguiente página es `WHERE (ts, id) < (cursor)` sobre
+un índice compuesto: la página N cuesta lo mismo que la primera,
+sin OFFSET que recorra y descarte filas.
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o manipulado"""
+
+
+def encode_cursor(timestamp: datetime, row_id: Any) -> str:
+    """(timestamp, id) → cursor opaco (base64 url-safe)"""
+    raw = json.dumps([timestamp.isoformat(), str(row_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Cursor opaco → (timestamp, id); el id tiene que ser un UUID"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(timestamp), str(uuid.UUID(str(row_id)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_page(
+    rows: Sequence[Any],
+    limit: int,
+    time_column: str,
+    id_column: str = 'id'
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Filas de una query con LIMIT limit + 1 → (página, next_cursor)
+
+    La fila extra solo indica que hay más; no se devuelve.
+    """
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last[time_column], last[id_column])
+
+    return items, next_cursor
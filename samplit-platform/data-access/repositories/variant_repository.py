@@ -135,6 +135,7 @@ class VariantRepository(BaseRepository):
                     is_active
                 FROM variants
                 WHERE experiment_id = $1 AND is_active = true
+                ORDER BY created_at
                 """,
                 experiment_id
             )
@@ -154,9 +155,227 @@ class VariantRepository(BaseRepository):
                 }
             
             variants.append(variant)
-        
+
         return variants
-    
+
+    async def get_variants_for_batch_optimization(self,
+                                                  experiment_ids: List[str],
+                                                  user_identifier: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Get variants with decrypted state for several experiments at once
+
+        Single query that also returns the user's existing allocation
+        for each experiment, so the batched allocation path needs only
+        one read round trip regardless of how many experiments run on
+        the page.
+
+        Returns:
+            {
+                experiment_id: {
+                    'optimization_strategy': str,
+                    'allocated_variant_id': Optional[str],
+                    'variants': [variant, ...]
+                }
+            }
+        """
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT
+                    v.id, v.experiment_id, v.name, v.content,
+                    v.algorithm_state,
+                    v.total_allocations, v.total_conversions,
+                    v.observed_conversion_rate,
+                    e.optimization_strategy,
+                    a.variant_id as allocated_variant_id
+                FROM variants v
+                JOIN experiments e ON e.id = v.experiment_id
+                LEFT JOIN allocations a
+                    ON a.experiment_id = v.experiment_id
+                    AND a.user_identifier = $2
+                WHERE v.experiment_id = ANY($1::uuid[]) AND v.is_active = true
+                ORDER BY v.experiment_id, v.created_at
+                """,
+                experiment_ids,
+                user_identifier
+            )
+
+        experiments: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            experiment_id = str(row['experiment_id'])
+
+            if experiment_id not in experiments:
+                experiments[experiment_id] = {
+                    'optimization_strategy': row['optimization_strategy'],
+                    'allocated_variant_id': (
+                        str(row['allocated_variant_id'])
+                        if row['allocated_variant_id'] else None
+                    ),
+                    'variants': []
+                }
+
+            variant = dict(row)
+            variant['id'] = str(row['id'])
+            del variant['allocated_variant_id']
+            del variant['optimization_strategy']
+
+            # Decrypt algorithm state
+            if row['algorithm_state']:
+                variant['algorithm_state'] = self._decrypt_algorithm_state(
+                    row['algorithm_state']
+                )
+            else:
+                variant['algorithm_state'] = {
+                    'alpha': 1.0,
+                    'beta': 1.0
+                }
+
+            experiments[experiment_id]['variants'].append(variant)
+
+        return experiments
+
+    async def update_algorithm_states_batch(self,
+                                            new_states: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Update algorithm state for several variants in one round trip
+
+        Also increments total_allocations, since the batched path only
+        updates state for variants that just received an allocation.
+        """
+
+        if not new_states:
+            return
+
+        records = [
+            (self._encrypt_algorithm_state(state), variant_id)
+            for variant_id, state in new_states.items()
+        ]
+
+        async with self.db.acquire() as conn:
+            await conn.executemany(
+                """
+                UPDATE variants
+                SET
+                    algorithm_state = $1,
+                    total_allocations = total_allocations + 1,
+                    updated_at = NOW()
+                WHERE id = $2
+                """,
+                records
+            )
+
+    async def get_variant_counts_for_experiments(self,
+                                                 experiment_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get public counters of active variants for several experiments
+
+        Public metrics only (no algorithm state), enough to derive
+        posteriors for analytics and published allocation weights.
+
+        Returns:
+            {experiment_id: [{'id', 'content', 'allocations', 'conversions'}, ...]}
+        """
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT
+                    id, experiment_id, content,
+                    total_allocations, total_conversions
+                FROM variants
+                WHERE experiment_id = ANY($1::uuid[]) AND is_active = true
+                ORDER BY experiment_id, created_at
+                """,
+                experiment_ids
+            )
+
+        experiments: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            experiments.setdefault(str(row['experiment_id']), []).append({
+                'id': str(row['id']),
+                'content': row['content'],
+                'allocations': row['total_allocations'],
+                'conversions': row['total_conversions']
+            })
+
+        return experiments
+
+    async def get_variant_experiments_for_user(self,
+                                               variant_ids: List[str],
+                                               user_id: str) -> Dict[str, str]:
+        """
+        Map variant IDs to their experiment, restricted to a user's active experiments
+
+        Used to validate client-reported assignments before storing them.
+        """
+
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT v.id, v.experiment_id
+                FROM variants v
+                JOIN experiments e ON e.id = v.experiment_id
+                WHERE v.id = ANY($1::uuid[])
+                  AND v.is_active = true
+                  AND e.user_id = $2
+                  AND e.status = 'active'
+                """,
+                variant_ids,
+                user_id
+            )
+
+        return {str(row['id']): str(row['experiment_id']) for row in rows}
+
+    async def apply_allocation_counts(self,
+                                      counts: Dict[str, int]) -> None:
+        """
+        Add N allocations per variant to counters and algorithm state
+
+        Bulk counterpart of update_algorithm_state for allocations that
+        were decided outside the allocation endpoint (client-side mode).
+        One read and one write regardless of the number of variants.
+        """
+
+        if not counts:
+            return
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    """
+                    SELECT id, algorithm_state
+                    FROM variants
+                    WHERE id = ANY($1::uuid[])
+                    FOR UPDATE
+                    """,
+                    list(counts.keys())
+                )
+
+                records = []
+                for row in rows:
+                    variant_id = str(row['id'])
+                    state = self._decrypt_algorithm_state(row['algorithm_state'])
+                    state['samples'] = state.get('samples', 0) + counts[variant_id]
+
+                    records.append((
+                        self._encrypt_algorithm_state(state),
+                        counts[variant_id],
+                        variant_id
+                    ))
+
+                await conn.executemany(
+                    """
+                    UPDATE variants
+                    SET
+                        algorithm_state = $1,
+                        total_allocations = total_allocations + $2,
+                        updated_at = NOW()
+                    WHERE id = $3
+                    """,
+                    records
+                )
+
     async def get_variant_public_data(self, variant_id: str) -> Optional[Dict[str, Any]]:
         """
         Get variant data WITHOUT algorithm state
@@ -231,19 +450,19 @@ class VariantRepository(BaseRepository):
         return False
 
     async def increment_allocation(self, variant_id: str) -> None:
-    """
-    Increment allocation count
+        """
+        Increment allocation count
     
-    Called when user is assigned to this variant.
-    """
-    async with self.db.acquire() as conn:
-        await conn.execute(
-            """
-            UPDATE variants
-            SET 
-                total_allocations = total_allocations + 1,
-                updated_at = NOW()
-            WHERE id = $1
-            """,
-            variant_id
-        )
+        Called when user is assigned to this variant.
+        """
+        async with self.db.acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE variants
+                SET 
+                    total_allocations = total_allocations + 1,
+                    updated_at = NOW()
+                WHERE id = $1
+                """,
+                variant_id
+            )
@@ -0,0 +1,21 @@
+-- database/migrations/002_installation_health.sql
+
+-- ============================================
+-- INSTALLATION HEALTH (cache del health sweep)
+-- ============================================
+-- Último resultado del health check periódico de cada instalación.
+-- El dashboard lee de aquí en vez de hacer fetch en vivo al sitio.
+
+CREATE TABLE IF NOT EXISTS installation_health (
+    installation_id UUID PRIMARY KEY REFERENCES platform_installations(id) ON DELETE CASCADE,
+
+    health VARCHAR(20) NOT NULL,
+    status_code INTEGER DEFAULT 0,
+    response_time_ms INTEGER DEFAULT 0,
+    accessible BOOLEAN DEFAULT false,
+    message TEXT,
+
+    checked_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_installation_health_checked ON installation_health(checked_at);
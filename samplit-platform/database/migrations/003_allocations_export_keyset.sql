@@ -0,0 +1,11 @@
+-- database/migrations/003_allocations_export_keyset.sql
+
+-- ============================================
+-- ALLOCATIONS EXPORT (keyset)
+-- ============================================
+-- El export recorre las allocations de un experimento en orden
+-- (allocated_at, id) y reanuda con (allocated_at, id) > (...):
+-- con este índice cada página es un range scan, sin OFFSET ni sort.
+
+CREATE INDEX IF NOT EXISTS idx_allocations_experiment_keyset
+    ON allocations(experiment_id, allocated_at, id);
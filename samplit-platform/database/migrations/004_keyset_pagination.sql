@@ -0,0 +1,19 @@
+-- database/migrations/004_keyset_pagination.sql
+
+-- ============================================
+-- KEYSET PAGINATION
+-- ============================================
+-- Listados paginados por cursor (timestamp, id), más recientes primero:
+-- WHERE (ts, id) < (cursor) ORDER BY ts DESC, id DESC LIMIT n.
+-- Cada índice compuesto sirve esa query con un scan hacia atrás,
+-- así la página N cuesta lo mismo que la primera.
+--
+-- Allocations por experimento: idx_allocations_experiment_keyset (003)
+
+-- Actividad reciente de una variante
+CREATE INDEX IF NOT EXISTS idx_allocations_variant_keyset
+    ON allocations(variant_id, allocated_at, id);
+
+-- Logs de instalación
+CREATE INDEX IF NOT EXISTS idx_installation_logs_keyset
+    ON installation_logs(installation_id, created_at, id);
@@ -0,0 +1,11 @@
+-- database/migrations/005_winner_detection.sql
+
+-- ============================================
+-- WINNER DETECTION
+-- ============================================
+-- El job periódico de winner detection guarda por variante y hora
+-- P(best) (confidence_score) y expected loss: lo que se pierde en
+-- conversion rate si se elige esa variante y no era la mejor.
+
+ALTER TABLE performance_snapshots
+    ADD COLUMN IF NOT EXISTS expected_loss DOUBLE PRECISION DEFAULT 0.0;
@@ -0,0 +1,45 @@
+-- database/migrations/006_experiment_summaries.sql
+
+-- ============================================
+-- EXPERIMENT SUMMARIES (dashboard)
+-- ============================================
+-- Resumen materializado por experimento para el dashboard: estado,
+-- contadores, conversion rate y la variante líder según el último
+-- ciclo de winner detection. Se reconstruye por usuario con un solo
+-- INSERT ... SELECT ... GROUP BY cuando está viejo o se invalidó
+-- (cambios de experimentos); leerlo es un index scan por user_id.
+-- Todo es derivado: borrar filas solo fuerza un refresh.
+
+CREATE TABLE IF NOT EXISTS experiment_summaries (
+    experiment_id UUID PRIMARY KEY REFERENCES experiments(id) ON DELETE CASCADE,
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    
+    -- Experimento
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    status VARCHAR(20),
+    optimization_strategy VARCHAR(50),
+    created_at TIMESTAMPTZ,
+    started_at TIMESTAMPTZ,
+    
+    -- Contadores (variantes activas)
+    variant_count INTEGER DEFAULT 0,
+    total_users INTEGER DEFAULT 0,
+    total_conversions INTEGER DEFAULT 0,
+    conversion_rate DOUBLE PRECISION DEFAULT 0.0,
+    
+    -- Líder (P(best) del último snapshot de winner detection)
+    leader_variant_id UUID,
+    leader_variant_name VARCHAR(255),
+    leader_prob_best DOUBLE PRECISION,
+    leader_expected_loss DOUBLE PRECISION,
+    
+    refreshed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_experiment_summaries_user
+    ON experiment_summaries(user_id, created_at DESC);
+
+-- Último snapshot por experimento
+CREATE INDEX IF NOT EXISTS idx_perf_snapshots_latest
+    ON performance_snapshots(experiment_id, snapshot_date DESC, snapshot_hour DESC);
@@ -0,0 +1,12 @@
+-- database/migrations/007_funnel_session_store.sql
+
+-- ============================================
+-- FUNNEL SESSION STORE
+-- ============================================
+-- Con varios workers el estado de cada sesión de funnel vive en
+-- funnel_sessions (cada worker solo guarda una cache local corta).
+-- version hace de compare-and-set: un worker con una copia vieja no
+-- pisa el paso que ya avanzó otro.
+
+ALTER TABLE funnel_sessions
+    ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 0;
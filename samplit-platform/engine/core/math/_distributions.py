@@ -123,9 +123,52 @@ def calculate_probability_best(options_data: List[Dict[str, int]],
     
     return prob_best
 
+def calculate_allocation_weights(successes: List[int],
+                                 failures: List[int],
+                                 samples: int = 10000,
+                                 min_weight: float = 0.0) -> List[float]:
+    """
+    Calculate traffic weights for each option
+
+    Weight = share of posterior draws in which the option is best,
+    i.e. the long-run allocation the adaptive engine would produce.
+    Published to clients that decide locally instead of calling
+    the allocation endpoint.
+
+    Args:
+        successes: Positive outcomes per option
+        failures: Negative outcomes per option
+        samples: Monte Carlo draws
+        min_weight: Floor per option (keeps exploring every option)
+
+    Returns:
+        Weights in the same order as the inputs, summing to 1.0
+
+    Implementation: [CONFIDENTIAL - MONTE CARLO BAYESIAN]
+    """
+
+    n_options = len(successes)
+    if n_options == 0:
+        return []
+
+    alpha = np.asarray(successes, dtype=np.float64) + 1.0
+    beta = np.asarray(failures, dtype=np.float64) + 1.0
+
+    # (samples, n_options) in one draw - no per-sample Python loop
+    draws = np.random.beta(alpha, beta, size=(samples, n_options))
+    winners = np.argmax(draws, axis=1)
+    weights = np.bincount(winners, minlength=n_options) / samples
+
+    if min_weight > 0:
+        weights = np.maximum(weights, min_weight)
+        weights = weights / weights.sum()
+
+    return [float(w) for w in weights]
+
 # Export only what's needed
 __all__ = [
     'sample_posterior',
     'calculate_confidence_bounds',
-    'calculate_probability_best'
+    'calculate_probability_best',
+    'calculate_allocation_weights'
 ]
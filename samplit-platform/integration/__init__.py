@@ -15,11 +15,13 @@ from .proxy.injection_engine import InjectionEngine
 from .proxy.config_generator import ConfigGenerator
 from .managers.installation_manager import InstallationManager
 from .managers.verification_manager import VerificationManager
+from .managers.health_sweeper import HealthSweeper
 
 __all__ = [
     'MABProxyMiddleware',
     'InjectionEngine',
     'ConfigGenerator',
     'InstallationManager',
-    'VerificationManager'
+    'VerificationManager',
+    'HealthSweeper'
 ]
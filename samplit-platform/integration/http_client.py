@@ -0,0 +1,185 @@
+# integration/http_client.py
+
+"""
+HTTP Client Registry
+
+Sesiones aiohttp compartidas (una por propósito) para todo el HTTP
+saliente de la capa de integración: proxy al origen, verificación de
+instalaciones y APIs de plataformas de ads.
+
+Crear una ClientSession por request tira el keep-alive, la cache DNS y
+la reutilización de sesiones TLS: cada página proxied pagaba un
+handshake TCP+TLS completo al origen. Aquí cada propósito tiene su
+propio connector (límites por host, keep-alive, DNS cache) y timeout.
+
+La registry se crea en el lifespan de FastAPI y se cierra al apagar.
+"""
+
+import aiohttp
+import logging
+from typing import Dict, Any, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PURPOSE_PROXY = 'proxy'
+PURPOSE_VERIFICATION = 'verification'
+PURPOSE_ADS = 'ads'
+
+
+class _ConnectionStats:
+    """Contadores de conexiones vía aiohttp TraceConfig"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, ctx, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self.dns_cache_misses += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.connections_created + self.connections_reused
+        return {
+            'requests': self.requests,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'reuse_ratio': round(self.connections_reused / total, 4) if total else 0.0,
+            'dns_cache_hits': self.dns_cache_hits,
+            'dns_cache_misses': self.dns_cache_misses
+        }
+
+
+class HttpClientRegistry:
+    """
+    Una ClientSession por propósito, creada al primer uso
+    """
+
+    def __init__(self, profiles: Dict[str, Dict[str, Any]]):
+        """
+        Args:
+            profiles: {purpose: {'limit', 'limit_per_host', 'timeout',
+                                 'connect_timeout', 'keepalive_timeout',
+                                 'dns_cache_ttl', 'auto_decompress'?}}
+        """
+        self.profiles = profiles
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._stats: Dict[str, _ConnectionStats] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> 'HttpClientRegistry':
+        common = {
+            'keepalive_timeout': settings.HTTP_KEEPALIVE_TIMEOUT,
+            'dns_cache_ttl': settings.HTTP_DNS_CACHE_TTL,
+            'connect_timeout': settings.HTTP_CONNECT_TIMEOUT
+        }
+        return cls({
+            PURPOSE_PROXY: {
+                **common,
+                'limit': settings.HTTP_PROXY_LIMIT,
+                'limit_per_host': settings.HTTP_PROXY_LIMIT_PER_HOST,
+                'timeout': settings.HTTP_PROXY_TIMEOUT,
+                # El proxy reenvía los bodies con su Content-Encoding original
+                'auto_decompress': False
+            },
+            PURPOSE_VERIFICATION: {
+                **common,
+                'limit': settings.HEALTH_SWEEP_CONCURRENCY * 3,
+                'limit_per_host': 3,   # html/endpoint/headers en paralelo
+                'timeout': settings.HTTP_VERIFICATION_TIMEOUT
+            },
+            PURPOSE_ADS: {
+                **common,
+                'limit': settings.HTTP_ADS_LIMIT,
+                'limit_per_host': settings.HTTP_ADS_LIMIT,
+                'timeout': settings.HTTP_ADS_TIMEOUT
+            }
+        })
+
+    def session(self, purpose: str) -> aiohttp.ClientSession:
+        """ClientSession compartida para un propósito"""
+        session = self._sessions.get(purpose)
+        if session is not None and not session.closed:
+            return session
+
+        profile = self.profiles[purpose]
+        stats = self._stats.setdefault(purpose, _ConnectionStats())
+
+        connector = aiohttp.TCPConnector(
+            limit=profile['limit'],
+            limit_per_host=profile['limit_per_host'],
+            ttl_dns_cache=profile['dns_cache_ttl'],
+            keepalive_timeout=profile['keepalive_timeout']
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=profile['timeout'],
+                connect=profile['connect_timeout']
+            ),
+            trace_configs=[stats.trace_config()],
+            auto_decompress=profile.get('auto_decompress', True)
+        )
+
+        self._sessions[purpose] = session
+        return session
+
+    async def close(self) -> None:
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {}
+        for purpose, counters in self._stats.items():
+            session = self._sessions.get(purpose)
+            connector = session.connector if session is not None else None
+
+            stats[purpose] = {
+                **counters.to_dict(),
+                'open': session is not None and not session.closed,
+                'limit': connector.limit if connector else 0,
+                'limit_per_host': connector.limit_per_host if connector else 0
+            }
+        return stats
+
+
+# Singleton instance
+_http_clients: Optional[HttpClientRegistry] = None
+
+def get_http_clients() -> HttpClientRegistry:
+    """Get singleton HTTP client registry"""
+    global _http_clients
+    if _http_clients is None:
+        _http_clients = HttpClientRegistry.from_settings(settings)
+    return _http_clients
+
+def get_http_session(purpose: str) -> aiohttp.ClientSession:
+    """Shortcut: ClientSession compartida para un propósito"""
+    return get_http_clients().session(purpose)
@@ -8,8 +8,10 @@ Managers que gestionan recursos externos y verificaciones.
 
 from .installation_manager import InstallationManager
 from .verification_manager import VerificationManager
+from .health_sweeper import HealthSweeper
 
 __all__ = [
     'InstallationManager',
-    'VerificationManager'
+    'VerificationManager',
+    'HealthSweeper'
 ]
@@ -0,0 +1,170 @@
+# integration/managers/health_sweeper.py
+
+"""
+Health Sweeper
+
+Revisa periódicamente la salud de todas las instalaciones activas
+y guarda el resultado en installation_health. El dashboard lee ese
+cache en vez de lanzar un fetch en vivo al sitio del usuario.
+
+- Concurrencia global acotada (semáforo)
+- Cortesía por host: un request a la vez y un intervalo mínimo
+- Session compartida de la registry HTTP (keep-alive, DNS cache)
+- Un solo sweep a la vez entre workers (advisory lock de Postgres)
+"""
+
+import asyncio
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+
+from data_access.database import DatabaseManager
+from ..http_client import get_http_session, PURPOSE_VERIFICATION
+from .installation_manager import InstallationManager
+from .verification_manager import VerificationManager
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock (un sweep a la vez entre workers)
+HEALTH_SWEEP_LOCK = 'samplit.health_sweep'
+
+class HealthSweeper:
+    """
+    Health check en bulk de instalaciones activas
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        concurrency: int = 20,
+        per_host_interval: float = 1.0,
+        session: Optional[aiohttp.ClientSession] = None
+    ):
+        self.db = db
+        self.installation_manager = InstallationManager(db)
+        self.concurrency = concurrency
+        self.per_host_interval = per_host_interval
+        self._session = session
+
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_last_request: Dict[str, float] = {}
+
+        # Métricas del último sweep
+        self.last_sweep_at: Optional[float] = None
+        self.last_sweep_duration = 0.0
+        self.last_sweep_checked = 0
+        self.skipped_locked = 0
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Loop de sweeps (se lanza como background task en el lifespan)"""
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health sweep failed: {str(e)}", exc_info=True)
+
+            await asyncio.sleep(interval_seconds)
+
+    async def sweep(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Un health check para cada instalación activa
+
+        Returns:
+            Resultados guardados, o None si otro worker tiene el lock
+        """
+        start = time.monotonic()
+
+        # Lock en una conexión propia: los fetch a los sitios pueden durar
+        # minutos y no deben tener ocupada una conexión del pool principal
+        async with self.db.advisory_lock(HEALTH_SWEEP_LOCK) as locked:
+            if not locked:
+                self.skipped_locked += 1
+                return None
+
+            installations = await self.installation_manager.get_installations_for_health_sweep()
+
+            if not installations:
+                return []
+
+            try:
+                results = await self._check_all(
+                    installations,
+                    self._session or get_http_session(PURPOSE_VERIFICATION)
+                )
+            finally:
+                self._evict_idle_hosts()
+
+            await self.installation_manager.save_health_results(results)
+
+        self.last_sweep_at = time.time()
+        self.last_sweep_duration = time.monotonic() - start
+        self.last_sweep_checked = len(results)
+
+        logger.info(
+            f"Health sweep: {len(results)} installations "
+            f"in {self.last_sweep_duration:.1f}s"
+        )
+
+        return results
+
+    async def _check_all(
+        self,
+        installations: List[Dict[str, Any]],
+        session: aiohttp.ClientSession
+    ) -> List[Dict[str, Any]]:
+        verifier = VerificationManager(session=session)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(installation: Dict[str, Any]) -> Dict[str, Any]:
+            site_url = installation['site_url']
+            if not site_url.startswith(('http://', 'https://')):
+                site_url = f"https://{site_url}"
+
+            # Primero el turno del host, así no se ocupa un hueco global esperando
+            async with self._polite(urlparse(site_url).hostname or site_url):
+                async with semaphore:
+                    result = await verifier.check_health(site_url)
+
+            return {'installation_id': installation['id'], **result}
+
+        return await asyncio.gather(*(check(i) for i in installations))
+
+    @asynccontextmanager
+    async def _polite(self, host: str):
+        """Un request a la vez por host, con per_host_interval entre ellos"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+
+        async with lock:
+            elapsed = time.monotonic() - self._host_last_request.get(host, 0.0)
+            if elapsed < self.per_host_interval:
+                await asyncio.sleep(self.per_host_interval - elapsed)
+
+            try:
+                yield
+            finally:
+                self._host_last_request[host] = time.monotonic()
+
+    def _evict_idle_hosts(self) -> None:
+        """Olvidar los hosts sin request en curso ni intervalo pendiente"""
+        now = time.monotonic()
+
+        for host, lock in list(self._host_locks.items()):
+            last_request = self._host_last_request.get(host, 0.0)
+            if not lock.locked() and now - last_request >= self.per_host_interval:
+                del self._host_locks[host]
+                self._host_last_request.pop(host, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'last_sweep_at': self.last_sweep_at,
+            'last_sweep_duration': round(self.last_sweep_duration, 2),
+            'last_sweep_checked': self.last_sweep_checked,
+            'skipped_locked': self.skipped_locked,
+            'hosts': len(self._host_locks)
+        }
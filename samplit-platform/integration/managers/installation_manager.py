@@ -15,6 +15,7 @@ import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 from data_access.database import DatabaseManager
+from data_access.repositories.pagination import clamp_page_size, decode_cursor, keyset_page
 
 logger = logging.getLogger(__name__)
 
@@ -129,8 +130,11 @@ class InstallationManager:
                         WHEN pi.last_activity > NOW() - INTERVAL '24 hours' THEN 'warning'
                         WHEN pi.last_activity IS NULL THEN 'pending'
                         ELSE 'inactive'
-                    END as health
+                    END as health,
+                    ih.health as site_health,
+                    ih.checked_at as health_checked_at
                 FROM platform_installations pi
+                LEFT JOIN installation_health ih ON ih.installation_id = pi.id
                 WHERE pi.user_id = $1
             """
             
@@ -406,7 +410,8 @@ class InstallationManager:
     async def get_installation_logs(
         self,
         installation_id: str,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Obtener logs de instalación
@@ -414,29 +419,153 @@ class InstallationManager:
         Args:
             installation_id: ID de la instalación
             limit: Número de logs a retornar
+            cursor: Cursor de la página anterior (keyset)
             
         Returns:
             Lista de logs
         """
+        page = await self.get_installation_logs_page(installation_id, limit, cursor)
+        return page['logs']
+    
+    async def get_installation_logs_page(
+        self,
+        installation_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Página de logs, más recientes primero (keyset por created_at, id)
+        
+        Returns:
+            {'logs': [...], 'next_cursor': str | None}
+        
+        Raises:
+            InvalidCursor: cursor mal formado
+        """
+        limit = clamp_page_size(limit)
+        query = """
+            SELECT id, event_type, message, metadata, created_at
+            FROM installation_logs
+            WHERE installation_id = $1
+        """
+        args: List[Any] = [installation_id, limit + 1]
+        
+        if cursor:
+            query += " AND (created_at, id) < ($3::timestamptz, $4::uuid)"
+            args.extend(decode_cursor(cursor))
+        
+        query += " ORDER BY created_at DESC, id DESC LIMIT $2"
+        
+        try:
+            async with self.db.pool.acquire() as conn:
+                rows = await conn.fetch(query, *args)
+            
+            logs, next_cursor = keyset_page(rows, limit, 'created_at')
+            return {'logs': logs, 'next_cursor': next_cursor}
+            
+        except Exception as e:
+            logger.error(f"Failed to get logs: {str(e)}", exc_info=True)
+            return {'logs': [], 'next_cursor': None}
+    
+    # ============================================
+    # HEALTH CACHE (health sweep)
+    # ============================================
+    
+    async def get_installations_for_health_sweep(self) -> List[Dict[str, Any]]:
+        """
+        Instalaciones a revisar en el health sweep (activas), las que
+        llevan más tiempo sin comprobar primero
+        """
         try:
             async with self.db.pool.acquire() as conn:
                 rows = await conn.fetch(
                     """
-                    SELECT event_type, message, metadata, created_at
-                    FROM installation_logs
-                    WHERE installation_id = $1
-                    ORDER BY created_at DESC
-                    LIMIT $2
-                    """,
-                    installation_id, limit
+                    SELECT pi.id, pi.site_url
+                    FROM platform_installations pi
+                    LEFT JOIN installation_health ih ON ih.installation_id = pi.id
+                    WHERE pi.status = 'active'
+                    ORDER BY ih.checked_at NULLS FIRST
+                    """
                 )
             
             return [dict(row) for row in rows]
             
         except Exception as e:
-            logger.error(f"Failed to get logs: {str(e)}", exc_info=True)
+            logger.error(f"Failed to get installations for sweep: {str(e)}", exc_info=True)
             return []
     
+    async def save_health_results(
+        self,
+        results: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Guardar en bulk resultados de health check
+        
+        Args:
+            results: [{'installation_id', 'health', 'status_code',
+                       'response_time', 'accessible', 'message'}, ...]
+        """
+        if not results:
+            return
+        
+        async with self.db.pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO installation_health (
+                    installation_id, health, status_code,
+                    response_time_ms, accessible, message, checked_at
+                ) VALUES ($1, $2, $3, $4, $5, $6, NOW())
+                ON CONFLICT (installation_id) DO UPDATE SET
+                    health = EXCLUDED.health,
+                    status_code = EXCLUDED.status_code,
+                    response_time_ms = EXCLUDED.response_time_ms,
+                    accessible = EXCLUDED.accessible,
+                    message = EXCLUDED.message,
+                    checked_at = EXCLUDED.checked_at
+                """,
+                [
+                    (
+                        r['installation_id'],
+                        r['health'],
+                        r.get('status_code', 0),
+                        int(r.get('response_time', 0) * 1000),
+                        r.get('accessible', False),
+                        r.get('message')
+                    )
+                    for r in results
+                ]
+            )
+    
+    async def get_cached_health(
+        self,
+        installation_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Último health check guardado por el sweep (None si no hay)
+        """
+        try:
+            async with self.db.pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    """
+                    SELECT health, status_code, response_time_ms,
+                           accessible, message, checked_at
+                    FROM installation_health
+                    WHERE installation_id = $1
+                    """,
+                    installation_id
+                )
+            
+            if not row:
+                return None
+            
+            health = dict(row)
+            health['response_time'] = health.pop('response_time_ms') / 1000
+            return health
+            
+        except Exception as e:
+            logger.error(f"Failed to get cached health: {str(e)}", exc_info=True)
+            return None
+    
     def _generate_installation_token(self) -> str:
         """Generar token de instalación único"""
         return f"inst_{uuid.uuid4().hex[:16]}"
@@ -6,21 +6,34 @@ Verification Manager
 Verifica automáticamente que las instalaciones estén funcionando correctamente.
 """
 
+import asyncio
+import time
 import aiohttp
 import logging
 from typing import Optional, Dict, Any
 from bs4 import BeautifulSoup
 
+from ..http_client import get_http_session, PURPOSE_VERIFICATION
+
 logger = logging.getLogger(__name__)
 
 class VerificationManager:
     """
     Manager para verificar instalaciones automáticamente
+    
+    Usa la session compartida de verificación de la registry HTTP
+    (o la que se pase explícitamente).
     """
     
-    def __init__(self):
-        self.timeout = aiohttp.ClientTimeout(total=10)
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
         self.user_agent = 'SamplitVerificationBot/1.0'
+        self._session = session
+    
+    def _client(self) -> aiohttp.ClientSession:
+        """Session explícita o la compartida de verificación"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+        return get_http_session(PURPOSE_VERIFICATION)
     
     async def verify_installation(
         self,
@@ -44,33 +57,46 @@ class VerificationManager:
             }
         """
         try:
-            # Intentar diferentes métodos de verificación
-            
-            # Método 1: Buscar token en HTML
-            html_verified = await self._verify_html(site_url, installation_token)
-            if html_verified['verified']:
-                return html_verified
-            
-            # Método 2: Verificar endpoint de verificación
-            endpoint_verified = await self._verify_endpoint(site_url, installation_token)
-            if endpoint_verified['verified']:
-                return endpoint_verified
+            # Los tres métodos en paralelo: el primero que verifique gana
+            # y se cancelan los demás (peor caso = un timeout, no tres)
+            session = self._client()
+            tasks = {
+                asyncio.create_task(
+                    self._verify_html(site_url, installation_token, session)
+                ): 'html_check',
+                asyncio.create_task(
+                    self._verify_endpoint(site_url, installation_token, session)
+                ): 'endpoint_check',
+                asyncio.create_task(
+                    self._verify_headers(site_url, session)
+                ): 'headers_check'
+            }
             
-            # Método 3: Verificar headers
-            headers_verified = await self._verify_headers(site_url)
-            if headers_verified['verified']:
-                return headers_verified
+            details = {}
+            pending = set(tasks)
             
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    
+                    for task in done:
+                        result = task.result()
+                        if result['verified']:
+                            return result
+                        details[tasks[task]] = result['message']
+            finally:
+                for task in pending:
+                    task.cancel()
+        
             # No se pudo verificar
             return {
                 'verified': False,
                 'method': 'none',
                 'message': 'Could not verify installation. Please check your setup.',
-                'details': {
-                    'html_check': html_verified['message'],
-                    'endpoint_check': endpoint_verified['message'],
-                    'headers_check': headers_verified['message']
-                }
+                'details': details
             }
             
         except Exception as e:
@@ -85,46 +111,46 @@ class VerificationManager:
     async def _verify_html(
         self,
         site_url: str,
-        installation_token: str
+        installation_token: str,
+        session: aiohttp.ClientSession
     ) -> Dict[str, Any]:
         """
         Verificar buscando el token en el HTML
         """
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    site_url,
-                    headers={'User-Agent': self.user_agent}
-                ) as response:
-                    
-                    if response.status != 200:
-                        return {
-                            'verified': False,
-                            'method': 'html',
-                            'message': f'HTTP {response.status}'
-                        }
-                    
-                    html = await response.text()
-                    
-                    # Buscar token en el HTML
-                    if installation_token in html:
-                        # Verificar que esté en un script de Samplit
-                        if 'SAMPLIT' in html or 'MAB' in html:
-                            return {
-                                'verified': True,
-                                'method': 'html',
-                                'message': 'Tracker code found in HTML',
-                                'details': {
-                                    'found_token': True,
-                                    'found_config': True
-                                }
-                            }
-                    
+            async with session.get(
+                site_url,
+                headers={'User-Agent': self.user_agent}
+            ) as response:
+                
+                if response.status != 200:
                     return {
                         'verified': False,
                         'method': 'html',
-                        'message': 'Tracker code not found in HTML'
+                        'message': f'HTTP {response.status}'
                     }
+                
+                html = await response.text()
+                
+                # Buscar token en el HTML
+                if installation_token in html:
+                    # Verificar que esté en un script de Samplit
+                    if 'SAMPLIT' in html or 'MAB' in html:
+                        return {
+                            'verified': True,
+                            'method': 'html',
+                            'message': 'Tracker code found in HTML',
+                            'details': {
+                                'found_token': True,
+                                'found_config': True
+                            }
+                        }
+                
+                return {
+                    'verified': False,
+                    'method': 'html',
+                    'message': 'Tracker code not found in HTML'
+                }
                     
         except aiohttp.ClientError as e:
             return {
@@ -132,6 +158,12 @@ class VerificationManager:
                 'method': 'html',
                 'message': f'Connection error: {str(e)}'
             }
+        except asyncio.TimeoutError:
+            return {
+                'verified': False,
+                'method': 'html',
+                'message': 'Timeout'
+            }
         except Exception as e:
             return {
                 'verified': False,
@@ -142,7 +174,8 @@ class VerificationManager:
     async def _verify_endpoint(
         self,
         site_url: str,
-        installation_token: str
+        installation_token: str,
+        session: aiohttp.ClientSession
     ) -> Dict[str, Any]:
         """
         Verificar usando endpoint especial
@@ -150,37 +183,36 @@ class VerificationManager:
         try:
             verify_url = f"{site_url}?mab_verify={installation_token}"
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    verify_url,
-                    headers={'User-Agent': self.user_agent}
-                ) as response:
-                    
-                    if response.status != 200:
-                        return {
-                            'verified': False,
-                            'method': 'endpoint',
-                            'message': f'HTTP {response.status}'
-                        }
-                    
-                    html = await response.text()
-                    
-                    # Buscar marca de verificación
-                    if 'MAB_INSTALLATION_ID' in html and installation_token in html:
-                        return {
-                            'verified': True,
-                            'method': 'endpoint',
-                            'message': 'Verification endpoint responded correctly',
-                            'details': {
-                                'endpoint': verify_url
-                            }
-                        }
-                    
+            async with session.get(
+                verify_url,
+                headers={'User-Agent': self.user_agent}
+            ) as response:
+                
+                if response.status != 200:
                     return {
                         'verified': False,
                         'method': 'endpoint',
-                        'message': 'Verification endpoint not responding'
+                        'message': f'HTTP {response.status}'
+                    }
+                
+                html = await response.text()
+                
+                # Buscar marca de verificación
+                if 'MAB_INSTALLATION_ID' in html and installation_token in html:
+                    return {
+                        'verified': True,
+                        'method': 'endpoint',
+                        'message': 'Verification endpoint responded correctly',
+                        'details': {
+                            'endpoint': verify_url
+                        }
                     }
+                
+                return {
+                    'verified': False,
+                    'method': 'endpoint',
+                    'message': 'Verification endpoint not responding'
+                }
                     
         except aiohttp.ClientError as e:
             return {
@@ -188,6 +220,12 @@ class VerificationManager:
                 'method': 'endpoint',
                 'message': f'Connection error: {str(e)}'
             }
+        except asyncio.TimeoutError:
+            return {
+                'verified': False,
+                'method': 'endpoint',
+                'message': 'Timeout'
+            }
         except Exception as e:
             return {
                 'verified': False,
@@ -197,34 +235,34 @@ class VerificationManager:
     
     async def _verify_headers(
         self,
-        site_url: str
+        site_url: str,
+        session: aiohttp.ClientSession
     ) -> Dict[str, Any]:
         """
         Verificar mediante headers de respuesta
         """
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.head(
-                    site_url,
-                    headers={'User-Agent': self.user_agent}
-                ) as response:
-                    
-                    # Buscar header de Samplit
-                    if 'X-MAB-Injected' in response.headers:
-                        return {
-                            'verified': True,
-                            'method': 'headers',
-                            'message': 'Samplit proxy headers detected',
-                            'details': {
-                                'proxy_detected': True
-                            }
-                        }
-                    
+            async with session.head(
+                site_url,
+                headers={'User-Agent': self.user_agent}
+            ) as response:
+                
+                # Buscar header de Samplit
+                if 'X-MAB-Injected' in response.headers:
                     return {
-                        'verified': False,
+                        'verified': True,
                         'method': 'headers',
-                        'message': 'No Samplit headers found'
+                        'message': 'Samplit proxy headers detected',
+                        'details': {
+                            'proxy_detected': True
+                        }
                     }
+                
+                return {
+                    'verified': False,
+                    'method': 'headers',
+                    'message': 'No Samplit headers found'
+                }
                     
         except aiohttp.ClientError as e:
             return {
@@ -232,6 +270,12 @@ class VerificationManager:
                 'method': 'headers',
                 'message': f'Connection error: {str(e)}'
             }
+        except asyncio.TimeoutError:
+            return {
+                'verified': False,
+                'method': 'headers',
+                'message': 'Timeout'
+            }
         except Exception as e:
             return {
                 'verified': False,
@@ -253,42 +297,44 @@ class VerificationManager:
             Dict con información de salud
         """
         try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    site_url,
-                    headers={'User-Agent': self.user_agent}
-                ) as response:
-                    
-                    status_code = response.status
-                    response_time = response.elapsed.total_seconds() if hasattr(response, 'elapsed') else 0
-                    
-                    # Determinar salud
-                    if status_code == 200:
-                        health = 'healthy'
-                    elif 200 <= status_code < 300:
-                        health = 'healthy'
-                    elif 300 <= status_code < 400:
-                        health = 'warning'
-                    elif status_code == 429:
-                        health = 'rate_limited'
-                    else:
-                        health = 'unhealthy'
-                    
-                    return {
-                        'health': health,
-                        'status_code': status_code,
-                        'response_time': response_time,
-                        'accessible': True,
-                        'message': f'Site is {health}'
-                    }
-                    
-        except aiohttp.ClientError as e:
+            session = self._client()
+            start = time.monotonic()
+            
+            async with session.get(
+                site_url,
+                headers={'User-Agent': self.user_agent}
+            ) as response:
+                
+                status_code = response.status
+                response_time = time.monotonic() - start
+                
+                # Determinar salud
+                if status_code == 200:
+                    health = 'healthy'
+                elif 200 <= status_code < 300:
+                    health = 'healthy'
+                elif 300 <= status_code < 400:
+                    health = 'warning'
+                elif status_code == 429:
+                    health = 'rate_limited'
+                else:
+                    health = 'unhealthy'
+                
+                return {
+                    'health': health,
+                    'status_code': status_code,
+                    'response_time': response_time,
+                    'accessible': True,
+                    'message': f'Site is {health}'
+                }
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             return {
                 'health': 'unreachable',
                 'status_code': 0,
                 'response_time': 0,
                 'accessible': False,
-                'message': f'Site unreachable: {str(e)}'
+                'message': f'Site unreachable: {str(e) or type(e).__name__}'
             }
         except Exception as e:
             return {
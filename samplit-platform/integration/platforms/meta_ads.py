@@ -1,9 +1,10 @@
 # integration/platforms/meta_ads.py
 
-import aiohttp
 from typing import Dict, Any
 import logging
 
+from ..http_client import get_http_session, PURPOSE_ADS
+
 logger = logging.getLogger(__name__)
 
 class MetaAdsIntegration:
@@ -28,48 +29,49 @@ class MetaAdsIntegration:
             'fields': 'impressions,clicks,spend,actions,ctr,cpc'
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                result = await response.json()
-                
-                if not result.get('data'):
-                    return {
-                        'impressions': 0,
-                        'clicks': 0,
-                        'conversions': 0,
-                        'spend': 0,
-                        'ctr': 0,
-                        'cpc': 0
-                    }
-                
-                data = result['data'][0]
-                
-                # Extract conversions from actions
-                conversions = 0
-                if 'actions' in data:
-                    for action in data['actions']:
-                        if action['action_type'] in ['purchase', 'lead', 'complete_registration']:
-                            conversions += int(action['value'])
-                
-                return {
-                    'impressions': int(data.get('impressions', 0)),
-                    'clicks': int(data.get('clicks', 0)),
-                    'conversions': conversions,
-                    'spend': float(data.get('spend', 0)),
-                    'ctr': float(data.get('ctr', 0)),
-                    'cpc': float(data.get('cpc', 0))
-                }
+        session = get_http_session(PURPOSE_ADS)
+        async with session.get(url, params=params) as response:
+            result = await response.json()
+        
+        if not result.get('data'):
+            return {
+                'impressions': 0,
+                'clicks': 0,
+                'conversions': 0,
+                'spend': 0,
+                'ctr': 0,
+                'cpc': 0
+            }
+        
+        data = result['data'][0]
+        
+        # Extract conversions from actions
+        conversions = 0
+        if 'actions' in data:
+            for action in data['actions']:
+                if action['action_type'] in ['purchase', 'lead', 'complete_registration']:
+                    conversions += int(action['value'])
+        
+        return {
+            'impressions': int(data.get('impressions', 0)),
+            'clicks': int(data.get('clicks', 0)),
+            'conversions': conversions,
+            'spend': float(data.get('spend', 0)),
+            'ctr': float(data.get('ctr', 0)),
+            'cpc': float(data.get('cpc', 0))
+        }
     
     async def pause_ad(self, ad_id: str):
         """Pausar ad"""
         url = f"{self.base_url}/{ad_id}"
         
-        async with aiohttp.ClientSession() as session:
-            data = {
-                'status': 'PAUSED',
-                'access_token': self.access_token
-            }
-            await session.post(url, data=data)
+        data = {
+            'status': 'PAUSED',
+            'access_token': self.access_token
+        }
+        # Liberar la conexión para que vuelva al pool compartido
+        async with get_http_session(PURPOSE_ADS).post(url, data=data) as response:
+            await response.read()
             
         logger.info(f"Paused ad: {ad_id}")
     
@@ -77,11 +79,12 @@ class MetaAdsIntegration:
         """Activar ad"""
         url = f"{self.base_url}/{ad_id}"
         
-        async with aiohttp.ClientSession() as session:
-            data = {
-                'status': 'ACTIVE',
-                'access_token': self.access_token
-            }
-            await session.post(url, data=data)
+        data = {
+            'status': 'ACTIVE',
+            'access_token': self.access_token
+        }
+        # Liberar la conexión para que vuelva al pool compartido
+        async with get_http_session(PURPOSE_ADS).post(url, data=data) as response:
+            await response.read()
             
         logger.info(f"Activated ad: {ad_id}")
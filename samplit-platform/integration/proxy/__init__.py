@@ -9,10 +9,14 @@ inyecta el tracker de Samplit sin requerir cambios de código.
 
 from .proxy_middleware import MABProxyMiddleware
 from .injection_engine import InjectionEngine
+from .streaming_injector import StreamingInjector
+from .variant_rewriter import VariantRewriter
 from .config_generator import ConfigGenerator
 
 __all__ = [
     'MABProxyMiddleware',
     'InjectionEngine',
+    'StreamingInjector',
+    'VariantRewriter',
     'ConfigGenerator'
 ]
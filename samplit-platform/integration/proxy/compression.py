@@ -0,0 +1,199 @@
+# integration/proxy/compression.py
+
+"""
+Compression
+
+Content-Encoding para el proxy:
+
+- Al origen se le pide solo lo que sabemos decodificar (gzip, deflate
+  y br si está instalado `brotli`), respetando lo que acepta el cliente
+- Los assets que no son HTML se reenvían con su encoding original,
+  sin decodificar ni recomprimir
+- El HTML se decodifica en streaming para inyectar el tracker y se
+  vuelve a comprimir con el mejor encoding que acepte el cliente
+"""
+
+import zlib
+from typing import AsyncIterator, Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo gzip/deflate
+    brotli = None
+
+SUPPORTED_ENCODINGS = ('br', 'gzip', 'deflate') if brotli else ('gzip', 'deflate')
+
+# Preferencia al recomprimir HTML
+_OUTPUT_PREFERENCE = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding → {encoding: q}"""
+    encodings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name] = q
+    return encodings
+
+
+def origin_accept_encoding(client_header: Optional[str]) -> str:
+    """
+    Accept-Encoding para el origen: lo que acepta el cliente y
+    nosotros podemos decodificar (para poder inyectar en HTML)
+    """
+    accepted = parse_accept_encoding(client_header)
+    wildcard = accepted.get('*', 0.0)
+
+    encodings = [
+        name for name in SUPPORTED_ENCODINGS
+        if accepted.get(name, wildcard) > 0
+    ]
+    return ', '.join(encodings) if encodings else 'identity'
+
+
+def choose_output_encoding(client_header: Optional[str]) -> Optional[str]:
+    """Mejor encoding para recomprimir HTML (None = sin comprimir)"""
+    accepted = parse_accept_encoding(client_header)
+    wildcard = accepted.get('*', 0.0)
+
+    best, best_q = None, 0.0
+    for name in _OUTPUT_PREFERENCE:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_supported_encoding(encoding: Optional[str]) -> bool:
+    """True si sabemos descomprimir este Content-Encoding del origen"""
+    encoding = (encoding or 'identity').strip().lower()
+    return encoding == 'identity' or encoding in SUPPORTED_ENCODINGS
+
+
+class Decoder:
+    """Descompresor incremental para un Content-Encoding"""
+
+    def __init__(self, encoding: Optional[str]):
+        encoding = (encoding or 'identity').strip().lower()
+
+        if encoding == 'gzip':
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._obj = zlib.decompressobj()
+        elif encoding == 'br' and brotli:
+            self._obj = brotli.Decompressor()
+        elif encoding == 'identity':
+            self._obj = None
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+        self._deflate_raw_retry = encoding == 'deflate'
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._obj is None:
+            return chunk
+
+        if self._deflate_raw_retry:
+            # Algunos servidores mandan "deflate" sin cabecera zlib
+            self._deflate_raw_retry = False
+            try:
+                return self._obj.decompress(chunk)
+            except zlib.error:
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+
+        if brotli and isinstance(self._obj, brotli.Decompressor):
+            return self._obj.process(chunk)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        if self._obj is None or (brotli and isinstance(self._obj, brotli.Decompressor)):
+            return b''
+        return self._obj.flush()
+
+
+class Encoder:
+    """
+    Compresor incremental
+
+    Cada chunk se emite con un sync flush, así el navegador puede
+    empezar a parsear sin esperar al final del documento.
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == 'gzip':
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            raise ValueError(f"Unsupported output encoding: {encoding}")
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == 'br':
+            return self._obj.process(chunk) + self._obj.flush()
+        return self._obj.compress(chunk) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.finish() if self.encoding == 'br' else self._obj.flush()
+
+
+async def decode_stream(
+    chunks: AsyncIterator[bytes],
+    encoding: Optional[str]
+) -> AsyncIterator[bytes]:
+    """Descomprimir un stream de chunks"""
+    decoder = Decoder(encoding)
+    async for chunk in chunks:
+        data = decoder.decompress(chunk)
+        if data:
+            yield data
+
+    tail = decoder.flush()
+    if tail:
+        yield tail
+
+
+async def encode_stream(
+    chunks: AsyncIterator[bytes],
+    encoding: Optional[str],
+    level: int
+) -> AsyncIterator[bytes]:
+    """Comprimir un stream de chunks (encoding None = tal cual)"""
+    if encoding is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    encoder = Encoder(encoding, level)
+    async for chunk in chunks:
+        data = encoder.compress(chunk)
+        if data:
+            yield data
+
+    yield encoder.finish()
+
+
+def decode_body(body: bytes, encoding: Optional[str]) -> bytes:
+    """Descomprimir un body completo"""
+    decoder = Decoder(encoding)
+    return decoder.decompress(body) + decoder.flush()
+
+
+def encode_body(body: bytes, encoding: Optional[str], level: int) -> bytes:
+    """Comprimir un body completo (encoding None = tal cual)"""
+    if encoding is None:
+        return body
+    encoder = Encoder(encoding, level)
+    return encoder.compress(body) + encoder.finish()
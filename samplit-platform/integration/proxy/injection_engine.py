@@ -9,11 +9,86 @@ Motor que inyecta el tracker de Samplit en HTML automáticamente.
 import re
 import json
 import logging
-from typing import Optional, Dict, Any, List
-from bs4 import BeautifulSoup
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+from orchestration.utils.static_bundles import get_static_bundles
 
 logger = logging.getLogger(__name__)
 
+# Tags de apertura <head ...> / <body ...> (no <header>, <bodyguard>...),
+# saltando comentarios y bloques <script> completos: un '<body>' dentro de
+# ellos no es un tag. Sin cierre, el resto del documento va dentro.
+_TOKEN_PATTERN = (
+    rb'(?P<comment><!--.*?(?:(?P<comment_end>-->)|\Z))'
+    rb'|(?P<script><script(?=[\s>/])[^>]*>.*?(?:(?P<script_end></script\s*>)|\Z))'
+    rb'|<(?P<tag>(?P<head>head)|body)(?=[\s>/])[^>]*>'
+)
+_TOKEN_BYTES = re.compile(_TOKEN_PATTERN, re.IGNORECASE | re.DOTALL)
+_TOKEN_STR = re.compile(_TOKEN_PATTERN.decode('ascii'), re.IGNORECASE | re.DOTALL)
+
+# Un tag partido entre chunks no debería ocupar más que esto
+_MAX_TAG_CHARS = 2048
+
+# JSON dentro de <script>: ni '</script>' ni '<!--' pueden cerrar el bloque
+# (el config lleva contenido de variantes y el id del visitante)
+_SCRIPT_JSON_ESCAPES = {
+    ord('<'): '\\u003c',
+    ord('>'): '\\u003e',
+    ord('&'): '\\u0026',
+    0x2028: '\\u2028',
+    0x2029: '\\u2029'
+}
+
+
+def scan_injection_points(
+    document: Union[str, bytes, bytearray],
+    start: int = 0
+) -> Tuple[int, int, int]:
+    """
+    Una pasada hacia delante buscando <head ...> y <body ...>
+    
+    Se para en el primer <head>. Sin copiar ni pasar a minúsculas el
+    documento.
+    
+    Returns:
+        (fin del <head> o -1, fin del primer <body> o -1, dónde seguir
+        escaneando si al documento le llegan más bytes)
+    """
+    pattern = _TOKEN_STR if isinstance(document, str) else _TOKEN_BYTES
+    body_end = -1
+    resume = start
+    
+    for match in pattern.finditer(document, start):
+        if match.group('tag') is None:
+            if (match.group('comment') and not match.group('comment_end')) or (
+                match.group('script') and not match.group('script_end')
+            ):
+                # Comentario / script sin cerrar (todavía): seguir desde su inicio
+                return -1, body_end, match.start()
+            resume = match.end()
+            continue
+        
+        if match.group('head') is not None:
+            return match.end(), body_end, match.end()
+        
+        if body_end < 0:
+            body_end = match.end()
+        resume = match.end()
+    
+    # Solo la cola puede tener el principio de un tag partido
+    return -1, body_end, max(resume, len(document) - _MAX_TAG_CHARS)
+
+
+def find_injection_point(document: Union[str, bytes, bytearray], start: int = 0) -> int:
+    """
+    Posición justo después de <head ...> o, si no hay, del primer <body ...>
+    
+    Returns:
+        Índice donde inyectar, o -1 si no hay ninguno
+    """
+    head_end, body_end, _ = scan_injection_points(document, start)
+    return head_end if head_end >= 0 else body_end
+
 class InjectionEngine:
     """
     Motor de inyección de código en HTML
@@ -24,14 +99,24 @@ class InjectionEngine:
     
     def __init__(self, api_url: str):
         self.api_url = api_url
-        self.tracker_url = f"{api_url}/static/tracker.js"
+    
+    @property
+    def tracker_url(self) -> str:
+        """
+        URL con hash del bundle del tracker (cacheable como immutable)
+        
+        Se resuelve en cada uso: los bundles se construyen en el arranque,
+        después de crear el engine. Sin bundle, la URL fija.
+        """
+        return f"{self.api_url}{get_static_bundles().url('tracker.js')}"
     
     async def inject_tracker(
         self,
         html: str,
         installation_token: str,
         url: str,
-        experiments: Optional[List[Dict]] = None
+        experiments: Optional[List[Dict]] = None,
+        user_identifier: Optional[str] = None
     ) -> str:
         """
         Inyectar tracker en HTML
@@ -41,25 +126,19 @@ class InjectionEngine:
             installation_token: Token de instalación
             url: URL de la página
             experiments: Experimentos activos (opcional)
+            user_identifier: Visitante de las asignaciones (opcional)
             
         Returns:
             HTML con tracker inyectado
         """
         try:
-            # Si no se pasaron experimentos, construir config básica
-            if experiments is None:
-                experiments = []
-            
-            # Construir configuración del tracker
-            config = self._build_tracker_config(
+            tracker_code = self.build_tracker_code(
                 installation_token,
                 url,
-                experiments
+                experiments,
+                user_identifier
             )
             
-            # Generar código del tracker
-            tracker_code = self._generate_tracker_code(config)
-            
             # Inyectar en HTML
             modified_html = self._inject_code(html, tracker_code)
             
@@ -70,23 +149,51 @@ class InjectionEngine:
             # En caso de error, retornar HTML original
             return html
     
+    def build_tracker_code(
+        self,
+        installation_token: str,
+        url: str,
+        experiments: Optional[List[Dict]] = None,
+        user_identifier: Optional[str] = None
+    ) -> str:
+        """
+        Código del tracker para una página (lo usa también el proxy en streaming)
+        """
+        # Si no se pasaron experimentos, construir config básica
+        if experiments is None:
+            experiments = []
+        
+        # Construir configuración del tracker
+        config = self._build_tracker_config(
+            installation_token,
+            url,
+            experiments,
+            user_identifier
+        )
+        
+        # Generar código del tracker
+        return self._generate_tracker_code(config)
+    
     def _build_tracker_config(
         self,
         installation_token: str,
         url: str,
-        experiments: List[Dict]
+        experiments: List[Dict],
+        user_identifier: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Construir configuración para el tracker"""
-        return {
+        """
+        Construir configuración para el tracker
+        
+        Con user_identifier (render en servidor del proxy) los experimentos
+        llevan ya su 'assignment': el tracker no pide config ni llama a
+        /assign, solo registra eventos.
+        """
+        config = {
             'installationToken': installation_token,
             'apiEndpoint': self.api_url,
             'currentUrl': url,
             'experiments': [
-                {
-                    'id': exp.get('id'),
-                    'name': exp.get('name'),
-                    'elements': exp.get('elements', [])
-                }
+                self._tracker_experiment(exp)
                 for exp in experiments
             ],
             'tracking': {
@@ -97,10 +204,26 @@ class InjectionEngine:
             },
             'debug': False
         }
+        
+        if user_identifier:
+            config['userIdentifier'] = user_identifier
+            config['serverRendered'] = True
+        
+        return config
+    
+    def _tracker_experiment(self, exp: Dict) -> Dict[str, Any]:
+        experiment = {
+            'id': exp.get('id'),
+            'name': exp.get('name'),
+            'elements': exp.get('elements', [])
+        }
+        if exp.get('assignment'):
+            experiment['assignment'] = exp['assignment']
+        return experiment
     
     def _generate_tracker_code(self, config: Dict[str, Any]) -> str:
         """Generar código HTML del tracker"""
-        config_json = json.dumps(config, separators=(',', ':'))
+        config_json = json.dumps(config, separators=(',', ':')).translate(_SCRIPT_JSON_ESCAPES)
         
         return f"""
 <!-- Samplit Tracker (Auto-Injected) -->
@@ -111,45 +234,64 @@ window.SAMPLIT_CONFIG = {config_json};
 <!-- End Samplit Tracker -->
 """
     
-    def _inject_code(self, html: str, tracker_code: str) -> str:
+    async def inject_tracker_bytes(
+        self,
+        body: bytes,
+        installation_token: str,
+        url: str,
+        charset: str = 'utf-8',
+        experiments: Optional[List[Dict]] = None,
+        user_identifier: Optional[str] = None
+    ) -> bytes:
+        """
+        Inyectar tracker en HTML sin decodificarlo
+        
+        Solo para charsets compatibles con ASCII (utf-8, latin-1,
+        windows-125x...): el tag se busca directamente en los bytes.
+        """
+        try:
+            tracker_code = self.build_tracker_code(
+                installation_token,
+                url,
+                experiments,
+                user_identifier
+            ).encode(charset)
+            
+            return self._inject_code(body, tracker_code)
+            
+        except Exception as e:
+            logger.error(f"Injection failed: {str(e)}", exc_info=True)
+            return body
+    
+    def _inject_code(
+        self,
+        html: Union[str, bytes],
+        tracker_code: Union[str, bytes]
+    ) -> Union[str, bytes]:
         """
-        Inyectar código en HTML
+        Inyectar código en HTML (str o bytes)
         
-        Estrategia de inyección (en orden de preferencia):
-        1. Después del <head> tag
-        2. Después del <body> tag  
+        Estrategia de inyección:
+        1. Después del <head ...> tag
+        2. Después del primer <body ...> tag
         3. Al inicio del documento (fallback)
+        
+        El resultado se construye con una única concatenación.
         """
+        end = find_injection_point(html)
         
-        # Método 1: Inyectar después de <head>
-        if '<head>' in html.lower():
-            modified = re.sub(
-                r'(<head[^>]*>)',
-                r'\1' + tracker_code,
-                html,
-                count=1,
-                flags=re.IGNORECASE
-            )
-            if modified != html:
-                logger.debug("Injected after <head>")
-                return modified
-        
-        # Método 2: Inyectar después de <body>
-        if '<body>' in html.lower():
-            modified = re.sub(
-                r'(<body[^>]*>)',
-                r'\1' + tracker_code,
-                html,
-                count=1,
-                flags=re.IGNORECASE
-            )
-            if modified != html:
-                logger.debug("Injected after <body>")
-                return modified
+        if end < 0:
+            logger.warning("No <head> or <body> found, injecting at start")
+            return tracker_code + html
+        
+        logger.debug(f"Injected after open tag at {end}")
         
-        # Método 3: Fallback - inyectar al inicio
-        logger.warning("No <head> or <body> found, injecting at start")
-        return tracker_code + html
+        if isinstance(html, str):
+            return ''.join((html[:end], tracker_code, html[end:]))
+        
+        # memoryview: los dos trozos no se copian antes del join
+        view = memoryview(html)
+        return b''.join((view[:end], tracker_code, view[end:]))
     
     def generate_manual_snippet(
         self,
@@ -159,7 +301,8 @@ window.SAMPLIT_CONFIG = {config_json};
         """
         Generar snippet para instalación manual
         
-        Este código lo copia el usuario en su sitio manualmente.
+        Este código lo copia el usuario en su sitio manualmente, así que
+        usa la URL fija de tracker.js (no la del bundle con hash).
         """
         config = self._build_tracker_config(
             installation_token,
@@ -174,5 +317,5 @@ window.SAMPLIT_CONFIG = {{
     apiEndpoint: '{self.api_url}'
 }};
 </script>
-<script src="{self.tracker_url}" async></script>
+<script src="{self.api_url}/static/tracker.js" async></script>
 <!-- End Samplit Tracker -->"""
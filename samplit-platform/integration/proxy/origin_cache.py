@@ -0,0 +1,601 @@
+# integration/proxy/origin_cache.py
+
+"""
+Origin Cache
+
+Cache HTTP delante de los fetch al origen del proxy (assets estáticos
+y HTML cacheable), como un cache compartido:
+
+- Tier en memoria (LRU acotado por bytes) + tier opcional en disco
+  (también acotado por bytes; recibe lo que sale de memoria)
+- Frescura según Cache-Control (s-maxage/max-age), Expires o
+  heurística sobre Last-Modified
+- Respeta no-store/private, Vary y Set-Cookie
+- Revalida con If-None-Match / If-Modified-Since (304 → se reutiliza)
+- Coalesce: varios misses concurrentes de la misma URL → un solo fetch
+- Hit-for-pass: una URL cuya última respuesta no era cacheable (HTML
+  dinámico) va directa al origen, sin esperar al fetch de otro request
+"""
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import itertools
+from functools import partial
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Headers que describen la respuesta y se refrescan con un 304
+_REVALIDATION_HEADERS = ('cache-control', 'expires', 'etag', 'last-modified', 'date', 'vary')
+
+
+@dataclass
+class CachedResponse:
+    """Respuesta del origen guardada en cache"""
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: Optional[bytes]
+    stored_at: float
+    expires_at: float
+    vary: Dict[str, str] = field(default_factory=dict)
+    size: int = 0
+    disk_path: Optional[str] = None
+
+    @property
+    def etag(self) -> Optional[str]:
+        return get_header(self.headers, 'etag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return get_header(self.headers, 'last-modified')
+
+    @property
+    def age(self) -> int:
+        return int(time.time() - self.stored_at)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def get_header(headers: Dict[str, str], name: str) -> Optional[str]:
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def shared_max_age(
+    headers: Dict[str, str],
+    allowed_vary: tuple = ('accept-encoding', 'accept-language', 'accept')
+) -> Optional[float]:
+    """
+    Segundos que el origen permite compartir la respuesta entre
+    visitantes, o None si no la marca como compartible
+
+    Compartible = public / s-maxage / max-age, sin private, no-store,
+    no-cache ni Set-Cookie, y sin Vary fuera de allowed_vary.
+    """
+    directives = _parse_cache_control(get_header(headers, 'cache-control'))
+
+    if directives.keys() & {'private', 'no-store', 'no-cache'}:
+        return None
+    if get_header(headers, 'set-cookie') is not None:
+        return None
+
+    vary = get_header(headers, 'vary') or ''
+    if any(name.strip().lower() not in allowed_vary for name in vary.split(',') if name.strip()):
+        return None
+
+    for directive in ('s-maxage', 'max-age'):
+        if directives.get(directive):
+            try:
+                return max(float(directives[directive]), 0.0)
+            except ValueError:
+                return None
+
+    return 0.0 if 'public' in directives else None
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class OriginCache:
+    """
+    Cache compartido de respuestas del origen
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 5 * 1024 * 1024,
+        disk_path: Optional[str] = None,
+        max_disk_bytes: int = 1024 * 1024 * 1024,
+        heuristic_max_age: int = 86400,
+        coalesce_timeout: float = 10.0,
+        pass_seconds: float = 60.0,
+        max_pass_urls: int = 10000
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.disk_path = disk_path
+        self.max_disk_bytes = max_disk_bytes
+        self.heuristic_max_age = heuristic_max_age
+        self.coalesce_timeout = coalesce_timeout
+        self.pass_seconds = pass_seconds
+        self.max_pass_urls = max_pass_urls
+
+        self._memory: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pass: "OrderedDict[str, float]" = OrderedDict()  # url → hasta cuándo
+        self._loading: Dict[str, asyncio.Future] = {}      # url → promoción en curso
+        self._writes: Dict[str, asyncio.Future] = {}       # path → escritura en curso
+        self._file_seq = itertools.count()
+
+        if disk_path:
+            os.makedirs(disk_path, exist_ok=True)
+            self._clear_disk()
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.coalesced = 0
+        self.passed = 0
+        self.stored = 0
+        self.uncacheable = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> 'OriginCache':
+        return cls(
+            max_memory_bytes=settings.PROXY_CACHE_MAX_MEMORY_BYTES,
+            max_entry_bytes=settings.PROXY_CACHE_MAX_ENTRY_BYTES,
+            disk_path=settings.PROXY_CACHE_DISK_PATH,
+            max_disk_bytes=settings.PROXY_CACHE_MAX_DISK_BYTES,
+            heuristic_max_age=settings.PROXY_CACHE_HEURISTIC_MAX_AGE,
+            pass_seconds=settings.PROXY_CACHE_PASS_SECONDS
+        )
+
+    # ===== FETCH =====
+
+    async def fetch(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str]
+    ) -> Tuple[Optional[CachedResponse], Optional[aiohttp.ClientResponse]]:
+        """
+        Servir desde cache o ir al origen
+
+        Returns:
+            (entry, None)    si hay respuesta en cache (fresca o revalidada)
+            (None, response) si la respuesta no es cacheable; el caller
+                             la consume y la libera (p.ej. HTML en streaming)
+        """
+        entry = await self._get(url, headers)
+        if entry is not None and entry.is_fresh():
+            self.hits += 1
+            return entry, None
+
+        # Última respuesta no cacheable: esperar a otro request no serviría
+        if entry is None and self._is_pass(url):
+            self.misses += 1
+            self.passed += 1
+            return await self._fetch_origin(session, url, headers, None)
+
+        # Otro request ya está trayendo esta URL: esperar su resultado
+        inflight = self._inflight.get(url)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(inflight), self.coalesce_timeout)
+            except Exception:
+                pass
+
+            entry = await self._get(url, headers)
+            if entry is not None and entry.is_fresh():
+                self.hits += 1
+                return entry, None
+
+        self.misses += 1
+        if url in self._inflight:
+            # Ya hay otro fetch registrado: no pisarlo
+            return await self._fetch_origin(session, url, headers, entry)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+
+        try:
+            return await self._fetch_origin(session, url, headers, entry)
+        finally:
+            if self._inflight.get(url) is future:
+                del self._inflight[url]
+            future.set_result(None)
+
+    def _is_pass(self, url: str) -> bool:
+        until = self._pass.get(url)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            del self._pass[url]
+            return False
+        return True
+
+    def _mark_pass(self, url: str) -> None:
+        self._pass[url] = time.monotonic() + self.pass_seconds
+        self._pass.move_to_end(url)
+
+        while len(self._pass) > self.max_pass_urls:
+            self._pass.popitem(last=False)
+
+    async def _fetch_origin(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, str],
+        stale: Optional[CachedResponse]
+    ) -> Tuple[Optional[CachedResponse], Optional[aiohttp.ClientResponse]]:
+        request_headers = dict(headers)
+
+        # Revalidación condicional de la copia caducada
+        if stale is not None:
+            if stale.etag:
+                request_headers['If-None-Match'] = stale.etag
+            if stale.last_modified:
+                request_headers['If-Modified-Since'] = stale.last_modified
+
+        response = await session.get(url, headers=request_headers)
+
+        if response.status == 304 and stale is not None:
+            response.release()
+            self.revalidated += 1
+            return self._refresh(stale, response), None
+
+        expires_at = self._freshness(response)
+        length = response.content_length
+
+        if (
+            expires_at is None
+            or (length is not None and length > self.max_entry_bytes)
+        ):
+            self.uncacheable += 1
+            self._mark_pass(url)
+            return None, response
+
+        try:
+            body = await response.read()
+        finally:
+            response.release()
+
+        entry = CachedResponse(
+            url=url,
+            status=response.status,
+            headers=dict(response.headers),
+            body=body,
+            stored_at=time.time(),
+            expires_at=expires_at,
+            vary=self._vary_values(response, headers),
+            size=len(body)
+        )
+
+        self._pass.pop(url, None)
+        if entry.size <= self.max_entry_bytes:
+            self._store(entry)
+
+        return entry, None
+
+    # ===== POLÍTICA HTTP =====
+
+    def _freshness(self, response: aiohttp.ClientResponse) -> Optional[float]:
+        """
+        Timestamp hasta el que la respuesta es fresca, o None si no es cacheable
+        """
+        if response.status != 200 or response.method != 'GET':
+            return None
+
+        headers = response.headers
+        directives = _parse_cache_control(headers.get('Cache-Control'))
+
+        if 'no-store' in directives or 'private' in directives:
+            return None
+        if 'Set-Cookie' in headers or headers.get('Vary', '').strip() == '*':
+            return None
+
+        now = time.time()
+
+        # no-cache: se puede guardar pero hay que revalidar siempre
+        if 'no-cache' in directives:
+            return now if (headers.get('ETag') or headers.get('Last-Modified')) else None
+
+        for directive in ('s-maxage', 'max-age'):
+            if directives.get(directive):
+                try:
+                    return now + int(directives[directive])
+                except ValueError:
+                    break
+
+        expires = headers.get('Expires')
+        if expires is not None:
+            expires_at = _parse_http_date(expires)
+            if expires_at is None:
+                return now   # Expires inválido = ya caducado
+            date = _parse_http_date(headers.get('Date')) or now
+            return now + max(expires_at - date, 0)
+
+        # Heurística: 10% del tiempo desde la última modificación
+        last_modified = _parse_http_date(headers.get('Last-Modified'))
+        if last_modified is not None:
+            return now + min((now - last_modified) * 0.1, self.heuristic_max_age)
+
+        # Solo ETag: guardar para revalidar
+        if headers.get('ETag'):
+            return now
+
+        return None
+
+    def _refresh(
+        self,
+        entry: CachedResponse,
+        response: aiohttp.ClientResponse
+    ) -> CachedResponse:
+        """Actualizar headers y frescura con un 304"""
+        for name in _REVALIDATION_HEADERS:
+            value = response.headers.get(name)
+            if value is not None:
+                for key in [k for k in entry.headers if k.lower() == name]:
+                    del entry.headers[key]
+                entry.headers[name.title()] = value
+
+        directives = _parse_cache_control(get_header(entry.headers, 'cache-control'))
+        now = time.time()
+        max_age = directives.get('s-maxage') or directives.get('max-age')
+
+        if 'no-cache' in directives or not max_age:
+            entry.expires_at = now
+        else:
+            try:
+                entry.expires_at = now + int(max_age)
+            except ValueError:
+                entry.expires_at = now
+
+        entry.stored_at = now
+        return entry
+
+    def _vary_values(
+        self,
+        response: aiohttp.ClientResponse,
+        request_headers: Dict[str, str]
+    ) -> Dict[str, str]:
+        names = [
+            name.strip().lower()
+            for name in response.headers.get('Vary', '').split(',')
+            if name.strip()
+        ]
+
+        # Body comprimido: nunca servirlo a quien pidió otro encoding
+        if response.headers.get('Content-Encoding') and 'accept-encoding' not in names:
+            names.append('accept-encoding')
+        return {name: (get_header(request_headers, name) or '') for name in names}
+
+    def _matches_vary(self, entry: CachedResponse, request_headers: Dict[str, str]) -> bool:
+        return all(
+            (get_header(request_headers, name) or '') == value
+            for name, value in entry.vary.items()
+        )
+
+    # ===== ALMACENAMIENTO =====
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> Optional[CachedResponse]:
+        entry = self._memory.get(url)
+        if entry is not None:
+            self._memory.move_to_end(url)
+        else:
+            entry = await self._load_from_disk(url)
+
+        if entry is None or not self._matches_vary(entry, headers):
+            return None
+        return entry
+
+    def _store(self, entry: CachedResponse) -> None:
+        self._discard(entry.url)
+
+        self._memory[entry.url] = entry
+        self._memory_bytes += entry.size
+        self.stored += 1
+
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+            self._demote_to_disk(evicted)
+
+    def _discard(self, url: str) -> None:
+        old = self._memory.pop(url, None)
+        if old is not None:
+            self._memory_bytes -= old.size
+
+        old = self._disk.pop(url, None)
+        if old is not None:
+            self._disk_bytes -= old.size
+            self._remove_file(old.disk_path)
+
+    def _demote_to_disk(self, entry: CachedResponse) -> None:
+        """
+        Pasar a disco lo que sale de memoria (si hay tier en disco)
+
+        La escritura va al executor pero queda registrada en _writes:
+        borrar o leer el fichero espera a que termine, así no quedan
+        ficheros huérfanos fuera de la contabilidad. Cada demote usa un
+        fichero propio (url + secuencia), así un borrado pendiente nunca
+        se lleva la escritura siguiente de la misma URL.
+        """
+        if not self.disk_path or entry.size > self.max_disk_bytes:
+            return
+
+        path = os.path.join(
+            self.disk_path,
+            f"{hashlib.sha256(entry.url.encode('utf-8')).hexdigest()}.{next(self._file_seq)}"
+        )
+        body = entry.body
+        entry.body = None
+        entry.disk_path = path
+
+        self._disk[entry.url] = entry
+        self._disk_bytes += entry.size
+
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            _, evicted = self._disk.popitem(last=False)
+            self._disk_bytes -= evicted.size
+            if evicted is not entry:
+                self._remove_file(evicted.disk_path)
+
+        if self._disk.get(entry.url) is entry:
+            write = asyncio.get_running_loop().run_in_executor(
+                None, self._write_file, path, body
+            )
+            self._writes[path] = write
+            write.add_done_callback(partial(self._write_done, entry, path))
+
+    def _write_done(self, entry: CachedResponse, path: str, write: asyncio.Future) -> None:
+        self._writes.pop(path, None)
+
+        error = None if write.cancelled() else write.exception()
+        if error is None:
+            return
+
+        logger.warning(f"Origin cache disk write failed: {error}")
+        if self._disk.get(entry.url) is entry and entry.disk_path == path:
+            del self._disk[entry.url]
+            self._disk_bytes -= entry.size
+
+    async def _load_from_disk(self, url: str) -> Optional[CachedResponse]:
+        """Promoción a memoria coalescida: una sola lectura por URL"""
+        loading = self._loading.get(url)
+        if loading is None:
+            entry = self._disk.get(url)
+            if entry is None:
+                return None
+
+            loading = asyncio.ensure_future(self._promote(url, entry))
+            self._loading[url] = loading
+            loading.add_done_callback(partial(self._load_done, url))
+
+        return await asyncio.shield(loading)
+
+    def _load_done(self, url: str, loading: asyncio.Future) -> None:
+        if self._loading.get(url) is loading:
+            del self._loading[url]
+
+    async def _promote(self, url: str, entry: CachedResponse) -> Optional[CachedResponse]:
+        path = entry.disk_path
+        try:
+            write = self._writes.get(path)
+            if write is not None:
+                await asyncio.shield(write)
+
+            body = await asyncio.get_running_loop().run_in_executor(
+                None, self._read_file, path
+            )
+        except OSError:
+            body = None
+
+        # Descartada, desalojada o reemplazada mientras se leía: quien la
+        # sacó del índice ya descontó sus bytes y borró el fichero
+        if self._disk.get(url) is not entry:
+            return None
+
+        del self._disk[url]
+        self._disk_bytes -= entry.size
+        self._remove_file(path)
+
+        if body is None:
+            return None
+
+        # Promocionar a memoria
+        entry.body = body
+        entry.disk_path = None
+        self._store(entry)
+        self.stored -= 1   # no es un store nuevo
+
+        return entry
+
+    def _remove_file(self, path: Optional[str]) -> None:
+        """Borrar un fichero del tier en disco (después de su escritura)"""
+        write = self._writes.get(path) if path else None
+        if write is not None:
+            write.add_done_callback(lambda _: self._unlink(path))
+        else:
+            self._unlink(path)
+
+    def _clear_disk(self) -> None:
+        """El índice vive en memoria: borrar ficheros de procesos anteriores"""
+        for name in os.listdir(self.disk_path):
+            if len(name.split('.')[0]) == 64:
+                self._unlink(os.path.join(self.disk_path, name))
+
+    @staticmethod
+    def _write_file(path: str, body: bytes) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    def _unlink(path: Optional[str]) -> None:
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ===== STATS =====
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'revalidated': self.revalidated,
+            'coalesced': self.coalesced,
+            'passed': self.passed,
+            'pass_urls': len(self._pass),
+            'stored': self.stored,
+            'uncacheable': self.uncacheable,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk),
+            'disk_bytes': self._disk_bytes
+        }
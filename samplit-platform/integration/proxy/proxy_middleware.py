@@ -8,13 +8,62 @@ Intercepta requests del usuario, obtiene HTML original e inyecta tracker automá
 
 from fastapi import Request, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import asyncio
 import aiohttp
 import logging
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 from .injection_engine import InjectionEngine
+from .streaming_injector import StreamingInjector, is_ascii_compatible
+from .variant_rewriter import VariantRewriter, build_rewrite_rules, rewrite_body
+from .origin_cache import OriginCache, CachedResponse, get_header, shared_max_age
+from .compression import (
+    origin_accept_encoding,
+    choose_output_encoding,
+    decode_stream,
+    encode_stream,
+    decode_body,
+    encode_body,
+    is_supported_encoding
+)
+from ..http_client import get_http_session, PURPOSE_PROXY
+from orchestration.utils.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# URLs recordadas como compartibles (o no) por el origen
+_MAX_SHARE_HINTS = 10000
+
+
+@dataclass
+class _SharedResponse:
+    """Respuesta ya renderizada, repartible entre requests coalescidas"""
+    status: int
+    body: bytes
+    headers: Dict[str, str]
+    max_age: Optional[float]
+    
+    @classmethod
+    def from_response(cls, response: Response, max_age: Optional[float]) -> '_SharedResponse':
+        return cls(
+            status=response.status_code,
+            body=response.body,
+            headers=dict(response.headers),
+            max_age=max_age
+        )
+    
+    @property
+    def shareable(self) -> bool:
+        return self.status == 200 and self.max_age is not None
+    
+    def to_response(self, coalesced: bool = False) -> Response:
+        headers = dict(self.headers)
+        if coalesced:
+            headers['X-Samplit-Coalesced'] = 'true'
+        return Response(content=self.body, status_code=self.status, headers=headers)
+
 class MABProxyMiddleware:
     """
     Middleware que intercepta HTML e inyecta tracker automáticamente
@@ -23,91 +72,491 @@ class MABProxyMiddleware:
     Nosotros retornamos el HTML con el tracker ya inyectado.
     """
     
-    def __init__(self, api_url: str = "https://api.samplit.com"):
+    def __init__(
+        self,
+        api_url: str = "https://api.samplit.com",
+        streaming: bool = True,
+        max_scan_bytes: int = 262144,
+        origin_cache: Optional[OriginCache] = None,
+        compression_levels: Optional[Dict[str, int]] = None,
+        coalescer: Optional[SingleFlight] = None,
+        micro_cache_seconds: float = 0.0
+    ):
         self.api_url = api_url
         self.injection_engine = InjectionEngine(api_url)
-        self.timeout = aiohttp.ClientTimeout(total=30)
+        self.streaming = streaming
+        self.max_scan_bytes = max_scan_bytes
+        self.origin_cache = origin_cache
+        self.compression_levels = compression_levels or {'br': 5, 'gzip': 6}
+        self.coalescer = coalescer
+        self.micro_cache_seconds = micro_cache_seconds
+        
+        # (installation_token, url) → max-age compartible del último fetch
+        self._share_hints: 'OrderedDict[tuple, Optional[float]]' = OrderedDict()
         
     async def process_request(
         self, 
         request: Request,
         installation_token: str,
-        original_url: str
+        original_url: str,
+        load_experiments: Optional[Callable[[], Awaitable[List[Dict[str, Any]]]]] = None,
+        user_identifier: Optional[str] = None
     ) -> Response:
         """
         Procesar request: obtener HTML original e inyectar tracker
         
+        En modo streaming el HTML no se bufferiza: se inyecta el tracker
+        al ver el primer <head>/<body> y el resto se reenvía según llega,
+        así el TTFB sigue al del origen.
+        
+        Los assets se reenvían con el Content-Encoding del origen; el HTML
+        se recomprime con el mejor encoding que acepte el navegador.
+        
+        Con load_experiments (render en servidor) las variantes asignadas
+        al visitante se aplican al HTML en el proxy, y el tracker recibe
+        la config con las asignaciones ya hechas.
+        
         Args:
             request: FastAPI Request object
             installation_token: Token de la instalación
             original_url: URL original del sitio del usuario
+            load_experiments: Experimentos de la página con 'assignment'
+                (solo se llama si la respuesta es HTML)
+            user_identifier: Visitante al que pertenecen las asignaciones
             
         Returns:
             Response con HTML modificado o contenido original
         """
+        # Páginas que el origen marca como compartibles (visto en el fetch
+        # anterior): un solo fetch + inyección para todas las requests
+        # concurrentes, y micro-cache de unos segundos
+        if (
+            self.coalescer is not None
+            and load_experiments is None
+            and self._share_hints.get((installation_token, original_url)) is not None
+        ):
+            return await self._process_coalesced(
+                request,
+                installation_token,
+                original_url
+            )
+        
+        return await self._process(
+            request,
+            installation_token,
+            original_url,
+            load_experiments,
+            user_identifier,
+            self.streaming
+        )
+    
+    async def _process_coalesced(
+        self,
+        request: Request,
+        installation_token: str,
+        original_url: str
+    ) -> Response:
+        """
+        Fetch + inyección compartidos por (instalación, URL, headers que varían)
+        """
+        key = (
+            installation_token,
+            original_url,
+            choose_output_encoding(request.headers.get('Accept-Encoding')),
+            request.headers.get('Accept-Language', ''),
+            request.headers.get('Accept', '')
+        )
+        is_leader = False
+        
+        async def render() -> _SharedResponse:
+            nonlocal is_leader
+            is_leader = True
+            response = await self._process(
+                request,
+                installation_token,
+                original_url,
+                streaming_enabled=False
+            )
+            return _SharedResponse.from_response(
+                response,
+                self._share_hints.get((installation_token, original_url))
+            )
+        
+        shared = await self.coalescer.do(key, render, ttl_for=self._micro_cache_ttl)
+        
+        if is_leader:
+            return shared.to_response()
+        
+        if not shared.shareable:
+            # El origen dejó de marcarla como compartible: fetch propio
+            return await self._process(
+                request,
+                installation_token,
+                original_url,
+                streaming_enabled=self.streaming
+            )
+        
+        return shared.to_response(coalesced=True)
+    
+    def _micro_cache_ttl(self, shared: _SharedResponse) -> float:
+        """Micro-cache solo para HTML compartible (los assets ya van al OriginCache)"""
+        if not shared.shareable or 'x-mab-injected' not in shared.headers:
+            return 0.0
+        return min(self.micro_cache_seconds, shared.max_age)
+    
+    def _remember_sharing(
+        self,
+        installation_token: str,
+        original_url: str,
+        headers
+    ) -> None:
+        key = (installation_token, original_url)
+        self._share_hints[key] = shared_max_age(dict(headers))
+        self._share_hints.move_to_end(key)
+        
+        while len(self._share_hints) > _MAX_SHARE_HINTS:
+            self._share_hints.popitem(last=False)
+    
+    async def _process(
+        self,
+        request: Request,
+        installation_token: str,
+        original_url: str,
+        load_experiments=None,
+        user_identifier: Optional[str] = None,
+        streaming_enabled: bool = True
+    ) -> Response:
+        """Fetch al origen (o cache) + inyección"""
+        streaming = False
+        response = None
+        
         try:
-            # 1. Obtener HTML original del sitio del usuario
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                headers = self._get_forwarded_headers(request)
-                
-                async with session.get(original_url, headers=headers) as response:
-                    
-                    if response.status != 200:
-                        logger.warning(
-                            f"Original site returned {response.status} for {original_url}"
-                        )
-                        return Response(
-                            content=f"Error fetching original content: {response.status}",
-                            status_code=response.status
-                        )
-                    
-                    content_type = response.headers.get('Content-Type', '')
-                    
-                    # Solo procesar HTML
-                    if 'text/html' not in content_type.lower():
-                        # Pasar contenido sin modificar (CSS, JS, imágenes, etc)
-                        content = await response.read()
-                        return Response(
-                            content=content,
-                            media_type=content_type,
-                            headers=self._filter_headers(dict(response.headers))
-                        )
-                    
-                    # 2. Obtener HTML
-                    html = await response.text()
-                    
-                    # 3. Inyectar tracker
-                    modified_html = await self.injection_engine.inject_tracker(
-                        html=html,
-                        installation_token=installation_token,
-                        url=original_url
-                    )
-                    
-                    logger.info(f"Tracker injected for {original_url}")
-                    
-                    # 4. Retornar HTML modificado
-                    return Response(
-                        content=modified_html,
-                        media_type='text/html; charset=utf-8',
-                        headers={
-                            'Content-Type': 'text/html; charset=utf-8',
-                            'X-MAB-Injected': 'true',
-                            'Cache-Control': 'no-cache'
-                        }
+            # 1. Obtener respuesta del sitio del usuario
+            #    (session compartida: keep-alive y TLS reutilizados)
+            session = get_http_session(PURPOSE_PROXY)
+            headers = self._get_forwarded_headers(request)
+            
+            if self.origin_cache is not None:
+                cached, response = await self.origin_cache.fetch(
+                    session,
+                    original_url,
+                    headers
+                )
+                if cached is not None:
+                    if self.coalescer is not None:
+                        self._remember_sharing(installation_token, original_url, cached.headers)
+                    return await self._serve_cached(
+                        request,
+                        cached,
+                        installation_token,
+                        original_url,
+                        load_experiments,
+                        user_identifier
                     )
-                    
+            else:
+                response = await session.get(original_url, headers=headers)
+            
+            if response.status != 200:
+                logger.warning(
+                    f"Original site returned {response.status} for {original_url}"
+                )
+                return Response(
+                    content=f"Error fetching original content: {response.status}",
+                    status_code=response.status
+                )
+            
+            if self.coalescer is not None:
+                self._remember_sharing(installation_token, original_url, response.headers)
+            
+            content_type = response.headers.get('Content-Type', '')
+            content_encoding = response.headers.get('Content-Encoding')
+            
+            # Solo procesar HTML que sabemos descomprimir; se comprueba antes
+            # de empezar la respuesta para no cortarla a medias
+            injectable = 'text/html' in content_type.lower()
+            if injectable and not is_supported_encoding(content_encoding):
+                logger.warning(
+                    f"Unsupported Content-Encoding '{content_encoding}' for {original_url}, "
+                    f"serving without injection"
+                )
+                injectable = False
+            
+            if not injectable:
+                # Pasar contenido sin modificar ni recomprimir (CSS, JS, imágenes...)
+                content = await response.read()
+                return Response(
+                    content=content,
+                    media_type=content_type,
+                    headers=self._passthrough_headers(response.headers)
+                )
+            
+            experiments = await self._load_experiments(load_experiments, original_url)
+            
+            # 2a. Streaming: inyectar sin bufferizar la página
+            if streaming_enabled and is_ascii_compatible(response.charset):
+                streaming = True
+                return self._stream_html(
+                    request,
+                    response,
+                    content_type,
+                    installation_token,
+                    original_url,
+                    experiments,
+                    user_identifier
+                )
+            
+            # 2b. Bufferizado (streaming desactivado o charset no ASCII)
+            body = decode_body(await response.read(), content_encoding)
+            
+            return await self._inject_buffered(
+                request,
+                body,
+                response.charset or 'utf-8',
+                installation_token,
+                original_url,
+                experiments,
+                user_identifier
+            )
+                
         except aiohttp.ClientError as e:
             logger.error(f"Proxy request failed: {str(e)}")
             return Response(
                 content=f"Proxy error: Could not reach original site",
                 status_code=502
             )
+        except asyncio.TimeoutError:
+            logger.error(f"Proxy request timed out: {original_url}")
+            return Response(
+                content="Proxy error: Original site timed out",
+                status_code=504
+            )
         except Exception as e:
             logger.error(f"Proxy middleware error: {str(e)}", exc_info=True)
             return Response(
                 content=f"Proxy error: {str(e)}",
                 status_code=500
             )
+        finally:
+            # En streaming la conexión se libera al terminar el body
+            if response is not None and not streaming:
+                response.release()
+    
+    async def _serve_cached(
+        self,
+        request: Request,
+        cached: CachedResponse,
+        installation_token: str,
+        original_url: str,
+        load_experiments=None,
+        user_identifier: Optional[str] = None
+    ) -> Response:
+        """
+        Responder con una copia del origen guardada en cache
+        """
+        cache_headers = {
+            'Age': str(cached.age),
+            'X-Samplit-Cache': 'HIT'
+        }
+        content_type = get_header(cached.headers, 'content-type') or ''
+        content_encoding = get_header(cached.headers, 'content-encoding')
+        
+        if 'text/html' in content_type.lower() and is_supported_encoding(content_encoding):
+            body = decode_body(cached.body, content_encoding)
+            response = await self._inject_buffered(
+                request,
+                body,
+                _charset(content_type) or 'utf-8',
+                installation_token,
+                original_url,
+                await self._load_experiments(load_experiments, original_url),
+                user_identifier
+            )
+            response.headers.update(cache_headers)
+            return response
+        
+        headers = {**self._passthrough_headers(cached.headers), **cache_headers}
+        
+        # El navegador ya tiene esta versión
+        if cached.etag and request.headers.get('If-None-Match') == cached.etag:
+            return Response(status_code=304, headers=headers)
+        
+        return Response(
+            content=cached.body,
+            media_type=content_type,
+            headers=headers
+        )
+    
+    async def _inject_buffered(
+        self,
+        request: Request,
+        body: bytes,
+        charset: str,
+        installation_token: str,
+        original_url: str,
+        experiments: Optional[List[Dict[str, Any]]] = None,
+        user_identifier: Optional[str] = None
+    ) -> Response:
+        """
+        Inyectar el tracker en un HTML completo (ya descomprimido)
+        
+        Si el charset es compatible con ASCII se inyecta sobre los bytes,
+        sin decodificar ni re-codificar la página, y se aplican las
+        variantes en servidor. Si no, las variantes las aplica el tracker.
+        """
+        rules = build_rewrite_rules(experiments) if experiments else []
+        
+        # 3. Inyectar tracker
+        if is_ascii_compatible(charset):
+            modified = await self.injection_engine.inject_tracker_bytes(
+                body=body,
+                installation_token=installation_token,
+                url=original_url,
+                charset=charset,
+                experiments=experiments,
+                user_identifier=user_identifier
+            )
+            if rules:
+                modified = rewrite_body(modified, rules, charset)
+        else:
+            rules = []
+            modified_html = await self.injection_engine.inject_tracker(
+                html=body.decode(charset, errors='replace'),
+                installation_token=installation_token,
+                url=original_url,
+                experiments=experiments,
+                user_identifier=user_identifier
+            )
+            modified, charset = modified_html.encode('utf-8'), 'utf-8'
+        
+        logger.info(
+            f"Tracker injected for {original_url}"
+            f" ({sum(r.applied for r in rules)}/{len(rules)} variants rendered)"
+        )
+        
+        # 4. Retornar HTML modificado (recomprimido si el cliente acepta)
+        encoding = choose_output_encoding(request.headers.get('Accept-Encoding'))
+        
+        return Response(
+            content=encode_body(
+                modified,
+                encoding,
+                self.compression_levels.get(encoding, 6)
+            ),
+            media_type=f'text/html; charset={charset}',
+            headers=self._html_headers(encoding, personalized=bool(experiments))
+        )
+    
+    def _stream_html(
+        self,
+        request: Request,
+        response: aiohttp.ClientResponse,
+        content_type: str,
+        installation_token: str,
+        original_url: str,
+        experiments: Optional[List[Dict[str, Any]]] = None,
+        user_identifier: Optional[str] = None
+    ) -> StreamingResponse:
+        """
+        StreamingResponse que inyecta el tracker sobre la marcha
+        
+        origen (br/gzip/deflate) → descomprimir → inyectar → aplicar
+        variantes → recomprimir, todo chunk a chunk.
+        """
+        charset = response.charset or 'utf-8'
+        tracker_code = self.injection_engine.build_tracker_code(
+            installation_token,
+            original_url,
+            experiments,
+            user_identifier
+        ).encode(charset)
+        
+        injector = StreamingInjector(tracker_code, self.max_scan_bytes)
+        rewriter = VariantRewriter(
+            build_rewrite_rules(experiments) if experiments else [],
+            charset
+        )
+        encoding = choose_output_encoding(request.headers.get('Accept-Encoding'))
+        
+        chunks = decode_stream(
+            response.content.iter_any(),
+            response.headers.get('Content-Encoding')
+        )
+        chunks = injector.inject(chunks)
+        if rewriter.rules:
+            chunks = rewriter.rewrite(chunks)
+        chunks = encode_stream(
+            chunks,
+            encoding,
+            self.compression_levels.get(encoding, 6)
+        )
+        
+        async def body():
+            try:
+                async for chunk in chunks:
+                    yield chunk
+                logger.info(
+                    f"Tracker injected for {original_url} ({injector.position}, "
+                    f"{len(rewriter.applied)}/{len(rewriter.rules)} variants rendered)"
+                )
+            finally:
+                response.release()
+        
+        return StreamingResponse(
+            body(),
+            media_type=content_type,
+            headers=self._html_headers(encoding, personalized=bool(experiments)),
+            # Por si el cliente se desconecta antes de consumir el body
+            background=BackgroundTask(response.release)
+        )
+    
+    async def _load_experiments(
+        self,
+        load_experiments,
+        original_url: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Experimentos con asignación para el render en servidor (None = sin render)"""
+        if load_experiments is None:
+            return None
+        
+        try:
+            return await load_experiments()
+        except Exception as e:
+            # Sin variantes en servidor: el tracker las aplicará como siempre
+            logger.warning(f"Server-side variants unavailable for {original_url}: {e!r}")
+            return None
+    
+    def _html_headers(
+        self,
+        encoding: Optional[str],
+        personalized: bool = False
+    ) -> Dict[str, str]:
+        """Headers del HTML con tracker"""
+        headers = {
+            'X-MAB-Injected': 'true',
+            # HTML con variantes del visitante: nunca en caches compartidas
+            'Cache-Control': 'private, no-cache' if personalized else 'no-cache',
+            'Vary': 'Accept-Encoding'
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return headers
+    
+    def _passthrough_headers(self, headers) -> Dict[str, str]:
+        """
+        Headers de un asset reenviado tal cual (body sin tocar,
+        así que se conserva el Content-Encoding del origen)
+        """
+        filtered = self._filter_headers(dict(headers))
+        
+        encoding = get_header(dict(headers), 'content-encoding')
+        if encoding:
+            filtered['Content-Encoding'] = encoding
+            vary = get_header(filtered, 'vary')
+            if not vary or 'accept-encoding' not in vary.lower():
+                filtered = {k: v for k, v in filtered.items() if k.lower() != 'vary'}
+                filtered['Vary'] = f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'
+        
+        return filtered
     
     def _get_forwarded_headers(self, request: Request) -> Dict[str, str]:
         """Obtener headers para forward del request original"""
@@ -118,7 +567,10 @@ class MABProxyMiddleware:
             ),
             'Accept': request.headers.get('Accept', '*/*'),
             'Accept-Language': request.headers.get('Accept-Language', 'en-US'),
-            'Accept-Encoding': 'gzip, deflate',
+            # Solo encodings que podemos descomprimir (para inyectar en HTML)
+            'Accept-Encoding': origin_accept_encoding(
+                request.headers.get('Accept-Encoding')
+            ),
             'Referer': request.headers.get('Referer', ''),
             'X-Forwarded-For': request.client.host if request.client else '',
             'X-Forwarded-Proto': request.url.scheme,
@@ -144,3 +596,12 @@ class MABProxyMiddleware:
             k: v for k, v in headers.items()
             if k.lower() not in blocked_headers
         }
+
+
+def _charset(content_type: str) -> Optional[str]:
+    """Charset declarado en un Content-Type"""
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.strip().partition('=')
+        if name.lower() == 'charset' and value:
+            return value.strip('"\'')
+    return None
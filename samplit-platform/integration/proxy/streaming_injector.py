@@ -0,0 +1,88 @@
+# integration/proxy/streaming_injector.py
+
+"""
+Streaming Injector
+
+Inyección del tracker sobre un stream de bytes del origen, sin
+bufferizar la página completa:
+
+- Se acumulan chunks solo hasta encontrar <head ...> o, si llega antes,
+  <body ...> (el tag puede llegar partido entre dos chunks), saltando
+  comentarios y <script>
+- Se emite lo anterior + tag + tracker. Visto <body> ya no se espera a
+  un <head>: después del body no sería un head de verdad, y esperar
+  costaría el first byte de las páginas sin <head>
+- El resto de chunks se pasan tal cual, sin copiar ni decodificar
+
+Trabaja en bytes, así que solo sirve para charsets compatibles con
+ASCII (utf-8, latin-1, windows-125x...). Para utf-16/32 el proxy usa
+la inyección bufferizada de InjectionEngine.
+"""
+
+import logging
+from typing import AsyncIterator, Optional
+
+from .injection_engine import scan_injection_points
+
+logger = logging.getLogger(__name__)
+
+_ASCII_INCOMPATIBLE = ('utf-16', 'utf-32', 'utf_16', 'utf_32')
+
+
+def is_ascii_compatible(charset: Optional[str]) -> bool:
+    """True si el tag se puede buscar directamente en bytes"""
+    return not (charset and charset.lower().startswith(_ASCII_INCOMPATIBLE))
+
+
+class StreamingInjector:
+    """
+    Inyecta tracker_code tras el <head> (o el primer <body>) de un stream
+    """
+
+    def __init__(self, tracker_code: bytes, max_scan_bytes: int = 262144):
+        self.tracker_code = tracker_code
+        self.max_scan_bytes = max_scan_bytes
+        self.injected = False
+        self.position: Optional[str] = None  # 'tag' | 'start'
+
+    async def inject(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Envolver un iterador de chunks del origen
+        """
+        buffer = bytearray()
+        scan_from = 0
+
+        async for chunk in chunks:
+            if self.injected:
+                yield chunk
+                continue
+
+            buffer += chunk
+            head_end, body_end, scan_from = scan_injection_points(buffer, scan_from)
+
+            # El primero de los dos (un <head> después de <body> no cuenta)
+            end = head_end if body_end < 0 else body_end
+            if end >= 0:
+                yield self._inject_at(buffer, end)
+                buffer = bytearray()
+                continue
+
+            if len(buffer) >= self.max_scan_bytes:
+                # Sin <head>/<body> en los primeros bytes: al inicio
+                yield self._inject_at(buffer, -1)
+                buffer = bytearray()
+
+        if not self.injected:
+            # Documento completo sin <head>/<body>
+            yield self._inject_at(buffer, -1)
+
+    def _inject_at(self, buffer: bytearray, end: int) -> bytes:
+        self.injected = True
+
+        if end < 0:
+            logger.warning("No <head> or <body> found, injecting at start")
+            self.position = 'start'
+            return b''.join((self.tracker_code, buffer))
+
+        self.position = 'tag'
+        return b''.join((buffer[:end], self.tracker_code, buffer[end:]))
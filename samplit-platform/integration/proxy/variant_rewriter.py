@@ -0,0 +1,592 @@
+# integration/proxy/variant_rewriter.py
+
+"""
+Variant Rewriter
+
+Aplica en el servidor las variantes asignadas al visitante mientras
+el HTML pasa por el proxy. La página llega ya personalizada: sin
+fetch de config, sin /assign y sin flicker en el cliente.
+
+No se parsea el documento (nada de BeautifulSoup): un tokenizer
+incremental sobre bytes que solo sigue la pila de elementos abiertos
+para poder evaluar selectores.
+
+- Selectores: id, class, css simple (tag, #id, .class, [attr],
+  [attr="v"], :nth-of-type(n), combinadores ' ' y '>') y el xpath
+  //*[@id="..."] que genera el editor visual
+- Lo que no se puede resolver aquí lo sigue aplicando el tracker
+- Cada regla se aplica al primer elemento que encaja (como
+  querySelector); aplicadas todas, el resto pasa sin tokenizar
+
+Solo para charsets compatibles con ASCII (igual que StreamingInjector).
+"""
+
+import re
+import html
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Any, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# SELECTORES
+# ============================================
+
+_SIMPLE_SELECTOR = re.compile(
+    r'''
+      (?P<tag>[a-zA-Z][\w-]*|\*)
+    | \#(?P<id>[\w-]+)
+    | \.(?P<cls>[\w-]+)
+    | \[(?P<attr>[\w:-]+)(?:=(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<uq>[^\]]*)))?\]
+    | :nth-of-type\((?P<nth>\d+)\)
+    ''',
+    re.VERBOSE
+)
+
+_XPATH_ID = re.compile(r'''^//\*\[@id=["']([^"']+)["']\]$''')
+
+
+class UnsupportedSelector(ValueError):
+    """Selector que el rewriter no sabe evaluar (se deja al tracker)"""
+
+
+@dataclass
+class _Compound:
+    tag: Optional[str] = None
+    id: Optional[str] = None
+    classes: Set[str] = field(default_factory=set)
+    attrs: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    nth: Optional[int] = None
+
+    def matches(self, frame: '_Frame') -> bool:
+        if self.tag and self.tag != '*' and self.tag != frame.tag:
+            return False
+        if self.id is not None and frame.attrs.get('id') != self.id:
+            return False
+        if self.classes and not self.classes <= frame.classes:
+            return False
+        for name, value in self.attrs:
+            if name not in frame.attrs:
+                return False
+            if value is not None and frame.attrs[name] != value:
+                return False
+        if self.nth is not None and frame.nth != self.nth:
+            return False
+        return True
+
+
+# [(combinador, compound)]: combinador entre el anterior y este (' ' | '>')
+Selector = List[Tuple[Optional[str], _Compound]]
+
+
+def parse_selector(selector_type: str, value: str) -> Selector:
+    """
+    Selector de experiment_elements → forma evaluable en streaming
+
+    Raises:
+        UnsupportedSelector
+    """
+    value = (value or '').strip()
+    if not value:
+        raise UnsupportedSelector("Empty selector")
+
+    if selector_type == 'id':
+        return [(None, _Compound(id=value.lstrip('#')))]
+
+    if selector_type == 'class':
+        classes = {c for c in re.split(r'[\s.]+', value) if c}
+        return [(None, _Compound(classes=classes))]
+
+    if selector_type == 'xpath':
+        match = _XPATH_ID.match(value)
+        if not match:
+            raise UnsupportedSelector(f"XPath not supported server-side: {value}")
+        return [(None, _Compound(id=match.group(1)))]
+
+    if selector_type == 'css':
+        return _parse_css(value)
+
+    raise UnsupportedSelector(f"Unknown selector type: {selector_type}")
+
+
+def _parse_css(value: str) -> Selector:
+    if ',' in value:
+        raise UnsupportedSelector(f"Selector lists not supported: {value}")
+
+    parts: Selector = []
+    combinator: Optional[str] = None
+    pos = 0
+
+    while pos < len(value):
+        char = value[pos]
+
+        if char.isspace():
+            if parts and combinator is None:
+                combinator = ' '
+            pos += 1
+            continue
+
+        if char == '>':
+            if not parts:
+                raise UnsupportedSelector(f"Invalid selector: {value}")
+            combinator = '>'
+            pos += 1
+            continue
+
+        compound = _Compound()
+        start = pos
+        while pos < len(value):
+            match = _SIMPLE_SELECTOR.match(value, pos)
+            if not match:
+                break
+            if match.group('tag'):
+                if pos != start:
+                    raise UnsupportedSelector(f"Invalid selector: {value}")
+                compound.tag = match.group('tag').lower()
+            elif match.group('id'):
+                compound.id = match.group('id')
+            elif match.group('cls'):
+                compound.classes.add(match.group('cls'))
+            elif match.group('attr'):
+                attr_value = next(
+                    (match.group(g) for g in ('dq', 'sq', 'uq') if match.group(g) is not None),
+                    None
+                )
+                compound.attrs.append((match.group('attr').lower(), attr_value))
+            else:
+                compound.nth = int(match.group('nth'))
+            pos = match.end()
+
+        if pos == start or (pos < len(value) and not value[pos].isspace() and value[pos] != '>'):
+            raise UnsupportedSelector(f"Selector not supported server-side: {value}")
+
+        parts.append((combinator if parts else None, compound))
+        combinator = None
+
+    if not parts or combinator is not None:
+        raise UnsupportedSelector(f"Invalid selector: {value}")
+
+    return parts
+
+
+def _matches(selector: Selector, stack: List['_Frame']) -> bool:
+    """El elemento en la cima de la pila encaja con el selector"""
+    return _match_at(selector, len(selector) - 1, stack, len(stack) - 1)
+
+
+def _match_at(selector: Selector, k: int, stack: List['_Frame'], i: int) -> bool:
+    combinator, compound = selector[k]
+    if i < 0 or not compound.matches(stack[i]):
+        return False
+    if k == 0:
+        return True
+
+    if combinator == '>':
+        return _match_at(selector, k - 1, stack, i - 1)
+    return any(_match_at(selector, k - 1, stack, j) for j in range(i - 1, -1, -1))
+
+
+# ============================================
+# REGLAS
+# ============================================
+
+@dataclass
+class RewriteRule:
+    """Un elemento a personalizar con el contenido de su variante"""
+    experiment_id: str
+    element_id: str
+    selector: Selector
+    content: Dict[str, Any]
+    applied: bool = False
+
+
+def build_rewrite_rules(experiments: List[Dict[str, Any]]) -> List[RewriteRule]:
+    """
+    Reglas a partir de los experimentos de la página con su 'assignment'
+
+    El contenido de la variante asignada se aplica por elemento:
+    content['elements'][element_id] si existe; si no, un contenido
+    plano solo se aplica cuando el experimento tiene un único elemento.
+    Lo que no se pueda resolver se deja al tracker.
+    """
+    rules = []
+
+    for exp in experiments:
+        assignment = exp.get('assignment')
+        content = (assignment or {}).get('content')
+        if not isinstance(content, dict):
+            continue
+
+        elements = exp.get('elements') or []
+        per_element = content.get('elements') if isinstance(content.get('elements'), dict) else None
+
+        for element in elements:
+            element_id = str(element.get('id'))
+
+            if per_element is not None:
+                element_content = per_element.get(element_id)
+            elif len(elements) == 1:
+                element_content = content
+            else:
+                element_content = None
+
+            if not element_content:
+                continue
+
+            try:
+                selector = parse_selector(
+                    element.get('selector_type'),
+                    element.get('selector_value')
+                )
+            except UnsupportedSelector as e:
+                logger.debug(f"Element {element_id} left to tracker: {e}")
+                continue
+
+            rules.append(RewriteRule(
+                experiment_id=str(exp.get('id')),
+                element_id=element_id,
+                selector=selector,
+                content=element_content
+            ))
+
+    return rules
+
+
+# ============================================
+# TOKENIZER / REWRITER
+# ============================================
+
+_START_TAG = re.compile(rb'<([a-zA-Z][^\s/>]*)((?:"[^"]*"|\'[^\']*\'|[^\'">])*)>')
+_END_TAG = re.compile(rb'</([a-zA-Z][^\s/>]*)[^>]*>')
+_ATTR = re.compile(rb'([^\s"\'>/=]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+
+_VOID = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+_RAW_TEXT = {'script', 'style', 'textarea', 'title'}
+
+# <p> se cierra implícitamente al abrir un bloque
+_CLOSES_P = {
+    'address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'
+}
+_CLOSES_SELF = {'li', 'option', 'tr', 'td', 'th', 'dt', 'dd'}
+
+# Un tag/comentario sin terminar no debería ocupar más que esto
+_MAX_PENDING = 65536
+
+
+@dataclass
+class _Frame:
+    tag: str
+    attrs: Dict[str, str]
+    classes: Set[str]
+    nth: int
+    child_counts: Dict[str, int] = field(default_factory=dict)
+
+
+class VariantRewriter:
+    """
+    Rewriter incremental: feed(chunk) → bytes listos para enviar
+    """
+
+    def __init__(self, rules: List[RewriteRule], charset: str = 'utf-8'):
+        self.rules = [r for r in rules if not r.applied]
+        self.charset = charset
+
+        self._buffer = bytearray()
+        self._root = _Frame('#root', {}, set(), 0)
+        self._stack: List[_Frame] = []
+        self._raw_end: Optional['re.Pattern'] = None
+        self._skip_depth: Optional[int] = None
+        self._done = not self.rules
+
+    @property
+    def applied(self) -> List[RewriteRule]:
+        return [r for r in self.rules if r.applied]
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._done and not self._buffer:
+            return chunk
+
+        self._buffer += chunk
+        return self._process(final=False)
+
+    def finish(self) -> bytes:
+        return self._process(final=True)
+
+    async def rewrite(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Envolver un iterador de chunks (ya descomprimidos)"""
+        async for chunk in chunks:
+            data = self.feed(chunk)
+            if data:
+                yield data
+
+        tail = self.finish()
+        if tail:
+            yield tail
+
+    def _process(self, final: bool) -> bytes:
+        buffer = self._buffer
+        out: List[bytes] = []
+        pos = 0
+
+        while pos < len(buffer):
+            if self._done:
+                out.append(buffer[pos:])
+                pos = len(buffer)
+                break
+
+            if self._raw_end is not None:
+                pos = self._consume_raw_text(buffer, pos, out, final)
+                if self._raw_end is not None:
+                    break
+                continue
+
+            lt = buffer.find(b'<', pos)
+            if lt < 0:
+                self._emit(out, buffer[pos:])
+                pos = len(buffer)
+                break
+
+            self._emit(out, buffer[pos:lt])
+            pos = lt
+
+            end = self._consume_markup(buffer, pos, out, final)
+            if end is None:
+                break
+            pos = end
+
+        self._buffer = buffer[pos:]
+        if final and self._buffer:
+            self._emit(out, bytes(self._buffer))
+            self._buffer = bytearray()
+
+        return b''.join(out)
+
+    def _emit(self, out: List[bytes], data) -> None:
+        if data and self._skip_depth is None:
+            out.append(data)
+
+    def _consume_raw_text(self, buffer: bytearray, pos: int, out: List[bytes], final: bool) -> int:
+        """Contenido de script/style/...: texto hasta su tag de cierre"""
+        match = self._raw_end.search(buffer, pos)
+        if match:
+            self._emit(out, buffer[pos:match.start()])
+            self._raw_end = None
+            return match.start()
+
+        # Guardar la cola por si el </script> llega partido
+        safe = len(buffer) if final else max(pos, len(buffer) - 16)
+        self._emit(out, buffer[pos:safe])
+        return safe
+
+    def _consume_markup(self, buffer: bytearray, pos: int, out: List[bytes], final: bool) -> Optional[int]:
+        """
+        Consumir lo que empieza en '<'
+
+        Returns:
+            Posición tras el token, o None si hace falta más input
+        """
+        pending = len(buffer) - pos
+        if pending < 4 and not final:
+            return None
+
+        if buffer.startswith(b'<!--', pos):
+            end = buffer.find(b'-->', pos + 4)
+            if end < 0:
+                return None if not final and pending < _MAX_PENDING else self._as_text(buffer, pos, out)
+            self._emit(out, buffer[pos:end + 3])
+            return end + 3
+
+        if buffer.startswith((b'<!', b'<?'), pos):
+            end = buffer.find(b'>', pos)
+            if end < 0:
+                return None if not final and pending < _MAX_PENDING else self._as_text(buffer, pos, out)
+            self._emit(out, buffer[pos:end + 1])
+            return end + 1
+
+        if buffer.startswith(b'</', pos):
+            match = _END_TAG.match(buffer, pos)
+            if not match:
+                if b'>' not in buffer[pos:] and not final and pending < _MAX_PENDING:
+                    return None
+                return self._as_text(buffer, pos, out)
+            self._end_tag(match.group(1).decode('latin-1').lower(), buffer[pos:match.end()], out)
+            return match.end()
+
+        match = _START_TAG.match(buffer, pos)
+        if match:
+            self._start_tag(match, out)
+            return match.end()
+
+        next_char = buffer[pos + 1:pos + 2]
+        if next_char.isalpha() and not final and pending < _MAX_PENDING:
+            return None
+
+        return self._as_text(buffer, pos, out)
+
+    def _as_text(self, buffer: bytearray, pos: int, out: List[bytes]) -> int:
+        self._emit(out, buffer[pos:pos + 1])
+        return pos + 1
+
+    # ===== ELEMENTOS =====
+
+    def _parent(self) -> _Frame:
+        return self._stack[-1] if self._stack else self._root
+
+    def _start_tag(self, match, out: List[bytes]) -> None:
+        tag = match.group(1).decode('latin-1').lower()
+        raw_attrs = match.group(2)
+
+        self._close_implied(tag)
+
+        attrs = self._parse_attrs(raw_attrs)
+        parent = self._parent()
+        parent.child_counts[tag] = parent.child_counts.get(tag, 0) + 1
+
+        frame = _Frame(
+            tag=tag,
+            attrs=attrs,
+            classes=set(attrs.get('class', '').split()),
+            nth=parent.child_counts[tag]
+        )
+
+        self_closing = raw_attrs.rstrip().endswith(b'/')
+        is_void = tag in _VOID or self_closing
+
+        self._stack.append(frame)
+        token = match.group(0)
+        inner = None
+
+        if self._skip_depth is None:
+            for rule in self.rules:
+                if rule.applied or not _matches(rule.selector, self._stack):
+                    continue
+
+                token, rule_inner = self._apply(rule, tag, token, attrs)
+                if rule_inner is not None and not is_void:
+                    inner = rule_inner
+                rule.applied = True
+                logger.debug(f"Variant applied server-side: element {rule.element_id}")
+
+        self._emit(out, token)
+
+        if is_void:
+            self._stack.pop()
+        elif tag in _RAW_TEXT:
+            self._raw_end = re.compile(rb'</' + tag.encode('ascii') + rb'[\s/>]', re.IGNORECASE)
+
+        if inner is not None:
+            out.append(inner)
+            # Saltar el contenido original hasta el cierre del elemento
+            self._skip_depth = len(self._stack)
+
+        self._check_done()
+
+    def _end_tag(self, tag: str, token: bytes, out: List[bytes]) -> None:
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i].tag == tag:
+                closes_skipped = self._skip_depth is not None and i < self._skip_depth
+                del self._stack[i:]
+
+                if closes_skipped:
+                    self._skip_depth = None
+                break
+
+        self._emit(out, token)
+        self._check_done()
+
+    def _close_implied(self, tag: str) -> None:
+        """Cierres implícitos más comunes (<p>, <li>, <td>...)"""
+        if not self._stack:
+            return
+
+        top = self._stack[-1].tag
+        if (top == 'p' and tag in _CLOSES_P) or (tag in _CLOSES_SELF and top == tag):
+            if self._skip_depth is not None and len(self._stack) <= self._skip_depth:
+                self._skip_depth = None
+            self._stack.pop()
+
+    def _check_done(self) -> None:
+        if self._skip_depth is None and all(r.applied for r in self.rules):
+            self._done = True
+
+    def _parse_attrs(self, raw: bytes) -> Dict[str, str]:
+        attrs = {}
+        for match in _ATTR.finditer(raw):
+            name = match.group(1).decode('latin-1').lower()
+            value = match.group(2)
+            if value is None:
+                attrs.setdefault(name, '')
+                continue
+            if value[:1] in (b'"', b"'"):
+                value = value[1:-1]
+            attrs.setdefault(name, html.unescape(value.decode(self.charset, errors='replace')))
+        return attrs
+
+    # ===== APLICAR VARIANTE =====
+
+    def _apply(
+        self,
+        rule: RewriteRule,
+        tag: str,
+        token: bytes,
+        attrs: Dict[str, str]
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Returns:
+            (start tag, contenido interior nuevo | None)
+        """
+        content = rule.content
+        changes: Dict[str, str] = {}
+
+        for name, value in (content.get('attributes') or {}).items():
+            changes[str(name).lower()] = str(value)
+
+        if content.get('image_url') and tag in ('img', 'source'):
+            changes['src'] = str(content['image_url'])
+
+        if content.get('styles'):
+            declarations = '; '.join(
+                f"{_kebab(prop)}: {value}"
+                for prop, value in content['styles'].items()
+            )
+            existing = (changes.get('style') or attrs.get('style') or '').strip().rstrip(';')
+            changes['style'] = f"{existing}; {declarations}" if existing else declarations
+
+        if changes:
+            attrs.update(changes)
+            token = self._build_start_tag(tag, attrs, token.rstrip().endswith(b'/>'))
+
+        inner = None
+        if content.get('html') is not None:
+            inner = str(content['html']).encode(self.charset, errors='xmlcharrefreplace')
+        elif content.get('text') is not None:
+            inner = html.escape(str(content['text']), quote=False).encode(
+                self.charset,
+                errors='xmlcharrefreplace'
+            )
+
+        return token, inner
+
+    def _build_start_tag(self, tag: str, attrs: Dict[str, str], self_closing: bool) -> bytes:
+        parts = [tag]
+        for name, value in attrs.items():
+            parts.append(f'{name}="{html.escape(value, quote=True)}"')
+        end = ' />' if self_closing else '>'
+        return ('<' + ' '.join(parts) + end).encode(self.charset, errors='xmlcharrefreplace')
+
+
+def _kebab(prop: str) -> str:
+    """backgroundColor → background-color (el editor guarda camelCase)"""
+    return re.sub(r'([A-Z])', lambda m: '-' + m.group(1).lower(), str(prop))
+
+
+def rewrite_body(body: bytes, rules: List[RewriteRule], charset: str = 'utf-8') -> bytes:
+    """Aplicar variantes a un documento completo"""
+    rewriter = VariantRewriter(rules, charset)
+    return rewriter.feed(body) + rewriter.finish()
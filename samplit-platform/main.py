@@ -17,12 +17,31 @@ from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import time
 from typing import Callable
 
 from config.settings import settings
 from data_access.database import DatabaseManager
+from orchestration.utils.admission_control import (
+    AdmissionController,
+    AdmissionRejected,
+    ROUTE_TRACKER,
+    ROUTE_ASSIGN
+)
+from orchestration.utils.fallback_cache import get_fallback_cache
+from orchestration.utils.circuit_breaker import get_circuit_breakers_stats
+from orchestration.utils.single_flight import get_single_flights_stats
+from orchestration.utils.compute_pool import get_compute_pool
+from orchestration.utils.analytics_cache import get_analytics_cache
+from orchestration.utils.live_metrics import get_live_metrics
+from orchestration.utils.stopping_rules import get_stopping_rules
+from orchestration.services.winner_detection_service import WinnerDetectionService
+from orchestration.services.experiment_snapshots import SnapshotExporter
+from integration.managers.health_sweeper import HealthSweeper
+from integration.http_client import get_http_clients
+from orchestration.utils.static_bundles import get_static_bundles
 from public_api.routers import (
     auth,
     experiments,
@@ -31,7 +50,10 @@ from public_api.routers import (
     emails,
     notifications,
     installations,
-    subscriptions
+    subscriptions,
+    tracker,
+    proxy,
+    static_assets
 )
 
 # ============================================
@@ -67,21 +89,75 @@ async def lifespan(app: FastAPI):
     
     logger.info("✅ Database initialized")
     
-    # Health check
+    # Health check (antes de arrancar las tareas de background)
     if await db.health_check():
         logger.info("✅ Database health check passed")
     else:
         logger.error("❌ Database health check failed")
+        await db.close()
         raise Exception("Database not healthy")
     
-    logger.info("✨ Samplit Platform ready!")
+    # Admission control para endpoints públicos
+    app.state.admission = AdmissionController.from_settings(settings)
+    
+    # Bundles JS minificados + gzip/brotli, en memoria
+    app.state.static_bundles = get_static_bundles().build()
+    logger.info("✅ Static bundles built")
+    
+    # Clientes HTTP compartidos (proxy, verificación, ads)
+    app.state.http_clients = get_http_clients()
+    
+    # Health sweep periódico de instalaciones
+    app.state.health_sweeper = HealthSweeper(
+        db,
+        concurrency=settings.HEALTH_SWEEP_CONCURRENCY,
+        per_host_interval=settings.HEALTH_SWEEP_PER_HOST_INTERVAL
+    )
+    health_sweep_task = None
+    if settings.HEALTH_SWEEP_ENABLED:
+        health_sweep_task = asyncio.create_task(
+            app.state.health_sweeper.run_forever(
+                settings.HEALTH_SWEEP_INTERVAL_SECONDS
+            )
+        )
+        logger.info("✅ Installation health sweep scheduled")
     
-    yield
+    # Winner detection periódico (todos los experimentos activos)
+    app.state.winner_detection = WinnerDetectionService.from_settings(db, settings)
+    winner_detection_task = None
+    if settings.WINNER_DETECTION_ENABLED:
+        winner_detection_task = asyncio.create_task(
+            app.state.winner_detection.run_forever(
+                settings.WINNER_DETECTION_INTERVAL_SECONDS
+            )
+        )
+        logger.info("✅ Winner detection scheduled")
+    
+    # Snapshots Parquet para análisis offline (fuera de la DB de producción)
+    app.state.snapshot_exporter = SnapshotExporter.from_settings(db, settings)
+    snapshot_task = None
+    if settings.SNAPSHOT_EXPORT_ENABLED:
+        snapshot_task = asyncio.create_task(
+            app.state.snapshot_exporter.run_forever(
+                settings.SNAPSHOT_INTERVAL_SECONDS
+            )
+        )
+        logger.info("✅ Experiment snapshot export scheduled")
     
-    # SHUTDOWN
-    logger.info("🛑 Shutting down Samplit Platform...")
-    await db.close()
-    logger.info("👋 Samplit Platform stopped")
+    logger.info("✨ Samplit Platform ready!")
+    
+    try:
+        yield
+    finally:
+        # SHUTDOWN
+        logger.info("🛑 Shutting down Samplit Platform...")
+        for task in (health_sweep_task, winner_detection_task, snapshot_task):
+            if task:
+                task.cancel()
+        await app.state.http_clients.close()
+        get_compute_pool().shutdown()
+        await db.close()
+        logger.info("👋 Samplit Platform stopped")
 
 # ============================================
 # CREATE APP
@@ -147,6 +223,90 @@ async def add_security_headers(request: Request, call_next: Callable):
     
     return response
 
+# Admission control / load shedding (endpoints públicos)
+@app.middleware("http")
+async def admission_control(request: Request, call_next: Callable):
+    """
+    Limitar concurrencia y rate de tracker/assign/convert
+    
+    Si una request no se admite, responder al instante con la última
+    respuesta buena conocida (o 503 + Retry-After) en vez de encolarla
+    detrás de la base de datos.
+    """
+    controller: AdmissionController = getattr(request.app.state, 'admission', None)
+    if controller is None:
+        return await call_next(request)
+    
+    classified = controller.classify(
+        request.url.path,
+        dict(request.query_params),
+        request.client.host if request.client else ''
+    )
+    if classified is None:
+        return await call_next(request)
+    
+    route, key = classified
+    
+    try:
+        async with controller.admit(route, key):
+            return await call_next(request)
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding request ({e}) for {key}")
+        return _shed_response(request, e)
+
+def _shed_response(request: Request, rejection: AdmissionRejected) -> JSONResponse:
+    """Respuesta rápida para una request descartada"""
+    path = request.url.path
+    query = request.query_params
+    fallback_cache = get_fallback_cache()
+    headers = {"X-Samplit-Shed": rejection.reason}
+    
+    if rejection.route == ROUTE_TRACKER and request.method == "GET":
+        # El tracker nunca debe romper el sitio: config previa o vacía
+        if path.endswith("/experiments"):
+            payload = fallback_cache.get_config(
+                (query.get("installation_token"), query.get("url"))
+            )
+        else:
+            payload = fallback_cache.get_config(
+                ("config", path.rsplit("/", 1)[-1])
+            )
+        
+        return JSONResponse(
+            content=payload or {"experiments": [], "count": 0},
+            headers=headers
+        )
+    
+    if rejection.route == ROUTE_ASSIGN:
+        # Asignación sticky conocida, si no la variante control
+        experiment_id = path.rstrip("/").split("/")[-2]
+        cached = fallback_cache.get_assignment_or_control(
+            experiment_id,
+            query.get("user_identifier", "")
+        )
+        
+        if cached:
+            return JSONResponse(
+                content={
+                    "variant_id": cached["variant_id"],
+                    "content": cached["content"],
+                    "assignment_id": "",
+                    "new_assignment": False
+                },
+                headers=headers
+            )
+    
+    # Eventos y conversiones: el cliente puede reintentar
+    headers["Retry-After"] = "1"
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "error": "Service Busy",
+            "message": "Too many requests, retry later"
+        },
+        headers=headers
+    )
+
 # ============================================
 # PUBLIC ENDPOINTS (No Auth)
 # ============================================
@@ -165,6 +325,14 @@ app.include_router(
     tags=["Proxy Middleware (Public)"]
 )
 
+# Static assets (tracker.js + bundles del dashboard)
+app.include_router(
+    static_assets.router,
+    prefix="/static",
+    tags=["Static (Public)"],
+    include_in_schema=False
+)
+
 # ============================================
 # EXCEPTION HANDLERS
 # ============================================
@@ -340,6 +508,24 @@ async def system_stats(request: Request):
         "system": "samplit",
         "version": settings.APP_VERSION,
         "database": stats,
+        "admission": request.app.state.admission.get_stats(),
+        "fallback_cache": get_fallback_cache().get_stats(),
+        "circuit_breakers": get_circuit_breakers_stats(),
+        "single_flight": get_single_flights_stats(),
+        "compute_pool": get_compute_pool().get_stats(),
+        "analytics_cache": get_analytics_cache().get_stats(),
+        "exports": analytics.export_limiter.get_stats(),
+        "live_metrics": get_live_metrics().get_stats(),
+        "stopping_rules": get_stopping_rules().get_stats(),
+        "health_sweep": request.app.state.health_sweeper.get_stats(),
+        "winner_detection": request.app.state.winner_detection.get_stats(),
+        "snapshot_export": request.app.state.snapshot_exporter.get_stats(),
+        "http_clients": request.app.state.http_clients.get_stats(),
+        "origin_cache": (
+            proxy.proxy_middleware.origin_cache.get_stats()
+            if proxy.proxy_middleware.origin_cache else None
+        ),
+        "static_bundles": request.app.state.static_bundles.get_stats(),
         "features": {
             "funnels": settings.ENABLE_FUNNEL_OPTIMIZATION,
             "emails": settings.ENABLE_EMAIL_OPTIMIZATION,
@@ -1,10 +1,10 @@
 # orchestration/services/ads_optimizer_service.py
 
 import logging
-import numpy as np
 from typing import Dict, Any, List
 from data_access.database import DatabaseManager
 from engine.state.encryption import get_encryptor
+from orchestration.services.analytics_jobs import BetaArm, ProbabilityBestJob
 
 logger = logging.getLogger(__name__)
 
@@ -136,30 +136,22 @@ class AdsOptimizerService:
     
     def calculate_probabilities(self, creatives: List[Dict]) -> Dict[str, float]:
         """Calcular Thompson Sampling probabilities"""
+        return self.probabilities_job(creatives).run()
+    
+    @staticmethod
+    def probabilities_job(creatives: List[Dict], samples: int = 10000) -> ProbabilityBestJob:
+        """Job de P(best) por creative (para el compute pool)"""
         
-        samples = 10000
-        creative_samples = {}
-        
-        # Sample from Beta distribution
+        arms = []
         for creative in creatives:
             state = creative['algorithm_state_decrypted']
-            alpha = state['success_count']
-            beta = state['failure_count']
-            
-            creative_samples[creative['id']] = np.random.beta(alpha, beta, samples)
-        
-        # Count how often each is best
-        probabilities = {}
-        for creative_id in creative_samples:
-            is_best = sum(
-                1 for i in range(samples)
-                if creative_samples[creative_id][i] == max(
-                    creative_samples[cid][i] for cid in creative_samples
-                )
-            )
-            probabilities[creative_id] = is_best / samples
+            arms.append(BetaArm(
+                arm_id=creative['id'],
+                alpha=state['success_count'],
+                beta=state['failure_count']
+            ))
         
-        return probabilities
+        return ProbabilityBestJob(arms=tuple(arms), samples=samples)
     
     async def pause_creative(self, creative_id: str, campaign: Dict):
         """Pausar creative underperformer"""
@@ -0,0 +1,335 @@
+# orchestration/services/analytics_jobs.py
+
+"""
+Analytics Jobs
+
+Cálculos estadísticos de los dashboards como jobs del compute pool.
+Funciones puras sobre parámetros Beta: sin base de datos ni estado,
+se ejecutan en un proceso worker.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from orchestration.utils.compute_pool import ComputeJob
+
+
+@dataclass(frozen=True)
+class BetaArm:
+    """Posterior Beta de una variante / creative"""
+    arm_id: str
+    alpha: float
+    beta: float
+
+
+def probability_best(arms: Sequence[BetaArm], samples: int = 10000) -> Dict[str, float]:
+    """
+    Probabilidad de que cada arm sea el mejor (Monte Carlo)
+
+    Una sola matriz (samples, arms) y argmax por fila.
+    """
+    if not arms:
+        return {}
+
+    alpha = np.array([arm.alpha for arm in arms], dtype=np.float64)
+    beta = np.array([arm.beta for arm in arms], dtype=np.float64)
+
+    draws = np.random.beta(alpha, beta, size=(samples, len(arms)))
+    wins = np.bincount(np.argmax(draws, axis=1), minlength=len(arms))
+
+    return {arm.arm_id: float(wins[i] / samples) for i, arm in enumerate(arms)}
+
+
+def credible_intervals(
+    arms: Sequence[BetaArm],
+    level: float = 0.95
+) -> Dict[str, Dict[str, float]]:
+    """Intervalos creíbles y valor esperado de cada arm"""
+    from scipy import stats
+
+    if not arms:
+        return {}
+
+    alpha = np.array([arm.alpha for arm in arms], dtype=np.float64)
+    beta = np.array([arm.beta for arm in arms], dtype=np.float64)
+
+    tail = (1 - level) / 2
+    lower = stats.beta.ppf(tail, alpha, beta)
+    upper = stats.beta.ppf(1 - tail, alpha, beta)
+
+    return {
+        arm.arm_id: {
+            'lower': float(lower[i]),
+            'upper': float(upper[i]),
+            'expected': float(alpha[i] / (alpha[i] + beta[i]))
+        }
+        for i, arm in enumerate(arms)
+    }
+
+
+# Por debajo (de éxitos o fracasos) la Beta es asimétrica: muestreo exacto
+NORMAL_APPROX_MIN = 30
+
+# Nodos de Gauss-Hermite para integrar sobre posteriors normales
+QUADRATURE_NODES = 48
+
+# Con varianzas muy distintas el integrando es casi un escalón y la
+# cuadratura pierde precisión: esos experimentos van por Monte Carlo
+QUADRATURE_MAX_SD_RATIO = 3.0
+
+
+@dataclass(frozen=True)
+class ExperimentArms:
+    """Arms de un experimento para evaluación en batch"""
+    experiment_id: str
+    arms: Tuple[BetaArm, ...]
+
+
+def evaluate_experiments(
+    experiments: Sequence[ExperimentArms],
+    samples: int = 2000,
+    max_elements: int = 16_000_000,
+    seed: Optional[int] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    P(best) y expected loss de muchos experimentos a la vez
+
+    Los experimentos se agrupan por número de arms K y se evalúan como
+    tensores (K, n, ...) en bloques de como mucho max_elements, sin
+    bucles Python por sample ni por experimento:
+
+    - Todos los arms con datos de sobra y varianzas parecidas: posterior
+      ≈ normal, P(best) y E[max] por cuadratura de Gauss-Hermite
+      (determinista, sin draws)
+    - El resto: Monte Carlo con `samples` draws por arm
+
+    Expected loss de un arm = E[max_j θ_j − θ_arm]: lo que se pierde
+    (en conversion rate) si se elige ese arm y no era el mejor.
+    """
+    rng = np.random.default_rng(seed)
+
+    groups: Dict[int, List[ExperimentArms]] = {}
+    for experiment in experiments:
+        if len(experiment.arms) >= 2:
+            groups.setdefault(len(experiment.arms), []).append(experiment)
+
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for k, group in groups.items():
+        # (K, n): un arm por fila, así cada slice por arm es contiguo
+        alpha = np.array([[arm.alpha for arm in e.arms] for e in group], dtype=np.float64).T
+        beta = np.array([[arm.beta for arm in e.arms] for e in group], dtype=np.float64).T
+
+        _, sd = _beta_moments(alpha, beta)
+        normal = (
+            (np.minimum(alpha, beta) >= NORMAL_APPROX_MIN).all(axis=0)
+            & (sd.max(axis=0) <= QUADRATURE_MAX_SD_RATIO * sd.min(axis=0))
+        )
+
+        for use_quadrature in (True, False):
+            columns = np.flatnonzero(normal == use_quadrature)
+            width = k * QUADRATURE_NODES if use_quadrature else samples
+            block = max(1, max_elements // (width * k))
+
+            for start in range(0, len(columns), block):
+                index = columns[start:start + block]
+                a = alpha[:, index]
+                b = beta[:, index]
+
+                if use_quadrature:
+                    prob_best, expected_loss = _normal_quadrature(a, b)
+                else:
+                    prob_best, expected_loss = _monte_carlo(rng, a, b, samples)
+
+                for i, column in enumerate(index):
+                    experiment = group[column]
+                    results[experiment.experiment_id] = _experiment_summary(
+                        experiment, prob_best[:, i], expected_loss[:, i]
+                    )
+
+    return results
+
+
+def _normal_quadrature(alpha: np.ndarray, beta: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    P(best) y expected loss con posteriors normales, bloque (K, n)
+
+    Con θ_i = μ_i + σ_i·z:
+        P(best_i) = E_z[ Π_{j≠i} Φ((θ_i − μ_j) / σ_j) ]
+        E[max]    = Σ_i E_z[ θ_i · Π_{j≠i} Φ((θ_i − μ_j) / σ_j) ]
+    """
+    from scipy.special import ndtr
+
+    mean, sd = _beta_moments(alpha, beta)
+    nodes, weights = _gauss_hermite()
+
+    prob_best = np.empty(alpha.shape)
+    expected_max = np.zeros(alpha.shape[1])
+
+    for i in range(alpha.shape[0]):
+        theta = mean[i, :, None] + sd[i, :, None] * nodes            # (n, Q)
+        cdf = ndtr((theta[None] - mean[..., None]) / sd[..., None])  # (K, n, Q)
+        cdf[i] = 1.0
+        others = cdf.prod(axis=0)                                    # (n, Q)
+
+        prob_best[i] = others @ weights
+        expected_max += (theta * others) @ weights
+
+    return prob_best / prob_best.sum(axis=0), np.maximum(expected_max - mean, 0.0)
+
+
+def _monte_carlo(
+    rng: np.random.Generator,
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    samples: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """P(best) y expected loss por Monte Carlo, bloque (K, n)"""
+    draws = posterior_draws(rng, alpha, beta, samples)    # (K, n, S)
+
+    best = draws[0].copy()
+    for j in range(1, draws.shape[0]):
+        np.maximum(best, draws[j], out=best)             # (n, S)
+
+    prob_best = np.empty(alpha.shape)
+    expected_loss = np.empty(alpha.shape)
+    for j in range(draws.shape[0]):
+        prob_best[j] = (draws[j] == best).mean(axis=1)
+        expected_loss[j] = (best - draws[j]).mean(axis=1)
+
+    return prob_best, expected_loss
+
+
+def _beta_moments(alpha: np.ndarray, beta: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    total = alpha + beta
+    return alpha / total, np.sqrt(alpha * beta / (total * total * (total + 1)))
+
+
+def _gauss_hermite() -> Tuple[np.ndarray, np.ndarray]:
+    """Nodos y pesos para E_z[f(z)], z ~ N(0, 1)"""
+    nodes, weights = np.polynomial.hermite_e.hermegauss(QUADRATURE_NODES)
+    return nodes, weights / weights.sum()
+
+
+def posterior_draws(
+    rng: np.random.Generator,
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    samples: int
+) -> np.ndarray:
+    """
+    Draws de Beta(alpha, beta) para un bloque (K, n) → (K, n, samples)
+
+    Con alpha y beta grandes la Beta es prácticamente normal: se usa
+    la normal con la misma media y varianza (float32, mucho más rápida
+    que muestrear Beta). Los arms con pocos datos se muestrean exactos.
+    """
+    mean, sd = _beta_moments(alpha, beta)
+    mean = mean.astype(np.float32)[..., None]
+    sd = sd.astype(np.float32)[..., None]
+
+    draws = rng.standard_normal(size=alpha.shape + (samples,), dtype=np.float32)
+    draws *= sd
+    draws += mean
+
+    rows, cols = np.nonzero((alpha < NORMAL_APPROX_MIN) | (beta < NORMAL_APPROX_MIN))
+    if len(rows):
+        draws[rows, cols] = rng.beta(
+            alpha[rows, cols, None], beta[rows, cols, None], size=(len(rows), samples)
+        )
+
+    return draws
+
+
+def _experiment_summary(
+    experiment: ExperimentArms,
+    prob_best: np.ndarray,
+    expected_loss: np.ndarray
+) -> Dict[str, Any]:
+    best = int(np.argmax(prob_best))
+    ids = [arm.arm_id for arm in experiment.arms]
+
+    return {
+        'prob_best': {arm_id: float(prob_best[i]) for i, arm_id in enumerate(ids)},
+        'expected_loss': {arm_id: float(expected_loss[i]) for i, arm_id in enumerate(ids)},
+        'best_variant': ids[best],
+        'best_confidence': float(prob_best[best]),
+        'best_expected_loss': float(expected_loss[best])
+    }
+
+
+# ============================================
+# JOBS
+# ============================================
+
+@dataclass(frozen=True)
+class ProbabilityBestJob(ComputeJob[Dict[str, float]]):
+    """P(best) por arm"""
+    arms: Tuple[BetaArm, ...]
+    samples: int = 10000
+
+    name = 'probability_best'
+
+    def run(self) -> Dict[str, float]:
+        return probability_best(self.arms, self.samples)
+
+
+@dataclass(frozen=True)
+class BayesianAnalysisJob(ComputeJob[Dict[str, Any]]):
+    """P(best), intervalos creíbles y ganador de un experimento"""
+    arms: Tuple[BetaArm, ...]
+    samples: int = 10000
+    threshold: float = 0.95
+    credible_level: float = 0.95
+
+    name = 'bayesian_analysis'
+
+    def run(self) -> Dict[str, Any]:
+        if len(self.arms) < 2:
+            return {
+                'prob_best': {},
+                'credible_intervals': {},
+                'best_variant': None,
+                'best_confidence': 0,
+                'threshold_met': False
+            }
+
+        prob_best = probability_best(self.arms, self.samples)
+
+        best_variant_id = max(prob_best, key=prob_best.get)
+        best_confidence = prob_best[best_variant_id]
+        threshold_met = best_confidence >= self.threshold
+
+        return {
+            'prob_best': prob_best,
+            'credible_intervals': credible_intervals(self.arms, self.credible_level),
+            'best_variant': best_variant_id if threshold_met else None,
+            'best_confidence': best_confidence,
+            'threshold_met': threshold_met
+        }
+
+
+def variant_arms(variants: List[Dict[str, Any]]) -> Tuple[BetaArm, ...]:
+    """Arms (prior Beta(1, 1)) desde filas de variantes con totales"""
+    return tuple(
+        BetaArm(
+            arm_id=str(v['id']),
+            alpha=v['total_conversions'] + 1,
+            beta=v['total_allocations'] - v['total_conversions'] + 1
+        )
+        for v in variants
+    )
+
+
+@dataclass(frozen=True)
+class WinnerDetectionJob(ComputeJob[Dict[str, Dict[str, Any]]]):
+    """Evaluación en batch de todos los experimentos activos"""
+    experiments: Tuple[ExperimentArms, ...]
+    samples: int = 2000
+
+    name = 'winner_detection'
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        return evaluate_experiments(self.experiments, self.samples)
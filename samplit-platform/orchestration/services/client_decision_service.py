@@ -0,0 +1,252 @@
+# orchestration/services/client_decision_service.py
+
+"""
+Client Decision Service
+
+Modo de decisión en el cliente para instalaciones de mucho tráfico:
+- Publicamos pesos de asignación por experimento (derivados del posterior)
+- El tracker asigna localmente con un hash estable (sin llamar a /assign)
+- Las asignaciones reportadas se reconcilian en bulk en allocations
+  y en el estado del optimizador
+"""
+
+import json
+import time
+import uuid
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import settings
+from data_access.repositories.variant_repository import VariantRepository
+from data_access.repositories.allocation_repository import AllocationRepository
+from engine.core.math._distributions import calculate_allocation_weights
+from orchestration.utils.live_metrics import get_live_metrics
+
+logger = logging.getLogger(__name__)
+
+DECISION_MODE_SERVER = 'server'
+DECISION_MODE_CLIENT = 'client'
+
+# Hash compartido con el tracker (misma implementación en JS)
+BUCKETING_SPEC = {
+    'algorithm': 'fnv1a32',
+    'key': '{experiment_id}:{user_identifier}'
+}
+
+_FNV_OFFSET = 0x811C9DC5
+_FNV_PRIME = 0x01000193
+
+# Pesos publicados: {experiment_id: (computed_at, [variant, ...])}, LRU
+# acotado a CLIENT_DECISION_MAX_EXPERIMENTS
+_weights_cache: 'OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]' = OrderedDict()
+
+
+def stable_bucket(experiment_id: str, user_identifier: str) -> float:
+    """
+    Bucket estable en [0, 1) para un visitante y experimento
+
+    FNV-1a de 32 bits sobre UTF-8, igual que el tracker, para que
+    servidor y cliente lleguen a la misma variante con los mismos pesos.
+    """
+    h = _FNV_OFFSET
+    for byte in f"{experiment_id}:{user_identifier}".encode('utf-8'):
+        h ^= byte
+        h = (h * _FNV_PRIME) & 0xFFFFFFFF
+    return h / 2 ** 32
+
+
+def pick_weighted_variant(variants: List[Dict[str, Any]], bucket: float) -> str:
+    """Elegir variante según pesos publicados y un bucket en [0, 1)"""
+    total = sum(v['weight'] for v in variants)
+    threshold = bucket * total
+    cumulative = 0.0
+
+    for variant in variants:
+        cumulative += variant['weight']
+        if threshold < cumulative:
+            return variant['id']
+
+    return variants[-1]['id']
+
+
+def get_decision_mode(installation: Dict[str, Any]) -> str:
+    """Modo de decisión configurado en la metadata de la instalación"""
+    metadata = installation.get('metadata') or {}
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    if isinstance(metadata, dict) and metadata.get('decision_mode') == DECISION_MODE_CLIENT:
+        return DECISION_MODE_CLIENT
+    return DECISION_MODE_SERVER
+
+
+def _canonical_uuid(value: Any) -> Optional[str]:
+    """UUID en forma canónica (str), o None si el tracker mandó otra cosa"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+class ClientDecisionService:
+    """
+    Pesos publicados + reconciliación de asignaciones hechas en el cliente
+    """
+
+    def __init__(self, db_manager):
+        # Solo lo usan endpoints públicos del tracker
+        self.variant_repo = VariantRepository(db_manager.public_pool)
+        self.allocation_repo = AllocationRepository(db_manager.public_pool)
+
+    async def get_allocation_weights(
+        self,
+        experiment_ids: List[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Pesos de asignación por experimento
+
+        Se recalculan como mucho cada CLIENT_DECISION_REFRESH_SECONDS;
+        los experimentos vencidos se cargan juntos en una sola query.
+
+        Returns:
+            {experiment_id: [{'id', 'content', 'weight'}, ...]}
+        """
+        now = time.monotonic()
+        refresh = settings.CLIENT_DECISION_REFRESH_SECONDS
+
+        stale = [
+            exp_id for exp_id in experiment_ids
+            if exp_id not in _weights_cache
+            or now - _weights_cache[exp_id][0] >= refresh
+        ]
+
+        if stale:
+            counts = await self.variant_repo.get_variant_counts_for_experiments(stale)
+
+            for exp_id in stale:
+                variants = counts.get(exp_id, [])
+                if not variants:
+                    _weights_cache.pop(exp_id, None)
+                    continue
+
+                weights = calculate_allocation_weights(
+                    successes=[v['conversions'] for v in variants],
+                    failures=[
+                        max(v['allocations'] - v['conversions'], 0)
+                        for v in variants
+                    ],
+                    min_weight=settings.CLIENT_DECISION_MIN_WEIGHT
+                )
+
+                _weights_cache[exp_id] = (now, [
+                    {
+                        'id': v['id'],
+                        'content': v['content'],
+                        'weight': round(weight, 4)
+                    }
+                    for v, weight in zip(variants, weights)
+                ])
+
+        published = {}
+        for exp_id in experiment_ids:
+            if exp_id in _weights_cache:
+                _weights_cache.move_to_end(exp_id)
+                published[exp_id] = _weights_cache[exp_id][1]
+
+        while len(_weights_cache) > settings.CLIENT_DECISION_MAX_EXPERIMENTS:
+            _weights_cache.popitem(last=False)
+
+        return published
+
+    async def reconcile_assignments(
+        self,
+        user_id: str,
+        assignments: List[Dict[str, Any]]
+    ) -> Dict[str, int]:
+        """
+        Guardar en bulk asignaciones decididas por el tracker
+
+        Solo se aceptan variantes activas de experimentos activos del
+        usuario. Las asignaciones ya existentes (sticky) se ignoran, y
+        el estado del optimizador se actualiza solo con las insertadas.
+
+        Args:
+            user_id: Dueño de la instalación
+            assignments: [{'experiment_id', 'variant_id', 'user_identifier',
+                           'session_id'?}, ...]
+
+        Returns:
+            {'received', 'stored', 'rejected'}
+        """
+        if not assignments:
+            return {'received': 0, 'stored': 0, 'rejected': 0}
+
+        # Ids que no son UUID se rechazan aquí: uno solo haría fallar el
+        # cast $1::uuid[] y con él todo el batch
+        valid = []
+        rejected = 0
+
+        for assignment in assignments:
+            variant_id = _canonical_uuid(assignment['variant_id'])
+            experiment_id = assignment.get('experiment_id')
+
+            if variant_id is None or (
+                experiment_id and _canonical_uuid(experiment_id) is None
+            ):
+                rejected += 1
+                continue
+
+            valid.append({
+                **assignment,
+                'variant_id': variant_id,
+                'experiment_id': _canonical_uuid(experiment_id) if experiment_id else None
+            })
+
+        variant_experiments = await self.variant_repo.get_variant_experiments_for_user(
+            list({a['variant_id'] for a in valid}),
+            user_id
+        ) if valid else {}
+
+        rows = []
+        seen = set()
+
+        for assignment in valid:
+            experiment_id = variant_experiments.get(assignment['variant_id'])
+
+            if not experiment_id or (
+                assignment['experiment_id']
+                and assignment['experiment_id'] != experiment_id
+            ):
+                rejected += 1
+                continue
+
+            key = (experiment_id, assignment['user_identifier'])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            rows.append({
+                'experiment_id': experiment_id,
+                'variant_id': assignment['variant_id'],
+                'user_identifier': assignment['user_identifier'],
+                'session_id': assignment.get('session_id'),
+                'context': {'decision_mode': DECISION_MODE_CLIENT}
+            })
+
+        inserted = await self.allocation_repo.create_allocations_batch(rows)
+
+        await self.variant_repo.apply_allocation_counts(
+            dict(Counter(row['variant_id'] for row in inserted))
+        )
+
+        for experiment_id in {row['experiment_id'] for row in inserted}:
+            get_live_metrics().notify(experiment_id)
+
+        if rejected:
+            logger.warning(f"Rejected {rejected} client-side assignments")
+
+        return {
+            'received': len(assignments),
+            'stored': len(inserted),
+            'rejected': rejected
+        }
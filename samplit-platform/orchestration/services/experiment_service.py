@@ -6,6 +6,8 @@ from data_access.repositories.variant_repository import VariantRepository
 from data_access.repositories.allocation_repository import AllocationRepository
 from orchestration.factories.optimizer_factory import OptimizerFactory
 from orchestration.interfaces.optimization_interface import OptimizationStrategy
+from orchestration.utils.fallback_cache import get_fallback_cache
+from orchestration.utils.live_metrics import get_live_metrics
 import logging
 
 class ExperimentService:
@@ -18,10 +20,14 @@ class ExperimentService:
     - Public API
     """
     
-    def __init__(self, db_manager):
-        self.experiment_repo = ExperimentRepository(db_manager.pool)
-        self.variant_repo = VariantRepository(db_manager.pool)
-        self.allocation_repo = AllocationRepository(db_manager.pool)
+    def __init__(self, db_manager, public: bool = False):
+        # Tráfico público (assign/convert/tracker) usa su propio sub-pool
+        pool = db_manager.public_pool if public else db_manager.pool
+        
+        self.experiment_repo = ExperimentRepository(pool)
+        self.variant_repo = VariantRepository(pool)
+        self.allocation_repo = AllocationRepository(pool)
+        self.fallback_cache = get_fallback_cache()
         self.logger = logging.getLogger(__name__)
     
     async def create_experiment(self,
@@ -63,6 +69,9 @@ class ExperimentService:
             
             variant_ids.append(variant_id)
         
+        # El resumen del dashboard se rehace con el experimento completo
+        await self.experiment_repo.invalidate_summaries([experiment_id])
+        
         return {
             'experiment_id': experiment_id,
             'variant_ids': variant_ids,
@@ -94,8 +103,8 @@ class ExperimentService:
         # Default: Thompson Sampling
         return OptimizationStrategy.ADAPTIVE
     
-    def _initialize_algorithm_state(self, 
-                                    strategy: OptimizationStrategy) -> Dict[str, Any]:
+    @staticmethod
+    def _initialize_algorithm_state(strategy: OptimizationStrategy) -> Dict[str, Any]:
         """
         Initialize algorithm state based on strategy
         
@@ -162,21 +171,13 @@ class ExperimentService:
             experiment_id
         )
         
+        self._remember_control(experiment_id, variants)
+        
         # Get optimizer
         optimizer = OptimizerFactory.create(strategy)
         
         # Prepare options for optimizer
-        options = []
-        for variant in variants:
-            state = variant['algorithm_state']
-            
-            options.append({
-                'id': variant['id'],
-                'performance': variant['observed_conversion_rate'],
-                'samples': state.get('samples', 0),
-                # Internal state for optimizer (sin exponer nombres)
-                '_internal_state': state
-            })
+        options = self._build_optimizer_options(variants)
         
         # SELECT VARIANT (aquí está el Thompson Sampling)
         selected_id = await optimizer.select(options, context or {})
@@ -199,6 +200,7 @@ class ExperimentService:
             user_identifier=user_identifier,
             context=context
         )
+        get_live_metrics().notify(experiment_id)
         
         # Get public variant data
         variant_data = await self.variant_repo.get_variant_public_data(selected_id)
@@ -209,6 +211,161 @@ class ExperimentService:
             'new_allocation': True
         }
     
+    async def allocate_user_to_experiments(self,
+                                           experiment_ids: List[str],
+                                           user_identifier: str,
+                                           context: Optional[Dict] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Allocate user to every given experiment in one batch
+        
+        Batched version of allocate_user_to_variant, used when a page
+        runs several experiments at once (tracker config):
+        1. One read: variants + existing allocation for all experiments
+        2. Optimizer selection in memory for the new ones
+        3. One insert for all new allocations
+        4. One update for the selected variants' state (encrypted)
+        
+        Returns:
+            {experiment_id: {'variant_id', 'variant', 'new_allocation'}}
+        """
+        
+        if not experiment_ids:
+            return {}
+        
+        batch = await self.variant_repo.get_variants_for_batch_optimization(
+            experiment_ids,
+            user_identifier
+        )
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        pending: Dict[str, Dict[str, Any]] = {}
+        
+        for experiment_id, data in batch.items():
+            variants = data['variants']
+            self._remember_control(experiment_id, variants)
+            
+            # Existing allocation (sticky)
+            allocated_id = data['allocated_variant_id']
+            existing = next(
+                (v for v in variants if v['id'] == allocated_id),
+                None
+            ) if allocated_id else None
+            
+            if existing:
+                results[experiment_id] = {
+                    'variant_id': existing['id'],
+                    'variant': self._public_variant_data(existing),
+                    'new_allocation': False
+                }
+                continue
+            
+            try:
+                strategy = OptimizationStrategy(data['optimization_strategy'])
+            except ValueError:
+                strategy = OptimizationStrategy.ADAPTIVE
+            
+            optimizer = OptimizerFactory.create(strategy)
+            selected_id = await optimizer.select(
+                self._build_optimizer_options(variants),
+                context or {}
+            )
+            
+            selected = next(v for v in variants if v['id'] == selected_id)
+            pending[experiment_id] = selected
+            results[experiment_id] = {
+                'variant_id': selected_id,
+                'variant': self._public_variant_data(selected),
+                'new_allocation': True
+            }
+        
+        if not pending:
+            return results
+        
+        # Store all new allocations (conflicts = concurrent request won)
+        inserted = await self.allocation_repo.create_allocations_batch([
+            {
+                'experiment_id': experiment_id,
+                'variant_id': variant['id'],
+                'user_identifier': user_identifier,
+                'session_id': (context or {}).get('session_id'),
+                'context': context
+            }
+            for experiment_id, variant in pending.items()
+        ])
+        
+        # Lost races: return the allocation the concurrent request stored
+        stored = {row['experiment_id'] for row in inserted}
+        lost = [experiment_id for experiment_id in pending if experiment_id not in stored]
+        
+        if lost:
+            allocated = await self.allocation_repo.get_allocated_variants(
+                lost,
+                user_identifier
+            )
+            for experiment_id, variant_id in allocated.items():
+                variant = next(
+                    (v for v in batch[experiment_id]['variants'] if v['id'] == variant_id),
+                    None
+                )
+                results[experiment_id] = {
+                    'variant_id': variant_id,
+                    'variant': (
+                        self._public_variant_data(variant) if variant
+                        else await self.variant_repo.get_variant_public_data(variant_id)
+                    ),
+                    'new_allocation': False
+                }
+        
+        # Update algorithm state only for allocations actually stored
+        new_states = {}
+        for row in inserted:
+            variant = pending[row['experiment_id']]
+            state = variant['algorithm_state'].copy()
+            state['samples'] = state.get('samples', 0) + 1
+            new_states[variant['id']] = state
+        
+        await self.variant_repo.update_algorithm_states_batch(new_states)
+        
+        for row in inserted:
+            get_live_metrics().notify(row['experiment_id'])
+        
+        return results
+    
+    def _build_optimizer_options(self,
+                                 variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Prepare optimizer options from variants with decrypted state"""
+        options = []
+        for variant in variants:
+            state = variant['algorithm_state']
+            
+            options.append({
+                'id': variant['id'],
+                'performance': variant['observed_conversion_rate'],
+                'samples': state.get('samples', 0),
+                # Internal state for optimizer (sin exponer nombres)
+                '_internal_state': state
+            })
+        
+        return options
+    
+    def _remember_control(self,
+                          experiment_id: str,
+                          variants: List[Dict[str, Any]]) -> None:
+        """Guardar la variante control (primera creada) para load shedding"""
+        if variants:
+            self.fallback_cache.remember_control(
+                experiment_id,
+                str(variants[0]['id']),
+                variants[0].get('content')
+            )
+    
+    def _public_variant_data(self, variant: Dict[str, Any]) -> Dict[str, Any]:
+        """Strip algorithm state from a variant (safe for API exposure)"""
+        return {
+            k: v for k, v in variant.items()
+            if k != 'algorithm_state'
+        }
+    
     async def record_conversion(self,
                                experiment_id: str,
                                user_identifier: str,
@@ -263,3 +420,4 @@ class ExperimentService:
         
         # Update public metrics (via DB function - no expone estado)
         await self.variant_repo.increment_conversion(variant_id)
+        get_live_metrics().notify(experiment_id)
@@ -0,0 +1,440 @@
+# orchestration/services/experiment_snapshots.py
+
+"""
+Experiment Snapshots
+
+Copia columnar de las allocations de cada experimento para análisis
+offline, fuera de la base de datos de producción:
+
+    <root>/allocations/experiment_id=<id>/date=<YYYY-MM-DD>/part-0.parquet
+    <root>/allocations/experiment_id=<id>/_manifest.json
+
+- Exporter periódico (o nocturno): la primera vez exporta todo; después
+  solo reescribe las particiones de los últimos lookback_days, que
+  todavía reciben conversiones tardías. Cada partición se escribe en un
+  fichero temporal y se publica con un rename atómico.
+- Consultas: un conjunto cerrado de agregados (OFFLINE_QUERIES) sobre
+  los Parquet con DuckDB embebido, en el compute pool. Los filtros de
+  fecha podan particiones; la base de datos no se toca.
+
+Las conversiones van en la propia fila (converted_at, conversion_value):
+no hay una tabla de eventos aparte.
+
+pyarrow (export) y duckdb (consultas) son opcionales.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from data_access.database import DatabaseManager
+from data_access.repositories.allocation_repository import AllocationRepository
+from orchestration.utils.compute_pool import ComputeJob
+from orchestration.utils.export_stream import (
+    ALLOCATION_EXPORT_COLUMNS,
+    ExportColumn,
+    ParquetEncoder
+)
+
+try:
+    import duckdb
+except ImportError:  # duckdb es opcional: sin él no hay consultas offline
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock (un export a la vez entre workers)
+SNAPSHOT_EXPORT_LOCK = 'samplit.snapshot_export'
+
+SNAPSHOT_COLUMNS = [*ALLOCATION_EXPORT_COLUMNS, ExportColumn('context')]
+
+MANIFEST_NAME = '_manifest.json'
+PARTITION_FILE = 'part-0.parquet'
+
+
+class SnapshotUnavailable(Exception):
+    """Sin snapshot del experimento o sin el motor de consultas"""
+
+
+# ============================================
+# STORE
+# ============================================
+
+class SnapshotStore:
+    """
+    Layout de los snapshots en disco local (o un bucket montado)
+
+    Las rutas siguen el particionado Hive (clave=valor), que DuckDB,
+    Spark o pandas leen tal cual.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def experiment_dir(self, experiment_id: str) -> str:
+        # Validado: el id acaba en una ruta del sistema de ficheros
+        return os.path.join(
+            self.root, 'allocations', f'experiment_id={uuid.UUID(str(experiment_id))}'
+        )
+
+    def partition_path(self, experiment_id: str, day: date) -> str:
+        return os.path.join(
+            self.experiment_dir(experiment_id), f'date={day.isoformat()}', PARTITION_FILE
+        )
+
+    def files_glob(self, experiment_id: str) -> str:
+        return os.path.join(self.experiment_dir(experiment_id), 'date=*', '*.parquet')
+
+    def read_manifest(self, experiment_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.experiment_dir(experiment_id), MANIFEST_NAME)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_manifest(self, experiment_id: str, manifest: Dict[str, Any]) -> None:
+        path = os.path.join(self.experiment_dir(experiment_id), MANIFEST_NAME)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def _append(path: str, data: bytes) -> None:
+    with open(path, 'ab') as f:
+        f.write(data)
+
+
+def _append_rows(path: str, encoder: ParquetEncoder, rows: List[Any]) -> None:
+    """Codificar y escribir en el executor: pyarrow no corre en el event loop"""
+    _append(path, encoder.encode(rows))
+
+
+def _append_footer(path: str, encoder: ParquetEncoder) -> None:
+    _append(path, encoder.finish())
+
+
+def _start_file(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb'):
+        pass
+
+
+# ============================================
+# EXPORTER
+# ============================================
+
+class SnapshotExporter:
+    """
+    Export incremental de allocations a Parquet particionado por fecha
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        store: SnapshotStore,
+        lookback_days: int = 7,
+        chunk_size: int = 5000
+    ):
+        self.db = db
+        self.store = store
+        self.lookback_days = lookback_days
+        self.chunk_size = chunk_size
+        self.allocation_repo = AllocationRepository(db.pool)
+
+        # Métricas del último export
+        self.last_run_at: Optional[float] = None
+        self.last_run_duration = 0.0
+        self.last_run_experiments = 0
+        self.last_run_partitions = 0
+        self.last_run_rows = 0
+        self.skipped_locked = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'SnapshotExporter':
+        return cls(
+            db,
+            SnapshotStore(settings.SNAPSHOT_ROOT),
+            lookback_days=settings.SNAPSHOT_LOOKBACK_DAYS,
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Loop de exports (se lanza como background task en el lifespan)"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Snapshot export failed: {str(e)}", exc_info=True)
+
+            await asyncio.sleep(interval_seconds)
+
+    async def run_once(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Exportar todos los experimentos pendientes
+
+        Returns:
+            Resumen por experimento, o None si otro worker tiene el lock
+        """
+        start = time.monotonic()
+
+        # El lock va en una conexión propia: el export de todos los
+        # experimentos no tiene ocupada una conexión del pool principal
+        async with self.db.advisory_lock(SNAPSHOT_EXPORT_LOCK) as locked:
+            if not locked:
+                self.skipped_locked += 1
+                return None
+
+            async with self.db.pool.acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT id, status, updated_at
+                    FROM experiments
+                    WHERE status IN ('active', 'paused', 'completed')
+                    """
+                )
+            cutoff = datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+
+            results = {}
+            for row in rows:
+                experiment_id = str(row['id'])
+                recent = row['status'] == 'active' or (
+                    row['updated_at'] is not None and row['updated_at'] >= cutoff
+                )
+                if recent or self.store.read_manifest(experiment_id) is None:
+                    results[experiment_id] = await self.export_experiment(experiment_id)
+
+        self.last_run_at = time.time()
+        self.last_run_duration = time.monotonic() - start
+        self.last_run_experiments = len(results)
+        self.last_run_partitions = sum(len(r['partitions']) for r in results.values())
+        self.last_run_rows = sum(r['rows'] for r in results.values())
+
+        logger.info(
+            f"Snapshot export: {self.last_run_experiments} experiments, "
+            f"{self.last_run_partitions} partitions, {self.last_run_rows} rows "
+            f"in {self.last_run_duration:.1f}s"
+        )
+
+        return results
+
+    async def export_experiment(self, experiment_id: str) -> Dict[str, Any]:
+        """
+        (Re)escribir las particiones abiertas de un experimento
+
+        Sin manifest: todas. Con manifest: desde hoy - lookback_days.
+        """
+        manifest = self.store.read_manifest(experiment_id)
+
+        since = None
+        if manifest is not None:
+            first_open = datetime.now(timezone.utc).date() - timedelta(days=self.lookback_days)
+            since = datetime.combine(first_open, dt_time.min, tzinfo=timezone.utc)
+
+        loop = asyncio.get_running_loop()
+        written: Dict[str, int] = {}
+
+        day: Optional[date] = None
+        encoder: Optional[ParquetEncoder] = None
+        tmp_path = ''
+
+        async def close_partition() -> None:
+            await loop.run_in_executor(None, _append_footer, tmp_path, encoder)
+            await loop.run_in_executor(
+                None, os.replace, tmp_path, self.store.partition_path(experiment_id, day)
+            )
+
+        async for chunk in self.allocation_repo.stream_experiment_allocations(
+            experiment_id,
+            chunk_size=self.chunk_size,
+            since=since,
+            with_context=True
+        ):
+            for row_day, rows in _split_by_day(chunk):
+                if row_day != day:
+                    if encoder is not None:
+                        await close_partition()
+                    day = row_day
+                    encoder = ParquetEncoder(SNAPSHOT_COLUMNS)
+                    tmp_path = f'{self.store.partition_path(experiment_id, day)}.tmp'
+                    await loop.run_in_executor(None, _start_file, tmp_path)
+                    written[day.isoformat()] = 0
+
+                await loop.run_in_executor(None, _append_rows, tmp_path, encoder, rows)
+                written[day.isoformat()] += len(rows)
+
+        if encoder is not None:
+            await close_partition()
+
+        partitions = dict((manifest or {}).get('partitions', {}))
+        partitions.update(written)
+
+        self.store.write_manifest(experiment_id, {
+            'experiment_id': experiment_id,
+            'exported_at': datetime.now(timezone.utc).isoformat(),
+            'columns': [column.name for column in SNAPSHOT_COLUMNS],
+            'partitions': partitions
+        })
+
+        return {'partitions': sorted(written), 'rows': sum(written.values())}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'last_run_at': self.last_run_at,
+            'last_run_duration': round(self.last_run_duration, 2),
+            'last_run_experiments': self.last_run_experiments,
+            'last_run_partitions': self.last_run_partitions,
+            'last_run_rows': self.last_run_rows,
+            'skipped_locked': self.skipped_locked
+        }
+
+
+def _split_by_day(rows: Sequence[Any]) -> List[Tuple[date, List[Any]]]:
+    """Filas ordenadas por allocated_at → tramos contiguos por día (UTC)"""
+    runs: List[Tuple[date, List[Any]]] = []
+    for row in rows:
+        day = row['allocated_at'].astimezone(timezone.utc).date()
+        if not runs or runs[-1][0] != day:
+            runs.append((day, []))
+        runs[-1][1].append(row)
+    return runs
+
+
+# ============================================
+# CONSULTAS (DuckDB)
+# ============================================
+
+_SOURCE = "read_parquet($files, hive_partitioning = true)"
+
+OFFLINE_QUERIES: Dict[str, str] = {
+    # Totales por variante en el rango
+    'variant_summary': f"""
+        SELECT
+            variant_id,
+            any_value(variant_name) AS variant_name,
+            count(*) AS allocations,
+            count(converted_at) AS conversions,
+            count(converted_at) / count(*) AS conversion_rate,
+            sum(conversion_value) AS revenue
+        FROM {_SOURCE}
+        WHERE {{filters}}
+        GROUP BY variant_id
+        ORDER BY variant_id
+    """,
+
+    # CR por cohorte diaria (día de allocation)
+    'daily_conversion': f"""
+        SELECT
+            date,
+            variant_id,
+            count(*) AS allocations,
+            count(converted_at) AS conversions,
+            count(converted_at) / count(*) AS conversion_rate
+        FROM {_SOURCE}
+        WHERE {{filters}}
+        GROUP BY date, variant_id
+        ORDER BY date, variant_id
+    """,
+
+    # Tiempo hasta la conversión
+    'conversion_lag': f"""
+        SELECT
+            variant_id,
+            count(*) AS conversions,
+            quantile_cont(epoch(converted_at - allocated_at) / 3600, 0.5) AS median_hours,
+            quantile_cont(epoch(converted_at - allocated_at) / 3600, 0.9) AS p90_hours
+        FROM {_SOURCE}
+        WHERE {{filters}} AND converted_at IS NOT NULL
+        GROUP BY variant_id
+        ORDER BY variant_id
+    """,
+
+    # Desglose por una clave del contexto de allocation (país, device...)
+    'segment_breakdown': f"""
+        SELECT
+            coalesce(json_extract_string(context, $segment), '(none)') AS segment,
+            variant_id,
+            count(*) AS allocations,
+            count(converted_at) AS conversions,
+            count(converted_at) / count(*) AS conversion_rate
+        FROM {_SOURCE}
+        WHERE {{filters}}
+        GROUP BY segment, variant_id
+        ORDER BY segment, variant_id
+    """
+}
+
+
+@dataclass(frozen=True)
+class OfflineQueryJob(ComputeJob[Dict[str, Any]]):
+    """Una consulta predefinida sobre los Parquet de un experimento"""
+    files: str
+    query: str
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    segment: Optional[str] = None
+    threads: int = 2
+
+    name = 'offline_query'
+
+    def run(self) -> Dict[str, Any]:
+        if duckdb is None:
+            raise SnapshotUnavailable("Offline queries require duckdb")
+
+        filters = ['true']
+        params: Dict[str, Any] = {'files': self.files}
+
+        # Sobre la columna de partición: DuckDB ni abre los ficheros fuera del rango
+        if self.start_date:
+            filters.append('date >= $start_date')
+            params['start_date'] = self.start_date
+        if self.end_date:
+            filters.append('date <= $end_date')
+            params['end_date'] = self.end_date
+        if self.query == 'segment_breakdown':
+            params['segment'] = f'$.{self.segment}'
+
+        sql = OFFLINE_QUERIES[self.query].format(filters=' AND '.join(filters))
+
+        conn = duckdb.connect(':memory:', config={'threads': self.threads})
+        try:
+            result = conn.execute(sql, params)
+            columns = [column[0] for column in result.description]
+            rows = [
+                {name: _jsonable(value) for name, value in zip(columns, row)}
+                for row in result.fetchall()
+            ]
+        finally:
+            conn.close()
+
+        return {'columns': columns, 'rows': rows}
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+# Singleton instance
+_snapshot_store: Optional[SnapshotStore] = None
+
+def get_snapshot_store() -> SnapshotStore:
+    """Get singleton snapshot store"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        from config.settings import settings
+        _snapshot_store = SnapshotStore(settings.SNAPSHOT_ROOT)
+    return _snapshot_store
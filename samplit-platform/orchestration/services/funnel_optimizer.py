@@ -6,6 +6,13 @@ from datetime import datetime
 from data_access.database import DatabaseManager
 from orchestration.factories.optimizer_factory import OptimizerFactory
 from orchestration.interfaces.optimization_interface import OptimizationStrategy
+from orchestration.utils.funnel_plans import FunnelPlanCache
+from orchestration.utils.funnel_session_store import (
+    FunnelSession,
+    FunnelSessionConflict,
+    FunnelSessionStore,
+    create_funnel_session_store
+)
 import logging
 
 @dataclass
@@ -18,17 +25,6 @@ class FunnelStep:
     is_required: bool = True
     timeout_seconds: Optional[int] = None
 
-@dataclass
-class FunnelSession:
-    """Active funnel session for a user"""
-    session_id: str
-    user_id: str
-    funnel_id: str
-    current_step: int
-    selections: List[str]  # Variant IDs selected at each step
-    started_at: datetime
-    context: Dict[str, Any]
-
 class FunnelOptimizationService:
     """
     Multi-step funnel optimization
@@ -47,7 +43,10 @@ class FunnelOptimizationService:
     even the individually best performers "A -> Y -> Q"
     """
     
-    def __init__(self, db: DatabaseManager):
+    def __init__(self,
+                 db: DatabaseManager,
+                 sessions: Optional[FunnelSessionStore] = None,
+                 plans: Optional[FunnelPlanCache] = None):
         self.db = db
         
         # Sequential allocator for multi-step optimization
@@ -60,8 +59,13 @@ class FunnelOptimizationService:
             }
         )
         
-        # Active sessions
-        self.active_sessions: Dict[str, FunnelSession] = {}
+        from config.settings import settings
+        
+        # Active sessions (en memoria o compartidas entre workers)
+        self.sessions = sessions or create_funnel_session_store(db, settings)
+        
+        # Funnels precompilados: elegir variante no hace queries
+        self.plans = plans or FunnelPlanCache.from_settings(db, settings)
         self.logger = logging.getLogger(__name__)
     
     async def start_funnel_session(self,
@@ -84,10 +88,7 @@ class FunnelOptimizationService:
             context=context
         )
         
-        self.active_sessions[session_id] = session
-        
-        # Persist to DB
-        await self.db.create_funnel_session(session)
+        await self.sessions.create(session)
         
         return session
     
@@ -101,13 +102,22 @@ class FunnelOptimizationService:
         performs best in combination with previous selections.
         """
         
-        session = self.active_sessions.get(session_id)
+        try:
+            return await self._next_step_variant(session_id, fresh=False)
+        except FunnelSessionConflict:
+            # Otro worker avanzó la sesión: releer y elegir otra vez
+            return await self._next_step_variant(session_id, fresh=True)
+    
+    async def _next_step_variant(self, session_id: str, fresh: bool) -> Dict[str, Any]:
+        session = await self.sessions.get(session_id, fresh=fresh)
         if not session:
             raise ValueError(f"Session {session_id} not found")
         
-        # Get funnel definition
-        funnel = await self.db.get_funnel(session.funnel_id)
-        steps = funnel['steps']
+        # Funnel plan (cacheado: pasos, variantes y su performance)
+        plan = await self.plans.get(session.funnel_id)
+        if plan is None:
+            raise ValueError(f"Funnel {session.funnel_id} not found")
+        steps = plan.steps
         
         if session.current_step >= len(steps):
             return {'completed': True}
@@ -117,30 +127,15 @@ class FunnelOptimizationService:
         
         # Prepare context with path history
         optimization_context = {
-            'step_id': current_step['id'],
+            'step_id': current_step.step_id,
             'step_order': session.current_step,
             'previous_selections': session.selections,
             'user_context': session.context,
             'funnel_id': session.funnel_id
         }
         
-        # Get available variants for this step
-        variants = current_step['variants']
-        
-        # Prepare options with performance data
-        options = []
-        for variant in variants:
-            perf_data = await self.db.get_variant_performance(
-                variant['id'],
-                step_id=current_step['id']
-            )
-            
-            options.append({
-                'id': variant['id'],
-                'content': variant['content'],
-                'performance': perf_data.get('conversion_rate', 0),
-                'samples': perf_data.get('sample_size', 0)
-            })
+        # Options with performance data (arrays del plan, sin queries)
+        options = plan.options(current_step)
         
         # Select using sequential optimizer
         # This considers both individual performance AND path performance
@@ -150,22 +145,22 @@ class FunnelOptimizationService:
         )
         
         # Get full variant data
-        selected_variant = next(v for v in variants if v['id'] == selected_id)
+        selected_variant = current_step.variants[current_step.index[selected_id]]
         
-        # Update session
-        session.selections.append(selected_id)
+        # Update session (la selección del paso actual; repetir o recargar
+        # el paso la reemplaza, no añade otra)
+        session.selections[session.current_step:] = [selected_id]
+        await self.sessions.save(session)
         
         # Log decision
         self.logger.info(
-            "Funnel step variant selected",
-            session_id=session_id,
-            step=session.current_step,
-            variant_id=selected_id,
-            path_so_far=" -> ".join(session.selections)
+            f"Funnel step variant selected: session={session_id} "
+            f"step={session.current_step} variant={selected_id} "
+            f"path={' -> '.join(session.selections)}"
         )
         
         return {
-            'step': current_step,
+            'step': current_step.step,
             'variant': selected_variant,
             'session': session,
             'progress': (session.current_step + 1) / len(steps)
@@ -181,19 +176,33 @@ class FunnelOptimizationService:
         Updates both step-level and path-level performance
         """
         
-        session = self.active_sessions.get(session_id)
+        session = await self.sessions.get(session_id)
         if not session:
             return
         
         # Reward for completing step
         step_reward = 0.5 if not converted else 1.0
-        
-        # Update optimizer
         current_variant_id = session.selections[-1] if session.selections else None
+        completed_step = session.current_step
+        
+        # Move to next step if not final conversion (persistido antes de
+        # actualizar el optimizer: un conflicto no cuenta el paso dos veces)
+        if not converted:
+            session.current_step += 1
+            try:
+                await self.sessions.save(session)
+            except FunnelSessionConflict:
+                session = await self.sessions.get(session_id, fresh=True)
+                if not session or session.current_step != completed_step:
+                    return  # Otro worker ya registró este paso
+                session.current_step += 1
+                await self.sessions.save(session)
+                current_variant_id = session.selections[-1] if session.selections else None
         
+        # Update optimizer
         if current_variant_id:
             optimization_context = {
-                'step_id': session.current_step,
+                'step_id': completed_step,
                 'previous_selections': session.selections[:-1],
                 'user_context': session.context,
                 'full_path': session.selections,
@@ -205,13 +214,6 @@ class FunnelOptimizationService:
                 reward=step_reward,
                 context=optimization_context
             )
-        
-        # Move to next step if not final conversion
-        if not converted:
-            session.current_step += 1
-        
-        # Persist
-        await self.db.update_funnel_session(session, metadata)
     
     async def record_funnel_conversion(self,
                                        session_id: str,
@@ -223,7 +225,7 @@ class FunnelOptimizationService:
         This updates the entire path with final conversion reward
         """
         
-        session = self.active_sessions.get(session_id)
+        session = await self.sessions.get(session_id)
         if not session:
             return
         
@@ -244,21 +246,16 @@ class FunnelOptimizationService:
                 context=optimization_context
             )
         
-        # Persist conversion
-        await self.db.record_funnel_conversion(
-            session=session,
+        # Persist conversion (y deja de estar en curso)
+        await self.sessions.record_conversion(
+            session,
             value=conversion_value,
             metadata=metadata
         )
         
-        # Clean up session
-        del self.active_sessions[session_id]
-        
         self.logger.info(
-            "Funnel conversion recorded",
-            session_id=session_id,
-            path=" -> ".join(session.selections),
-            value=conversion_value
+            f"Funnel conversion recorded: session={session_id} "
+            f"path={' -> '.join(session.selections)} value={conversion_value}"
         )
     
     async def get_funnel_insights(self, funnel_id: str) -> Dict[str, Any]:
@@ -272,14 +272,19 @@ class InstallationService:
     async def check_installation_health(
         self,
         installation_id: str,
-        user_id: str
+        user_id: str,
+        live: bool = False
     ) -> Dict[str, Any]:
         """
         Verificar salud de la instalación
         
+        Por defecto devuelve el último resultado del health sweep;
+        solo hace fetch al sitio si live=True o aún no hay resultado.
+        
         Args:
             installation_id: ID de la instalación
             user_id: ID del usuario
+            live: Forzar comprobación en vivo
             
         Returns:
             Dict con información de salud
@@ -301,10 +306,17 @@ class InstallationService:
                     'error': 'Installation not found'
                 }
             
-            # Verificar salud
-            health_result = await self.verification_manager.check_health(
-                site_url=installation['site_url']
-            )
+            # Verificar salud (cache del sweep, si no en vivo)
+            health_result = None
+            if not live:
+                health_result = await self.installation_manager.get_cached_health(
+                    installation_id
+                )
+            
+            if health_result is None:
+                health_result = await self.verification_manager.check_health(
+                    site_url=installation['site_url']
+                )
             
             return {
                 **health_result,
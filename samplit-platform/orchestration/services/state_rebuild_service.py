@@ -0,0 +1,551 @@
+# orchestration/services/state_rebuild_service.py
+
+"""
+State Rebuild
+
+Reconstruye desde el log de eventos el estado derivado que se mantiene
+de forma incremental:
+
+- variants: total_allocations, total_conversions,
+  observed_conversion_rate y los contadores de algorithm_state
+  (samples, success_count), desde `allocations`
+- funnel_path_performance: attempts, conversions, conversion_rate y
+  optimization_state de cada path, desde `funnel_sessions`
+
+Para recuperar el estado cuando un bug corrompe algorithm_state o los
+contadores se desvían de las allocations.
+
+Por experimento / funnel:
+
+1. Una transacción REPEATABLE READ: los contadores actuales y el
+   stream de eventos (cursor del servidor, chunk_size filas) ven el
+   mismo snapshot
+2. Fold con NumPy: cada fila es un código 2·índice + convertido y el
+   chunk entero se acumula con un bincount, sin bucle Python por fila
+3. Swap en una transacción (FOR UPDATE sobre las filas): valor
+   reconstruido + lo que el tráfico en vivo sumó desde el snapshot
+
+Varios experimentos / funnels a la vez (como mucho `workers`, cada uno
+con su conexión) y solo un rebuild a la vez entre workers (advisory
+lock).
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_access.database import DatabaseManager
+from data_access.repositories.experiment_repository import ExperimentRepository
+from data_access.repositories.funnel_path_repository import FunnelPathRepository
+from engine.state.encryption import get_encryptor
+from orchestration.interfaces.optimization_interface import OptimizationStrategy
+from orchestration.services.experiment_service import ExperimentService
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock (un rebuild a la vez entre workers)
+STATE_REBUILD_LOCK = 'samplit.state_rebuild'
+
+
+class StateRebuildService:
+    """
+    Rebuild de contadores y estado del algoritmo desde allocations / funnel_sessions
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        workers: int = 4,
+        chunk_size: int = 10000,
+        abandon_hours: int = 24
+    ):
+        self.db = db
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.abandon_hours = abandon_hours
+        self.encryptor = get_encryptor()
+
+        # Métricas del último rebuild
+        self.last_run_at: Optional[float] = None
+        self.last_run_duration = 0.0
+        self.last_run_experiments = 0
+        self.last_run_funnels = 0
+        self.last_run_rows = 0
+        self.last_run_rows_per_second = 0.0
+        self.last_run_errors = 0
+        self.skipped_locked = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'StateRebuildService':
+        return cls(
+            db,
+            workers=settings.STATE_REBUILD_WORKERS,
+            chunk_size=settings.STATE_REBUILD_CHUNK_SIZE,
+            abandon_hours=settings.STATE_REBUILD_ABANDON_HOURS
+        )
+
+    async def run_once(
+        self,
+        experiment_ids: Optional[Sequence[str]] = None,
+        funnel_ids: Optional[Sequence[str]] = None,
+        funnels: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild completo (o solo de los experimentos / funnels indicados)
+
+        Returns:
+            Resumen con throughput y resultado por experimento / funnel,
+            o None si otro worker tiene el lock
+        """
+        start = time.monotonic()
+
+        async with self.db.pool.acquire() as conn:
+            locked = await conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtext($1))",
+                STATE_REBUILD_LOCK
+            )
+            if not locked:
+                self.skipped_locked += 1
+                return None
+
+            try:
+                if experiment_ids is None:
+                    experiment_ids = [
+                        str(row['id'])
+                        for row in await conn.fetch("SELECT id FROM experiments ORDER BY created_at")
+                    ]
+                if not funnels:
+                    funnel_ids = []
+                elif funnel_ids is None:
+                    funnel_ids = [
+                        str(row['id'])
+                        for row in await conn.fetch("SELECT id FROM funnels ORDER BY created_at")
+                    ]
+
+                semaphore = asyncio.Semaphore(self.workers)
+
+                async def bounded(rebuild, target_id: str) -> Dict[str, Any]:
+                    async with semaphore:
+                        try:
+                            return await rebuild(target_id)
+                        except Exception as e:
+                            logger.error(
+                                f"State rebuild failed for {target_id}: {str(e)}",
+                                exc_info=True
+                            )
+                            return {'error': str(e), 'rows': 0}
+
+                results = await asyncio.gather(
+                    *(bounded(self.rebuild_experiment, i) for i in experiment_ids),
+                    *(bounded(self.rebuild_funnel, i) for i in funnel_ids)
+                )
+            finally:
+                await conn.execute(
+                    "SELECT pg_advisory_unlock(hashtext($1))",
+                    STATE_REBUILD_LOCK
+                )
+
+        experiments = dict(zip(experiment_ids, results[:len(experiment_ids)]))
+        funnel_results = dict(zip(funnel_ids, results[len(experiment_ids):]))
+
+        duration = time.monotonic() - start
+        rows = sum(r['rows'] for r in results)
+
+        self.last_run_at = time.time()
+        self.last_run_duration = duration
+        self.last_run_experiments = len(experiments)
+        self.last_run_funnels = len(funnel_results)
+        self.last_run_rows = rows
+        self.last_run_rows_per_second = rows / duration if duration > 0 else 0.0
+        self.last_run_errors = sum(1 for r in results if 'error' in r)
+
+        logger.info(
+            f"State rebuild: {len(experiments)} experiments, {len(funnel_results)} funnels, "
+            f"{rows} rows in {duration:.1f}s ({self.last_run_rows_per_second:.0f} rows/s)"
+        )
+
+        return {
+            'duration_seconds': round(duration, 3),
+            'rows': rows,
+            'rows_per_second': round(self.last_run_rows_per_second, 1),
+            'errors': self.last_run_errors,
+            'experiments': experiments,
+            'funnels': funnel_results
+        }
+
+    # ===== VARIANTES =====
+
+    async def rebuild_experiment(self, experiment_id: str) -> Dict[str, Any]:
+        """Contadores y algorithm_state de las variantes de un experimento"""
+        start = time.monotonic()
+
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                strategy = await conn.fetchval(
+                    "SELECT optimization_strategy FROM experiments WHERE id = $1",
+                    experiment_id
+                )
+                snapshot = await conn.fetch(
+                    """
+                    SELECT id, total_allocations, total_conversions
+                    FROM variants
+                    WHERE experiment_id = $1
+                    ORDER BY created_at
+                    """,
+                    experiment_id
+                )
+                variant_ids = [str(row['id']) for row in snapshot]
+
+                # Código por fila: 2·(posición de la variante) + convertido
+                counts, rows = await self._fold(
+                    conn,
+                    """
+                    SELECT (array_position($2::uuid[], variant_id) - 1) * 2
+                           + (converted_at IS NOT NULL)::int
+                    FROM allocations
+                    WHERE experiment_id = $1 AND variant_id = ANY($2::uuid[])
+                    """,
+                    experiment_id, variant_ids,
+                    groups=len(variant_ids)
+                )
+
+            fold_duration = time.monotonic() - start
+            corrected, corrupted = await self._swap_variants(
+                conn, experiment_id, strategy, snapshot, counts
+            )
+
+        return {
+            'variants': len(variant_ids),
+            'variants_corrected': corrected,
+            'states_reset': corrupted,
+            'rows': rows,
+            'rows_per_second': round(rows / fold_duration, 1) if fold_duration > 0 else 0.0,
+            'duration_seconds': round(time.monotonic() - start, 3)
+        }
+
+    async def _swap_variants(
+        self,
+        conn,
+        experiment_id: str,
+        strategy: Optional[str],
+        snapshot: Sequence[Any],
+        counts: np.ndarray
+    ) -> Tuple[int, int]:
+        """
+        Escribir los contadores reconstruidos de todas las variantes a la vez
+
+        Returns:
+            (variantes cuyos contadores cambiaron, estados ilegibles reiniciados)
+        """
+        if not snapshot:
+            return 0, 0
+
+        position = {str(row['id']): i for i, row in enumerate(snapshot)}
+
+        try:
+            initial_state = ExperimentService._initialize_algorithm_state(
+                OptimizationStrategy(strategy)
+            )
+        except ValueError:
+            initial_state = ExperimentService._initialize_algorithm_state(
+                OptimizationStrategy.ADAPTIVE
+            )
+
+        corrected = corrupted = 0
+
+        async with conn.transaction():
+            current = await conn.fetch(
+                """
+                SELECT id, total_allocations, total_conversions, algorithm_state
+                FROM variants
+                WHERE id = ANY($1::uuid[])
+                FOR UPDATE
+                """,
+                list(position)
+            )
+
+            records = []
+            for row in current:
+                i = position[str(row['id'])]
+                before = snapshot[i]
+
+                # Reconstruido hasta el snapshot + tráfico en vivo desde entonces
+                allocations = int(counts[i].sum()) + (
+                    (row['total_allocations'] or 0) - (before['total_allocations'] or 0)
+                )
+                conversions = int(counts[i, 1]) + (
+                    (row['total_conversions'] or 0) - (before['total_conversions'] or 0)
+                )
+                allocations = max(allocations, 0)
+                conversions = min(max(conversions, 0), allocations)
+
+                if (allocations, conversions) != (row['total_allocations'], row['total_conversions']):
+                    corrected += 1
+
+                state = self._decrypt(row['algorithm_state'])
+                if state is None:
+                    corrupted += 1
+                    state = {}
+
+                state = {**initial_state, **state}
+                prior = 0 if state.get('algorithm_type') == 'explore_exploit' else 1
+                state['samples'] = allocations
+                state['success_count'] = prior + conversions
+
+                records.append((
+                    allocations,
+                    conversions,
+                    self.encryptor.encrypt_state(state),
+                    row['id']
+                ))
+
+            await conn.executemany(
+                """
+                UPDATE variants
+                SET
+                    total_allocations = $1,
+                    total_conversions = $2,
+                    observed_conversion_rate = $2::DECIMAL / GREATEST($1, 1)::DECIMAL,
+                    algorithm_state = $3,
+                    updated_at = NOW()
+                WHERE id = $4
+                """,
+                records
+            )
+
+            if corrected:
+                await ExperimentRepository._invalidate_summaries(conn, [experiment_id])
+
+        return corrected, corrupted
+
+    # ===== FUNNEL PATHS =====
+
+    async def rebuild_funnel(self, funnel_id: str) -> Dict[str, Any]:
+        """
+        attempts / conversions / optimization_state de los paths de un funnel
+
+        Un intento es una sesión completada o abandonada (sin actividad
+        en abandon_hours). El path es el hash de las variantes
+        seleccionadas, igual que FunnelPathRepository._hash_path
+        (sha256 de los ids ordenados unidos por "->", calculado en SQL).
+        """
+        start = time.monotonic()
+
+        async with self.db.pool.acquire() as conn:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                snapshot = await conn.fetch(
+                    """
+                    SELECT path_hash, attempts, conversions
+                    FROM funnel_path_performance
+                    WHERE funnel_id = $1
+                    """,
+                    funnel_id
+                )
+
+                paths: Dict[str, int] = {}
+                samples: Dict[str, str] = {}
+                counts = np.zeros((0, 2), dtype=np.int64)
+                rows = 0
+
+                cursor = await conn.cursor(
+                    """
+                    SELECT
+                        encode(sha256(convert_to(p.path, 'UTF8')), 'hex') AS path_hash,
+                        s.selected_variants,
+                        s.converted
+                    FROM funnel_sessions s
+                    CROSS JOIN LATERAL (
+                        SELECT string_agg(v, '->' ORDER BY v COLLATE "C") AS path
+                        FROM jsonb_array_elements_text(s.selected_variants) v
+                    ) p
+                    WHERE s.funnel_id = $1
+                      AND jsonb_array_length(s.selected_variants) > 0
+                      AND (
+                          s.completed
+                          OR s.last_activity_at < NOW() - make_interval(hours => $2)
+                      )
+                    """,
+                    funnel_id, self.abandon_hours
+                )
+
+                while True:
+                    chunk = await cursor.fetch(self.chunk_size)
+                    if not chunk:
+                        break
+
+                    index = np.fromiter(
+                        (paths.setdefault(row['path_hash'], len(paths)) for row in chunk),
+                        dtype=np.int64,
+                        count=len(chunk)
+                    )
+                    converted = np.fromiter(
+                        (row['converted'] for row in chunk), dtype=np.int64, count=len(chunk)
+                    )
+
+                    if len(paths) > len(samples):
+                        for row in chunk:
+                            samples.setdefault(row['path_hash'], row['selected_variants'])
+
+                    counts = _grow(counts, len(paths))
+                    counts += _fold_codes(index * 2 + converted, len(paths))
+                    rows += len(chunk)
+
+            fold_duration = time.monotonic() - start
+            corrected = await self._swap_paths(conn, funnel_id, snapshot, paths, samples, counts)
+
+        return {
+            'paths': len(paths),
+            'paths_corrected': corrected,
+            'rows': rows,
+            'rows_per_second': round(rows / fold_duration, 1) if fold_duration > 0 else 0.0,
+            'duration_seconds': round(time.monotonic() - start, 3)
+        }
+
+    async def _swap_paths(
+        self,
+        conn,
+        funnel_id: str,
+        snapshot: Sequence[Any],
+        paths: Dict[str, int],
+        samples: Dict[str, str],
+        counts: np.ndarray
+    ) -> int:
+        """Upsert de todos los paths del funnel (también los que ya no tienen sesiones)"""
+        before = {row['path_hash']: row for row in snapshot}
+
+        async with conn.transaction():
+            current = await conn.fetch(
+                """
+                SELECT path_hash, attempts, conversions, optimization_state
+                FROM funnel_path_performance
+                WHERE funnel_id = $1
+                FOR UPDATE
+                """,
+                funnel_id
+            )
+            existing = {row['path_hash']: row for row in current}
+
+            records = []
+            corrected = 0
+            for path_hash in set(paths) | set(existing):
+                attempts = conversions = 0
+                if path_hash in paths:
+                    attempts = int(counts[paths[path_hash]].sum())
+                    conversions = int(counts[paths[path_hash], 1])
+
+                row = existing.get(path_hash)
+                state: Dict[str, Any] = {}
+                path_data = None
+
+                if row is not None:
+                    # Reconstruido hasta el snapshot + lo sumado desde entonces
+                    old = before.get(path_hash)
+                    attempts += (row['attempts'] or 0) - ((old['attempts'] or 0) if old else 0)
+                    conversions += (row['conversions'] or 0) - ((old['conversions'] or 0) if old else 0)
+                    state = self._decrypt(row['optimization_state']) or {}
+                else:
+                    path = samples[path_hash]
+                    path_data = self.encryptor.encrypt_path_data(
+                        json.loads(path) if isinstance(path, str) else path
+                    )
+
+                attempts = max(attempts, 0)
+                conversions = min(max(conversions, 0), attempts)
+
+                if row is None or (attempts, conversions) != (row['attempts'], row['conversions']):
+                    corrected += 1
+
+                state = {**FunnelPathRepository._initialize_path_state(), **state}
+                state['success_count'] = 1 + conversions
+                state['failure_count'] = 1 + attempts - conversions
+                state['samples'] = attempts
+
+                records.append((
+                    funnel_id,
+                    path_hash,
+                    path_data,
+                    attempts,
+                    conversions,
+                    self.encryptor.encrypt_state(state)
+                ))
+
+            if records:
+                await conn.executemany(
+                    """
+                    INSERT INTO funnel_path_performance (
+                        funnel_id, path_hash, path_data,
+                        attempts, conversions, conversion_rate,
+                        optimization_state
+                    ) VALUES ($1, $2, $3, $4, $5, $5::DECIMAL / GREATEST($4, 1)::DECIMAL, $6)
+                    ON CONFLICT (funnel_id, path_hash)
+                    DO UPDATE SET
+                        attempts = EXCLUDED.attempts,
+                        conversions = EXCLUDED.conversions,
+                        conversion_rate = EXCLUDED.conversion_rate,
+                        optimization_state = EXCLUDED.optimization_state
+                    """,
+                    records
+                )
+
+        return corrected
+
+    # ===== FOLD =====
+
+    async def _fold(self, conn, query: str, *args, groups: int) -> Tuple[np.ndarray, int]:
+        """
+        Stream de códigos 2·grupo + convertido → (groups, 2) [no convertidas, convertidas]
+
+        La query devuelve una sola columna entera por fila.
+        """
+        counts = np.zeros((groups, 2), dtype=np.int64)
+        rows = 0
+
+        cursor = await conn.cursor(query, *args)
+        while True:
+            chunk = await cursor.fetch(self.chunk_size)
+            if not chunk:
+                break
+
+            codes = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+            counts += _fold_codes(codes, groups)
+            rows += len(chunk)
+
+        return counts, rows
+
+    def _decrypt(self, encrypted: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Estado descifrado; None si no se puede leer (cifrado o JSON corrupto)"""
+        if not encrypted:
+            return {}
+        try:
+            state = self.encryptor.decrypt_state(encrypted)
+        except Exception:
+            return None
+        return state if isinstance(state, dict) else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'last_run_at': self.last_run_at,
+            'last_run_duration': round(self.last_run_duration, 2),
+            'last_run_experiments': self.last_run_experiments,
+            'last_run_funnels': self.last_run_funnels,
+            'last_run_rows': self.last_run_rows,
+            'last_run_rows_per_second': round(self.last_run_rows_per_second, 1),
+            'last_run_errors': self.last_run_errors,
+            'skipped_locked': self.skipped_locked
+        }
+
+
+def _fold_codes(codes: np.ndarray, groups: int) -> np.ndarray:
+    """bincount de códigos 2·grupo + convertido → (groups, 2)"""
+    return np.bincount(codes, minlength=groups * 2).reshape(groups, 2)
+
+
+def _grow(counts: np.ndarray, groups: int) -> np.ndarray:
+    """Añadir filas a cero para los grupos (paths) nuevos del chunk"""
+    if groups > len(counts):
+        counts = np.concatenate([counts, np.zeros((groups - len(counts), 2), dtype=np.int64)])
+    return counts
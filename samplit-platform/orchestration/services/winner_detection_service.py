@@ -0,0 +1,373 @@
+# orchestration/services/winner_detection_service.py
+
+"""
+Winner Detection
+
+Job periódico sobre todos los experimentos activos:
+
+1. Una query con los contadores de todas sus variantes activas
+2. P(best) y expected loss de todos a la vez (WinnerDetectionJob en
+   el compute pool, tensores agrupados por número de variantes)
+3. Un upsert en bulk en performance_snapshots (una fila por variante
+   y hora)
+4. Opcional: pausar variantes perdedoras y concluir experimentos con
+   ganador claro según las reglas de parada (StoppingPolicy, la misma
+   política que el dashboard)
+
+Con varios workers solo uno ejecuta cada ciclo (advisory lock).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from data_access.database import DatabaseManager
+from data_access.repositories.experiment_repository import ExperimentRepository
+from orchestration.services.analytics_jobs import (
+    BetaArm,
+    ExperimentArms,
+    WinnerDetectionJob
+)
+from orchestration.utils.compute_pool import ComputePool, get_compute_pool
+from orchestration.utils.stopping_rules import (
+    DECISION_WINNER,
+    StoppingPolicy,
+    StoppingRulesJob
+)
+
+logger = logging.getLogger(__name__)
+
+# Clave del advisory lock (un ciclo a la vez entre workers)
+WINNER_DETECTION_LOCK = 'samplit.winner_detection'
+
+
+class WinnerDetectionService:
+    """
+    Evaluación en batch de experimentos activos
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        samples: int = 2000,
+        threshold: float = 0.95,
+        policy: Optional[StoppingPolicy] = None,
+        stopping_samples: int = 4000,
+        auto_pause_losers: bool = False,
+        loser_threshold: float = 0.01,
+        auto_conclude: bool = False,
+        timeout: float = 300.0,
+        pool: Optional[ComputePool] = None
+    ):
+        self.db = db
+        self.samples = samples
+        self.threshold = threshold
+        self.policy = policy or StoppingPolicy(prob_threshold=threshold)
+        self.stopping_samples = stopping_samples
+        self.auto_pause_losers = auto_pause_losers
+        self.loser_threshold = loser_threshold
+        self.auto_conclude = auto_conclude
+        self.timeout = timeout
+        self._pool = pool
+
+        # Métricas del último ciclo
+        self.last_run_at: Optional[float] = None
+        self.last_run_duration = 0.0
+        self.last_run_experiments = 0
+        self.last_run_winners = 0
+        self.variants_paused = 0
+        self.experiments_concluded = 0
+        self.skipped_locked = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'WinnerDetectionService':
+        return cls(
+            db,
+            samples=settings.WINNER_DETECTION_SAMPLES,
+            threshold=settings.WINNER_DETECTION_THRESHOLD,
+            policy=StoppingPolicy.from_settings(settings),
+            stopping_samples=settings.STOPPING_SAMPLES,
+            auto_pause_losers=settings.WINNER_AUTO_PAUSE_LOSERS,
+            loser_threshold=settings.WINNER_LOSER_THRESHOLD,
+            auto_conclude=settings.WINNER_AUTO_CONCLUDE,
+            timeout=settings.WINNER_DETECTION_TIMEOUT_SECONDS
+        )
+
+    async def run_forever(self, interval_seconds: float) -> None:
+        """Loop de ciclos (se lanza como background task en el lifespan)"""
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Winner detection failed: {str(e)}", exc_info=True)
+
+            await asyncio.sleep(interval_seconds)
+
+    async def run_once(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Un ciclo completo
+
+        Returns:
+            Resultados por experimento, o None si otro worker tiene el lock
+        """
+        start = time.monotonic()
+
+        # El lock va en una conexión propia: el job del compute pool puede
+        # tardar minutos y no debe tener ocupada una del pool principal
+        async with self.db.advisory_lock(WINNER_DETECTION_LOCK) as locked:
+            if not locked:
+                self.skipped_locked += 1
+                return None
+
+            async with self.db.pool.acquire() as conn:
+                experiments, counts = await self._load_counts(conn)
+            if not experiments:
+                return {}
+
+            pool = self._pool or get_compute_pool()
+            results = await pool.submit(
+                WinnerDetectionJob(tuple(experiments), self.samples),
+                timeout=self.timeout
+            )
+
+            async with self.db.pool.acquire() as conn:
+                await self._save_snapshots(conn, results, counts)
+
+                if self.auto_pause_losers:
+                    self.variants_paused += await self._pause_losers(conn, results)
+
+            if self.auto_conclude:
+                self.experiments_concluded += await self._conclude(
+                    pool, experiments, counts
+                )
+
+        self.last_run_at = time.time()
+        self.last_run_duration = time.monotonic() - start
+        self.last_run_experiments = len(results)
+        self.last_run_winners = sum(
+            1 for r in results.values() if r['best_confidence'] >= self.threshold
+        )
+
+        logger.info(
+            f"Winner detection: {len(results)} experiments, "
+            f"{self.last_run_winners} winners in {self.last_run_duration:.1f}s"
+        )
+
+        return results
+
+    # ===== LECTURA =====
+
+    async def _load_counts(
+        self,
+        conn
+    ) -> Tuple[List[ExperimentArms], Dict[str, Tuple[int, int]]]:
+        """
+        Contadores de todos los experimentos activos en una query
+
+        Returns:
+            (arms por experimento, {variant_id: (allocations, conversions)})
+        """
+        rows = await conn.fetch(
+            """
+            SELECT v.id, v.experiment_id, v.total_allocations, v.total_conversions
+            FROM variants v
+            JOIN experiments e ON e.id = v.experiment_id
+            WHERE e.status = 'active' AND v.is_active = true
+            ORDER BY v.experiment_id, v.created_at
+            """
+        )
+
+        arms: Dict[str, List[BetaArm]] = {}
+        counts: Dict[str, Tuple[int, int]] = {}
+
+        for row in rows:
+            variant_id = str(row['id'])
+            allocations = row['total_allocations'] or 0
+            conversions = min(row['total_conversions'] or 0, allocations)
+
+            counts[variant_id] = (allocations, conversions)
+            arms.setdefault(str(row['experiment_id']), []).append(
+                BetaArm(
+                    arm_id=variant_id,
+                    alpha=conversions + 1,
+                    beta=allocations - conversions + 1
+                )
+            )
+
+        experiments = [
+            ExperimentArms(experiment_id, tuple(experiment_arms))
+            for experiment_id, experiment_arms in arms.items()
+            if len(experiment_arms) >= 2
+        ]
+
+        return experiments, counts
+
+    # ===== ESCRITURA =====
+
+    async def _save_snapshots(
+        self,
+        conn,
+        results: Dict[str, Dict[str, Any]],
+        counts: Dict[str, Tuple[int, int]]
+    ) -> None:
+        """Una fila por variante y hora; el último ciclo de la hora gana"""
+        now = datetime.now(timezone.utc)
+
+        experiment_ids, variant_ids = [], []
+        allocations, conversions, rates = [], [], []
+        confidences, significant, losses = [], [], []
+
+        for experiment_id, result in results.items():
+            winner = result['best_confidence'] >= self.threshold
+
+            for variant_id, prob in result['prob_best'].items():
+                n, c = counts[variant_id]
+
+                experiment_ids.append(experiment_id)
+                variant_ids.append(variant_id)
+                allocations.append(n)
+                conversions.append(c)
+                rates.append(c / n if n else 0.0)
+                confidences.append(round(prob, 4))
+                significant.append(winner and variant_id == result['best_variant'])
+                losses.append(result['expected_loss'][variant_id])
+
+        await conn.execute(
+            """
+            INSERT INTO performance_snapshots (
+                experiment_id, variant_id, snapshot_date, snapshot_hour,
+                allocations_count, conversions_count, conversion_rate,
+                confidence_score, statistical_significance, expected_loss
+            )
+            SELECT
+                s.experiment_id, s.variant_id, $1::date, $2::int,
+                s.allocations, s.conversions, s.rate,
+                s.confidence, s.significant, s.loss
+            FROM unnest(
+                $3::uuid[], $4::uuid[], $5::int[], $6::int[],
+                $7::float8[], $8::float8[], $9::bool[], $10::float8[]
+            ) AS s(
+                experiment_id, variant_id, allocations, conversions,
+                rate, confidence, significant, loss
+            )
+            ON CONFLICT (experiment_id, variant_id, snapshot_date, snapshot_hour)
+            DO UPDATE SET
+                allocations_count = EXCLUDED.allocations_count,
+                conversions_count = EXCLUDED.conversions_count,
+                conversion_rate = EXCLUDED.conversion_rate,
+                confidence_score = EXCLUDED.confidence_score,
+                statistical_significance = EXCLUDED.statistical_significance,
+                expected_loss = EXCLUDED.expected_loss,
+                created_at = NOW()
+            """,
+            now.date(), now.hour,
+            experiment_ids, variant_ids, allocations, conversions,
+            rates, confidences, significant, losses
+        )
+
+    async def _pause_losers(self, conn, results: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Desactivar variantes sin opciones (P(best) < loser_threshold)
+
+        Nunca la mejor, y siempre quedan al menos dos variantes activas.
+        """
+        losers: List[str] = []
+
+        for result in results.values():
+            ranked = sorted(result['prob_best'].items(), key=lambda item: item[1])
+            keep = len(ranked)
+
+            for variant_id, prob in ranked:
+                if keep <= 2 or prob >= self.loser_threshold:
+                    break
+                if variant_id == result['best_variant']:
+                    continue
+                losers.append(variant_id)
+                keep -= 1
+
+        if not losers:
+            return 0
+
+        result = await conn.execute(
+            """
+            UPDATE variants
+            SET is_active = false, updated_at = NOW()
+            WHERE id = ANY($1::uuid[]) AND is_active = true
+            """,
+            losers
+        )
+        await self._invalidate_summaries(conn, [
+            experiment_id for experiment_id, r in results.items()
+            if any(variant_id in r['prob_best'] for variant_id in losers)
+        ])
+        return int(result.split()[-1])
+
+    async def _conclude(
+        self,
+        pool: ComputePool,
+        experiments: List[ExperimentArms],
+        counts: Dict[str, Tuple[int, int]]
+    ) -> int:
+        """
+        Concluir experimentos con ganador claro
+
+        Decisión 'winner' de las reglas de parada (StoppingRulesJob), la
+        misma que ve el dashboard. Sin min_samples allocations en cada
+        variante las reglas siempre dicen 'continue': esos experimentos
+        ni se evalúan.
+        """
+        candidates = tuple(
+            experiment for experiment in experiments
+            if all(
+                counts[arm.arm_id][0] >= self.policy.min_samples
+                for arm in experiment.arms
+            )
+        )
+        if not candidates:
+            return 0
+
+        decisions = await pool.submit(
+            StoppingRulesJob(candidates, self.policy, self.stopping_samples),
+            timeout=self.timeout
+        )
+        concluded = [
+            experiment_id
+            for experiment_id, decision in decisions.items()
+            if decision['decision'] == DECISION_WINNER
+        ]
+
+        if not concluded:
+            return 0
+
+        async with self.db.pool.acquire() as conn:
+            result = await conn.execute(
+                """
+                UPDATE experiments
+                SET status = 'completed', completed_at = NOW(), updated_at = NOW()
+                WHERE id = ANY($1::uuid[]) AND status = 'active'
+                """,
+                concluded
+            )
+            await self._invalidate_summaries(conn, concluded)
+        return int(result.split()[-1])
+
+    @staticmethod
+    async def _invalidate_summaries(conn, experiment_ids: List[str]) -> None:
+        """Resumen del dashboard de los dueños (ver ExperimentRepository)"""
+        if experiment_ids:
+            await ExperimentRepository._invalidate_summaries(conn, experiment_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'last_run_at': self.last_run_at,
+            'last_run_duration': round(self.last_run_duration, 2),
+            'last_run_experiments': self.last_run_experiments,
+            'last_run_winners': self.last_run_winners,
+            'variants_paused': self.variants_paused,
+            'experiments_concluded': self.experiments_concluded,
+            'skipped_locked': self.skipped_locked
+        }
@@ -0,0 +1,223 @@
+# orchestration/utils/admission_control.py
+
+"""
+Admission Control
+
+Control de admisión para los endpoints públicos (tracker, assign, convert):
+- Límite de concurrencia por grupo de rutas (falla rápido, sin cola larga)
+- Rate limit por instalación/experimento (token bucket)
+
+Un pico de tráfico en el sitio de un cliente no debe dejar sin
+capacidad al resto de clientes ni al dashboard.
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Tuple
+
+ROUTE_TRACKER = 'tracker'
+ROUTE_ASSIGN = 'assign'
+ROUTE_CONVERT = 'convert'
+
+
+class AdmissionRejected(Exception):
+    """Request rechazada por control de admisión"""
+
+    def __init__(self, route: str, reason: str):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.reason = reason  # 'concurrency' | 'rate_limit'
+
+
+class TokenBucket:
+    """Token bucket clásico: `rate` tokens/s, hasta `capacity`"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+
+class RouteLimiter:
+    """
+    Límite de concurrencia de un grupo de rutas
+
+    Si no hay hueco en `queue_timeout` segundos se rechaza en vez
+    de esperar hasta el command_timeout de la base de datos.
+    """
+
+    def __init__(self, max_concurrency: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Lazy: el semáforo debe crearse dentro del event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def acquire(self) -> bool:
+        try:
+            await asyncio.wait_for(
+                self.semaphore.acquire(),
+                timeout=self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'rejected': self.rejected
+        }
+
+
+class AdmissionController:
+    """
+    Control de admisión de los endpoints públicos
+
+    Rutas:
+    - {prefix}/tracker/*                  → 'tracker' (key: installation token)
+    - {prefix}/experiments/{id}/assign    → 'assign'  (key: experiment id)
+    - {prefix}/experiments/{id}/convert   → 'convert' (key: experiment id)
+    """
+
+    def __init__(
+        self,
+        api_prefix: str,
+        concurrency: Dict[str, int],
+        rate_per_second: float,
+        burst: int,
+        queue_timeout: float = 0.05,
+        max_buckets: int = 100000
+    ):
+        self.limiters = {
+            route: RouteLimiter(limit, queue_timeout)
+            for route, limit in concurrency.items()
+        }
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.rate_limited = 0
+
+        prefix = re.escape(api_prefix)
+        self._tracker_prefix = f"{api_prefix}/tracker/"
+        self._tracker_config = re.compile(rf"^{prefix}/tracker/config/([^/]+)$")
+        self._experiment_action = re.compile(
+            rf"^{prefix}/experiments/([^/]+)/(assign|convert)$"
+        )
+
+    @classmethod
+    def from_settings(cls, settings) -> 'AdmissionController':
+        return cls(
+            api_prefix=settings.API_PREFIX,
+            concurrency={
+                ROUTE_TRACKER: settings.ADMISSION_TRACKER_CONCURRENCY,
+                ROUTE_ASSIGN: settings.ADMISSION_ASSIGN_CONCURRENCY,
+                ROUTE_CONVERT: settings.ADMISSION_CONVERT_CONCURRENCY
+            },
+            rate_per_second=settings.ADMISSION_RATE_PER_SECOND,
+            burst=settings.ADMISSION_BURST,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000
+        )
+
+    def classify(self, path: str, query: Dict[str, str],
+                 client_host: str = '') -> Optional[Tuple[str, str]]:
+        """
+        Grupo de ruta y key de rate limit para una request
+
+        Returns:
+            (route, key) o None si la ruta no está controlada
+        """
+        match = self._experiment_action.match(path)
+        if match:
+            return match.group(2), f"experiment:{match.group(1)}"
+
+        if path.startswith(self._tracker_prefix):
+            match = self._tracker_config.match(path)
+            token = match.group(1) if match else query.get('installation_token')
+
+            # POST /event(s): el token va en el body, usar IP del cliente
+            key = f"installation:{token}" if token else f"ip:{client_host}"
+            return ROUTE_TRACKER, key
+
+        return None
+
+    @asynccontextmanager
+    async def admit(self, route: str, key: str):
+        """
+        Admitir una request o lanzar AdmissionRejected
+        """
+        if not self._take_token(key):
+            self.rate_limited += 1
+            raise AdmissionRejected(route, 'rate_limit')
+
+        limiter = self.limiters[route]
+        if not await limiter.acquire():
+            raise AdmissionRejected(route, 'concurrency')
+
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    def _take_token(self, key: str) -> bool:
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = TokenBucket(self.rate_per_second, self.burst)
+            self._buckets[key] = bucket
+
+            # Acotar memoria: descartar los buckets menos usados
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        return bucket.try_acquire()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'routes': {
+                route: limiter.get_stats()
+                for route, limiter in self.limiters.items()
+            },
+            'rate_limited': self.rate_limited,
+            'tracked_keys': len(self._buckets)
+        }
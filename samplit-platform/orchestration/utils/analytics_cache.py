@@ -0,0 +1,231 @@
+# orchestration/utils/analytics_cache.py
+
+"""
+Analytics Cache
+
+Resultados de analytics por experimento, indexados por un fingerprint
+de sus estadísticas suficientes: (variant_id, allocations, conversions)
+más los metadatos que aparecen en la respuesta. Mismos inputs →
+mismo resultado, sin repetir el Monte Carlo.
+
+- fresh: verificado hace menos de fresh_seconds → se sirve sin queries
+- revalidado: el fingerprint actual coincide → se reutiliza
+- stale-while-revalidate: los datos cambiaron pero el resultado tiene
+  menos de stale_seconds → se sirve y se recalcula en background
+
+El fingerprint también es el ETag: el dashboard recibe 304 mientras
+no haya allocations/conversions nuevas.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from orchestration.utils.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_FLIGHT = 'analytics'
+
+
+@dataclass
+class CachedAnalytics:
+    """Un resultado calculado y los inputs de los que sale"""
+    experiment_id: str
+    owner_id: str
+    fingerprint: str
+    value: Any
+    computed_at: float
+    checked_at: float
+
+    @property
+    def etag(self) -> str:
+        # Débil: otro cálculo con los mismos inputs varía en el ruido Monte Carlo
+        return f'W/"{self.fingerprint[:32]}"'
+
+
+def analytics_fingerprint(*parts: Iterable[Any]) -> str:
+    """
+    Hash estable de los inputs de un resultado
+
+    Cada parte es una secuencia de valores (p.ej. metadatos del
+    experimento, una tupla por variante).
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(tuple(part)).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class AnalyticsCache:
+    """
+    Cache en memoria (por proceso) de resultados de analytics
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        fresh_seconds: float = 2.0,
+        stale_seconds: float = 60.0
+    ):
+        self.max_entries = max_entries
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+
+        self._entries: 'OrderedDict[str, CachedAnalytics]' = OrderedDict()
+        self._refreshing: Set[asyncio.Task] = set()
+        self._flight = get_single_flight(ANALYTICS_FLIGHT)
+
+        # Métricas
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.stale_served = 0
+        self.misses = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> 'AnalyticsCache':
+        return cls(
+            max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES,
+            fresh_seconds=settings.ANALYTICS_CACHE_FRESH_SECONDS,
+            stale_seconds=settings.ANALYTICS_CACHE_STALE_SECONDS
+        )
+
+    # ===== LECTURA =====
+
+    def get_fresh(self, experiment_id: str, owner_id: str) -> Optional[CachedAnalytics]:
+        """Resultado verificado hace menos de fresh_seconds (sin tocar la DB)"""
+        entry = self._entries.get(experiment_id)
+        if entry is None or entry.owner_id != owner_id:
+            return None
+        if time.monotonic() - entry.checked_at >= self.fresh_seconds:
+            return None
+
+        self.fresh_hits += 1
+        self._entries.move_to_end(experiment_id)
+        return entry
+
+    async def get_or_compute(
+        self,
+        experiment_id: str,
+        owner_id: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> CachedAnalytics:
+        """
+        Resultado para el fingerprint actual
+
+        Reutiliza si coincide, sirve stale y recalcula en background
+        si cambió hace poco, o calcula (coalesced) si no hay nada útil.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(experiment_id)
+
+        if entry is not None and entry.owner_id == owner_id:
+            self._entries.move_to_end(experiment_id)
+
+            if entry.fingerprint == fingerprint:
+                self.revalidated += 1
+                entry.checked_at = now
+                return entry
+
+            if now - entry.computed_at < self.stale_seconds:
+                self.stale_served += 1
+                self._refresh(experiment_id, owner_id, fingerprint, compute)
+                return entry
+
+        self.misses += 1
+        return await self._compute(experiment_id, owner_id, fingerprint, compute)
+
+    # ===== CÁLCULO =====
+
+    async def _compute(
+        self,
+        experiment_id: str,
+        owner_id: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> CachedAnalytics:
+        async def run() -> CachedAnalytics:
+            value = await compute()
+            return self._store(experiment_id, owner_id, fingerprint, value)
+
+        # Varios dashboards abiertos sobre el mismo experimento: un solo cálculo
+        return await self._flight.do((experiment_id, fingerprint), run)
+
+    def _refresh(
+        self,
+        experiment_id: str,
+        owner_id: str,
+        fingerprint: str,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> None:
+        task = asyncio.ensure_future(
+            self._compute(experiment_id, owner_id, fingerprint, compute)
+        )
+        self._refreshing.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshing.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.refresh_failures += 1
+            logger.warning(f"Analytics background refresh failed: {error}")
+
+    def _store(
+        self,
+        experiment_id: str,
+        owner_id: str,
+        fingerprint: str,
+        value: Any
+    ) -> CachedAnalytics:
+        now = time.monotonic()
+        entry = CachedAnalytics(
+            experiment_id=experiment_id,
+            owner_id=owner_id,
+            fingerprint=fingerprint,
+            value=value,
+            computed_at=now,
+            checked_at=now
+        )
+        self._entries[experiment_id] = entry
+        self._entries.move_to_end(experiment_id)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return entry
+
+    def invalidate(self, experiment_id: str) -> None:
+        self._entries.pop(experiment_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'fresh_hits': self.fresh_hits,
+            'revalidated': self.revalidated,
+            'stale_served': self.stale_served,
+            'misses': self.misses,
+            'refreshing': len(self._refreshing),
+            'refresh_failures': self.refresh_failures
+        }
+
+
+# Singleton instance
+_analytics_cache: Optional[AnalyticsCache] = None
+
+def get_analytics_cache() -> AnalyticsCache:
+    """Get singleton analytics cache"""
+    global _analytics_cache
+    if _analytics_cache is None:
+        from config.settings import settings
+        _analytics_cache = AnalyticsCache.from_settings(settings)
+    return _analytics_cache
@@ -0,0 +1,244 @@
+# orchestration/utils/circuit_breaker.py
+
+"""
+Circuit Breaker
+
+Protege los endpoints públicos (tracker, proxy, assign) de una base
+de datos lenta o caída:
+
+- CLOSED:    las llamadas pasan, con un deadline corto
+- OPEN:      demasiadas llamadas lentas o fallidas en la ventana reciente;
+             se rechaza al instante y el caller sirve su fallback
+- HALF_OPEN: pasado open_seconds se dejan pasar unas pocas llamadas
+             de prueba; si van bien se cierra, si no se vuelve a abrir
+
+Una llamada cuenta como mala si falla por la base de datos (conexión,
+timeout, interfaz de asyncpg), vence el deadline o tarda más de
+slow_call_ms (tripping por latencia, no solo por errores). Los errores
+de la propia llamada (un id inválido, una constraint...) se propagan
+pero no cuentan: la base de datos respondió, y requests basura no
+deben abrir el circuito de todos los clientes.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import asyncpg
+
+from config.settings import settings
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+# Breaker compartido por las lecturas/escrituras de los endpoints públicos
+PUBLIC_DB_CIRCUIT = 'public_db'
+
+# Errores de infraestructura: los únicos que cuentan como fallo
+# (asyncio.TimeoutError es TimeoutError ⊂ OSError)
+INFRASTRUCTURE_ERRORS = (
+    OSError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+    asyncpg.TooManyConnectionsError,
+    asyncpg.QueryCanceledError
+)
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: usar fallback"""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con ventana deslizante de llamadas recientes
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_ms: float = 500,
+        failure_rate: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 15.0,
+        half_open_probes: int = 3,
+        call_deadline_ms: float = 1500
+    ):
+        self.name = name
+        self.slow_call_seconds = slow_call_ms / 1000
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.call_deadline = call_deadline_ms / 1000
+
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self._window: deque = deque(maxlen=window_size)  # True = llamada mala
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        # Métricas
+        self.calls = 0
+        self.slow_calls = 0
+        self.failed_calls = 0
+        self.rejected_calls = 0
+        self.fallbacks_served = 0
+        self.times_opened = 0
+
+    @classmethod
+    def from_settings(cls, name: str, settings) -> 'CircuitBreaker':
+        return cls(
+            name=name,
+            slow_call_ms=settings.CIRCUIT_SLOW_CALL_MS,
+            failure_rate=settings.CIRCUIT_FAILURE_RATE,
+            window_size=settings.CIRCUIT_WINDOW_SIZE,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES,
+            call_deadline_ms=settings.CIRCUIT_CALL_DEADLINE_MS
+        )
+
+    @property
+    def is_open(self) -> bool:
+        self._maybe_half_open()
+        return self.state == STATE_OPEN
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Ejecutar func(*args, **kwargs) protegido por el circuito
+
+        Raises:
+            CircuitOpenError: circuito abierto (o sin hueco para probe)
+            asyncio.TimeoutError: se superó el deadline
+            Exception: el error original de func
+        """
+        self._maybe_half_open()
+
+        probe = False
+        if self.state == STATE_OPEN:
+            self.rejected_calls += 1
+            raise CircuitOpenError(self.name)
+
+        if self.state == STATE_HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.rejected_calls += 1
+                raise CircuitOpenError(self.name)
+            self._probes_in_flight += 1
+            probe = True
+
+        self.calls += 1
+        start = time.monotonic()
+        bad = None  # None = cancelada: solo se libera el hueco del probe
+
+        try:
+            result = await asyncio.wait_for(
+                func(*args, **kwargs),
+                timeout=self.call_deadline
+            )
+        except INFRASTRUCTURE_ERRORS:
+            self.failed_calls += 1
+            bad = True
+            raise
+        except Exception:
+            # Error de la llamada, no de la base de datos
+            bad = self._is_slow(start)
+            raise
+        else:
+            bad = self._is_slow(start)
+        finally:
+            if bad is not None:
+                self._record(bad=bad, probe=probe)
+            elif probe:
+                self._release_probe()
+
+        return result
+
+    def _is_slow(self, start: float) -> bool:
+        slow = time.monotonic() - start > self.slow_call_seconds
+        if slow:
+            self.slow_calls += 1
+        return slow
+
+    def record_fallback(self) -> None:
+        """Contabilizar una respuesta servida desde el fallback"""
+        self.fallbacks_served += 1
+
+    def _maybe_half_open(self) -> None:
+        if (
+            self.state == STATE_OPEN
+            and time.monotonic() - self.opened_at >= self.open_seconds
+        ):
+            self.state = STATE_HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+
+    def _record(self, bad: bool, probe: bool) -> None:
+        if probe:
+            self._release_probe()
+
+            if self.state != STATE_HALF_OPEN:
+                return
+
+            if bad:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = STATE_CLOSED
+                    self._window.clear()
+            return
+
+        self._window.append(bad)
+
+        if self.state == STATE_CLOSED and len(self._window) >= self.min_calls:
+            if sum(self._window) / len(self._window) >= self.failure_rate:
+                self._open()
+
+    def _release_probe(self) -> None:
+        # El hueco pudo resetearse ya (nuevo HALF_OPEN mientras tanto)
+        self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self) -> None:
+        self.state = STATE_OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._window.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        self._maybe_half_open()
+        return {
+            'state': self.state,
+            'calls': self.calls,
+            'slow_calls': self.slow_calls,
+            'failed_calls': self.failed_calls,
+            'rejected_calls': self.rejected_calls,
+            'fallbacks_served': self.fallbacks_served,
+            'times_opened': self.times_opened,
+            'recent_bad_calls': sum(self._window),
+            'recent_calls': len(self._window)
+        }
+
+
+# Registry de breakers por nombre
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get (or create) circuit breaker by name"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker.from_settings(name, settings)
+        _breakers[name] = breaker
+    return breaker
+
+def get_circuit_breakers_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats de todos los breakers registrados"""
+    return {name: breaker.get_stats() for name, breaker in _breakers.items()}
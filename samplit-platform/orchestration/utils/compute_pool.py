@@ -0,0 +1,241 @@
+# orchestration/utils/compute_pool.py
+
+"""
+Compute Pool
+
+Trabajo CPU (Monte Carlo, scipy) fuera del event loop, en un pool
+de procesos acotado. Mientras un dashboard calcula analytics, los
+endpoints de visitantes (tracker, assign) del mismo worker siguen
+respondiendo.
+
+- Jobs tipados: dataclasses picklables con run() puro (sin I/O)
+- Cola acotada: si está llena se rechaza (ComputePoolBusy → 503)
+- Timeout por job (ComputeJobTimeout → 504)
+- Métricas de profundidad de cola, latencia y resultados
+
+Un job que vence el timeout ya no se espera, pero si estaba
+ejecutándose en un proceso termina igualmente: su slot se libera
+cuando acaba de verdad, así la cola nunca supera el límite.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Generic, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class ComputeJob(Generic[T]):
+    """
+    Base de los jobs del pool
+
+    Subclases: dataclasses con los datos de entrada (tipos simples,
+    se envían por pickle al worker) y run() → resultado.
+    """
+
+    name = 'job'
+
+    def run(self) -> T:
+        raise NotImplementedError
+
+
+class ComputePoolBusy(Exception):
+    """La cola del pool está llena"""
+
+
+class ComputeJobTimeout(Exception):
+    """El job no terminó dentro de su timeout"""
+
+
+def _execute(job: ComputeJob[T]) -> T:
+    # Top-level para que sea picklable
+    return job.run()
+
+
+class ComputePool:
+    """
+    Pool acotado para jobs CPU
+    """
+
+    def __init__(
+        self,
+        kind: str = 'process',
+        max_workers: int = 2,
+        max_queue: int = 16,
+        default_timeout: float = 10.0
+    ):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"Unknown compute pool kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.default_timeout = default_timeout
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.in_flight = 0          # En cola + ejecutándose
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self._jobs: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> 'ComputePool':
+        return cls(
+            kind=settings.ANALYTICS_POOL_KIND,
+            max_workers=settings.ANALYTICS_POOL_WORKERS,
+            max_queue=settings.ANALYTICS_POOL_MAX_QUEUE,
+            default_timeout=settings.ANALYTICS_JOB_TIMEOUT_SECONDS
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                # spawn, no fork: el proceso padre tiene threads
+                # (event loop, resolvers) que no sobreviven a un fork
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='compute'
+                )
+        return self._executor
+
+    async def submit(self, job: ComputeJob[T], timeout: Optional[float] = None) -> T:
+        """
+        Ejecutar job en el pool y esperar su resultado
+
+        Raises:
+            ComputePoolBusy: cola llena
+            ComputeJobTimeout: no terminó en timeout segundos
+        """
+        with self._lock:
+            if self.in_flight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ComputePoolBusy(
+                    f"Compute pool full ({self.in_flight} jobs in flight)"
+                )
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.submitted += 1
+
+        started = time.monotonic()
+        try:
+            future = self._get_executor().submit(_execute, job)
+        except BrokenProcessPool:
+            self._release(None)
+            self._reset_executor()
+            raise
+        except Exception:
+            self._release(None)
+            raise
+
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=timeout or self.default_timeout
+            )
+        except asyncio.TimeoutError:
+            self._count(job.name, 'timeouts')
+            with self._lock:
+                self.timeouts += 1
+            logger.warning(f"Compute job {job.name} timed out")
+            raise ComputeJobTimeout(f"{job.name} exceeded {timeout or self.default_timeout}s")
+        except BrokenProcessPool:
+            # Un worker murió (OOM, señal): el siguiente submit crea otro pool
+            self._reset_executor()
+            with self._lock:
+                self.failed += 1
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception:
+            self._count(job.name, 'failed')
+            with self._lock:
+                self.failed += 1
+            raise
+
+        self._count(job.name, 'completed', time.monotonic() - started)
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _release(self, future: Optional[Future]) -> None:
+        # Callback del executor: se llama desde otro thread
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count(self, name: str, outcome: str, seconds: float = 0.0) -> None:
+        with self._lock:
+            stats = self._jobs.setdefault(
+                name, {'completed': 0, 'failed': 0, 'timeouts': 0, 'total_seconds': 0.0}
+            )
+            stats[outcome] += 1
+            stats['total_seconds'] += seconds
+
+    def _reset_executor(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Parar los workers (jobs pendientes se cancelan)"""
+        self._reset_executor()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'kind': self.kind,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queue_depth': max(0, self.in_flight - self.max_workers),
+                'peak_in_flight': self.peak_in_flight,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+                'jobs': {
+                    name: {
+                        'completed': int(stats['completed']),
+                        'failed': int(stats['failed']),
+                        'timeouts': int(stats['timeouts']),
+                        'avg_ms': round(
+                            stats['total_seconds'] * 1000 / stats['completed'], 2
+                        ) if stats['completed'] else None
+                    }
+                    for name, stats in self._jobs.items()
+                }
+            }
+
+
+# Singleton instance
+_compute_pool: Optional[ComputePool] = None
+
+def get_compute_pool() -> ComputePool:
+    """Get singleton compute pool (los workers arrancan con el primer job)"""
+    global _compute_pool
+    if _compute_pool is None:
+        from config.settings import settings
+        _compute_pool = ComputePool.from_settings(settings)
+    return _compute_pool
@@ -0,0 +1,240 @@
+# orchestration/utils/export_stream.py
+
+"""
+Export Stream
+
+Codificación en streaming de exports grandes (allocations de un
+experimento): las filas llegan por chunks desde un cursor del
+servidor, se codifican y se comprimen al vuelo. En memoria solo hay
+un chunk, da igual el número total de filas.
+
+- CSV / NDJSON: texto, comprimido con gzip (opcional)
+- Parquet: columnar, un row group por chunk, compresión interna
+  zstd (requiere pyarrow; es opcional)
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Sequence
+from uuid import UUID
+
+from integration.proxy.compression import Encoder
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él no hay Parquet
+    pa = None
+    pq = None
+
+
+class ExportFormatUnavailable(Exception):
+    """Formato desconocido o sin su dependencia instalada"""
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """Columna exportada: nombre y tipo lógico (string, timestamp, float)"""
+    name: str
+    kind: str = 'string'
+
+
+ALLOCATION_EXPORT_COLUMNS = [
+    ExportColumn('id'),
+    ExportColumn('variant_id'),
+    ExportColumn('variant_name'),
+    ExportColumn('user_identifier'),
+    ExportColumn('session_id'),
+    ExportColumn('allocated_at', 'timestamp'),
+    ExportColumn('converted_at', 'timestamp'),
+    ExportColumn('conversion_value', 'float')
+]
+
+
+def _plain(value: Any) -> Any:
+    """Valor de la DB → tipo serializable en texto"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+# ============================================
+# ENCODERS
+# ============================================
+
+class CsvEncoder:
+    media_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+    compressible = True
+
+    def __init__(self, columns: Sequence[ExportColumn]):
+        self.columns = [column.name for column in columns]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+
+    def header(self) -> bytes:
+        self._writer.writerow(self.columns)
+        return self._take()
+
+    def encode(self, rows: Sequence[Mapping[str, Any]]) -> bytes:
+        self._writer.writerows(
+            ['' if row[name] is None else _plain(row[name]) for name in self.columns]
+            for row in rows
+        )
+        return self._take()
+
+    def finish(self) -> bytes:
+        return b''
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue().encode('utf-8')
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class NdjsonEncoder:
+    media_type = 'application/x-ndjson'
+    extension = 'ndjson'
+    compressible = True
+
+    def __init__(self, columns: Sequence[ExportColumn]):
+        self.columns = [column.name for column in columns]
+
+    def header(self) -> bytes:
+        return b''
+
+    def encode(self, rows: Sequence[Mapping[str, Any]]) -> bytes:
+        return ''.join(
+            json.dumps({name: _plain(row[name]) for name in self.columns}) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+    def finish(self) -> bytes:
+        return b''
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichero de solo escritura que se vacía tras cada row group"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ParquetEncoder:
+    media_type = 'application/vnd.apache.parquet'
+    extension = 'parquet'
+    compressible = False  # Ya va comprimido por columna
+
+    _TYPES = {
+        'string': lambda: pa.string(),
+        'timestamp': lambda: pa.timestamp('us', tz='UTC'),
+        'float': lambda: pa.float64()
+    }
+
+    def __init__(self, columns: Sequence[ExportColumn], compression: str = 'zstd'):
+        if pa is None:
+            raise ExportFormatUnavailable("Parquet export requires pyarrow")
+
+        self.columns = list(columns)
+        self.schema = pa.schema([
+            (column.name, self._TYPES[column.kind]()) for column in self.columns
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression=compression)
+
+    def header(self) -> bytes:
+        return b''
+
+    def encode(self, rows: Sequence[Mapping[str, Any]]) -> bytes:
+        data: Dict[str, List[Any]] = {}
+        for column in self.columns:
+            values = [row[column.name] for row in rows]
+            if column.kind == 'string':
+                values = [None if v is None else str(v) for v in values]
+            elif column.kind == 'float':
+                values = [None if v is None else float(v) for v in values]
+            data[column.name] = values
+
+        self._writer.write_table(pa.Table.from_pydict(data, schema=self.schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': CsvEncoder,
+    'ndjson': NdjsonEncoder,
+    'parquet': ParquetEncoder
+}
+
+
+def make_encoder(export_format: str, columns: Sequence[ExportColumn]):
+    encoder_class = EXPORT_FORMATS.get(export_format)
+    if encoder_class is None:
+        raise ExportFormatUnavailable(f"Unknown export format: {export_format}")
+    return encoder_class(columns)
+
+
+# ============================================
+# STREAM
+# ============================================
+
+async def encode_export(
+    chunks: AsyncIterator[Sequence[Mapping[str, Any]]],
+    encoder,
+    compression: Optional[str] = 'gzip',
+    level: int = 6
+) -> AsyncIterator[bytes]:
+    """
+    Chunks de filas → bytes del fichero exportado
+
+    compression solo aplica a formatos de texto (Parquet ya va comprimido).
+    """
+    compressor = Encoder(compression, level) if compression and encoder.compressible else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor and data else data
+
+    header = emit(encoder.header())
+    if header:
+        yield header
+
+    async for rows in chunks:
+        data = emit(encoder.encode(rows))
+        if data:
+            yield data
+
+    tail = encoder.finish()
+    if compressor:
+        tail = (compressor.compress(tail) if tail else b'') + compressor.finish()
+    if tail:
+        yield tail
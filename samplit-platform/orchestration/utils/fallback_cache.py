@@ -0,0 +1,140 @@
+# orchestration/utils/fallback_cache.py
+
+"""
+Fallback Cache
+
+Última respuesta buena conocida para los endpoints públicos.
+Se usa cuando una request no puede servirse normalmente
+(load shedding, base de datos lenta) para responder rápido
+con algo razonable en vez de fallar o hacer esperar al sitio:
+
+- Config del tracker por instalación (+ URL)
+- Asignaciones sticky recientes (experimento, visitante)
+- Variante control por experimento
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class _LRU:
+    """OrderedDict acotado con timestamp por entrada"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class FallbackCache:
+    """
+    Cache en memoria (por proceso) de respuestas de respaldo
+    """
+
+    def __init__(
+        self,
+        max_configs: int = 10000,
+        max_assignments: int = 200000,
+        max_controls: int = 50000
+    ):
+        self._configs = _LRU(max_configs)
+        self._assignments = _LRU(max_assignments)
+        self._controls = _LRU(max_controls)
+        self.hits = 0
+        self.misses = 0
+
+    # ===== CONFIG DEL TRACKER =====
+
+    def remember_config(self, key: Hashable, payload: Dict[str, Any]) -> None:
+        """Guardar la última config buena (sin datos del visitante)"""
+        self._configs.set(key, payload)
+
+    def get_config(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        return self._lookup(self._configs, key)
+
+    # ===== ASIGNACIONES STICKY =====
+
+    def remember_assignment(
+        self,
+        experiment_id: str,
+        user_identifier: str,
+        variant_id: str,
+        content: Any
+    ) -> None:
+        self._assignments.set(
+            (experiment_id, user_identifier),
+            {'variant_id': variant_id, 'content': content}
+        )
+
+    def get_assignment(
+        self,
+        experiment_id: str,
+        user_identifier: str
+    ) -> Optional[Dict[str, Any]]:
+        return self._lookup(self._assignments, (experiment_id, user_identifier))
+
+    # ===== CONTROL =====
+
+    def remember_control(self, experiment_id: str, variant_id: str, content: Any) -> None:
+        """Variante control (la primera creada) de un experimento"""
+        self._controls.set(experiment_id, {'variant_id': variant_id, 'content': content})
+
+    def get_control(self, experiment_id: str) -> Optional[Dict[str, Any]]:
+        return self._lookup(self._controls, experiment_id)
+
+    def get_assignment_or_control(
+        self,
+        experiment_id: str,
+        user_identifier: str
+    ) -> Optional[Dict[str, Any]]:
+        """Asignación sticky conocida, si no la variante control"""
+        return (
+            self.get_assignment(experiment_id, user_identifier)
+            or self.get_control(experiment_id)
+        )
+
+    # ===== STATS =====
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'configs': len(self._configs),
+            'assignments': len(self._assignments),
+            'controls': len(self._controls),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _lookup(self, lru: _LRU, key: Hashable) -> Optional[Any]:
+        entry = lru.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+
+# Singleton instance
+_fallback_cache: Optional[FallbackCache] = None
+
+def get_fallback_cache() -> FallbackCache:
+    """Get singleton fallback cache"""
+    global _fallback_cache
+    if _fallback_cache is None:
+        _fallback_cache = FallbackCache()
+    return _fallback_cache
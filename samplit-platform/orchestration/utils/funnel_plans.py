@@ -0,0 +1,241 @@
+# orchestration/utils/funnel_plans.py
+
+"""
+Funnel Plans
+
+Definición de cada funnel precompilada para el hot path de
+get_next_step_variant: pasos, ids de variantes por paso, mapas
+variante → posición y la performance de todas las variantes en
+arrays paralelos. Elegir la variante del siguiente paso no toca la
+base de datos.
+
+- Primera vez: get_funnel + una query con la performance de todas las
+  variantes del funnel (WHERE id = ANY), no una por variante
+- Plan fresco (< fresh_seconds): se sirve tal cual
+- Plan viejo: se sirve y se refresca en background con una sola query
+  que trae la versión del funnel (updated_at) y la performance. Versión
+  distinta → se recompila la definición; igual → solo los arrays.
+- invalidate(): después de editar un funnel en este proceso
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from data_access.database import DatabaseManager
+from orchestration.utils.single_flight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+FUNNEL_PLANS_FLIGHT = 'funnel_plans'
+
+
+@dataclass(frozen=True)
+class FunnelStepPlan:
+    """Un paso del funnel con sus variantes indexadas"""
+    step: Dict[str, Any]                  # Definición original (para la respuesta)
+    step_id: str
+    variant_ids: Tuple[str, ...]
+    variants: Tuple[Dict[str, Any], ...]
+    index: Dict[str, int]                 # variant_id → posición en el paso
+    positions: Tuple[int, ...]            # Posición de cada variante en los arrays del plan
+
+
+class FunnelPlan:
+    """
+    Funnel compilado + performance de sus variantes
+    """
+
+    def __init__(self, funnel_id: str, version: Any, steps: Tuple[FunnelStepPlan, ...]):
+        self.funnel_id = funnel_id
+        self.version = version
+        self.steps = steps
+
+        # Arrays paralelos a variant_ids (todas las variantes del funnel)
+        self.variant_ids: Tuple[str, ...] = tuple(dict.fromkeys(
+            variant_id for step in steps for variant_id in step.variant_ids
+        ))
+        self.samples: List[int] = [0] * len(self.variant_ids)
+        self.conversion_rates: List[float] = [0.0] * len(self.variant_ids)
+        self.checked_at = 0.0
+
+    def apply_performance(self, performance: Dict[str, Dict[str, Any]]) -> None:
+        """Reemplazar los arrays de performance (un solo swap por array)"""
+        empty = {'sample_size': 0, 'conversion_rate': 0.0}
+        rows = [performance.get(variant_id, empty) for variant_id in self.variant_ids]
+
+        self.samples = [row['sample_size'] for row in rows]
+        self.conversion_rates = [row['conversion_rate'] for row in rows]
+        self.checked_at = time.monotonic()
+
+    def options(self, step: FunnelStepPlan) -> List[Dict[str, Any]]:
+        """Opciones del optimizer para un paso, desde los arrays"""
+        samples, rates = self.samples, self.conversion_rates
+        return [
+            {
+                'id': variant['id'],
+                'content': variant.get('content'),
+                'performance': rates[position],
+                'samples': samples[position]
+            }
+            for variant, position in zip(step.variants, step.positions)
+        ]
+
+
+def compile_funnel_plan(funnel: Dict[str, Any]) -> FunnelPlan:
+    """Pasos → FunnelStepPlan (steps JSONB llega como str sin codec)"""
+    steps = funnel['steps']
+    if isinstance(steps, str):
+        steps = json.loads(steps)
+
+    step_plans = []
+    positions: Dict[str, int] = {}
+
+    for order, step in enumerate(steps):
+        variants = tuple(
+            {**variant, 'id': str(variant['id'])} for variant in step.get('variants', [])
+        )
+        variant_ids = tuple(variant['id'] for variant in variants)
+        for variant_id in variant_ids:
+            positions.setdefault(variant_id, len(positions))
+
+        step_plans.append(FunnelStepPlan(
+            step=step,
+            step_id=str(step.get('id', order)),
+            variant_ids=variant_ids,
+            variants=variants,
+            index={variant_id: i for i, variant_id in enumerate(variant_ids)},
+            positions=tuple(positions[variant_id] for variant_id in variant_ids)
+        ))
+
+    return FunnelPlan(str(funnel['id']), funnel.get('updated_at'), tuple(step_plans))
+
+
+class FunnelPlanCache:
+    """
+    Planes de funnel en memoria (por proceso)
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        fresh_seconds: float = 10.0,
+        max_funnels: int = 1000
+    ):
+        self.db = db
+        self.fresh_seconds = fresh_seconds
+        self.max_funnels = max_funnels
+
+        self._plans: 'OrderedDict[str, FunnelPlan]' = OrderedDict()
+        self._refreshing: Set[asyncio.Task] = set()
+        self._flight = get_single_flight(FUNNEL_PLANS_FLIGHT)
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.recompiles = 0
+        self.refresh_failures = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'FunnelPlanCache':
+        return cls(
+            db,
+            fresh_seconds=settings.FUNNEL_PLAN_FRESH_SECONDS,
+            max_funnels=settings.FUNNEL_PLAN_MAX_FUNNELS
+        )
+
+    async def get(self, funnel_id: str) -> Optional[FunnelPlan]:
+        """Plan del funnel; None si no existe"""
+        funnel_id = str(funnel_id)
+        plan = self._plans.get(funnel_id)
+
+        if plan is not None:
+            self.hits += 1
+            self._plans.move_to_end(funnel_id)
+            now = time.monotonic()
+            if now - plan.checked_at >= self.fresh_seconds:
+                # Un refresh por intervalo, no uno por request mientras dura
+                plan.checked_at = now
+                self._refresh(funnel_id)
+            return plan
+
+        self.misses += 1
+        return await self._flight.do(('load', funnel_id), lambda: self._load(funnel_id))
+
+    def invalidate(self, funnel_id: str) -> None:
+        self._plans.pop(str(funnel_id), None)
+
+    # ===== CARGA =====
+
+    async def _load(self, funnel_id: str) -> Optional[FunnelPlan]:
+        funnel = await self.db.get_funnel(funnel_id)
+        if funnel is None:
+            self._plans.pop(funnel_id, None)
+            return None
+
+        plan = compile_funnel_plan(funnel)
+        state = await self.db.get_funnel_plan_state(funnel_id, list(plan.variant_ids))
+        if state is None:
+            return None
+
+        plan.apply_performance(state['performance'])
+        self._store(plan)
+        return plan
+
+    async def _revalidate(self, funnel_id: str) -> Optional[FunnelPlan]:
+        plan = self._plans.get(funnel_id)
+        if plan is None:
+            return await self._load(funnel_id)
+
+        state = await self.db.get_funnel_plan_state(funnel_id, list(plan.variant_ids))
+        if state is None:
+            self._plans.pop(funnel_id, None)
+            return None
+
+        if state['updated_at'] != plan.version:
+            # Definición editada (quizá desde otro worker): recompilar
+            self.recompiles += 1
+            return await self._load(funnel_id)
+
+        plan.apply_performance(state['performance'])
+        return plan
+
+    def _refresh(self, funnel_id: str) -> None:
+        self.refreshes += 1
+        task = asyncio.ensure_future(
+            self._flight.do(('refresh', funnel_id), lambda: self._revalidate(funnel_id))
+        )
+        self._refreshing.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshing.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            self.refresh_failures += 1
+            logger.warning(f"Funnel plan refresh failed: {error}")
+
+    def _store(self, plan: FunnelPlan) -> None:
+        self._plans[plan.funnel_id] = plan
+        self._plans.move_to_end(plan.funnel_id)
+
+        while len(self._plans) > self.max_funnels:
+            self._plans.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'funnels': len(self._plans),
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'recompiles': self.recompiles,
+            'refreshing': len(self._refreshing),
+            'refresh_failures': self.refresh_failures
+        }
@@ -0,0 +1,417 @@
+# orchestration/utils/funnel_session_store.py
+
+"""
+Funnel Session Store
+
+Dónde vive el estado de las sesiones de funnel en curso (paso actual y
+variantes elegidas). Dos backends:
+
+- memory: en el proceso, acotado. Records con __slots__, expiración
+  por inactividad con una timing wheel (O(1) por operación, sin
+  recorrer todas las sesiones) y un máximo de sesiones (LRU). Solo
+  sirve con un worker: otro proceso no ve las sesiones, y se pierden
+  al reiniciar. funnel_sessions se sigue escribiendo como log.
+- postgres: funnel_sessions es la fuente de verdad, compartida entre
+  workers y reinicios. Cada worker guarda una cache local read-through
+  corta; las escrituras son compare-and-set sobre `version`, así que
+  una copia vieja de la cache nunca pisa el progreso de otro worker
+  (FunnelSessionConflict → releer y repetir).
+
+En los dos, la memoria por proceso está acotada (max_sessions /
+cache_size) por mucho tráfico que haya.
+"""
+
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from data_access.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORY = 'memory'
+BACKEND_POSTGRES = 'postgres'
+
+
+@dataclass(slots=True)
+class FunnelSession:
+    """Active funnel session for a user"""
+    session_id: str
+    user_id: str
+    funnel_id: str
+    current_step: int
+    selections: List[str]  # Variant IDs selected at each step
+    started_at: datetime
+    context: Dict[str, Any]
+    version: int = 0       # funnel_sessions.version (compare-and-set)
+
+
+def _copy_session(session: FunnelSession) -> FunnelSession:
+    """
+    Copia para el caller: el servicio modifica la sesión antes de save(),
+    y dos requests del mismo worker no pueden compartir el objeto (ni la
+    lista de selecciones ni la versión del compare-and-set)
+    """
+    return replace(
+        session,
+        selections=list(session.selections),
+        context=dict(session.context)
+    )
+
+
+class FunnelSessionConflict(Exception):
+    """La sesión cambió (otro worker) desde que se leyó"""
+
+
+class FunnelSessionStore(ABC):
+    """
+    Sesiones de funnel en curso
+    """
+
+    @abstractmethod
+    async def create(self, session: FunnelSession) -> None:
+        """Guardar una sesión nueva"""
+
+    @abstractmethod
+    async def get(self, session_id: str, fresh: bool = False) -> Optional[FunnelSession]:
+        """Sesión abierta, o None si no existe / expiró / terminó"""
+
+    @abstractmethod
+    async def save(self, session: FunnelSession) -> None:
+        """
+        Persistir el progreso (paso actual, selecciones)
+
+        Raises:
+            FunnelSessionConflict: la sesión cambió desde que se leyó
+        """
+
+    @abstractmethod
+    async def record_conversion(
+        self,
+        session: FunnelSession,
+        value: float,
+        metadata: Optional[Dict] = None
+    ) -> None:
+        """Marcar la sesión como convertida y dejar de tenerla en curso"""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        pass
+
+
+# ============================================
+# MEMORY
+# ============================================
+
+class _SessionRecord:
+    """Una sesión en memoria y su posición en la timing wheel"""
+    __slots__ = ('session', 'expires_at', 'tick')
+
+    def __init__(self, session: FunnelSession, expires_at: float, tick: int):
+        self.session = session
+        self.expires_at = expires_at
+        self.tick = tick
+
+
+class InMemoryFunnelSessionStore(FunnelSessionStore):
+    """
+    Sesiones en el proceso con TTL (timing wheel) y máximo de sesiones
+
+    La wheel tiene un bucket por tick de tick_seconds y da una vuelta
+    en algo más que ttl_seconds: cada sesión está en el bucket del tick
+    en que expira. Con cada operación se vacían los buckets de los
+    ticks ya pasados; un acceso mueve la sesión a su nuevo bucket.
+    """
+
+    def __init__(
+        self,
+        db: Optional[DatabaseManager] = None,
+        ttl_seconds: float = 1800.0,
+        max_sessions: int = 100000,
+        tick_seconds: float = 1.0
+    ):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.tick_seconds = tick_seconds
+
+        self._records: 'OrderedDict[str, _SessionRecord]' = OrderedDict()
+        self._wheel: List[Set[str]] = [
+            set() for _ in range(int(math.ceil(ttl_seconds / tick_seconds)) + 2)
+        ]
+        self._cursor = self._tick(time.monotonic())
+
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'InMemoryFunnelSessionStore':
+        return cls(
+            db,
+            ttl_seconds=settings.FUNNEL_SESSION_TTL_SECONDS,
+            max_sessions=settings.FUNNEL_SESSION_MAX_SESSIONS
+        )
+
+    async def create(self, session: FunnelSession) -> None:
+        self._put(session)
+        if self.db is not None:
+            await self.db.create_funnel_session(session)
+
+    async def get(self, session_id: str, fresh: bool = False) -> Optional[FunnelSession]:
+        # Aquí la memoria es la fuente de verdad: fresh no cambia nada
+        now = time.monotonic()
+        self._expire(now)
+
+        record = self._records.get(session_id)
+        if record is None or record.expires_at <= now:
+            if record is not None:
+                self._remove(session_id)
+                self.expired += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._schedule(record, now)
+        self._records.move_to_end(session_id)
+        return _copy_session(record.session)
+
+    async def save(self, session: FunnelSession) -> None:
+        if self.db is not None:
+            version = await self.db.update_funnel_session(session)
+            if version is not None:
+                session.version = version
+        self._put(session)
+
+    async def record_conversion(
+        self,
+        session: FunnelSession,
+        value: float,
+        metadata: Optional[Dict] = None
+    ) -> None:
+        self._remove(session.session_id)
+        if self.db is not None:
+            await self.db.record_funnel_conversion(
+                session=session,
+                value=value,
+                metadata=metadata
+            )
+
+    # ===== TIMING WHEEL =====
+
+    def _tick(self, at: float) -> int:
+        return int(at // self.tick_seconds)
+
+    def _put(self, session: FunnelSession) -> None:
+        now = time.monotonic()
+        self._expire(now)
+
+        record = self._records.get(session.session_id)
+        if record is None:
+            record = _SessionRecord(session, 0.0, -1)
+            self._records[session.session_id] = record
+        record.session = _copy_session(session)
+
+        self._schedule(record, now)
+        self._records.move_to_end(session.session_id)
+
+        # Máximo de sesiones: fuera las de actividad más antigua
+        while len(self._records) > self.max_sessions:
+            session_id = next(iter(self._records))
+            self._remove(session_id)
+            self.evicted += 1
+
+    def _schedule(self, record: _SessionRecord, now: float) -> None:
+        """(Re)colocar la sesión en el bucket de su nuevo tick de expiración"""
+        record.expires_at = now + self.ttl_seconds
+        tick = self._tick(record.expires_at)
+        if tick == record.tick:
+            return
+
+        session_id = record.session.session_id
+        if record.tick >= 0:
+            self._wheel[record.tick % len(self._wheel)].discard(session_id)
+        self._wheel[tick % len(self._wheel)].add(session_id)
+        record.tick = tick
+
+    def _expire(self, now: float) -> None:
+        """Vaciar los buckets de los ticks ya pasados"""
+        current = self._tick(now)
+        # Tras mucho tiempo sin actividad basta con una vuelta
+        start = max(self._cursor, current - len(self._wheel))
+
+        for tick in range(start, current):
+            bucket = self._wheel[tick % len(self._wheel)]
+            for session_id in list(bucket):
+                record = self._records.get(session_id)
+                if record is None or record.expires_at <= now:
+                    bucket.discard(session_id)
+                    if record is not None:
+                        del self._records[session_id]
+                        self.expired += 1
+
+        self._cursor = max(self._cursor, current)
+
+    def _remove(self, session_id: str) -> None:
+        record = self._records.pop(session_id, None)
+        if record is not None and record.tick >= 0:
+            self._wheel[record.tick % len(self._wheel)].discard(session_id)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': BACKEND_MEMORY,
+            'sessions': len(self._records),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired,
+            'evicted': self.evicted
+        }
+
+
+# ============================================
+# POSTGRES
+# ============================================
+
+class _CachedSession:
+    __slots__ = ('session', 'fetched_at')
+
+    def __init__(self, session: FunnelSession, fetched_at: float):
+        self.session = session
+        self.fetched_at = fetched_at
+
+
+class PostgresFunnelSessionStore(FunnelSessionStore):
+    """
+    Sesiones en funnel_sessions (compartidas entre workers) con cache local
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        ttl_seconds: float = 1800.0,
+        cache_seconds: float = 5.0,
+        cache_size: int = 10000
+    ):
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.cache_seconds = cache_seconds
+        self.cache_size = cache_size
+
+        self._cache: 'OrderedDict[str, _CachedSession]' = OrderedDict()
+
+        # Métricas
+        self.cache_hits = 0
+        self.reads = 0
+        self.misses = 0
+        self.conflicts = 0
+
+    @classmethod
+    def from_settings(cls, db: DatabaseManager, settings) -> 'PostgresFunnelSessionStore':
+        return cls(
+            db,
+            ttl_seconds=settings.FUNNEL_SESSION_TTL_SECONDS,
+            cache_seconds=settings.FUNNEL_SESSION_CACHE_SECONDS,
+            cache_size=settings.FUNNEL_SESSION_CACHE_SIZE
+        )
+
+    async def create(self, session: FunnelSession) -> None:
+        await self.db.create_funnel_session(session)
+        self._remember(session)
+
+    async def get(self, session_id: str, fresh: bool = False) -> Optional[FunnelSession]:
+        if not fresh:
+            cached = self._cache.get(session_id)
+            if cached is not None and time.monotonic() - cached.fetched_at < self.cache_seconds:
+                self.cache_hits += 1
+                self._cache.move_to_end(session_id)
+                return _copy_session(cached.session)
+
+        self.reads += 1
+        row = await self.db.get_funnel_session(session_id, self.ttl_seconds)
+        if row is None:
+            self.misses += 1
+            self._cache.pop(session_id, None)
+            return None
+
+        session = FunnelSession(
+            session_id=row['session_id'],
+            user_id=row['user_identifier'],
+            funnel_id=str(row['funnel_id']),
+            current_step=row['current_step_index'] or 0,
+            selections=_json(row['selected_variants'], []),
+            started_at=row['started_at'],
+            context=_json(row['user_context'], {}),
+            version=row['version']
+        )
+        self._remember(session)
+        return _copy_session(session)
+
+    async def save(self, session: FunnelSession) -> None:
+        version = await self.db.update_funnel_session(session)
+        if version is None:
+            self.conflicts += 1
+            self._cache.pop(session.session_id, None)
+            raise FunnelSessionConflict(session.session_id)
+
+        session.version = version
+        self._remember(session)
+
+    async def record_conversion(
+        self,
+        session: FunnelSession,
+        value: float,
+        metadata: Optional[Dict] = None
+    ) -> None:
+        self._cache.pop(session.session_id, None)
+        await self.db.record_funnel_conversion(
+            session=session,
+            value=value,
+            metadata=metadata
+        )
+
+    def _remember(self, session: FunnelSession) -> None:
+        self._cache[session.session_id] = _CachedSession(
+            _copy_session(session),
+            time.monotonic()
+        )
+        self._cache.move_to_end(session.session_id)
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'backend': BACKEND_POSTGRES,
+            'cached_sessions': len(self._cache),
+            'cache_hits': self.cache_hits,
+            'reads': self.reads,
+            'misses': self.misses,
+            'conflicts': self.conflicts
+        }
+
+
+def _json(value: Any, default: Any) -> Any:
+    """JSONB de asyncpg (str sin codec registrado)"""
+    if value is None:
+        return default
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def create_funnel_session_store(db: DatabaseManager, settings) -> FunnelSessionStore:
+    """Backend según FUNNEL_SESSION_BACKEND"""
+    if settings.FUNNEL_SESSION_BACKEND == BACKEND_MEMORY:
+        return InMemoryFunnelSessionStore.from_settings(db, settings)
+    if settings.FUNNEL_SESSION_BACKEND == BACKEND_POSTGRES:
+        return PostgresFunnelSessionStore.from_settings(db, settings)
+    raise ValueError(f"Unknown funnel session backend: {settings.FUNNEL_SESSION_BACKEND}")
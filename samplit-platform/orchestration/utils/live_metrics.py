@@ -0,0 +1,389 @@
+# orchestration/utils/live_metrics.py
+
+"""
+Live Metrics
+
+Pub/sub en proceso de métricas por experimento para los dashboards
+(Server-Sent Events en vez de polling).
+
+Un canal por experimento con al menos un suscriptor:
+
+- Una sola tarea upstream por canal lee los contadores de variantes
+  (una query barata) y publica solo lo que cambió
+- Los contadores que se escriben en este proceso (allocations,
+  conversiones) despiertan al canal con notify(); los de otros
+  workers se recogen con un poll lento
+- Las ráfagas se agrupan: como mucho una lectura cada min_interval
+- Fan-out a N suscriptores: el coste sigue a los cambios, no a los
+  dashboards abiertos
+
+Cada evento tiene id "<epoch>-<seq>": un cliente que reconecta con
+Last-Event-ID recibe los eventos que se perdió (o un snapshot si ya
+no están en el historial o el canal es otro).
+
+Con un StoppingRuleEngine cada evento lleva además la decisión de
+parada, recalculada (incremental) con cada cambio de contadores.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from orchestration.services.analytics_jobs import BetaArm
+from orchestration.utils.stopping_rules import StoppingRuleEngine, get_stopping_rules
+
+logger = logging.getLogger(__name__)
+
+# Contadores por variante: {variant_id: {'allocations': int, 'conversions': int}}
+CountsLoader = Callable[[], Awaitable[Dict[str, Dict[str, int]]]]
+
+EVENT_SNAPSHOT = 'snapshot'
+EVENT_DELTA = 'delta'
+
+
+@dataclass
+class LiveEvent:
+    """Un evento publicado en un canal"""
+    id: str
+    event: str
+    data: Dict[str, Any]
+
+
+@dataclass(eq=False)
+class _Subscriber:
+    queue: asyncio.Queue
+    lagged: bool = False
+
+
+@dataclass
+class _Channel:
+    experiment_id: str
+    loader: CountsLoader
+    epoch: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    seq: int = 0
+    state: Optional[Dict[str, Dict[str, int]]] = None
+    stopping: Optional[Dict[str, Any]] = None
+    history: Deque[LiveEvent] = field(default_factory=deque)
+    subscribers: Set[_Subscriber] = field(default_factory=set)
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task] = None
+    idle_since: Optional[float] = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+
+class LiveMetricsHub:
+    """
+    Canales de métricas en vivo por experimento (por proceso)
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 5.0,
+        min_interval: float = 1.0,
+        heartbeat_interval: float = 15.0,
+        history_size: int = 100,
+        queue_size: int = 32,
+        idle_linger: float = 30.0,
+        stopping: Optional[StoppingRuleEngine] = None
+    ):
+        self.poll_interval = poll_interval
+        self.min_interval = min_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self.idle_linger = idle_linger
+        self.stopping = stopping
+
+        self._channels: Dict[str, _Channel] = {}
+
+        # Métricas
+        self.loads = 0
+        self.load_failures = 0
+        self.events_published = 0
+        self.resumed = 0
+        self.resyncs = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> 'LiveMetricsHub':
+        return cls(
+            poll_interval=settings.LIVE_METRICS_POLL_SECONDS,
+            min_interval=settings.LIVE_METRICS_MIN_INTERVAL_SECONDS,
+            heartbeat_interval=settings.LIVE_METRICS_HEARTBEAT_SECONDS,
+            history_size=settings.LIVE_METRICS_HISTORY_SIZE,
+            stopping=get_stopping_rules()
+        )
+
+    # ===== PRODUCTORES =====
+
+    def notify(self, experiment_id: str) -> None:
+        """Los contadores del experimento cambiaron (no-op sin suscriptores)"""
+        channel = self._channels.get(str(experiment_id))
+        if channel is not None:
+            channel.wake.set()
+
+    # ===== SUSCRIPTORES =====
+
+    async def subscribe(
+        self,
+        experiment_id: str,
+        loader: CountsLoader,
+        last_event_id: Optional[str] = None
+    ) -> AsyncIterator[Optional[LiveEvent]]:
+        """
+        Eventos del experimento; None = heartbeat (nada que enviar)
+
+        loader solo se usa si el canal no existe todavía.
+        """
+        channel = self._get_channel(str(experiment_id), loader)
+        subscriber = _Subscriber(queue=asyncio.Queue(maxsize=self.queue_size))
+
+        channel.subscribers.add(subscriber)
+        channel.idle_since = None
+
+        try:
+            while channel.state is None:
+                try:
+                    await asyncio.wait_for(channel.ready.wait(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield None
+
+            for event in self._catch_up(channel, last_event_id):
+                yield event
+
+            while True:
+                if subscriber.lagged:
+                    # No daba abasto: descartar la cola y mandar el estado actual
+                    subscriber.lagged = False
+                    self._drain(subscriber.queue)
+                    self.resyncs += 1
+                    yield self._snapshot(channel)
+                    continue
+
+                try:
+                    yield await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=self.heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers:
+                channel.idle_since = time.monotonic()
+
+    def _catch_up(self, channel: _Channel, last_event_id: Optional[str]):
+        """Eventos perdidos desde last_event_id, o snapshot"""
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition('-')
+            oldest = channel.history[0] if channel.history else None
+            oldest_seq = int(oldest.id.rsplit('-', 1)[1]) if oldest else channel.seq + 1
+
+            if epoch == channel.epoch and seq.isdigit() and int(seq) >= oldest_seq - 1:
+                self.resumed += 1
+                return [
+                    event for event in channel.history
+                    if int(event.id.rsplit('-', 1)[1]) > int(seq)
+                ]
+
+        return [self._snapshot(channel)]
+
+    def _snapshot(self, channel: _Channel) -> LiveEvent:
+        data = _payload(channel.experiment_id, channel.state or {}, channel.state or {})
+        if channel.stopping is not None:
+            data['stopping'] = channel.stopping
+        return LiveEvent(id=channel.event_id(channel.seq), event=EVENT_SNAPSHOT, data=data)
+
+    @staticmethod
+    def _drain(queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            queue.get_nowait()
+
+    # ===== UPSTREAM =====
+
+    def _get_channel(self, experiment_id: str, loader: CountsLoader) -> _Channel:
+        channel = self._channels.get(experiment_id)
+        if channel is None or channel.task is None or channel.task.done():
+            channel = _Channel(
+                experiment_id=experiment_id,
+                loader=loader,
+                history=deque(maxlen=self.history_size)
+            )
+            channel.task = asyncio.ensure_future(self._run_channel(channel))
+            self._channels[experiment_id] = channel
+        return channel
+
+    async def _run_channel(self, channel: _Channel) -> None:
+        try:
+            while True:
+                await self._refresh(channel)
+
+                # Sin suscriptores un rato: cerrar el canal
+                if (
+                    not channel.subscribers
+                    and channel.idle_since is not None
+                    and time.monotonic() - channel.idle_since >= self.idle_linger
+                ):
+                    break
+
+                # Agrupar ráfagas de notify()
+                await asyncio.sleep(self.min_interval)
+
+                try:
+                    await asyncio.wait_for(channel.wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                channel.wake.clear()
+        finally:
+            if self._channels.get(channel.experiment_id) is channel:
+                del self._channels[channel.experiment_id]
+
+    async def _refresh(self, channel: _Channel) -> None:
+        try:
+            self.loads += 1
+            counts = await channel.loader()
+        except Exception as e:
+            self.load_failures += 1
+            logger.warning(f"Live metrics load failed for {channel.experiment_id}: {e}")
+            return
+
+        previous = channel.state
+        channel.state = counts
+
+        if previous != counts:
+            channel.stopping = self._evaluate_stopping(channel.experiment_id, counts)
+
+        if previous is None:
+            channel.ready.set()
+            return
+
+        changed = {
+            variant_id: values
+            for variant_id, values in counts.items()
+            if previous.get(variant_id) != values
+        }
+        removed = [variant_id for variant_id in previous if variant_id not in counts]
+
+        if changed or removed:
+            data = _payload(channel.experiment_id, counts, changed, previous)
+            if removed:
+                data['removed'] = removed
+            if channel.stopping is not None:
+                data['stopping'] = channel.stopping
+            self._publish(channel, EVENT_DELTA, data)
+
+    def _evaluate_stopping(
+        self,
+        experiment_id: str,
+        counts: Dict[str, Dict[str, int]]
+    ) -> Optional[Dict[str, Any]]:
+        """Decisión de parada con los contadores actuales (None sin engine)"""
+        if self.stopping is None:
+            return None
+
+        arms = [
+            BetaArm(
+                arm_id=variant_id,
+                alpha=values['conversions'] + 1,
+                beta=max(values['allocations'] - values['conversions'], 0) + 1
+            )
+            for variant_id, values in counts.items()
+        ]
+
+        try:
+            return self.stopping.evaluate(experiment_id, arms)
+        except Exception as e:
+            logger.warning(f"Stopping rules failed for {experiment_id}: {e}")
+            return None
+
+    def _publish(self, channel: _Channel, event_type: str, data: Dict[str, Any]) -> None:
+        channel.seq += 1
+        event = LiveEvent(id=channel.event_id(channel.seq), event=event_type, data=data)
+        channel.history.append(event)
+        self.events_published += 1
+
+        for subscriber in channel.subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                subscriber.lagged = True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'channels': len(self._channels),
+            'subscribers': sum(len(c.subscribers) for c in self._channels.values()),
+            'loads': self.loads,
+            'load_failures': self.load_failures,
+            'events_published': self.events_published,
+            'resumed': self.resumed,
+            'resyncs': self.resyncs
+        }
+
+
+def _payload(
+    experiment_id: str,
+    counts: Dict[str, Dict[str, int]],
+    variants: Dict[str, Dict[str, int]],
+    previous: Optional[Dict[str, Dict[str, int]]] = None
+) -> Dict[str, Any]:
+    """
+    Datos de un evento: variantes (todas o las que cambiaron), totales
+    y un mapa plano métrica → valor para data-live-metric
+    """
+    total_users = sum(v['allocations'] for v in counts.values())
+    total_conversions = sum(v['conversions'] for v in counts.values())
+
+    variant_data = {}
+    metrics: Dict[str, Any] = {
+        'total_users': total_users,
+        'total_conversions': total_conversions,
+        'conversion_rate': total_conversions / total_users if total_users else 0
+    }
+
+    for variant_id, values in variants.items():
+        allocations = values['allocations']
+        conversions = values['conversions']
+        rate = conversions / allocations if allocations else 0
+
+        entry = {
+            'allocations': allocations,
+            'conversions': conversions,
+            'conversion_rate': rate
+        }
+        if previous is not None:
+            before = previous.get(variant_id, {'allocations': 0, 'conversions': 0})
+            entry['delta_allocations'] = allocations - before['allocations']
+            entry['delta_conversions'] = conversions - before['conversions']
+        variant_data[variant_id] = entry
+
+        metrics[f'{variant_id}.allocations'] = allocations
+        metrics[f'{variant_id}.conversions'] = conversions
+        metrics[f'{variant_id}.conversion_rate'] = rate
+
+    return {
+        'experiment_id': experiment_id,
+        'variants': variant_data,
+        'totals': {
+            'total_users': total_users,
+            'total_conversions': total_conversions
+        },
+        'metrics': metrics
+    }
+
+
+# Singleton instance
+_live_metrics: Optional[LiveMetricsHub] = None
+
+def get_live_metrics() -> LiveMetricsHub:
+    """Get singleton live metrics hub"""
+    global _live_metrics
+    if _live_metrics is None:
+        from config.settings import settings
+        _live_metrics = LiveMetricsHub.from_settings(settings)
+    return _live_metrics
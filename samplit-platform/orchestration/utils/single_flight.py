@@ -0,0 +1,128 @@
+# orchestration/utils/single_flight.py
+
+"""
+Single Flight
+
+Coalescing de llamadas concurrentes idénticas: la primera llamada
+para una key hace el trabajo y el resto espera el mismo resultado.
+Con micro-cache opcional, el resultado se reutiliza unos segundos.
+
+El trabajo corre en su propia task: si el cliente que lo lanzó se
+desconecta, los demás que esperan siguen recibiendo el resultado.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Coalescing de páginas del proxy y de lookups de instalación
+PROXY_PAGES_FLIGHT = 'proxy_pages'
+PROXY_INSTALLATIONS_FLIGHT = 'proxy_installations'
+
+
+class SingleFlight:
+    """
+    Una ejecución en vuelo por key, resultado compartido
+    """
+
+    def __init__(self, name: str, max_cached: int = 10000):
+        self.name = name
+        self.max_cached = max_cached
+
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._cache: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+        # Métricas
+        self.leaders = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None
+    ) -> Any:
+        """
+        Ejecutar func una sola vez para todos los callers concurrentes de key
+
+        Args:
+            key: Identidad de la llamada
+            func: Trabajo a realizar (sin argumentos)
+            ttl_for: Segundos de micro-cache para un resultado (None/0 = no cachear)
+        """
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, value = cached
+            if time.monotonic() < expires_at:
+                self.cache_hits += 1
+                self._cache.move_to_end(key)
+                return value
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(self._run(key, func, ttl_for))
+        self._inflight[key] = task
+        task.add_done_callback(_consume_exception)
+
+        return await asyncio.shield(task)
+
+    async def _run(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[Any]],
+        ttl_for: Optional[Callable[[Any], Optional[float]]]
+    ) -> Any:
+        try:
+            value = await func()
+
+            ttl = ttl_for(value) if ttl_for else None
+            if ttl and ttl > 0:
+                self._cache[key] = (time.monotonic() + ttl, value)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def forget(self, key: Hashable) -> None:
+        self._cache.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'cache_hits': self.cache_hits,
+            'inflight': len(self._inflight),
+            'cached': len(self._cache)
+        }
+
+
+def _consume_exception(task: asyncio.Task) -> None:
+    # Si todos los callers se fueron, que la excepción no quede sin recoger
+    if not task.cancelled():
+        task.exception()
+
+
+# Registry por nombre
+_flights: Dict[str, SingleFlight] = {}
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Get (or create) single flight group by name"""
+    flight = _flights.get(name)
+    if flight is None:
+        flight = SingleFlight(name)
+        _flights[name] = flight
+    return flight
+
+def get_single_flights_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats de todos los grupos registrados"""
+    return {name: flight.get_stats() for name, flight in _flights.items()}
@@ -0,0 +1,351 @@
+# orchestration/utils/static_bundles.py
+
+"""
+Static Bundles
+
+Build de assets estáticos al arrancar (Python puro, sin Node):
+
+- Concatena y minifica los bundles JS (tracker y dashboard)
+- Nombre con hash de contenido: /static/core.3f2a9c1b4d5e.js
+- Variantes gzip y brotli precalculadas en memoria
+- ETag fuerte por contenido
+
+Las URLs con hash se sirven con Cache-Control immutable. tracker.js
+también se sirve en su URL fija (snippets ya instalados en sitios de
+clientes) con un max-age corto y revalidación por ETag.
+"""
+
+import os
+import re
+import gzip
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bundles: nombre lógico → ficheros (relativos a static/) en orden
+DEFAULT_BUNDLES: Dict[str, List[str]] = {
+    'tracker.js': ['tracker.js'],
+    'core.js': [
+        # Mismo orden que los <script> sueltos de antes; event-bus antes
+        # de app y performance después de api (extiende APIClient)
+        'js/core/utils.js',
+        'js/core/state.js',
+        'js/core/api.js',
+        'js/core/event-bus.js',
+        'js/core/performance.js',
+        'js/core/app.js'
+    ],
+    'managers.js': ['js/managers/*.js'],
+    'components.js': ['js/components/*.js']
+}
+
+
+# ============================================
+# MINIFICACIÓN
+# ============================================
+
+# Tras estos caracteres un '/' abre un regex literal, no una división
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {
+    'return', 'typeof', 'case', 'do', 'else', 'in', 'of',
+    'new', 'delete', 'void', 'throw', 'instanceof', 'yield', 'await'
+}
+
+# Alrededor de estos se puede quitar el espacio sin cambiar tokens
+_TIGHT = set('{}()[];,:=!&|?')
+
+# Saltos de línea que ASI no necesita
+_NEWLINE_AFTER_SAFE = set('{([,;')
+_NEWLINE_BEFORE_SAFE = set('}]),;')
+
+
+def minify_js(source: str) -> str:
+    """
+    Minificación conservadora de JavaScript
+
+    Quita comentarios (salvo /*! ... */ de licencias), indentación y
+    espacios redundantes. Respeta strings, template literals y regex,
+    y conserva los saltos de línea que pueden importar para ASI.
+    """
+    out: List[str] = []
+    i = 0
+    n = len(source)
+    pending_space = ''  # '', ' ' o '\n' pendiente de decidir
+
+    def last_significant() -> str:
+        for chunk in reversed(out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped
+        return ''
+
+    def regex_allowed() -> bool:
+        prev = last_significant()
+        if not prev:
+            return True
+        if prev[-1] in _REGEX_PREFIX:
+            return True
+        word = re.search(r'[A-Za-z_$][\w$]*$', prev)
+        return bool(word) and word.group(0) in _REGEX_KEYWORDS
+
+    def flush_space(next_char: str) -> None:
+        nonlocal pending_space
+        space, pending_space = pending_space, ''
+        if not space or not out:
+            return
+
+        prev = out[-1][-1:]
+        if space == '\n' and not (prev in _NEWLINE_AFTER_SAFE or next_char in _NEWLINE_BEFORE_SAFE):
+            out.append('\n')
+        elif not (prev in _TIGHT or next_char in _TIGHT):
+            out.append(' ')
+
+    while i < n:
+        c = source[i]
+        nxt = source[i + 1] if i + 1 < n else ''
+
+        # Espacios
+        if c in ' \t\r\n\f\v':
+            j = i
+            while j < n and source[j] in ' \t\r\n\f\v':
+                j += 1
+            if '\n' in source[i:j] or pending_space == '\n':
+                pending_space = '\n'
+            else:
+                pending_space = pending_space or ' '
+            i = j
+            continue
+
+        # Comentarios
+        if c == '/' and nxt == '/':
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+
+        if c == '/' and nxt == '*':
+            end = source.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            if source.startswith('/*!', i):
+                flush_space(c)
+                out.append(source[i:end])
+                pending_space = '\n'
+            elif not pending_space:
+                pending_space = ' '
+            i = end
+            continue
+
+        flush_space(c)
+
+        # Strings y template literals
+        if c in '\'"`':
+            j = i + 1
+            while j < n and source[j] != c:
+                if source[j] == '\\':
+                    j += 1
+                elif c != '`' and source[j] == '\n':
+                    break
+                j += 1
+            out.append(source[i:j + 1])
+            i = j + 1
+            continue
+
+        # Regex literal
+        if c == '/' and regex_allowed():
+            j = i + 1
+            in_class = False
+            while j < n:
+                ch = source[j]
+                if ch == '\\':
+                    j += 2
+                    continue
+                if ch == '\n':
+                    break
+                if ch == '[':
+                    in_class = True
+                elif ch == ']':
+                    in_class = False
+                elif ch == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (source[j].isalnum() or source[j] == '_'):
+                j += 1  # flags
+            out.append(source[i:j])
+            i = j
+            continue
+
+        # Resto: identificadores, números, operadores
+        j = i + 1
+        if c.isalnum() or c in '_$':
+            while j < n and (source[j].isalnum() or source[j] in '_$.'):
+                j += 1
+        out.append(source[i:j])
+        i = j
+
+    return ''.join(out).strip() + '\n'
+
+
+# ============================================
+# BUNDLES
+# ============================================
+
+@dataclass
+class StaticBundle:
+    """Un bundle construido, con sus variantes comprimidas"""
+    name: str
+    content_type: str
+    body: bytes
+    digest: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def filename(self) -> str:
+        base, ext = os.path.splitext(self.name)
+        return f"{base}.{self.digest[:12]}{ext}"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:32]}"'
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        return self.encoded.get(encoding, self.body) if encoding else self.body
+
+
+class StaticBundleRegistry:
+    """
+    Bundles construidos al arrancar, indexados por nombre lógico y
+    por nombre con hash
+    """
+
+    def __init__(
+        self,
+        static_dir: str,
+        bundles: Optional[Dict[str, List[str]]] = None,
+        minify: bool = True,
+        gzip_level: int = 9,
+        brotli_quality: int = 11
+    ):
+        self.static_dir = os.path.abspath(static_dir)
+        self.bundle_specs = bundles or DEFAULT_BUNDLES
+        self.minify = minify
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+        self._by_name: Dict[str, StaticBundle] = {}
+        self._by_filename: Dict[str, StaticBundle] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> 'StaticBundleRegistry':
+        return cls(
+            static_dir=settings.STATIC_DIR,
+            minify=settings.STATIC_MINIFY,
+            gzip_level=settings.STATIC_GZIP_LEVEL,
+            brotli_quality=settings.STATIC_BROTLI_QUALITY
+        )
+
+    def build(self) -> 'StaticBundleRegistry':
+        """Construir todos los bundles (una vez, en el arranque)"""
+        for name, patterns in self.bundle_specs.items():
+            files = self._resolve(patterns)
+            if not files:
+                logger.warning(f"Static bundle {name}: no source files found")
+                continue
+
+            bundle = self._build_bundle(name, files)
+            self._by_name[name] = bundle
+            self._by_filename[bundle.filename] = bundle
+
+            logger.info(
+                f"Static bundle {bundle.filename}: {len(files)} files, "
+                f"{len(bundle.body)} bytes"
+                + ''.join(f", {enc} {len(body)}" for enc, body in bundle.encoded.items())
+            )
+
+        return self
+
+    def _resolve(self, patterns: List[str]) -> List[str]:
+        files: List[str] = []
+        for pattern in patterns:
+            if '*' in pattern:
+                directory, _, suffix = pattern.rpartition('/*')
+                full_dir = os.path.join(self.static_dir, directory)
+                if os.path.isdir(full_dir):
+                    files.extend(
+                        os.path.join(directory, entry)
+                        for entry in sorted(os.listdir(full_dir))
+                        if entry.endswith(suffix)
+                    )
+            elif os.path.isfile(os.path.join(self.static_dir, pattern)):
+                files.append(pattern)
+
+        # Sin duplicados, manteniendo el orden
+        return list(dict.fromkeys(files))
+
+    def _build_bundle(self, name: str, files: List[str]) -> StaticBundle:
+        parts = []
+        for relative in files:
+            with open(os.path.join(self.static_dir, relative), encoding='utf-8') as f:
+                source = f.read()
+            parts.append(minify_js(source) if self.minify else source)
+
+        # ';' entre ficheros: uno sin ';' final no se pega al siguiente
+        body = ';\n'.join(part.rstrip().rstrip(';') for part in parts).encode('utf-8') + b';\n'
+
+        encoded = {'gzip': gzip.compress(body, compresslevel=self.gzip_level, mtime=0)}
+        if brotli:
+            encoded['br'] = brotli.compress(body, quality=self.brotli_quality)
+
+        return StaticBundle(
+            name=name,
+            content_type='application/javascript; charset=utf-8',
+            body=body,
+            digest=hashlib.sha256(body).hexdigest(),
+            encoded=encoded,
+            sources=files
+        )
+
+    def get(self, name: str) -> Optional[StaticBundle]:
+        return self._by_name.get(name)
+
+    def get_by_filename(self, filename: str) -> Optional[StaticBundle]:
+        return self._by_filename.get(filename)
+
+    def url(self, name: str) -> str:
+        """URL con hash de un bundle (o la ruta original si no existe)"""
+        bundle = self._by_name.get(name)
+        return f"/static/{bundle.filename if bundle else name}"
+
+    def manifest(self) -> Dict[str, str]:
+        return {name: self.url(name) for name in self._by_name}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            name: {
+                'filename': bundle.filename,
+                'files': len(bundle.sources),
+                'bytes': len(bundle.body),
+                **{f'{enc}_bytes': len(body) for enc, body in bundle.encoded.items()}
+            }
+            for name, bundle in self._by_name.items()
+        }
+
+
+# Singleton instance
+_static_bundles: Optional[StaticBundleRegistry] = None
+
+def get_static_bundles() -> StaticBundleRegistry:
+    """Get singleton static bundle registry (vacía hasta build())"""
+    global _static_bundles
+    if _static_bundles is None:
+        from config.settings import settings
+        _static_bundles = StaticBundleRegistry.from_settings(settings)
+    return _static_bundles
@@ -0,0 +1,443 @@
+# orchestration/utils/stopping_rules.py
+
+"""
+Stopping Rules
+
+Cuándo parar un experimento, más allá de "P(best) ≥ 0.95":
+
+- Expected loss: lo que se pierde (en conversion rate) si se elige la
+  mejor variante y no lo era, relativo a su conversion rate. Por
+  debajo de loss_threshold, seguir testeando no compensa el tráfico
+  que se gasta.
+- Value remaining: percentil (hdi_mass) de (max θ − θ_best) / θ_best,
+  el uplift que todavía podría haber por encima de la mejor.
+- HDI-ROPE: HDI del lift relativo de la mejor frente a cada rival,
+  contra una región de equivalencia práctica ±rope. Todo el HDI por
+  encima → mejor; dentro → equivalentes.
+
+Los draws de cada experimento se guardan entre evaluaciones y solo se
+regeneran los de las variantes cuyos contadores cambiaron: con una
+conversión nueva se redibuja una fila de `samples`, no la matriz
+entera. Así la decisión se puede refrescar en cada conversión. La
+cache está acotada por bytes (LRU por experimento), no por número de
+experimentos: lo que ocupa depende de los arms.
+
+Es la única política de parada: la usan el dashboard (analytics, live
+metrics) y el auto-conclude de WinnerDetectionService (StoppingRulesJob,
+mismas reglas en el compute pool).
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from orchestration.services.analytics_jobs import BetaArm, ExperimentArms, posterior_draws
+from orchestration.utils.compute_pool import ComputeJob
+
+logger = logging.getLogger(__name__)
+
+DECISION_CONTINUE = 'continue'
+DECISION_WINNER = 'winner'
+DECISION_EQUIVALENT = 'equivalent'
+
+
+@dataclass(frozen=True)
+class StoppingPolicy:
+    """Umbrales de las reglas de parada"""
+    prob_threshold: float = 0.95
+    loss_threshold: float = 0.002            # Relativo al CR de la mejor
+    value_remaining_threshold: float = 0.01
+    rope: float = 0.01
+    hdi_mass: float = 0.95
+    min_samples: int = 100
+
+    @classmethod
+    def from_settings(cls, settings) -> 'StoppingPolicy':
+        return cls(
+            prob_threshold=settings.WINNER_DETECTION_THRESHOLD,
+            loss_threshold=settings.STOPPING_LOSS_THRESHOLD,
+            value_remaining_threshold=settings.STOPPING_VALUE_REMAINING,
+            rope=settings.STOPPING_ROPE,
+            hdi_mass=settings.STOPPING_HDI_MASS,
+            min_samples=settings.WINNER_MIN_SAMPLES
+        )
+
+
+@dataclass
+class _ExperimentDraws:
+    """Draws cacheados de un experimento: una fila por arm"""
+    params: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    rows: Dict[str, np.ndarray] = field(default_factory=dict)
+    nbytes: int = 0
+    decision_key: Optional[Tuple] = None
+    decision: Optional[Dict[str, Any]] = None
+
+
+class StoppingRuleEngine:
+    """
+    Decisiones de parada por experimento con draws incrementales (por proceso)
+    """
+
+    def __init__(
+        self,
+        policy: Optional[StoppingPolicy] = None,
+        samples: int = 4000,
+        max_cache_bytes: int = 32 * 1024 * 1024,
+        seed: Optional[int] = None
+    ):
+        self.policy = policy or StoppingPolicy()
+        self.samples = samples
+        self.max_cache_bytes = max_cache_bytes
+
+        self._rng = np.random.default_rng(seed)
+        self._experiments: 'OrderedDict[str, _ExperimentDraws]' = OrderedDict()
+        self._cache_bytes = 0
+
+        # Métricas
+        self.evaluations = 0
+        self.cached_decisions = 0
+        self.arms_redrawn = 0
+        self.arms_reused = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_settings(cls, settings) -> 'StoppingRuleEngine':
+        return cls(
+            policy=StoppingPolicy.from_settings(settings),
+            samples=settings.STOPPING_SAMPLES,
+            max_cache_bytes=settings.STOPPING_CACHE_MAX_BYTES
+        )
+
+    def evaluate(self, experiment_id: str, arms: Sequence[BetaArm]) -> Dict[str, Any]:
+        """
+        Decisión de parada para los arms actuales del experimento
+
+        Mismos contadores que la última vez → la decisión cacheada.
+        """
+        experiment_id = str(experiment_id)
+        entry = self._experiments.get(experiment_id)
+        if entry is None:
+            entry = _ExperimentDraws()
+            self._experiments[experiment_id] = entry
+        self._experiments.move_to_end(experiment_id)
+
+        key = tuple((arm.arm_id, arm.alpha, arm.beta) for arm in arms)
+        if entry.decision_key == key:
+            self.cached_decisions += 1
+            return entry.decision
+
+        self.evaluations += 1
+        draws = self._update_draws(entry, arms)
+        self._evict()
+
+        entry.decision = decide(arms, draws, self.policy)
+        entry.decision_key = key
+        return entry.decision
+
+    def forget(self, experiment_id: str) -> None:
+        entry = self._experiments.pop(str(experiment_id), None)
+        if entry is not None:
+            self._cache_bytes -= entry.nbytes
+
+    def _evict(self) -> None:
+        """Fuera los experimentos menos usados hasta caber (el último se queda)"""
+        while self._cache_bytes > self.max_cache_bytes and len(self._experiments) > 1:
+            _, entry = self._experiments.popitem(last=False)
+            self._cache_bytes -= entry.nbytes
+            self.evicted += 1
+
+    def _update_draws(self, entry: _ExperimentDraws, arms: Sequence[BetaArm]) -> np.ndarray:
+        """Matriz (K, samples), redibujando solo los arms que cambiaron"""
+        changed = [
+            arm for arm in arms
+            if entry.params.get(arm.arm_id) != (arm.alpha, arm.beta)
+        ]
+
+        if changed:
+            alpha = np.array([[arm.alpha] for arm in changed], dtype=np.float64)
+            beta = np.array([[arm.beta] for arm in changed], dtype=np.float64)
+            fresh = posterior_draws(self._rng, alpha, beta, self.samples)    # (m, 1, S)
+
+            for i, arm in enumerate(changed):
+                entry.params[arm.arm_id] = (arm.alpha, arm.beta)
+                # Copia: una vista retendría el bloque entero de `fresh`
+                entry.rows[arm.arm_id] = fresh[i, 0].copy()
+
+        # Arms que ya no están (variantes pausadas)
+        current = {arm.arm_id for arm in arms}
+        for arm_id in [a for a in entry.params if a not in current]:
+            del entry.params[arm_id]
+            del entry.rows[arm_id]
+
+        nbytes = sum(row.nbytes for row in entry.rows.values())
+        self._cache_bytes += nbytes - entry.nbytes
+        entry.nbytes = nbytes
+
+        self.arms_redrawn += len(changed)
+        self.arms_reused += len(arms) - len(changed)
+
+        if not arms:
+            return np.empty((0, self.samples))
+        return np.stack([entry.rows[arm.arm_id] for arm in arms]).astype(np.float64)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'experiments': len(self._experiments),
+            'cache_bytes': self._cache_bytes,
+            'evicted': self.evicted,
+            'evaluations': self.evaluations,
+            'cached_decisions': self.cached_decisions,
+            'arms_redrawn': self.arms_redrawn,
+            'arms_reused': self.arms_reused
+        }
+
+
+# ============================================
+# REGLAS
+# ============================================
+
+def decide(
+    arms: Sequence[BetaArm],
+    draws: np.ndarray,
+    policy: StoppingPolicy
+) -> Dict[str, Any]:
+    """
+    Reglas de parada sobre una matriz de draws (K, samples)
+
+    P(best), expected loss e intervalos creíbles salen de los mismos
+    draws que la decisión: la respuesta nunca mezcla dos pasadas.
+    """
+    return decide_batch([arms], draws[:, None, :], policy)[0]
+
+
+def decide_batch(
+    group: Sequence[Sequence[BetaArm]],
+    draws: np.ndarray,
+    policy: StoppingPolicy
+) -> List[Dict[str, Any]]:
+    """
+    Reglas de parada de n experimentos con el mismo número de arms K
+
+    draws es un bloque (K, n, samples), como en evaluate_experiments:
+    todo se calcula sobre el bloque, sin bucles por experimento salvo
+    para montar la respuesta.
+    """
+    k, n, _ = draws.shape
+    ids = [[arm.arm_id for arm in arms] for arms in group]
+
+    ci_lower, ci_upper = _credible_bounds(draws, policy.hdi_mass)    # (K, n)
+
+    if k < 2:
+        return [
+            {
+                'decision': DECISION_CONTINUE,
+                'reason': 'not_enough_variants',
+                'best_variant': arm_ids[0] if arm_ids else None,
+                'best_confidence': 1.0 if arm_ids else 0.0,
+                'threshold_met': False,
+                'prob_best': {arm_id: 1.0 for arm_id in arm_ids},
+                'expected_loss': {arm_id: 0.0 for arm_id in arm_ids},
+                'credible_intervals': _credible_intervals(arm_ids, ci_lower[:, i], ci_upper[:, i]),
+                'relative_loss': 0.0,
+                'value_remaining': 0.0,
+                'hdi_rope': {}
+            }
+            for i, arm_ids in enumerate(ids)
+        ]
+
+    alpha = np.array([[arm.alpha for arm in arms] for arms in group], dtype=np.float64).T
+    beta = np.array([[arm.beta for arm in arms] for arms in group], dtype=np.float64).T
+    columns = np.arange(n)
+
+    top = draws.max(axis=0)                                          # (n, S)
+    prob_best = (draws == top).mean(axis=2)                          # (K, n)
+    expected_loss = (top - draws).mean(axis=2)                       # (K, n)
+
+    best = prob_best.argmax(axis=0)                                  # (n,)
+    best_draws = draws[best, columns]                                # (n, S)
+    best_rate = alpha[best, columns] / (alpha + beta)[best, columns]
+    relative_loss = expected_loss[best, columns] / best_rate
+
+    value_remaining = _quantile_sorted(
+        np.sort((top - best_draws) / np.maximum(best_draws, 1e-12), axis=-1),
+        policy.hdi_mass
+    )
+
+    # Lift relativo de la mejor frente a cada arm (la fila de la mejor no se usa)
+    lift = (best_draws[None] - draws) / np.maximum(draws, 1e-12)     # (K, n, S)
+    hdi_lower, hdi_upper = _hdi(lift, policy.hdi_mass)               # (K, n)
+    del lift
+
+    samples_ok = (alpha + beta - 2).min(axis=0) >= policy.min_samples
+
+    decisions = []
+    for i, arm_ids in enumerate(ids):
+        b = int(best[i])
+
+        hdi_rope: Dict[str, Dict[str, Any]] = {}
+        for j, arm_id in enumerate(arm_ids):
+            if j == b:
+                continue
+            lower, upper = float(hdi_lower[j, i]), float(hdi_upper[j, i])
+            hdi_rope[arm_id] = {
+                'lower': lower,
+                'upper': upper,
+                'decision': _rope_decision(lower, upper, policy.rope)
+            }
+
+        rope_decisions = {entry['decision'] for entry in hdi_rope.values()}
+        loss = float(relative_loss[i])
+        remaining = float(value_remaining[i])
+
+        if not samples_ok[i]:
+            decision, reason = DECISION_CONTINUE, 'min_samples'
+        elif rope_decisions == {'equivalent'}:
+            decision, reason = DECISION_EQUIVALENT, 'hdi_rope'
+        elif loss <= policy.loss_threshold:
+            decision, reason = DECISION_WINNER, 'expected_loss'
+        elif remaining <= policy.value_remaining_threshold:
+            decision, reason = DECISION_WINNER, 'value_remaining'
+        elif rope_decisions == {'better'}:
+            decision, reason = DECISION_WINNER, 'hdi_rope'
+        else:
+            decision, reason = DECISION_CONTINUE, 'undecided'
+
+        decisions.append({
+            'decision': decision,
+            'reason': reason,
+            'best_variant': arm_ids[b],
+            'best_confidence': float(prob_best[b, i]),
+            'threshold_met': bool(prob_best[b, i] >= policy.prob_threshold),
+            'prob_best': {arm_id: float(prob_best[j, i]) for j, arm_id in enumerate(arm_ids)},
+            'expected_loss': {arm_id: float(expected_loss[j, i]) for j, arm_id in enumerate(arm_ids)},
+            'credible_intervals': _credible_intervals(arm_ids, ci_lower[:, i], ci_upper[:, i]),
+            'relative_loss': loss,
+            'value_remaining': remaining,
+            'hdi_rope': hdi_rope
+        })
+
+    return decisions
+
+
+def _credible_bounds(draws: np.ndarray, mass: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Intervalo creíble (colas iguales) sobre el último eje de los draws"""
+    if draws.shape[0] == 0:
+        empty = np.empty(draws.shape[:-1])
+        return empty, empty
+
+    tail = (1 - mass) / 2
+    ordered = np.sort(draws, axis=-1)
+    return _quantile_sorted(ordered, tail), _quantile_sorted(ordered, 1 - tail)
+
+
+def _quantile_sorted(ordered: np.ndarray, q: float) -> np.ndarray:
+    """
+    np.quantile (interpolación lineal) sobre el último eje ya ordenado:
+    un sort por bloque es bastante más barato que np.quantile
+    """
+    size = ordered.shape[-1]
+    position = q * (size - 1)
+    lower = int(math.floor(position))
+    upper = min(lower + 1, size - 1)
+    fraction = position - lower
+    return ordered[..., lower] * (1 - fraction) + ordered[..., upper] * fraction
+
+
+def _credible_intervals(
+    ids: Sequence[str],
+    lower: np.ndarray,
+    upper: np.ndarray
+) -> Dict[str, Dict[str, float]]:
+    return {
+        arm_id: {'lower': float(lower[i]), 'upper': float(upper[i])}
+        for i, arm_id in enumerate(ids)
+    }
+
+
+def _hdi(values: np.ndarray, mass: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Highest density interval sobre el último eje: el intervalo más corto
+    con `mass` de los draws
+    """
+    ordered = np.sort(values, axis=-1)
+    size = ordered.shape[-1]
+    width = max(1, int(math.ceil(mass * size)))
+    if width >= size:
+        return ordered[..., 0], ordered[..., -1]
+
+    spans = ordered[..., width:] - ordered[..., :size - width]
+    start = spans.argmin(axis=-1)[..., None]
+    return (
+        np.take_along_axis(ordered, start, axis=-1)[..., 0],
+        np.take_along_axis(ordered, start + width, axis=-1)[..., 0]
+    )
+
+
+def _rope_decision(lower: float, upper: float, rope: float) -> str:
+    if lower > rope:
+        return 'better'
+    if upper < -rope:
+        return 'worse'
+    if lower >= -rope and upper <= rope:
+        return 'equivalent'
+    return 'undecided'
+
+
+# ============================================
+# JOBS
+# ============================================
+
+@dataclass(frozen=True)
+class StoppingRulesJob(ComputeJob[Dict[str, Dict[str, Any]]]):
+    """
+    Decisión de parada de muchos experimentos (sin cache: draws nuevos)
+
+    Las mismas reglas que StoppingRuleEngine, para el job de winner
+    detection. Como evaluate_experiments: experimentos agrupados por K
+    y evaluados en bloques (K, n, samples) de como mucho max_elements.
+    """
+    experiments: Tuple[ExperimentArms, ...]
+    policy: StoppingPolicy
+    samples: int = 4000
+    max_elements: int = 4_000_000
+
+    name = 'stopping_rules'
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        rng = np.random.default_rng()
+        decisions = {}
+
+        groups: Dict[int, List[ExperimentArms]] = {}
+        for experiment in self.experiments:
+            groups.setdefault(len(experiment.arms), []).append(experiment)
+
+        for k, group in groups.items():
+            block = max(1, self.max_elements // (max(k, 1) * self.samples))
+
+            for start in range(0, len(group), block):
+                chunk = group[start:start + block]
+                alpha = np.array([[arm.alpha for arm in e.arms] for e in chunk], dtype=np.float64).T
+                beta = np.array([[arm.beta for arm in e.arms] for e in chunk], dtype=np.float64).T
+                draws = posterior_draws(rng, alpha, beta, self.samples)    # (K, n, S)
+
+                results = decide_batch([e.arms for e in chunk], draws, self.policy)
+                for experiment, decision in zip(chunk, results):
+                    decisions[experiment.experiment_id] = decision
+
+        return decisions
+
+
+# Singleton instance
+_stopping_rules: Optional[StoppingRuleEngine] = None
+
+def get_stopping_rules() -> StoppingRuleEngine:
+    """Get singleton stopping rule engine"""
+    global _stopping_rules
+    if _stopping_rules is None:
+        from config.settings import settings
+        _stopping_rules = StoppingRuleEngine.from_settings(settings)
+    return _stopping_rules
@@ -16,6 +16,7 @@ from public_api.routers.auth import get_current_user
 from data_access.database import get_database, DatabaseManager
 from orchestration.services.platform_credentials_service import PlatformCredentialsService
 from orchestration.services.ads_optimizer_service import AdsOptimizerService
+from orchestration.utils.compute_pool import get_compute_pool, ComputePoolBusy, ComputeJobTimeout
 
 router = APIRouter()
 
@@ -421,7 +422,15 @@ async def get_campaign_analytics(
                 creative['algorithm_state']
             )
     
-    probabilities = optimizer.calculate_probabilities(creatives_list)
+    # Monte Carlo en el compute pool, fuera del event loop
+    try:
+        probabilities = await get_compute_pool().submit(
+            optimizer.probabilities_job(creatives_list)
+        )
+    except ComputePoolBusy:
+        raise HTTPException(503, "Analytics busy, retry shortly", headers={"Retry-After": "2"})
+    except ComputeJobTimeout:
+        raise HTTPException(504, "Analytics computation timed out")
     
     # Best creative
     best_creative_id = max(probabilities, key=probabilities.get) if probabilities else None
@@ -1,15 +1,67 @@
 # public-api/routers/analytics.py
 
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from starlette.background import BackgroundTask
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable
+from datetime import date, datetime
+from uuid import UUID
+from contextlib import aclosing
+import json
+
+from config.settings import settings
 
 from data_access.database import get_database, DatabaseManager
+from data_access.repositories.variant_repository import VariantRepository
+from data_access.repositories.allocation_repository import AllocationRepository
+from data_access.repositories.pagination import (
+    decode_cursor,
+    keyset_page,
+    InvalidCursor,
+    MAX_PAGE_SIZE
+)
 from public_api.routers.auth import get_current_user
+from orchestration.utils.compute_pool import (
+    get_compute_pool,
+    ComputePoolBusy,
+    ComputeJobTimeout
+)
+from orchestration.services.analytics_jobs import variant_arms
+from orchestration.utils.analytics_cache import (
+    get_analytics_cache,
+    analytics_fingerprint,
+    CachedAnalytics
+)
+from orchestration.utils.live_metrics import get_live_metrics
+from orchestration.utils.stopping_rules import (
+    get_stopping_rules,
+    DECISION_CONTINUE,
+    DECISION_WINNER,
+    DECISION_EQUIVALENT
+)
+from orchestration.services.experiment_snapshots import (
+    get_snapshot_store,
+    OfflineQueryJob,
+    OFFLINE_QUERIES,
+    SnapshotUnavailable
+)
+from orchestration.utils.export_stream import (
+    make_encoder,
+    encode_export,
+    ALLOCATION_EXPORT_COLUMNS,
+    ExportFormatUnavailable
+)
+from orchestration.utils.admission_control import RouteLimiter
 
 router = APIRouter()
 
+# Exports simultáneos (cada uno retiene una conexión del pool)
+export_limiter = RouteLimiter(
+    settings.EXPORT_MAX_CONCURRENCY,
+    settings.EXPORT_QUEUE_TIMEOUT_MS / 1000
+)
+
 # ============================================
 # RESPONSE MODELS
 # ============================================
@@ -23,6 +75,7 @@ class VariantAnalytics(BaseModel):
     conversion_rate: float
     confidence_score: float
     probability_best: Optional[float] = None
+    expected_loss: Optional[float] = None
     credible_interval_lower: Optional[float] = None
     credible_interval_upper: Optional[float] = None
 
@@ -48,6 +101,11 @@ class ExperimentAnalytics(BaseModel):
     confidence_threshold_met: bool = False
     continue_testing: bool = True
     
+    # Stopping rules (expected loss, value remaining, HDI-ROPE)
+    stopping_decision: Optional[str] = None
+    stopping_reason: Optional[str] = None
+    value_remaining: Optional[float] = None
+    
     # Recommendations
     recommendations: List[str] = []
 
@@ -71,6 +129,8 @@ class TimeseriesResponse(BaseModel):
 @router.get("/{experiment_id}", response_model=ExperimentAnalytics)
 async def get_experiment_analytics(
     experiment_id: str,
+    request: Request,
+    response: Response,
     user_id: str = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -81,10 +141,20 @@ async def get_experiment_analytics(
     - Variant performance metrics
     - Bayesian statistical analysis
     - Recommendations
+    
+    Cached by (variant_id, allocations, conversions): polls without new
+    data reuse the previous result, and If-None-Match gets 304.
     """
     
+    cache = get_analytics_cache()
+    
     try:
-        # Verify ownership
+        # Verificado hace nada: ni siquiera consultar la DB
+        cached = cache.get_fresh(experiment_id, user_id)
+        if cached is not None:
+            return _cached_response(cached, request, response)
+        
+        # Verify ownership + variant totals (one connection)
         async with db.pool.acquire() as conn:
             exp_row = await conn.fetchrow(
                 """
@@ -94,6 +164,28 @@ async def get_experiment_analytics(
                 """,
                 experiment_id
             )
+            
+            variant_rows = []
+            if exp_row and str(exp_row['user_id']) == user_id:
+                variant_rows = await conn.fetch(
+                    """
+                    SELECT 
+                        v.id,
+                        v.name,
+                        v.total_allocations,
+                        v.total_conversions,
+                        v.observed_conversion_rate,
+                        CASE 
+                            WHEN v.total_allocations >= 30 THEN 0.8
+                            WHEN v.total_allocations >= 10 THEN 0.5
+                            ELSE 0.2
+                        END as confidence_score
+                    FROM variants v
+                    WHERE v.experiment_id = $1 AND v.is_active = true
+                    ORDER BY v.created_at
+                    """,
+                    experiment_id
+                )
         
         if not exp_row:
             raise HTTPException(
@@ -107,82 +199,25 @@ async def get_experiment_analytics(
                 detail="Access denied"
             )
         
-        # Get variant analytics
-        async with db.pool.acquire() as conn:
-            variant_rows = await conn.fetch(
-                """
-                SELECT 
-                    v.id,
-                    v.name,
-                    v.total_allocations,
-                    v.total_conversions,
-                    v.observed_conversion_rate,
-                    CASE 
-                        WHEN v.total_allocations >= 30 THEN 0.8
-                        WHEN v.total_allocations >= 10 THEN 0.5
-                        ELSE 0.2
-                    END as confidence_score
-                FROM variants v
-                WHERE v.experiment_id = $1 AND v.is_active = true
-                ORDER BY v.created_at
-                """,
-                experiment_id
-            )
-        
         variants = [dict(row) for row in variant_rows]
         
-        # Calculate totals
-        total_users = sum(v['total_allocations'] for v in variants)
-        total_conversions = sum(v['total_conversions'] for v in variants)
-        overall_cr = total_conversions / total_users if total_users > 0 else 0
-        
-        # Bayesian analysis
-        bayesian_analysis = await _perform_bayesian_analysis(variants)
-        
-        # Generate recommendations
-        recommendations = _generate_recommendations(
-            variants,
-            bayesian_analysis,
-            total_users
-        )
-        
-        # Build response
-        variant_analytics = [
-            VariantAnalytics(
-                variant_id=str(v['id']),
-                variant_name=v['name'],
-                allocations=v['total_allocations'],
-                conversions=v['total_conversions'],
-                conversion_rate=float(v['observed_conversion_rate']),
-                confidence_score=float(v['confidence_score']),
-                probability_best=bayesian_analysis['prob_best'].get(str(v['id'])),
-                credible_interval_lower=bayesian_analysis['credible_intervals'].get(
-                    str(v['id']), {}
-                ).get('lower'),
-                credible_interval_upper=bayesian_analysis['credible_intervals'].get(
-                    str(v['id']), {}
-                ).get('upper')
+        fingerprint = analytics_fingerprint(
+            (exp_row['name'], exp_row['status'], exp_row['started_at']),
+            *(
+                (str(v['id']), v['name'], v['total_allocations'], v['total_conversions'])
+                for v in variants
             )
-            for v in variants
-        ]
+        )
         
-        return ExperimentAnalytics(
-            experiment_id=str(exp_row['id']),
-            experiment_name=exp_row['name'],
-            status=exp_row['status'],
-            created_at=exp_row['created_at'],
-            started_at=exp_row['started_at'],
-            total_users=total_users,
-            total_conversions=total_conversions,
-            overall_conversion_rate=overall_cr,
-            variants=variant_analytics,
-            recommended_winner=bayesian_analysis.get('best_variant'),
-            winner_confidence=bayesian_analysis.get('best_confidence'),
-            confidence_threshold_met=bayesian_analysis.get('threshold_met', False),
-            continue_testing=not bayesian_analysis.get('threshold_met', False),
-            recommendations=recommendations
+        cached = await cache.get_or_compute(
+            experiment_id,
+            user_id,
+            fingerprint,
+            lambda: _build_experiment_analytics(exp_row, variants)
         )
         
+        return _cached_response(cached, request, response)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -191,6 +226,174 @@ async def get_experiment_analytics(
             detail=f"Analytics failed: {str(e)}"
         )
 
+@router.get("/{experiment_id}/live")
+async def stream_experiment_metrics(
+    experiment_id: str,
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    Live experiment metrics (Server-Sent Events)
+    
+    Streams a snapshot and then per-variant deltas when counters change.
+    All viewers of an experiment share one upstream reader. Reconnect
+    with Last-Event-ID to resume; comment lines are heartbeats.
+    """
+    
+    async with db.pool.acquire() as conn:
+        owner_id = await conn.fetchval(
+            "SELECT user_id FROM experiments WHERE id = $1",
+            experiment_id
+        )
+    
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found"
+        )
+    
+    if str(owner_id) != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    variant_repo = VariantRepository(db.pool)
+    
+    async def load_counts() -> Dict[str, Dict[str, int]]:
+        counts = await variant_repo.get_variant_counts_for_experiments([experiment_id])
+        return {
+            v['id']: {'allocations': v['allocations'], 'conversions': v['conversions']}
+            for variants in counts.values()
+            for v in variants
+        }
+    
+    async def event_stream():
+        yield f"retry: {settings.LIVE_METRICS_RETRY_MS}\n\n"
+        
+        events = get_live_metrics().subscribe(
+            experiment_id,
+            load_counts,
+            last_event_id=request.headers.get('Last-Event-ID')
+        )
+        async with aclosing(events):
+            async for event in events:
+                if await request.is_disconnected():
+                    break
+                
+                if event is None:
+                    yield ": ping\n\n"
+                else:
+                    yield (
+                        f"id: {event.id}\n"
+                        f"event: {event.event}\n"
+                        f"data: {json.dumps(event.data)}\n\n"
+                    )
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.get("/{experiment_id}/export")
+async def export_experiment_allocations(
+    experiment_id: str,
+    export_format: str = Query("csv", alias="format", regex="^(csv|ndjson|parquet)$"),
+    compression: str = Query("gzip", regex="^(gzip|none)$", description="gzip or none (csv/ndjson)"),
+    after_allocated_at: Optional[datetime] = Query(None, description="Resume after this row (allocated_at)"),
+    after_id: Optional[UUID] = Query(None, description="Resume after this row (id)"),
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    Export all allocations of an experiment
+    
+    Streamed from a server-side cursor and encoded on the fly, so memory
+    stays constant whatever the row count. Rows are ordered by
+    (allocated_at, id): to resume an interrupted export pass the values
+    of the last row received as after_allocated_at / after_id.
+    
+    Each export holds a pool connection and a read-only transaction
+    until the download ends, so at most EXPORT_MAX_CONCURRENCY run at
+    once (503 + Retry-After beyond that).
+    """
+    
+    if (after_allocated_at is None) != (after_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after_allocated_at and after_id must be provided together"
+        )
+    
+    async with db.pool.acquire() as conn:
+        owner_id = await conn.fetchval(
+            "SELECT user_id FROM experiments WHERE id = $1",
+            experiment_id
+        )
+    
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found"
+        )
+    
+    if str(owner_id) != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    try:
+        encoder = make_encoder(export_format, ALLOCATION_EXPORT_COLUMNS)
+    except ExportFormatUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    compressed = compression == "gzip" and encoder.compressible
+    filename = f"experiment-{experiment_id}-allocations.{encoder.extension}"
+    if compressed:
+        filename += ".gz"
+    
+    if not await export_limiter.acquire():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports in progress, retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    release = _release_once(export_limiter)
+    
+    rows = AllocationRepository(db.pool).stream_experiment_allocations(
+        experiment_id,
+        after=(after_allocated_at, after_id) if after_id else None,
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+    
+    # El hueco se libera al terminar el stream (o al cortarse); la
+    # background task lo cubre si el stream no llegó a empezar
+    return StreamingResponse(
+        _release_after(
+            encode_export(
+                rows,
+                encoder,
+                compression="gzip" if compressed else None,
+                level=settings.EXPORT_GZIP_LEVEL
+            ),
+            release
+        ),
+        media_type="application/gzip" if compressed else encoder.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store"
+        },
+        background=BackgroundTask(release)
+    )
+
 @router.get("/{experiment_id}/timeseries", response_model=TimeseriesResponse)
 async def get_timeseries_analytics(
     experiment_id: str,
@@ -289,10 +492,145 @@ async def get_timeseries_analytics(
             detail=f"Timeseries analytics failed: {str(e)}"
         )
 
+@router.get("/{experiment_id}/allocations")
+async def list_experiment_allocations(
+    experiment_id: str,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    List allocations for experiment, newest first
+    
+    Cursor-paginated: pass next_cursor to get the following page.
+    Every page costs the same, however deep. For full dumps use /export.
+    """
+    
+    async with db.pool.acquire() as conn:
+        exp_exists = await conn.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM experiments WHERE id = $1 AND user_id = $2)",
+            experiment_id, user_id
+        )
+    
+    if not exp_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found or access denied"
+        )
+    
+    try:
+        return await AllocationRepository(db.pool).get_experiment_allocations(
+            experiment_id,
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/{experiment_id}/offline/{query_name}")
+async def run_offline_query(
+    experiment_id: str,
+    query_name: str,
+    start_date: Optional[date] = Query(None, description="First allocation date (UTC)"),
+    end_date: Optional[date] = Query(None, description="Last allocation date (UTC)"),
+    segment: Optional[str] = Query(
+        None,
+        regex="^[A-Za-z0-9_]{1,64}$",
+        description="Context key for segment_breakdown (e.g. country)"
+    ),
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    Predefined aggregate over the experiment's Parquet snapshot
+    
+    Queries: variant_summary, daily_conversion, conversion_lag,
+    segment_breakdown. Runs on the columnar snapshot (DuckDB) in the
+    compute pool, never on the production database; data is as fresh
+    as the last snapshot export.
+    """
+    
+    if query_name not in OFFLINE_QUERIES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown query. Available: {', '.join(OFFLINE_QUERIES)}"
+        )
+    
+    if query_name == 'segment_breakdown' and not segment:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="segment_breakdown requires a segment"
+        )
+    
+    async with db.pool.acquire() as conn:
+        exp_exists = await conn.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM experiments WHERE id = $1 AND user_id = $2)",
+            experiment_id, user_id
+        )
+    
+    if not exp_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Experiment not found or access denied"
+        )
+    
+    store = get_snapshot_store()
+    manifest = store.read_manifest(experiment_id)
+    
+    if manifest is None or not manifest.get('partitions'):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No snapshot for this experiment yet"
+        )
+    
+    try:
+        result = await get_compute_pool().submit(
+            OfflineQueryJob(
+                files=store.files_glob(experiment_id),
+                query=query_name,
+                start_date=start_date,
+                end_date=end_date,
+                segment=segment,
+                threads=settings.SNAPSHOT_QUERY_THREADS
+            ),
+            timeout=settings.SNAPSHOT_QUERY_TIMEOUT_SECONDS
+        )
+    except SnapshotUnavailable as e:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=str(e)
+        )
+    except ComputePoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics busy, retry shortly",
+            headers={"Retry-After": "2"}
+        )
+    except ComputeJobTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Offline query timed out"
+        )
+    
+    return {
+        'experiment_id': experiment_id,
+        'query': query_name,
+        'snapshot_exported_at': manifest.get('exported_at'),
+        'start_date': start_date,
+        'end_date': end_date,
+        **result
+    }
+
 @router.get("/{experiment_id}/variants/{variant_id}/details")
 async def get_variant_details(
     experiment_id: str,
     variant_id: str,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Activity page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     user_id: str = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -300,6 +638,7 @@ async def get_variant_details(
     Get detailed analytics for specific variant
     
     Includes recent allocations and conversion patterns.
+    recent_activity is cursor-paginated (next_cursor).
     """
     
     try:
@@ -336,25 +675,37 @@ async def get_variant_details(
                 detail="Variant not found"
             )
         
-        # Get recent allocations
+        # Get recent allocations (keyset: allocated_at, id)
+        query = """
+            SELECT 
+                id, allocated_at, converted_at, conversion_value
+            FROM allocations
+            WHERE variant_id = $1
+        """
+        args = [variant_id, limit + 1]
+        
+        if cursor:
+            query += " AND (allocated_at, id) < ($3::timestamptz, $4::uuid)"
+            args.extend(decode_cursor(cursor))
+        
+        query += " ORDER BY allocated_at DESC, id DESC LIMIT $2"
+        
         async with db.pool.acquire() as conn:
-            recent_allocations = await conn.fetch(
-                """
-                SELECT 
-                    allocated_at, converted_at, conversion_value
-                FROM allocations
-                WHERE variant_id = $1
-                ORDER BY allocated_at DESC
-                LIMIT 50
-                """,
-                variant_id
-            )
+            recent_allocations = await conn.fetch(query, *args)
+        
+        activity, next_cursor = keyset_page(recent_allocations, limit, 'allocated_at')
         
         return {
             "variant": dict(variant),
-            "recent_activity": [dict(row) for row in recent_allocations]
+            "recent_activity": activity,
+            "next_cursor": next_cursor
         }
         
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -367,78 +718,122 @@ async def get_variant_details(
 # HELPER FUNCTIONS
 # ============================================
 
-async def _perform_bayesian_analysis(variants: List[Dict]) -> Dict[str, Any]:
-    """
-    Perform Bayesian analysis on variants
+async def _build_experiment_analytics(
+    exp_row: Dict[str, Any],
+    variants: List[Dict]
+) -> ExperimentAnalytics:
+    """Full analytics for an experiment (uncached)"""
     
-    Uses Thompson Sampling statistics to calculate:
-    - Probability each variant is best
-    - Credible intervals
-    - Statistical significance
-    """
+    # Calculate totals
+    total_users = sum(v['total_allocations'] for v in variants)
+    total_conversions = sum(v['total_conversions'] for v in variants)
+    overall_cr = total_conversions / total_users if total_users > 0 else 0
     
-    import numpy as np
-    from scipy import stats
+    # Bayesian analysis + stopping rules in one pass (draws cacheados,
+    # solo se redibujan variantes con cambios)
+    stopping = get_stopping_rules().evaluate(str(exp_row['id']), variant_arms(variants))
+    winner = stopping['decision'] == DECISION_WINNER
     
-    if len(variants) < 2:
-        return {
-            'prob_best': {},
-            'credible_intervals': {},
-            'best_variant': None,
-            'best_confidence': 0,
-            'threshold_met': False
-        }
-    
-    # Calculate probability each is best (Monte Carlo)
-    samples = 10000
-    variant_samples = {}
+    # Generate recommendations
+    recommendations = _generate_recommendations(
+        variants,
+        stopping,
+        total_users
+    )
     
-    for variant in variants:
-        # Beta distribution parameters
-        alpha = variant['total_conversions'] + 1
-        beta = variant['total_allocations'] - variant['total_conversions'] + 1
-        
-        variant_samples[str(variant['id'])] = np.random.beta(alpha, beta, samples)
-    
-    # Count how often each is best
-    prob_best = {}
-    for var_id in variant_samples:
-        is_best_count = sum(
-            variant_samples[var_id][i] == max(
-                variant_samples[vid][i] for vid in variant_samples
-            )
-            for i in range(samples)
+    # Build response
+    variant_analytics = [
+        VariantAnalytics(
+            variant_id=str(v['id']),
+            variant_name=v['name'],
+            allocations=v['total_allocations'],
+            conversions=v['total_conversions'],
+            conversion_rate=float(v['observed_conversion_rate']),
+            confidence_score=float(v['confidence_score']),
+            probability_best=stopping['prob_best'].get(str(v['id'])),
+            expected_loss=stopping['expected_loss'].get(str(v['id'])),
+            credible_interval_lower=stopping['credible_intervals'].get(
+                str(v['id']), {}
+            ).get('lower'),
+            credible_interval_upper=stopping['credible_intervals'].get(
+                str(v['id']), {}
+            ).get('upper')
         )
-        prob_best[var_id] = is_best_count / samples
+        for v in variants
+    ]
     
-    # Calculate credible intervals
-    credible_intervals = {}
-    for variant in variants:
-        alpha = variant['total_conversions'] + 1
-        beta = variant['total_allocations'] - variant['total_conversions'] + 1
-        
-        credible_intervals[str(variant['id'])] = {
-            'lower': float(stats.beta.ppf(0.025, alpha, beta)),
-            'upper': float(stats.beta.ppf(0.975, alpha, beta)),
-            'expected': float(alpha / (alpha + beta))
-        }
+    return ExperimentAnalytics(
+        experiment_id=str(exp_row['id']),
+        experiment_name=exp_row['name'],
+        status=exp_row['status'],
+        created_at=exp_row['created_at'],
+        started_at=exp_row['started_at'],
+        total_users=total_users,
+        total_conversions=total_conversions,
+        overall_conversion_rate=overall_cr,
+        variants=variant_analytics,
+        recommended_winner=stopping['best_variant'] if winner else None,
+        winner_confidence=stopping['best_confidence'],
+        confidence_threshold_met=winner,
+        continue_testing=stopping['decision'] == DECISION_CONTINUE,
+        stopping_decision=stopping['decision'],
+        stopping_reason=stopping['reason'],
+        value_remaining=stopping['value_remaining'],
+        recommendations=recommendations
+    )
+
+def _release_once(limiter: RouteLimiter) -> Callable[[], None]:
+    """release() del limiter que solo cuenta la primera vez"""
+    released = False
     
-    # Determine winner
-    best_variant_id = max(prob_best, key=prob_best.get)
-    best_confidence = prob_best[best_variant_id]
-    threshold_met = best_confidence >= 0.95
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
     
-    return {
-        'prob_best': prob_best,
-        'credible_intervals': credible_intervals,
-        'best_variant': best_variant_id if threshold_met else None,
-        'best_confidence': best_confidence,
-        'threshold_met': threshold_met
+    return release
+
+async def _release_after(
+    stream: AsyncIterator[bytes],
+    release: Callable[[], None]
+) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        release()
+
+def _cached_response(cached: CachedAnalytics, request: Request, response: Response):
+    """Cached result with ETag, or 304 if the dashboard already has it"""
+    
+    headers = {
+        'ETag': cached.etag,
+        'Cache-Control': 'private, no-cache'
     }
+    
+    if _etag_matches(request.headers.get('If-None-Match'), cached.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return cached.value
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista, '*', W/) contra un ETag débil"""
+    if not if_none_match:
+        return False
+    
+    opaque = etag.removeprefix('W/')
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == opaque:
+            return True
+    return False
+
 
 def _generate_recommendations(
     variants: List[Dict],
-    bayesian: Dict[str, Any],
+    stopping: Dict[str, Any],
     total_users: int
 ) -> List[str]:
     """Generate actionable recommendations"""
@@ -451,26 +846,41 @@ def _generate_recommendations(
             f"⏳ Need more data: {total_users}/100 users minimum for reliable results"
         )
     
-    # Check for winner
-    if bayesian.get('threshold_met'):
-        best_name = next(
-            v['name'] for v in variants 
-            if str(v['id']) == bayesian['best_variant']
-        )
+    names = {str(v['id']): v['name'] for v in variants}
+    best_name = names.get(stopping['best_variant'])
+    
+    # Check for winner (stopping rules)
+    if stopping['decision'] == DECISION_WINNER:
         recommendations.append(
-            f"🏆 Clear winner: {best_name} ({bayesian['best_confidence']:.1%} confidence)"
+            f"🏆 Clear winner: {best_name} ({stopping['best_confidence']:.1%} confidence)"
         )
+        if stopping['reason'] == 'expected_loss':
+            recommendations.append(
+                f"Expected loss of choosing {best_name} is "
+                f"{stopping['relative_loss']:.2%} of its conversion rate - "
+                f"more traffic is unlikely to change the decision"
+            )
+        elif stopping['reason'] == 'value_remaining':
+            recommendations.append(
+                f"At most {stopping['value_remaining']:.1%} uplift could remain "
+                f"above {best_name}"
+            )
         recommendations.append("Consider stopping the test and implementing the winner")
+    elif stopping['decision'] == DECISION_EQUIVALENT:
+        recommendations.append(
+            "🤝 Variants are practically equivalent - stop the test and keep "
+            "whichever is cheaper to maintain"
+        )
     else:
         recommendations.append(
             "📊 Continue testing - no clear winner yet"
         )
     
     # Check for underperformers
-    if bayesian.get('prob_best'):
+    if stopping['prob_best']:
         poor_performers = [
             v for v in variants 
-            if bayesian['prob_best'].get(str(v['id']), 0) < 0.05
+            if stopping['prob_best'].get(str(v['id']), 0) < 0.05
         ]
         if poor_performers and total_users > 100:
             recommendations.append(
@@ -5,7 +5,13 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from config.settings import settings
 from orchestration.services.experiment_service import ExperimentService
+from orchestration.utils.fallback_cache import get_fallback_cache
+from orchestration.utils.circuit_breaker import (
+    get_circuit_breaker,
+    PUBLIC_DB_CIRCUIT
+)
 from data_access.database import get_database, DatabaseManager
 from public_api.routers.auth import get_current_user
 
@@ -42,6 +48,32 @@ class ExperimentResponse(BaseModel):
     total_users: int
     conversion_rate: float
 
+class ExperimentSummaryResponse(BaseModel):
+    """Experiment row of the dashboard summary"""
+    id: str
+    name: str
+    status: str
+    optimization_strategy: str
+    created_at: datetime
+    started_at: Optional[datetime]
+    variant_count: int
+    total_users: int
+    total_conversions: int
+    conversion_rate: float
+    leader_variant_id: Optional[str]
+    leader_variant_name: Optional[str]
+    leader_prob_best: Optional[float]
+    leader_expected_loss: Optional[float]
+
+class DashboardSummaryResponse(BaseModel):
+    """Dashboard summary: every experiment of the user in one response"""
+    experiments: List[ExperimentSummaryResponse]
+    status_counts: Dict[str, int]
+    total_users: int
+    total_conversions: int
+    conversion_rate: float
+    refreshed_at: Optional[datetime]
+
 class VariantResponse(BaseModel):
     """Variant response"""
     id: str
@@ -144,7 +176,10 @@ async def list_experiments(
         from data_access.repositories.experiment_repository import ExperimentRepository
         
         repo = ExperimentRepository(db.pool)
-        experiments = await repo.find_by_user(user_id)
+        experiments = await repo.get_summary(
+            user_id,
+            max_age_seconds=settings.DASHBOARD_SUMMARY_MAX_AGE_SECONDS
+        )
         
         # Filter by status if requested
         if status_filter:
@@ -155,7 +190,7 @@ async def list_experiments(
         
         return [
             ExperimentResponse(
-                id=str(exp['id']),
+                id=str(exp['experiment_id']),
                 name=exp['name'],
                 description=exp.get('description'),
                 status=exp['status'],
@@ -175,6 +210,74 @@ async def list_experiments(
             detail=f"Failed to list experiments: {str(e)}"
         )
 
+@router.get("/summary", response_model=DashboardSummaryResponse)
+async def get_dashboard_summary(
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    Dashboard summary
+    
+    Status, counters, conversion rate and current leader (P(best) from
+    the last winner detection cycle) of every experiment, in a single
+    response. Served from the materialized per-user summary, so a page
+    load is one request and usually one index scan.
+    """
+    
+    try:
+        from data_access.repositories.experiment_repository import ExperimentRepository
+        
+        repo = ExperimentRepository(db.pool)
+        experiments = await repo.get_summary(
+            user_id,
+            max_age_seconds=settings.DASHBOARD_SUMMARY_MAX_AGE_SECONDS
+        )
+        
+        status_counts: Dict[str, int] = {}
+        for exp in experiments:
+            status_counts[exp['status']] = status_counts.get(exp['status'], 0) + 1
+        
+        total_users = sum(exp['total_users'] or 0 for exp in experiments)
+        total_conversions = sum(exp['total_conversions'] or 0 for exp in experiments)
+        
+        return DashboardSummaryResponse(
+            experiments=[
+                ExperimentSummaryResponse(
+                    id=str(exp['experiment_id']),
+                    name=exp['name'],
+                    status=exp['status'],
+                    optimization_strategy=exp.get('optimization_strategy') or 'adaptive',
+                    created_at=exp['created_at'],
+                    started_at=exp.get('started_at'),
+                    variant_count=exp['variant_count'] or 0,
+                    total_users=exp['total_users'] or 0,
+                    total_conversions=exp['total_conversions'] or 0,
+                    conversion_rate=float(exp['conversion_rate'] or 0),
+                    leader_variant_id=(
+                        str(exp['leader_variant_id']) if exp['leader_variant_id'] else None
+                    ),
+                    leader_variant_name=exp['leader_variant_name'],
+                    leader_prob_best=exp['leader_prob_best'],
+                    leader_expected_loss=exp['leader_expected_loss']
+                )
+                for exp in experiments
+            ],
+            status_counts=status_counts,
+            total_users=total_users,
+            total_conversions=total_conversions,
+            conversion_rate=total_conversions / total_users if total_users else 0.0,
+            refreshed_at=min(
+                (exp['refreshed_at'] for exp in experiments),
+                default=None
+            )
+        )
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get dashboard summary: {str(e)}"
+        )
+
 @router.get("/{experiment_id}", response_model=ExperimentDetailResponse)
 async def get_experiment(
     experiment_id: str,
@@ -321,19 +424,51 @@ async def assign_user_to_variant(
     PUBLIC ENDPOINT - No auth required for visitor allocation.
     """
     
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    fallback_cache = get_fallback_cache()
+    
     try:
-        service = ExperimentService(db)
+        service = ExperimentService(db, public=True)
         
         # Prepare context
         context = {}
         if session_id:
             context['session_id'] = session_id
         
-        # Allocate user
-        result = await service.allocate_user_to_variant(
-            experiment_id=experiment_id,
-            user_identifier=user_identifier,
-            context=context
+        # Allocate user (deadline corto, circuito abierto → fallback)
+        try:
+            result = await breaker.call(
+                service.allocate_user_to_variant,
+                experiment_id=experiment_id,
+                user_identifier=user_identifier,
+                context=context
+            )
+        except Exception as e:
+            cached = fallback_cache.get_assignment_or_control(
+                experiment_id,
+                user_identifier
+            )
+            if cached is None:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Assignment temporarily unavailable",
+                    headers={"Retry-After": "1"}
+                ) from e
+            
+            breaker.record_fallback()
+            return AssignmentResponse(
+                variant_id=cached['variant_id'],
+                content=cached['content'],
+                assignment_id='',
+                new_assignment=False
+            )
+        
+        # Sticky assignment en memoria (fallback si se descarta tráfico)
+        fallback_cache.remember_assignment(
+            experiment_id,
+            user_identifier,
+            result['variant_id'],
+            result['variant']['content']
         )
         
         return AssignmentResponse(
@@ -367,7 +502,7 @@ async def record_conversion(
     """
     
     try:
-        service = ExperimentService(db)
+        service = ExperimentService(db, public=True)
         
         await service.record_conversion(
             experiment_id=experiment_id,
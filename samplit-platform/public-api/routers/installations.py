@@ -5,7 +5,7 @@ Sistema de Instalaciones
 Gestiona WordPress plugins, proxies, snippets manuales, etc.
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Request
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Query
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -14,6 +14,8 @@ import hashlib
 
 from public_api.routers.auth import get_current_user
 from data_access.database import get_database, DatabaseManager
+from data_access.repositories.pagination import InvalidCursor, MAX_PAGE_SIZE
+from integration.managers.installation_manager import InstallationManager
 
 router = APIRouter()
 
@@ -324,7 +326,7 @@ async def get_installation_details(
                 SELECT event_type, message, created_at
                 FROM installation_logs
                 WHERE installation_id = $1
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT 10
                 """,
                 installation_id
@@ -344,6 +346,39 @@ async def get_installation_details(
             detail=f"Failed to get details: {str(e)}"
         )
 
+@router.get("/{installation_id}/logs")
+async def get_installation_logs(
+    installation_id: str,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    user_id: str = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """Logs de la instalación, más recientes primero (paginado por cursor)"""
+    async with db.pool.acquire() as conn:
+        exists = await conn.fetchval(
+            "SELECT EXISTS(SELECT 1 FROM platform_installations WHERE id = $1 AND user_id = $2)",
+            installation_id, user_id
+        )
+    
+    if not exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Installation not found"
+        )
+    
+    try:
+        return await InstallationManager(db).get_installation_logs_page(
+            installation_id,
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 # ============================================
 # ACTUALIZAR/ELIMINAR
 # ============================================
@@ -9,16 +9,47 @@ PÚBLICO - No requiere auth (es el sitio del usuario quien hace las requests).
 
 from fastapi import APIRouter, HTTPException, status, Request
 from fastapi.responses import Response
+import uuid
+from typing import Optional
 import logging
 
 from integration.proxy.proxy_middleware import MABProxyMiddleware
+from integration.proxy.origin_cache import OriginCache
+from orchestration.utils.fallback_cache import get_fallback_cache
+from orchestration.utils.circuit_breaker import (
+    get_circuit_breaker,
+    PUBLIC_DB_CIRCUIT
+)
+from orchestration.utils.single_flight import (
+    get_single_flight,
+    PROXY_PAGES_FLIGHT,
+    PROXY_INSTALLATIONS_FLIGHT
+)
+from public_api.routers.tracker import load_page_experiments
 from config.settings import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Inicializar proxy middleware
-proxy_middleware = MABProxyMiddleware(api_url=settings.BASE_URL)
+proxy_middleware = MABProxyMiddleware(
+    api_url=settings.BASE_URL,
+    streaming=settings.PROXY_STREAMING_ENABLED,
+    max_scan_bytes=settings.PROXY_INJECTION_MAX_SCAN_BYTES,
+    origin_cache=(
+        OriginCache.from_settings(settings)
+        if settings.PROXY_CACHE_ENABLED else None
+    ),
+    compression_levels={
+        'gzip': settings.PROXY_GZIP_LEVEL,
+        'br': settings.PROXY_BROTLI_QUALITY
+    },
+    coalescer=(
+        get_single_flight(PROXY_PAGES_FLIGHT)
+        if settings.PROXY_COALESCING_ENABLED else None
+    ),
+    micro_cache_seconds=settings.PROXY_MICROCACHE_SECONDS
+)
 
 # ============================================
 # PROXY REQUESTS
@@ -40,22 +71,14 @@ async def proxy_request(
     1. Nginx/Apache del usuario → aquí
     2. Nosotros → sitio original del usuario
     3. Interceptamos HTML
-    4. Inyectamos tracker
+    4. Inyectamos tracker (y, si está activado, aplicamos las variantes
+       del visitante en servidor)
     5. Retornamos HTML modificado
     """
     try:
         # Verificar que la instalación existe y está activa
         db = request.app.state.db
-        
-        async with db.pool.acquire() as conn:
-            installation = await conn.fetchrow(
-                """
-                SELECT id, site_url, status
-                FROM platform_installations
-                WHERE installation_token = $1
-                """,
-                installation_token
-            )
+        installation = await _get_installation(db, installation_token)
         
         if not installation:
             raise HTTPException(
@@ -76,13 +99,43 @@ async def proxy_request(
         
         logger.info(f"Proxying request: {original_url}")
         
+        load_experiments = None
+        user_identifier = None
+        new_visitor = False
+        
+        if settings.PROXY_SERVER_SIDE_VARIANTS:
+            # Visitante sticky por cookie (la misma que usa el tracker)
+            user_identifier = _visitor_id(request.cookies.get(settings.PROXY_VISITOR_COOKIE))
+            if not user_identifier:
+                user_identifier = uuid.uuid4().hex
+                new_visitor = True
+            
+            async def load_experiments():
+                return await load_page_experiments(
+                    db,
+                    installation_token,
+                    original_url,
+                    user_identifier
+                )
+        
         # Procesar a través del middleware
         response = await proxy_middleware.process_request(
             request=request,
             installation_token=installation_token,
-            original_url=original_url
+            original_url=original_url,
+            load_experiments=load_experiments,
+            user_identifier=user_identifier
         )
         
+        if new_visitor and response.headers.get('X-MAB-Injected'):
+            response.set_cookie(
+                settings.PROXY_VISITOR_COOKIE,
+                user_identifier,
+                max_age=settings.PROXY_VISITOR_COOKIE_MAX_AGE,
+                samesite='lax',
+                secure=True
+            )
+        
         return response
         
     except HTTPException:
@@ -106,3 +159,87 @@ async def proxy_root(
     Simplemente delega a proxy_request con path vacío.
     """
     return await proxy_request(installation_token, "", request)
+
+
+def _visitor_id(cookie: Optional[str]) -> Optional[str]:
+    """
+    Id del visitante desde la cookie, normalizado (uuid hex)
+
+    Cualquier otro valor se descarta y el visitante se trata como nuevo:
+    el id acaba en el HTML (config del tracker) y en la base de datos.
+    """
+    if not cookie:
+        return None
+    try:
+        return uuid.UUID(cookie).hex
+    except ValueError:
+        return None
+
+
+async def _get_installation(db, installation_token: str):
+    """
+    Lookup de instalación coalescido: en un pico de tráfico todas las
+    requests concurrentes comparten una sola consulta (y su resultado
+    unos segundos)
+    """
+    if not settings.PROXY_COALESCING_ENABLED:
+        return await _lookup_installation(db, installation_token)
+    
+    return await get_single_flight(PROXY_INSTALLATIONS_FLIGHT).do(
+        ('installation', installation_token),
+        lambda: _lookup_installation(db, installation_token),
+        ttl_for=lambda installation: (
+            settings.PROXY_MICROCACHE_SECONDS if installation else None
+        )
+    )
+
+
+async def _lookup_installation(db, installation_token: str):
+    """
+    Instalación del proxy, protegida por el circuit breaker
+    
+    Si la base de datos no responde se usa la última instalación
+    conocida en memoria para no cortar el sitio del usuario.
+    """
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    fallback_cache = get_fallback_cache()
+    cache_key = ('installation', installation_token)
+    
+    try:
+        row = await breaker.call(_fetch_installation, db, installation_token)
+    except Exception as e:
+        cached = fallback_cache.get_config(cache_key)
+        if cached is None:
+            logger.error(f"Installation lookup failed: {e!r}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Proxy temporarily unavailable",
+                headers={"Retry-After": "5"}
+            )
+        
+        breaker.record_fallback()
+        return cached
+    
+    if not row:
+        return None
+    
+    installation = {
+        'id': str(row['id']),
+        'site_url': row['site_url'],
+        'status': row['status']
+    }
+    fallback_cache.remember_config(cache_key, installation)
+    
+    return installation
+
+
+async def _fetch_installation(db, installation_token: str):
+    async with db.acquire_public() as conn:
+        return await conn.fetchrow(
+            """
+            SELECT id, site_url, status
+            FROM platform_installations
+            WHERE installation_token = $1
+            """,
+            installation_token
+        )
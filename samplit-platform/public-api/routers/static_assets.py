@@ -0,0 +1,81 @@
+# public-api/routers/static_assets.py
+
+"""
+Static Assets
+
+Sirve los bundles construidos al arrancar (ver static_bundles):
+
+- /static/core.<hash>.js → immutable, 1 año
+- /static/tracker.js (URL fija de los snippets) → max-age corto + ETag
+- Resto de /static → ficheros tal cual
+
+PÚBLICO - tracker.js se pide en cada page view de cada cliente.
+"""
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+from starlette.staticfiles import StaticFiles
+from typing import Optional
+import logging
+
+from orchestration.utils.static_bundles import get_static_bundles
+from integration.proxy.compression import choose_output_encoding
+from config.settings import settings
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Ficheros que no van en ningún bundle (css, iconos...)
+_static_files = StaticFiles(directory=settings.STATIC_DIR, check_dir=False)
+
+
+@router.get("/{path:path}")
+async def serve_static(path: str, request: Request):
+    """
+    Bundle por nombre con hash o por nombre lógico, o fichero estático
+    """
+    bundles = get_static_bundles()
+
+    bundle = bundles.get_by_filename(path)
+    cache_control = IMMUTABLE
+
+    if bundle is None:
+        # URL fija: puede cambiar en el siguiente deploy
+        bundle = bundles.get(path)
+        cache_control = f'public, max-age={settings.STATIC_ALIAS_MAX_AGE}'
+
+    if bundle is None:
+        return await _static_files.get_response(path, request.scope)
+
+    headers = {
+        'ETag': bundle.etag,
+        'Cache-Control': cache_control,
+        'Vary': 'Accept-Encoding'
+    }
+
+    if _etag_matches(request.headers.get('If-None-Match'), bundle.etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding = choose_output_encoding(request.headers.get('Accept-Encoding'))
+    if encoding in bundle.encoded:
+        headers['Content-Encoding'] = encoding
+
+    return Response(
+        content=bundle.variant(encoding),
+        media_type=bundle.content_type,
+        headers=headers
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista, '*' o W/) contra un ETag fuerte"""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
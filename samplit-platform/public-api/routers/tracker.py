@@ -8,13 +8,30 @@ NO requieren autenticación (son llamados por el sitio del usuario).
 """
 
 from fastapi import APIRouter, HTTPException, status, Query, Request
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+import copy
+import logging
 
 from data_access.database import get_database, DatabaseManager
+from orchestration.services.experiment_service import ExperimentService
+from orchestration.services.client_decision_service import (
+    ClientDecisionService,
+    BUCKETING_SPEC,
+    DECISION_MODE_CLIENT,
+    get_decision_mode
+)
+from orchestration.utils.fallback_cache import get_fallback_cache
+from orchestration.utils.circuit_breaker import (
+    get_circuit_breaker,
+    PUBLIC_DB_CIRCUIT
+)
+from config.settings import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # ============================================
 # MODELS
@@ -34,6 +51,20 @@ class TrackEventRequest(BaseModel):
     variant_id: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
 
+class BatchEvent(BaseModel):
+    """Evento dentro de un batch del tracker"""
+    event_type: str  # assignment, page_view, click, conversion, etc
+    experiment_id: Optional[str] = None
+    variant_id: Optional[str] = None
+    user_identifier: Optional[str] = None
+    session_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+class TrackEventBatchRequest(BaseModel):
+    """Request para registrar varios eventos del tracker a la vez"""
+    installation_token: str
+    events: List[BatchEvent] = Field(..., max_items=500)
+
 # ============================================
 # OBTENER EXPERIMENTOS ACTIVOS
 # ============================================
@@ -42,6 +73,11 @@ class TrackEventRequest(BaseModel):
 async def get_experiments_for_tracker(
     installation_token: str = Query(..., description="Token de instalación"),
     url: str = Query(..., description="URL de la página"),
+    user_identifier: Optional[str] = Query(
+        None,
+        description="Identificador del visitante (asigna variantes en la misma respuesta)"
+    ),
+    session_id: Optional[str] = Query(None, description="Session ID"),
     request: Request = None
 ):
     """
@@ -49,104 +85,435 @@ async def get_experiments_for_tracker(
     
     Endpoint público usado por el tracker JavaScript.
     Retorna experimentos que deben ejecutarse en esa URL.
+    
+    Si se envía user_identifier, cada experimento incluye ya su
+    'assignment' (variante decidida), evitando un /assign por experimento.
+    
+    Si la base de datos está lenta o el circuito está abierto se sirve
+    la última config buena de esa URL (con 'stale': true) y las
+    asignaciones sticky que haya en memoria.
     """
+    db = request.app.state.db
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    fallback_cache = get_fallback_cache()
+    
     try:
-        db = request.app.state.db
+        installation, experiments = await breaker.call(
+            _load_experiments_for_url,
+            db,
+            installation_token,
+            url
+        )
+    except Exception as e:
+        stale = fallback_cache.get_config((installation_token, url))
         
-        async with db.pool.acquire() as conn:
-            # Verificar instalación
-            installation = await conn.fetchrow(
-                """
-                SELECT id, user_id, site_url, status
-                FROM platform_installations
-                WHERE installation_token = $1
-                """,
-                installation_token
-            )
-            
-            if not installation:
-                return {
-                    'experiments': [],
-                    'count': 0,
-                    'error': 'Invalid installation token'
-                }
-            
-            if installation['status'] != 'active':
-                return {
-                    'experiments': [],
-                    'count': 0,
-                    'error': f"Installation is {installation['status']}"
-                }
-            
-            # Obtener experimentos activos para esta URL
-            experiment_rows = await conn.fetch(
-                """
-                SELECT 
-                    e.id, e.name, e.config,
-                    json_agg(
-                        json_build_object(
-                            'id', ee.id,
-                            'name', ee.name,
-                            'element_order', ee.element_order,
-                            'selector_type', ee.selector_type,
-                            'selector_value', ee.selector_value,
-                            'element_type', ee.element_type,
-                            'variants', (
-                                SELECT json_agg(
-                                    json_build_object(
-                                        'id', ev.id,
-                                        'variant_order', ev.variant_order,
-                                        'content', ev.content
-                                    ) ORDER BY ev.variant_order
-                                )
-                                FROM element_variants ev
-                                WHERE ev.element_id = ee.id
-                            )
-                        ) ORDER BY ee.element_order
-                    ) as elements
-                FROM experiments e
-                JOIN experiment_elements ee ON e.id = ee.experiment_id
-                WHERE e.user_id = $1
-                  AND e.status = 'active'
-                  AND (e.url = $2 OR $2 LIKE e.url || '%')
-                GROUP BY e.id
-                """,
-                installation['user_id'],
-                url
-            )
-            
-            # Formatear experimentos
-            experiments = []
-            for row in experiment_rows:
-                experiments.append({
-                    'id': str(row['id']),
-                    'name': row['name'],
-                    'config': row['config'],
-                    'elements': row['elements']
-                })
-            
-            # Actualizar última actividad de la instalación
-            await conn.execute(
-                """
-                UPDATE platform_installations
-                SET last_activity = NOW()
-                WHERE installation_token = $1
-                """,
-                installation_token
-            )
+        if stale is None:
+            # NO fallar - retornar array vacío para que el sitio funcione
+            return {
+                'experiments': [],
+                'count': 0,
+                'error': str(e) or type(e).__name__
+            }
+        
+        breaker.record_fallback()
+        experiments = copy.deepcopy(stale['experiments'])
+        
+        if user_identifier:
+            _attach_cached_assignments(experiments, user_identifier)
         
         return {
             'experiments': experiments,
-            'count': len(experiments)
+            'count': len(experiments),
+            'stale': True
         }
-        
-    except Exception as e:
-        # NO fallar - retornar array vacío para que el sitio funcione
+    
+    if not installation:
         return {
             'experiments': [],
             'count': 0,
-            'error': str(e)
+            'error': 'Invalid installation token'
+        }
+    
+    if installation['status'] != 'active':
+        return {
+            'experiments': [],
+            'count': 0,
+            'error': f"Installation is {installation['status']}"
+        }
+    
+    # Última config buena (sin datos del visitante) para fallback
+    fallback_cache.remember_config(
+        (installation_token, url),
+        {
+            'experiments': copy.deepcopy(experiments),
+            'count': len(experiments)
+        }
+    )
+    
+    # Asignar variantes en batch (una sola lectura para todos)
+    if user_identifier and experiments:
+        await _attach_assignments(
+            db,
+            experiments,
+            user_identifier,
+            session_id
+        )
+    
+    return {
+        'experiments': experiments,
+        'count': len(experiments)
+    }
+
+
+async def _load_experiments_for_url(
+    db: DatabaseManager,
+    installation_token: str,
+    url: str
+):
+    """
+    Instalación + experimentos activos para una URL (una conexión)
+    
+    Returns:
+        (installation | None, experiments)
+    """
+    async with db.acquire_public() as conn:
+        # Verificar instalación
+        installation = await conn.fetchrow(
+            """
+            SELECT id, user_id, site_url, status
+            FROM platform_installations
+            WHERE installation_token = $1
+            """,
+            installation_token
+        )
+        
+        if not installation or installation['status'] != 'active':
+            return installation, []
+        
+        # Obtener experimentos activos para esta URL
+        experiments = await _fetch_active_experiments(
+            conn,
+            installation['user_id'],
+            url
+        )
+        
+        # Actualizar última actividad de la instalación
+        await conn.execute(
+            """
+            UPDATE platform_installations
+            SET last_activity = NOW()
+            WHERE installation_token = $1
+            """,
+            installation_token
+        )
+    
+    return installation, experiments
+
+
+# ============================================
+# CONFIG PUBLICADO (CDN)
+# ============================================
+
+@router.get("/config/{installation_token}")
+async def get_tracker_config(
+    installation_token: str,
+    request: Request
+):
+    """
+    Config publicado del tracker
+    
+    No depende del visitante ni de la URL, así que se sirve con
+    Cache-Control público y puede cachearse en CDN.
+    
+    En modo cliente (metadata.decision_mode = 'client') cada experimento
+    incluye 'allocation' con los pesos de sus variantes: el tracker asigna
+    localmente con un hash estable y reporta las asignaciones vía /events,
+    sin llamar a /assign durante la carga de la página.
+    """
+    no_store = {'Cache-Control': 'no-store'}
+    db = request.app.state.db
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    fallback_cache = get_fallback_cache()
+    
+    try:
+        payload = await breaker.call(_build_tracker_config, db, installation_token)
+    except Exception as e:
+        stale = fallback_cache.get_config(('config', installation_token))
+        
+        if stale is None:
+            # NO fallar - el sitio debe seguir funcionando
+            return JSONResponse(
+                content={
+                    'experiments': [],
+                    'count': 0,
+                    'error': str(e) or type(e).__name__
+                },
+                headers=no_store
+            )
+        
+        # Config anterior, sin cachear en CDN para recuperar pronto
+        breaker.record_fallback()
+        return JSONResponse(
+            content={**stale, 'stale': True},
+            headers=no_store
+        )
+    
+    if payload is None:
+        return JSONResponse(
+            content={
+                'experiments': [],
+                'count': 0,
+                'error': 'Invalid or inactive installation'
+            },
+            headers=no_store
+        )
+    
+    fallback_cache.remember_config(('config', installation_token), payload)
+    max_age = payload['refresh_seconds']
+    
+    return JSONResponse(
+        content=payload,
+        headers={
+            'Cache-Control': f'public, max-age={max_age}, s-maxage={max_age}'
+        }
+    )
+
+
+async def _build_tracker_config(
+    db: DatabaseManager,
+    installation_token: str
+) -> Optional[Dict[str, Any]]:
+    """
+    Config publicado de una instalación (None si no existe o no está activa)
+    """
+    async with db.acquire_public() as conn:
+        installation = await conn.fetchrow(
+            """
+            SELECT id, user_id, status, metadata
+            FROM platform_installations
+            WHERE installation_token = $1
+            """,
+            installation_token
+        )
+        
+        if not installation or installation['status'] != 'active':
+            return None
+        
+        experiments = await _fetch_active_experiments(
+            conn,
+            installation['user_id']
+        )
+    
+    decision_mode = get_decision_mode(dict(installation))
+    
+    if decision_mode == DECISION_MODE_CLIENT and experiments:
+        service = ClientDecisionService(db)
+        weights = await service.get_allocation_weights(
+            [exp['id'] for exp in experiments]
+        )
+        
+        for exp in experiments:
+            if exp['id'] in weights:
+                exp['allocation'] = {
+                    'variants': weights[exp['id']],
+                    'bucketing': BUCKETING_SPEC
+                }
+    
+    return {
+        'decision_mode': decision_mode,
+        'experiments': experiments,
+        'count': len(experiments),
+        'refresh_seconds': settings.TRACKER_CONFIG_MAX_AGE
+    }
+
+
+async def _fetch_active_experiments(
+    conn,
+    user_id: str,
+    url: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Experimentos activos del usuario con sus elementos
+    
+    Si url es None se devuelven todos (config publicado para el tracker,
+    que filtra por URL en el cliente).
+    """
+    experiment_rows = await conn.fetch(
+        """
+        SELECT 
+            e.id, e.name, e.url, e.config,
+            json_agg(
+                json_build_object(
+                    'id', ee.id,
+                    'name', ee.name,
+                    'element_order', ee.element_order,
+                    'selector_type', ee.selector_type,
+                    'selector_value', ee.selector_value,
+                    'element_type', ee.element_type,
+                    'variants', (
+                        SELECT json_agg(
+                            json_build_object(
+                                'id', ev.id,
+                                'variant_order', ev.variant_order,
+                                'content', ev.content
+                            ) ORDER BY ev.variant_order
+                        )
+                        FROM element_variants ev
+                        WHERE ev.element_id = ee.id
+                    )
+                ) ORDER BY ee.element_order
+            ) as elements
+        FROM experiments e
+        JOIN experiment_elements ee ON e.id = ee.experiment_id
+        WHERE e.user_id = $1
+          AND e.status = 'active'
+          AND ($2::text IS NULL OR e.url = $2 OR $2 LIKE e.url || '%')
+        GROUP BY e.id
+        """,
+        user_id,
+        url
+    )
+    
+    # Formatear experimentos
+    return [
+        {
+            'id': str(row['id']),
+            'name': row['name'],
+            'url': row['url'],
+            'config': row['config'],
+            'elements': row['elements']
         }
+        for row in experiment_rows
+    ]
+
+
+async def _attach_assignments(
+    db: DatabaseManager,
+    experiments: List[Dict[str, Any]],
+    user_identifier: str,
+    session_id: Optional[str]
+) -> None:
+    """
+    Añadir la variante asignada a cada experimento
+    
+    Usa el path de asignación batch de ExperimentService. Si falla,
+    los experimentos se devuelven sin 'assignment' y el tracker
+    recurre a /experiments/{id}/assign como antes.
+    """
+    context = {'session_id': session_id} if session_id else {}
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    
+    try:
+        service = ExperimentService(db, public=True)
+        assignments = await breaker.call(
+            service.allocate_user_to_experiments,
+            experiment_ids=[exp['id'] for exp in experiments],
+            user_identifier=user_identifier,
+            context=context
+        )
+    except Exception as e:
+        logger.warning(f"Batch assignment failed, using cached assignments: {e!r}")
+        breaker.record_fallback()
+        _attach_cached_assignments(experiments, user_identifier)
+        return
+    
+    fallback_cache = get_fallback_cache()
+    
+    for exp in experiments:
+        assignment = assignments.get(exp['id'])
+        if not assignment:
+            continue
+        
+        fallback_cache.remember_assignment(
+            exp['id'],
+            user_identifier,
+            assignment['variant_id'],
+            assignment['variant'].get('content')
+        )
+        
+        exp['assignment'] = {
+            'variant_id': assignment['variant_id'],
+            'content': assignment['variant'].get('content'),
+            'new_assignment': assignment['new_allocation']
+        }
+
+
+async def load_page_experiments(
+    db: DatabaseManager,
+    installation_token: str,
+    url: str,
+    user_identifier: str,
+    session_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Experimentos activos de una URL con la variante del visitante
+    
+    Lo usa el proxy para renderizar las variantes en el servidor.
+    Mismo camino que /experiments: circuit breaker, última config
+    buena y asignaciones sticky en memoria si la base de datos falla.
+    """
+    breaker = get_circuit_breaker(PUBLIC_DB_CIRCUIT)
+    fallback_cache = get_fallback_cache()
+    
+    try:
+        installation, experiments = await breaker.call(
+            _load_experiments_for_url,
+            db,
+            installation_token,
+            url
+        )
+    except Exception:
+        stale = fallback_cache.get_config((installation_token, url))
+        if stale is None:
+            raise
+        
+        breaker.record_fallback()
+        experiments = copy.deepcopy(stale['experiments'])
+        _attach_cached_assignments(experiments, user_identifier)
+        return experiments
+    
+    if not installation or installation['status'] != 'active':
+        return []
+    
+    fallback_cache.remember_config(
+        (installation_token, url),
+        {
+            'experiments': copy.deepcopy(experiments),
+            'count': len(experiments)
+        }
+    )
+    
+    if experiments:
+        await _attach_assignments(
+            db,
+            experiments,
+            user_identifier,
+            session_id
+        )
+    
+    return experiments
+
+
+def _attach_cached_assignments(
+    experiments: List[Dict[str, Any]],
+    user_identifier: str
+) -> None:
+    """
+    Añadir asignaciones sticky conocidas en memoria (sin base de datos)
+    
+    Los experimentos sin asignación en memoria se devuelven sin
+    'assignment'; el tracker mostrará el contenido original.
+    """
+    fallback_cache = get_fallback_cache()
+    
+    for exp in experiments:
+        cached = fallback_cache.get_assignment(exp['id'], user_identifier)
+        if cached:
+            exp['assignment'] = {
+                'variant_id': cached['variant_id'],
+                'content': cached['content'],
+                'new_assignment': False
+            }
 
 
 # ============================================
@@ -171,7 +538,7 @@ async def track_event(
     try:
         db = request.app.state.db
         
-        async with db.pool.acquire() as conn:
+        async with db.acquire_public() as conn:
             # Verificar instalación
             installation = await conn.fetchrow(
                 """
@@ -214,6 +581,82 @@ async def track_event(
         }
 
 
+@router.post("/events")
+async def track_events_batch(
+    batch: TrackEventBatchRequest,
+    request: Request = None
+):
+    """
+    Registrar varios eventos del tracker en una sola request
+    
+    Los eventos 'assignment' (modo cliente) se reconcilian en bulk:
+    se guardan en allocations y actualizan el estado del optimizador.
+    """
+    try:
+        db = request.app.state.db
+        
+        async with db.acquire_public() as conn:
+            # Verificar instalación
+            installation = await conn.fetchrow(
+                """
+                SELECT id, user_id, status
+                FROM platform_installations
+                WHERE installation_token = $1
+                """,
+                batch.installation_token
+            )
+            
+            if not installation or installation['status'] != 'active':
+                return {
+                    'status': 'error',
+                    'error': 'Invalid or inactive installation'
+                }
+            
+            # Actualizar última actividad
+            await conn.execute(
+                """
+                UPDATE platform_installations
+                SET last_activity = NOW()
+                WHERE installation_token = $1
+                """,
+                batch.installation_token
+            )
+        
+        assignments = [
+            {
+                'experiment_id': event.experiment_id,
+                'variant_id': event.variant_id,
+                'user_identifier': event.user_identifier,
+                'session_id': event.session_id
+            }
+            for event in batch.events
+            if event.event_type == 'assignment'
+            and event.variant_id
+            and event.user_identifier
+        ]
+        
+        reconciled = None
+        if assignments:
+            service = ClientDecisionService(db)
+            reconciled = await service.reconcile_assignments(
+                user_id=str(installation['user_id']),
+                assignments=assignments
+            )
+        
+        return {
+            'status': 'success',
+            'received': len(batch.events),
+            'assignments': reconciled
+        }
+        
+    except Exception as e:
+        # NO fallar - el tracker debe continuar funcionando
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
 # ============================================
 # HEALTH CHECK PÚBLICO
 # ============================================
@@ -0,0 +1,104 @@
+# scripts/benchmark_injection.py
+
+"""
+Benchmark de inyección del tracker
+
+Compara la inyección antigua (lower() + re.sub + comparación del
+documento entero) con la de una sola pasada, en str y en bytes,
+sobre páginas de 10KB a 5MB.
+
+Uso:
+    python scripts/benchmark_injection.py
+    python scripts/benchmark_injection.py paginas/*.html   # corpus propio
+"""
+
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from integration.proxy.injection_engine import InjectionEngine
+
+# Tamaños típicos de páginas reales (landing simple → e-commerce con JSON inline)
+PAGE_SIZES = [10_000, 50_000, 100_000, 500_000, 1_000_000, 2_000_000, 5_000_000]
+
+
+def legacy_inject(html: str, tracker_code: str) -> str:
+    """Implementación anterior de InjectionEngine._inject_code"""
+    if '<head>' in html.lower():
+        modified = re.sub(r'(<head[^>]*>)', r'\1' + tracker_code, html,
+                          count=1, flags=re.IGNORECASE)
+        if modified != html:
+            return modified
+
+    if '<body>' in html.lower():
+        modified = re.sub(r'(<body[^>]*>)', r'\1' + tracker_code, html,
+                          count=1, flags=re.IGNORECASE)
+        if modified != html:
+            return modified
+
+    return tracker_code + html
+
+
+def build_page(size: int) -> str:
+    """Página sintética: <head> con metas/estilos y un <body> largo"""
+    head = (
+        '<!DOCTYPE html>\n<html lang="es">\n'
+        '<HEAD lang="es" data-theme="light">\n'
+        '<meta charset="utf-8">\n'
+        + ''.join(f'<link rel="stylesheet" href="/css/{i}.css">\n' for i in range(20))
+        + '<style>' + 'body{margin:0;padding:0}' * 200 + '</style>\n'
+        '</head>\n<body>\n'
+    )
+    block = (
+        '<div class="product-card"><h2>Producto</h2>'
+        '<p>Descripción con acentos: canción, niño, camión.</p>'
+        '<a href="/comprar" class="btn">Comprar</a></div>\n'
+    )
+    repeats = max(1, (size - len(head)) // len(block))
+    return head + block * repeats + '</body>\n</html>\n'
+
+
+def load_corpus(paths):
+    if paths:
+        return [(Path(p).name, Path(p).read_bytes()) for p in paths]
+    return [(f'{size // 1000}KB', build_page(size).encode('utf-8')) for size in PAGE_SIZES]
+
+
+def bench(func, number: int) -> float:
+    """Mejor tiempo por llamada (segundos)"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    engine = InjectionEngine('https://api.samplit.com')
+    tracker = engine.build_tracker_code('inst_benchmark', 'https://example.com/')
+    tracker_bytes = tracker.encode('utf-8')
+
+    print(f"{'page':>10} {'legacy':>10} {'str':>10} {'bytes':>10} {'speedup':>8}")
+
+    for name, body in load_corpus(sys.argv[1:]):
+        html = body.decode('utf-8', errors='replace')
+        number = max(1, 2_000_000 // len(body))
+
+        # str y bytes dan el mismo documento (el legacy no: con <HEAD lang=...>
+        # se saltaba el <head> e inyectaba tras <body>)
+        assert engine._inject_code(body, tracker_bytes) == engine._inject_code(html, tracker).encode('utf-8')
+
+        legacy = bench(lambda: legacy_inject(html, tracker), number)
+        single = bench(lambda: engine._inject_code(html, tracker), number)
+        raw = bench(lambda: engine._inject_code(body, tracker_bytes), number)
+
+        # El camino antiguo además decodificaba y re-codificaba la página
+        legacy += bench(lambda: body.decode('utf-8').encode('utf-8'), number)
+
+        print(
+            f"{name:>10} {legacy * 1000:>8.3f}ms {single * 1000:>8.3f}ms "
+            f"{raw * 1000:>8.3f}ms {legacy / raw:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/rebuild_state.py
+
+"""
+Rebuild de estado desde el log de eventos
+
+Recalcula los contadores y el algorithm_state de las variantes (desde
+allocations) y las estadísticas de los paths de funnels (desde
+funnel_sessions), y los reemplaza de forma atómica por experimento /
+funnel. Ver StateRebuildService.
+
+Uso:
+    python scripts/rebuild_state.py                          # todo
+    python scripts/rebuild_state.py --experiment <id> ...    # solo esos
+    python scripts/rebuild_state.py --no-funnels --workers 8
+
+Requiere SUPABASE_DB_URL y ALGORITHM_STATE_SECRET.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config.settings import settings
+from data_access.database import DatabaseManager
+from orchestration.services.state_rebuild_service import StateRebuildService
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--experiment', action='append', default=[],
+                        help='Experiment id (repetible)')
+    parser.add_argument('--funnel', action='append', default=[],
+                        help='Funnel id (repetible)')
+    parser.add_argument('--no-funnels', action='store_true',
+                        help='Solo variantes')
+    parser.add_argument('--workers', type=int, default=settings.STATE_REBUILD_WORKERS)
+    parser.add_argument('--chunk-size', type=int, default=settings.STATE_REBUILD_CHUNK_SIZE)
+    parser.add_argument('--json', action='store_true',
+                        help='Resultado completo en JSON')
+    return parser.parse_args()
+
+
+async def main() -> int:
+    args = parse_args()
+
+    db = DatabaseManager()
+    await db.initialize()
+
+    try:
+        service = StateRebuildService(
+            db,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            abandon_hours=settings.STATE_REBUILD_ABANDON_HOURS
+        )
+
+        filtered = bool(args.experiment or args.funnel)
+        result = await service.run_once(
+            experiment_ids=args.experiment if filtered else None,
+            funnel_ids=args.funnel if filtered else None,
+            funnels=not args.no_funnels
+        )
+    finally:
+        await db.close()
+
+    if result is None:
+        print("❌ Ya hay un rebuild en curso (advisory lock)")
+        return 1
+
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+        return 1 if result['errors'] else 0
+
+    for kind in ('experiments', 'funnels'):
+        for target_id, r in result[kind].items():
+            if 'error' in r:
+                print(f"   ❌ {target_id}: {r['error']}")
+            else:
+                corrected = r.get('variants_corrected', r.get('paths_corrected'))
+                print(
+                    f"   ✅ {target_id}: {r['rows']} filas, {corrected} corregidos, "
+                    f"{r['rows_per_second']:.0f} filas/s"
+                )
+
+    print(
+        f"\n{len(result['experiments'])} experimentos, {len(result['funnels'])} funnels, "
+        f"{result['rows']} filas en {result['duration_seconds']:.1f}s "
+        f"({result['rows_per_second']:.0f} filas/s), {result['errors']} errores"
+    )
+    return 1 if result['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -51,16 +51,34 @@ class MABApp {
         // Metrics Manager (solo si hay usuario autenticado)
         if (this.options.user) {
             this.managers.metrics = new MetricsManager(this.api, this.eventBus, {
-                interval: this.options.updateInterval || 30000
+                interval: this.options.updateInterval || 30000,
+                streamPath: this.options.liveMetricsPath || '/api/v1/analytics/{experimentId}/live'
             });
             
-            // Auto-start metrics
+            // Stream SSE de los experimentos en pantalla, luego auto-start
+            this.watchLiveExperiments();
             this.managers.metrics.start();
         }
         
         this.log('All managers initialized');
     }
     
+    watchLiveExperiments() {
+        const metrics = this.managers.metrics;
+        
+        // Vista de un experimento: su id en page-config; listados: los activos
+        const experimentIds = this.options.experimentId
+            ? [this.options.experimentId]
+            : Array.from(
+                document.querySelectorAll('[data-experiment-id][data-status="active"]'),
+                element => element.dataset.experimentId
+            );
+        
+        new Set(experimentIds).forEach(experimentId => {
+            metrics.watchExperiment(experimentId);
+        });
+    }
+    
     // ===== GLOBAL HANDLERS =====
     
     setupGlobalHandlers() {
@@ -47,6 +47,7 @@
                 
                 // Page info
                 currentPage: config.page || window.location.pathname,
+                experimentId: config.experimentId || null,
                 
                 // Initial data
                 initialData: initialData,
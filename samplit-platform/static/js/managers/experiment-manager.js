@@ -86,7 +86,26 @@ class ExperimentManager {
             throw error;
         }
     }
-    
+
+    /**
+     * Resumen del dashboard: todos los experimentos (estado, contadores,
+     * CR y líder por P(best)) en una sola request, en vez de list +
+     * detalle + analytics por experimento
+     */
+    async getDashboardSummary() {
+        try {
+            const response = await this.api.get('/api/experiments/summary');
+
+            if (response.success) {
+                return response.data;
+            }
+
+        } catch (error) {
+            this.handleError('list', error);
+            throw error;
+        }
+    }
+
     // ===== UPDATE =====
     
     async updateExperiment(experimentId, updates) {
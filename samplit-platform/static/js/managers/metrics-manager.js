@@ -4,7 +4,7 @@
  * Metrics Manager - Gestiona métricas en tiempo real
  * 
  * Responsabilidades:
- * - Polling de métricas desde el backend
+ * - Stream de métricas (SSE) o polling desde el backend
  * - Actualización de elementos con data-live-metric
  * - Retry logic con backoff exponencial
  * - Animaciones de cambios de valores
@@ -20,6 +20,8 @@ class MetricsManager {
             backoffMultiplier: 2,
             maxBackoff: 300000,        // 5 minutos max
             batchUpdates: true,
+            streamPath: null,          // SSE por experimento: '/api/v1/analytics/{experimentId}/live'
+            maxStreams: 4,             // Streams abiertos a la vez (el resto, polling)
             ...options
         };
         
@@ -28,6 +30,11 @@ class MetricsManager {
         this.currentInterval = this.options.interval;
         this.timeoutId = null;
         
+        // Streams SSE por experimento (experimentId → estado de la conexión)
+        this.streams = new Map();
+        this.streamDisabled = false;
+        this.streamRetry = 3000;
+        
         // Registry de métricas
         this.metrics = new Map();
         this.pendingUpdates = new Map();
@@ -49,6 +56,10 @@ class MetricsManager {
         this.eventBus.on('experiment:updated', () => {
             this.updateMetrics(true);
         });
+        
+        this.eventBus.on('experiment:deleted', ({ experimentId }) => {
+            this.unwatchExperiment(experimentId);
+        });
     }
     
     discoverMetrics() {
@@ -81,7 +92,7 @@ class MetricsManager {
             return;
         }
         
-        if (this.metrics.size === 0) {
+        if (this.metrics.size === 0 && this.streams.size === 0) {
             console.warn('[MetricsManager] No metrics to track');
             return;
         }
@@ -89,7 +100,10 @@ class MetricsManager {
         this.isRunning = true;
         console.log('[MetricsManager] Started');
         
-        // Primera actualización inmediata
+        // Push: el servidor manda solo los cambios de cada experimento
+        this.streams.forEach((stream, experimentId) => this.openStream(experimentId));
+        
+        // Polling para lo que no va por stream (primera actualización inmediata)
         this.scheduleNext(1000);
         
         this.eventBus.emit('metrics:started');
@@ -105,6 +119,8 @@ class MetricsManager {
             this.timeoutId = null;
         }
         
+        this.streams.forEach(stream => this.closeStream(stream));
+        
         console.log('[MetricsManager] Stopped');
         this.eventBus.emit('metrics:stopped');
     }
@@ -114,9 +130,14 @@ class MetricsManager {
     async updateMetrics(force = false) {
         if (!this.isRunning && !force) return;
         
-        const metricNames = Array.from(this.metrics.keys());
+        // Las de experimentos con stream ya llegan por push
+        const metricNames = Array.from(this.metrics.keys())
+            .filter(metricName => !this.isStreamedMetric(metricName));
         
         if (metricNames.length === 0) {
+            if (this.isRunning) {
+                this.scheduleNext(this.currentInterval);
+            }
             return;
         }
         
@@ -276,6 +297,239 @@ class MetricsManager {
         return String(num);
     }
     
+    // ===== LIVE STREAMS (SSE por experimento) =====
+    
+    canStream() {
+        return Boolean(
+            this.options.streamPath &&
+            !this.streamDisabled &&
+            window.fetch &&
+            window.ReadableStream &&
+            window.TextDecoder
+        );
+    }
+    
+    /**
+     * Recibir las métricas de un experimento por su stream SSE
+     * 
+     * Sus data-live-metric (visitors-{id}, conversion-{id},
+     * confidence-{id}) dejan de ir por polling. Como mucho maxStreams
+     * a la vez (límite de conexiones por origen del navegador): el
+     * resto sigue con polling.
+     */
+    watchExperiment(experimentId) {
+        if (!experimentId || this.streams.has(experimentId)) return true;
+        if (!this.canStream() || this.streams.size >= this.options.maxStreams) return false;
+        
+        this.streams.set(experimentId, {
+            controller: null,
+            timeoutId: null,
+            lastEventId: null,
+            retryCount: 0
+        });
+        
+        if (this.isRunning) {
+            this.openStream(experimentId);
+        }
+        return true;
+    }
+    
+    unwatchExperiment(experimentId) {
+        const stream = this.streams.get(experimentId);
+        if (!stream) return;
+        
+        this.streams.delete(experimentId);
+        this.closeStream(stream);
+    }
+    
+    closeStream(stream) {
+        if (stream.timeoutId) {
+            clearTimeout(stream.timeoutId);
+            stream.timeoutId = null;
+        }
+        if (stream.controller) {
+            stream.controller.abort();
+            stream.controller = null;
+        }
+    }
+    
+    isStreamedMetric(metricName) {
+        for (const experimentId of this.streams.keys()) {
+            if (metricName.endsWith(`-${experimentId}`)) return true;
+        }
+        return false;
+    }
+    
+    async openStream(experimentId) {
+        const stream = this.streams.get(experimentId);
+        if (!stream || !this.isRunning) return;
+        
+        // fetch en vez de EventSource: hace falta el header Authorization
+        const headers = { 'Accept': 'text/event-stream' };
+        
+        const token = localStorage.getItem('mab_token');
+        if (token) {
+            headers.Authorization = `Bearer ${token}`;
+        }
+        
+        // Reanudar donde se quedó la conexión anterior
+        if (stream.lastEventId) {
+            headers['Last-Event-ID'] = stream.lastEventId;
+        }
+        
+        const controller = new AbortController();
+        stream.controller = controller;
+        
+        const path = this.options.streamPath.replace(
+            '{experimentId}',
+            encodeURIComponent(experimentId)
+        );
+        
+        try {
+            const response = await fetch(this.api.buildUrl(path), {
+                headers,
+                signal: controller.signal
+            });
+            
+            if (!response.ok || !response.body) {
+                throw new Error(`Stream failed with status ${response.status}`);
+            }
+            
+            stream.retryCount = 0;
+            this.eventBus.emit('metrics:stream-opened', { experimentId });
+            
+            await this.readStream(experimentId, stream, response.body);
+            
+        } catch (error) {
+            if (error.name === 'AbortError') return;
+            
+            console.error(`[MetricsManager] Stream error (${experimentId}):`, error);
+            stream.retryCount++;
+            
+            if (stream.retryCount > this.options.retryAttempts) {
+                // Sin stream: sus métricas vuelven al polling
+                console.warn(`[MetricsManager] Stream unavailable for ${experimentId}, falling back to polling`);
+                this.streams.delete(experimentId);
+                
+                if (this.isRunning) {
+                    this.scheduleNext(1000);
+                }
+                return;
+            }
+        } finally {
+            if (stream.controller === controller) {
+                stream.controller = null;
+            }
+        }
+        
+        // Reconectar (con Last-Event-ID) mientras siga activo
+        if (this.isRunning && this.streams.get(experimentId) === stream) {
+            const delay = Math.min(
+                this.streamRetry * Math.pow(this.options.backoffMultiplier, stream.retryCount),
+                this.options.maxBackoff
+            );
+            stream.timeoutId = setTimeout(() => {
+                stream.timeoutId = null;
+                this.openStream(experimentId);
+            }, delay);
+        }
+    }
+    
+    async readStream(experimentId, stream, body) {
+        const reader = body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (this.isRunning && this.streams.get(experimentId) === stream) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Los eventos SSE se separan con una línea en blanco
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                this.handleStreamEvent(experimentId, stream, block);
+            }
+        }
+    }
+    
+    handleStreamEvent(experimentId, stream, block) {
+        let eventType = 'message';
+        let eventId = null;
+        let data = '';
+        
+        block.split('\n').forEach(line => {
+            // Líneas vacías y comentarios (heartbeats)
+            if (!line || line.startsWith(':')) return;
+            
+            const separator = line.indexOf(':');
+            const field = separator === -1 ? line : line.slice(0, separator);
+            let value = separator === -1 ? '' : line.slice(separator + 1);
+            if (value.startsWith(' ')) value = value.slice(1);
+            
+            if (field === 'event') {
+                eventType = value;
+            } else if (field === 'id') {
+                eventId = value;
+            } else if (field === 'data') {
+                data += data ? `\n${value}` : value;
+            } else if (field === 'retry' && /^\d+$/.test(value)) {
+                this.streamRetry = Number(value);
+            }
+        });
+        
+        if (eventId !== null) {
+            stream.lastEventId = eventId;
+        }
+        
+        if (!data) return;
+        
+        try {
+            const payload = JSON.parse(data);
+            const metrics = this.experimentMetrics(experimentId, payload);
+            
+            this.processMetricsUpdate(metrics);
+            
+            this.eventBus.emit(`metrics:${eventType}`, payload);
+            this.eventBus.emit('metrics:updated', metrics);
+        } catch (error) {
+            console.error('[MetricsManager] Invalid stream event:', error);
+        }
+    }
+    
+    /**
+     * Evento del stream → métricas de las vistas del experimento
+     * 
+     * Solo claves propias del experimento: los totales sin prefijo del
+     * payload (total_users...) pisarían las métricas globales del
+     * dashboard.
+     */
+    experimentMetrics(experimentId, payload) {
+        const metrics = {};
+        
+        Object.entries(payload.metrics || {}).forEach(([key, value]) => {
+            // {variant_id}.allocations, .conversions, .conversion_rate
+            if (key.includes('.')) {
+                metrics[key] = value;
+            }
+        });
+        
+        if (payload.totals) {
+            metrics[`visitors-${experimentId}`] = this.formatNumber(payload.totals.total_users);
+        }
+        if (payload.metrics && payload.metrics.conversion_rate !== undefined) {
+            metrics[`conversion-${experimentId}`] = `${(payload.metrics.conversion_rate * 100).toFixed(1)}%`;
+        }
+        if (payload.stopping) {
+            metrics[`confidence-${experimentId}`] = `${Math.round(payload.stopping.best_confidence * 100)}%`;
+        }
+        
+        return metrics;
+    }
+    
     // ===== SCHEDULING =====
     
     scheduleNext(delay) {
@@ -360,7 +614,8 @@ class MetricsManager {
             isRunning: this.isRunning,
             metricCount: this.metrics.size,
             currentInterval: this.currentInterval,
-            retryCount: this.retryCount
+            retryCount: this.retryCount,
+            streams: Array.from(this.streams.keys())
         };
     }
     